@@ -0,0 +1,208 @@
+"""
+AutoGen 学习项目 - 共享运行时组件
+
+示例之间共享的模型客户端、缓存和指标等基础设施。导出名在首次访问时
+才导入所在的子模块，只用到其中一部分的示例不必加载全部依赖。
+"""
+
+from typing import TYPE_CHECKING
+
+from autogen_learning.bootstrap import lazy_exports
+
+if TYPE_CHECKING:
+    from autogen_learning.batch import BatchResult, BatchRunner
+    from autogen_learning.budget import (
+        ContextBudgeter,
+        TokenBudgetModelClient,
+        TokenCounter,
+        get_budgeter,
+    )
+    from autogen_learning.cache import (
+        CachedModelClient,
+        CompletionCache,
+        MemoryLRUCache,
+        SQLiteCache,
+        request_fingerprint,
+    )
+    from autogen_learning.cascade import (
+        DEFAULT_SCORERS,
+        CascadeModelClient,
+        CascadeRequest,
+        choice_scorer,
+        confidence_score,
+        create_cascade_client,
+        json_score,
+        length_scorer,
+        tool_call_score,
+    )
+    from autogen_learning.cassette import (
+        Cassette,
+        CassetteMissError,
+        CassetteModelClient,
+        get_cassette,
+    )
+    from autogen_learning.checkpoint import (
+        Checkpoint,
+        CheckpointStore,
+        TurnCheckpoint,
+        resume,
+        run_with_checkpoints,
+    )
+    from autogen_learning.clients import (
+        DEFAULT_MODEL_INFO,
+        ModelClientRegistry,
+        ModelClientWrapper,
+        PooledModelClient,
+        PoolStats,
+        create_model_client,
+        get_registry,
+    )
+    from autogen_learning.compaction import (
+        SummarizingChatCompletionContext,
+        compaction_enabled,
+        create_model_context,
+    )
+    from autogen_learning.dag import (
+        AgentNode,
+        Edge,
+        NodeResult,
+        ToolNode,
+        Workflow,
+        WorkflowRun,
+    )
+    from autogen_learning.deadline import (
+        DeadlineExceededError,
+        DeadlineTermination,
+        current_deadline,
+        deadline_reached,
+        run_with_deadline,
+    )
+    from autogen_learning.dispatch import (
+        Dispatcher,
+        DispatchResult,
+        dispatch_concurrency,
+    )
+    from autogen_learning.expertise import ExpertiseRouter
+    from autogen_learning.fanout import FanOutTeam
+    from autogen_learning.metrics import Metric, MetricsCollector, MetricType
+    from autogen_learning.pool import (
+        AgentPool,
+        RolePoolStats,
+        TeamPool,
+        TeamRun,
+        history_size,
+    )
+    from autogen_learning.ratelimit import (
+        AsyncRateLimiter,
+        RateLimitedModelClient,
+        get_rate_limiter,
+    )
+    from autogen_learning.resilience import (
+        LatencyTracker,
+        ResilientModelClient,
+        is_retryable_error,
+    )
+    from autogen_learning.routing import (
+        EndpointHealth,
+        LatencyRouter,
+        RoutedModelClient,
+    )
+    from autogen_learning.selection import RuleBasedSelector, SpeakerSelector
+    from autogen_learning.singleflight import SingleFlightGroup, SingleFlightModelClient
+    from autogen_learning.streaming import (
+        StreamRenderer,
+        get_stream_metrics,
+        run_task,
+        streaming_enabled,
+    )
+    from autogen_learning.termination import PhraseMatcher, TerminationEngine
+
+_EXPORTS = {
+    "DEFAULT_MODEL_INFO": "clients",
+    "DEFAULT_SCORERS": "cascade",
+    "AgentNode": "dag",
+    "AgentPool": "pool",
+    "AsyncRateLimiter": "ratelimit",
+    "BatchResult": "batch",
+    "BatchRunner": "batch",
+    "CachedModelClient": "cache",
+    "CascadeModelClient": "cascade",
+    "CascadeRequest": "cascade",
+    "Cassette": "cassette",
+    "CassetteMissError": "cassette",
+    "CassetteModelClient": "cassette",
+    "Checkpoint": "checkpoint",
+    "CheckpointStore": "checkpoint",
+    "CompletionCache": "cache",
+    "ContextBudgeter": "budget",
+    "DeadlineExceededError": "deadline",
+    "DeadlineTermination": "deadline",
+    "DispatchResult": "dispatch",
+    "Dispatcher": "dispatch",
+    "Edge": "dag",
+    "EndpointHealth": "routing",
+    "ExpertiseRouter": "expertise",
+    "FanOutTeam": "fanout",
+    "LatencyRouter": "routing",
+    "LatencyTracker": "resilience",
+    "MemoryLRUCache": "cache",
+    "Metric": "metrics",
+    "MetricType": "metrics",
+    "MetricsCollector": "metrics",
+    "ModelClientRegistry": "clients",
+    "ModelClientWrapper": "clients",
+    "NodeResult": "dag",
+    "PhraseMatcher": "termination",
+    "PoolStats": "clients",
+    "PooledModelClient": "clients",
+    "RateLimitedModelClient": "ratelimit",
+    "ResilientModelClient": "resilience",
+    "RolePoolStats": "pool",
+    "RoutedModelClient": "routing",
+    "RuleBasedSelector": "selection",
+    "SQLiteCache": "cache",
+    "SingleFlightGroup": "singleflight",
+    "SingleFlightModelClient": "singleflight",
+    "SpeakerSelector": "selection",
+    "StreamRenderer": "streaming",
+    "SummarizingChatCompletionContext": "compaction",
+    "TeamPool": "pool",
+    "TeamRun": "pool",
+    "TerminationEngine": "termination",
+    "TokenBudgetModelClient": "budget",
+    "TokenCounter": "budget",
+    "ToolNode": "dag",
+    "TurnCheckpoint": "checkpoint",
+    "Workflow": "dag",
+    "WorkflowRun": "dag",
+    "choice_scorer": "cascade",
+    "compaction_enabled": "compaction",
+    "confidence_score": "cascade",
+    "create_cascade_client": "cascade",
+    "create_model_client": "clients",
+    "create_model_context": "compaction",
+    "current_deadline": "deadline",
+    "deadline_reached": "deadline",
+    "dispatch_concurrency": "dispatch",
+    "get_budgeter": "budget",
+    "get_cassette": "cassette",
+    "get_rate_limiter": "ratelimit",
+    "get_registry": "clients",
+    "get_stream_metrics": "streaming",
+    "history_size": "pool",
+    "is_retryable_error": "resilience",
+    "json_score": "cascade",
+    "length_scorer": "cascade",
+    "request_fingerprint": "cache",
+    "resume": "checkpoint",
+    "run_task": "streaming",
+    "run_with_checkpoints": "checkpoint",
+    "run_with_deadline": "deadline",
+    "streaming_enabled": "streaming",
+    "tool_call_score": "cascade",
+}
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
+
+# 公开名称与延迟导出表保持一致
+__all__ = list(_EXPORTS)
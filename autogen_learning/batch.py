@@ -0,0 +1,159 @@
+"""
+批量执行
+
+把大量互相独立的单轮任务并发地交给同一种智能体处理。每个工作协程持有
+由工厂创建的独立智能体实例，两个任务之间重置状态，因此任务之间不共享
+对话历史；超时或被取消的任务可能让智能体停在半途，之后的任务改用新建的
+实例。并发数有上限，结果按输入顺序返回并附带每个任务的耗时。
+"""
+
+import asyncio
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from autogen_agentchat.base import TaskResult
+from autogen_core import CancellationToken
+
+from autogen_learning.metrics import MetricsCollector
+from autogen_learning.streaming import run_task
+
+
+@dataclass
+class BatchResult:
+    """单个任务的执行结果"""
+
+    index: int
+    task: str
+    result: TaskResult | None = None
+    error: BaseException | None = None
+    wait_time: float = 0.0
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """任务是否成功完成"""
+        return self.error is None and self.result is not None
+
+    @property
+    def content(self) -> str:
+        """最后一条消息的文本，失败时为错误信息"""
+        if self.result is None or not self.result.messages:
+            return f"{type(self.error).__name__}: {self.error}" if self.error else ""
+        return self.result.messages[-1].to_text()
+
+
+async def _reset(runnable: Any) -> None:
+    """清空智能体或团队的对话状态"""
+    if hasattr(runnable, "on_reset"):
+        await runnable.on_reset(CancellationToken())
+    else:
+        await runnable.reset()
+
+
+class BatchRunner:
+    """有界并发的批量任务执行器
+
+    agent_factory 每次调用返回一个新的智能体（或团队）；最多创建 concurrency
+    个实例，每个实例串行处理分配给它的任务。
+    """
+
+    def __init__(
+        self,
+        agent_factory: Callable[[], Any],
+        concurrency: int = 8,
+        timeout: float | None = None,
+        metrics: MetricsCollector | None = None,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency 必须大于 0")
+        self.agent_factory = agent_factory
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.metrics = metrics
+        self.agents_created = 0
+        self.wall_time = 0.0
+        self._results: list[BatchResult] = []
+
+    async def _run_one(self, agent: Any, item: BatchResult) -> bool:
+        """执行一个任务，返回智能体能否继续复用"""
+        started_at = time.monotonic()
+        reusable = True
+        try:
+            async with asyncio.timeout(self.timeout):
+                item.result = await run_task(
+                    agent,
+                    item.task,
+                    metrics=self.metrics,
+                    render=False,
+                )
+        except (TimeoutError, asyncio.CancelledError) as e:
+            task = asyncio.current_task()
+            if task is not None and task.cancelling():
+                # 整个批次被取消，不吞掉取消
+                raise
+            # 运行被中途打断，智能体的状态不可信
+            item.error = e
+            reusable = False
+        except Exception as e:
+            item.error = e
+        item.duration = time.monotonic() - started_at
+
+        if self.metrics is not None:
+            self.metrics.timer("batch.task_duration", item.duration)
+            self.metrics.timer("batch.wait_time", item.wait_time)
+            self.metrics.counter("batch.completed" if item.ok else "batch.failed")
+            if not reusable:
+                self.metrics.counter("batch.agents_discarded")
+        return reusable
+
+    async def _worker(
+        self,
+        queue: asyncio.Queue[BatchResult],
+        queued_at: float,
+    ) -> None:
+        agent: Any = None
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            item.wait_time = time.monotonic() - queued_at
+            if agent is None:
+                agent = self.agent_factory()
+                self.agents_created += 1
+            else:
+                await _reset(agent)
+            if not await self._run_one(agent, item):
+                agent = None
+
+    async def run(self, tasks: Sequence[str]) -> list[BatchResult]:
+        """并发执行所有任务，按输入顺序返回结果（单个任务失败不影响其他任务）"""
+        results = [BatchResult(index=i, task=task) for i, task in enumerate(tasks)]
+        queue: asyncio.Queue[BatchResult] = asyncio.Queue()
+        for item in results:
+            queue.put_nowait(item)
+
+        started_at = time.monotonic()
+        workers = min(self.concurrency, len(results))
+        await asyncio.gather(*(self._worker(queue, started_at) for _ in range(workers)))
+        self.wall_time = time.monotonic() - started_at
+        self._results = results
+        return results
+
+    def stats(self) -> dict[str, Any]:
+        """最近一次批量执行的统计"""
+        durations = [r.duration for r in self._results]
+        serial_time = sum(durations)
+        speedup = serial_time / self.wall_time if self.wall_time else 0.0
+        return {
+            "tasks": len(self._results),
+            "succeeded": sum(1 for r in self._results if r.ok),
+            "failed": sum(1 for r in self._results if not r.ok),
+            "agents_created": self.agents_created,
+            "wall_time": round(self.wall_time, 3),
+            "serial_time": round(serial_time, 3),
+            "speedup": round(speedup, 2),
+            "max_duration": round(max(durations, default=0.0), 3),
+        }
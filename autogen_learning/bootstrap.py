@@ -0,0 +1,54 @@
+"""
+延迟导入
+
+OpenAI SDK 等重量级依赖只在第一次真正使用时才导入，缩短示例和
+test_all_examples.py 子进程的冷启动时间。导入耗时可以用
+``python -m autogen_learning.importtime`` 按示例统计。
+"""
+
+import importlib
+import importlib.util
+import sys
+from collections.abc import Callable, Mapping
+from types import ModuleType
+from typing import Any
+
+
+def lazy_import(name: str) -> ModuleType:
+    """返回延迟加载的模块：首次访问属性时才执行模块代码"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def lazy_exports(
+    package: str,
+    exports: Mapping[str, str],
+) -> tuple[Callable[[str], Any], Callable[[], list[str]]]:
+    """为包生成 PEP 562 的 __getattr__/__dir__，按需导入导出名所在的子模块
+
+    exports 把导出名映射到定义它的子模块（相对包名）；返回的两个函数由包赋给
+    模块级的 __getattr__ 和 __dir__。
+    """
+
+    def module_getattr(name: str) -> Any:
+        if name not in exports:
+            raise AttributeError(f"module '{package}' has no attribute '{name}'")
+        module = importlib.import_module(f"{package}.{exports[name]}")
+        value = getattr(module, name)
+        # 缓存到包命名空间，之后的访问不再经过 __getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def module_dir() -> list[str]:
+        return sorted({*vars(sys.modules[package]), *exports})
+
+    return module_getattr, module_dir
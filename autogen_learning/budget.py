@@ -0,0 +1,266 @@
+"""
+上下文 token 预算
+
+每次调用前在本地统计系统消息、历史和工具定义的 token 数；超出预算时先截断
+过长的单条消息，再从最早的对话轮次开始丢弃（工具调用与结果成对丢弃），
+并用一条说明消息标记省略的内容。节省的 token 数写入日志和 MetricsCollector。
+
+默认关闭：截断和丢弃历史会改变模型看到的内容，需要显式设置预算后，
+注册表客户端才会启用（0 表示关闭）:
+    AUTOGEN_PROMPT_TOKEN_BUDGET=32000
+"""
+
+import importlib
+import json
+import logging
+import os
+import re
+from collections.abc import AsyncGenerator, Sequence
+from typing import Any
+
+from autogen_core.models import (
+    AssistantMessage,
+    ChatCompletionClient,
+    CreateResult,
+    FunctionExecutionResultMessage,
+    LLMMessage,
+    SystemMessage,
+    UserMessage,
+)
+from autogen_core.tools import Tool, ToolSchema
+
+from autogen_learning.clients import ModelClientWrapper
+from autogen_learning.metrics import MetricsCollector
+
+logger = logging.getLogger(__name__)
+
+PROMPT_BUDGET_ENV = "AUTOGEN_PROMPT_TOKEN_BUDGET"
+DEFAULT_PROMPT_TOKEN_BUDGET = 0
+MESSAGE_OVERHEAD_TOKENS = 4
+_CJK = re.compile(r"[　-〿㐀-䶿一-鿿＀-￯]")
+
+
+class TokenCounter:
+    """本地 token 计数器
+
+    优先使用 tiktoken；编码文件不可用（例如离线环境）时退回到估算：
+    每个中日韩字符约 1 个 token，其余文本约 4 个字符 1 个 token。
+    """
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        self.encoding_name = encoding
+        self._encoding: Any = None
+        self._loaded = False
+
+    def _get_encoding(self) -> Any:
+        if not self._loaded:
+            self._loaded = True
+            try:
+                # tiktoken 较重，首次计数时才导入
+                tiktoken = importlib.import_module("tiktoken")
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                logger.warning(f"tiktoken 不可用，使用估算计数: {e}")
+        return self._encoding
+
+    def count_text(self, text: str) -> int:
+        """统计一段文本的 token 数"""
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        cjk = len(_CJK.findall(text))
+        return cjk + (len(text) - cjk + 3) // 4
+
+    def count_message(self, message: LLMMessage) -> int:
+        """统计单条消息的 token 数（含消息格式开销）"""
+        return MESSAGE_OVERHEAD_TOKENS + self.count_text(message_text(message))
+
+    def count_tools(self, tools: Sequence[Tool | ToolSchema]) -> int:
+        """统计工具定义的 token 数"""
+        schemas = [tool.schema if hasattr(tool, "schema") else tool for tool in tools]
+        if not schemas:
+            return 0
+        return self.count_text(json.dumps(schemas, ensure_ascii=False))
+
+
+def message_text(message: LLMMessage) -> str:
+    """消息的纯文本内容（工具调用按 name(arguments) 展开）"""
+    content = message.content
+    if isinstance(content, str):
+        return content
+    if isinstance(message, FunctionExecutionResultMessage):
+        return "\n".join(result.content for result in message.content)
+    parts = []
+    for part in content:
+        if isinstance(part, str):
+            parts.append(part)
+        elif hasattr(part, "arguments"):
+            parts.append(f"{part.name}({part.arguments})")
+    return "\n".join(parts)
+
+
+def _truncate_middle(text: str, keep_chars: int) -> str:
+    """保留首尾，截掉中间部分"""
+    if len(text) <= keep_chars:
+        return text
+    head = keep_chars * 2 // 3
+    tail = keep_chars - head
+    omitted = len(text) - keep_chars
+    return f"{text[:head]}\n…[已省略 {omitted} 个字符]…\n{text[-tail:]}"
+
+
+class ContextBudgeter:
+    """把提示裁剪到 token 预算以内"""
+
+    def __init__(
+        self,
+        max_prompt_tokens: int,
+        max_message_tokens: int | None = None,
+        counter: TokenCounter | None = None,
+        metrics: MetricsCollector | None = None,
+    ):
+        if max_prompt_tokens <= 0:
+            raise ValueError(f"max_prompt_tokens 必须大于 0: {max_prompt_tokens}")
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_message_tokens = max_message_tokens or max_prompt_tokens // 2
+        self.counter = counter or TokenCounter()
+        self.metrics = metrics
+        self.tokens_saved = 0
+        self.messages_dropped = 0
+
+    def _shrink(self, message: LLMMessage) -> LLMMessage:
+        """截断超过单条上限的消息"""
+        tokens = self.counter.count_message(message)
+        if tokens <= self.max_message_tokens:
+            return message
+
+        ratio = self.max_message_tokens / tokens
+        if isinstance(message.content, str) and not isinstance(message, SystemMessage):
+            keep = int(len(message.content) * ratio)
+            content = _truncate_middle(message.content, keep)
+            return message.model_copy(update={"content": content})
+        if isinstance(message, FunctionExecutionResultMessage):
+            results = [
+                result.model_copy(
+                    update={
+                        "content": _truncate_middle(
+                            result.content,
+                            int(len(result.content) * ratio),
+                        ),
+                    },
+                )
+                for result in message.content
+            ]
+            return message.model_copy(update={"content": results})
+        return message
+
+    @staticmethod
+    def _turns(history: list[LLMMessage]) -> list[list[LLMMessage]]:
+        """把历史分成可整体丢弃的轮次：工具调用和它的执行结果属于同一轮"""
+        turns: list[list[LLMMessage]] = []
+        for message in history:
+            if isinstance(message, FunctionExecutionResultMessage) and turns:
+                previous = turns[-1][-1]
+                if isinstance(previous, AssistantMessage) and not isinstance(
+                    previous.content,
+                    str,
+                ):
+                    turns[-1].append(message)
+                    continue
+            turns.append([message])
+        return turns
+
+    def fit(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = (),
+    ) -> list[LLMMessage]:
+        """返回不超过预算的消息列表"""
+        count = self.counter.count_message
+        original = sum(count(m) for m in messages) + self.counter.count_tools(tools)
+        if original <= self.max_prompt_tokens:
+            return list(messages)
+
+        system = [m for m in messages if isinstance(m, SystemMessage)]
+        history = [
+            self._shrink(m) for m in messages if not isinstance(m, SystemMessage)
+        ]
+        fixed = sum(count(m) for m in system) + self.counter.count_tools(tools)
+
+        # 从最新的轮次向前保留，最新一轮总是保留
+        turns = self._turns(history)
+        kept: list[list[LLMMessage]] = []
+        used = fixed
+        for turn in reversed(turns):
+            turn_tokens = sum(count(m) for m in turn)
+            if kept and used + turn_tokens > self.max_prompt_tokens:
+                break
+            kept.insert(0, turn)
+            used += turn_tokens
+
+        dropped = len(history) - sum(len(turn) for turn in kept)
+        fitted = list(system)
+        if dropped:
+            fitted.append(
+                UserMessage(
+                    content=f"[上下文预算: 已省略 {dropped} 条较早的消息]",
+                    source="context_budget",
+                ),
+            )
+        for turn in kept:
+            fitted.extend(turn)
+
+        fitted_tokens = sum(count(m) for m in fitted) + self.counter.count_tools(tools)
+        saved = original - fitted_tokens
+        self.tokens_saved += saved
+        self.messages_dropped += dropped
+        logger.info(
+            f"上下文预算: {original} -> {fitted_tokens} tokens "
+            f"(节省 {saved}, 省略 {dropped} 条消息)",
+        )
+        if self.metrics is not None:
+            self.metrics.counter("budget.tokens_saved", saved)
+            self.metrics.counter("budget.messages_dropped", dropped)
+            self.metrics.gauge("budget.prompt_tokens", fitted_tokens)
+        return fitted
+
+
+class TokenBudgetModelClient(ModelClientWrapper):
+    """调用前把提示裁剪到预算以内的模型客户端"""
+
+    def __init__(self, inner: ChatCompletionClient, budgeter: ContextBudgeter):
+        super().__init__(inner)
+        self.budgeter = budgeter
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+        **kwargs: Any,
+    ) -> CreateResult:
+        messages = self.budgeter.fit(messages, tools)
+        return await super().create(messages, tools=tools, **kwargs)
+
+    def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+        **kwargs: Any,
+    ) -> AsyncGenerator[str | CreateResult, None]:
+        messages = self.budgeter.fit(messages, tools)
+        return super().create_stream(messages, tools=tools, **kwargs)
+
+
+_budgeters: dict[int, ContextBudgeter] = {}
+
+
+def get_budgeter() -> ContextBudgeter | None:
+    """获取进程级预算器，未设置或 AUTOGEN_PROMPT_TOKEN_BUDGET=0 时不启用"""
+    budget = int(os.getenv(PROMPT_BUDGET_ENV, str(DEFAULT_PROMPT_TOKEN_BUDGET)))
+    if budget <= 0:
+        return None
+    if budget not in _budgeters:
+        _budgeters[budget] = ContextBudgeter(budget)
+    return _budgeters[budget]
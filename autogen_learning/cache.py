@@ -0,0 +1,314 @@
+"""
+两级补全缓存
+
+内存 LRU 作为第一级，SQLite 文件作为第二级。缓存键是模型、生成参数、
+消息和工具定义的规范化哈希，命中、未命中和淘汰次数写入 MetricsCollector。
+多份配置共用一个缓存文件时，用 namespace 把各自的条目分开。
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, Mapping, Sequence
+from pathlib import Path
+from typing import Any
+
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage
+from autogen_core.tools import Tool, ToolSchema
+from pydantic import BaseModel
+
+from autogen_learning.clients import ModelClientWrapper
+from autogen_learning.metrics import MetricsCollector
+
+
+def _tool_schema(tool: Tool | ToolSchema) -> Any:
+    """获取工具的 JSON schema"""
+    return tool.schema if hasattr(tool, "schema") else tool
+
+
+def _json_output_schema(json_output: Any) -> Any:
+    """将 json_output 参数规范化为可哈希的形式"""
+    if isinstance(json_output, type) and issubclass(json_output, BaseModel):
+        return json_output.model_json_schema()
+    return json_output
+
+
+def request_fingerprint(
+    identity: Mapping[str, Any],
+    messages: Sequence[LLMMessage],
+    tools: Sequence[Tool | ToolSchema] = (),
+    json_output: Any = None,
+    extra_create_args: Mapping[str, Any] | None = None,
+) -> str:
+    """计算请求的规范化哈希（模型、生成参数、消息、工具定义）"""
+    payload = {
+        "identity": dict(identity),
+        "create_args": dict(extra_create_args or {}),
+        "messages": [message.model_dump(mode="json") for message in messages],
+        "tools": [_tool_schema(tool) for tool in tools],
+        "json_output": _json_output_schema(json_output),
+    }
+    canonical = json.dumps(
+        payload,
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MemoryLRUCache:
+    """带 TTL 的内存 LRU 缓存"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        """读取条目，过期条目视为未命中"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created_at, value = entry
+        if time.time() - created_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: str, created_at: float | None = None) -> int:
+        """写入条目，返回因容量淘汰的条目数"""
+        if created_at is None:
+            created_at = time.time()
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        evicted = 0
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """基于 SQLite 的磁盘缓存，按最近访问时间淘汰"""
+
+    def __init__(self, path: str | Path, max_entries: int, ttl: float):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)",
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> tuple[float, str] | None:
+        """读取条目，返回 (创建时间, 值)；过期条目会被删除"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM completions WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE completions SET accessed_at = ? WHERE key = ?",
+                (now, key),
+            )
+            self._conn.commit()
+            return created_at, value
+
+    def put(self, key: str, value: str) -> int:
+        """写入条目，返回因容量淘汰的条目数"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM completions",
+            ).fetchone()
+            evicted = max(0, count - self.max_entries)
+            if evicted:
+                self._conn.execute(
+                    "DELETE FROM completions WHERE key IN ("
+                    " SELECT key FROM completions ORDER BY accessed_at LIMIT ?)",
+                    (evicted,),
+                )
+            self._conn.commit()
+            return evicted
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class CompletionCache:
+    """内存 + 磁盘两级补全缓存
+
+    namespace 作为所有缓存键的前缀，例如配置所在的环境名：各环境的
+    条目互不命中，也可以分别清理。
+    """
+
+    def __init__(
+        self,
+        ttl: float = 3600,
+        memory_entries: int = 256,
+        disk_entries: int = 5000,
+        path: str | Path | None = ".autogen_cache.sqlite",
+        metrics: MetricsCollector | None = None,
+        *,
+        namespace: str = "",
+    ):
+        self.ttl = ttl
+        self.namespace = namespace
+        self.memory = MemoryLRUCache(memory_entries, ttl)
+        self.disk = SQLiteCache(path, disk_entries, ttl) if path else None
+        self.metrics = metrics
+
+    def _count(self, name: str, value: float = 1.0) -> None:
+        if self.metrics is not None and value:
+            self.metrics.counter(name, value)
+
+    def _scoped(self, key: str) -> str:
+        return f"{self.namespace}:{key}" if self.namespace else key
+
+    async def get(self, key: str) -> CreateResult | None:
+        """按内存、磁盘的顺序查找缓存结果"""
+        key = self._scoped(key)
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("cache.memory.hits")
+            return self._decode(value)
+
+        if self.disk is not None:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None:
+                created_at, value = entry
+                self._count("cache.disk.hits")
+                # 回填内存层，保留原始创建时间以保证 TTL 一致
+                self._count(
+                    "cache.memory.evictions",
+                    self.memory.put(key, value, created_at),
+                )
+                return self._decode(value)
+
+        self._count("cache.misses")
+        return None
+
+    async def put(self, key: str, result: CreateResult) -> None:
+        """写入两级缓存"""
+        key = self._scoped(key)
+        value = result.model_dump_json()
+        self._count("cache.memory.evictions", self.memory.put(key, value))
+        if self.disk is not None:
+            evicted = await asyncio.to_thread(self.disk.put, key, value)
+            self._count("cache.disk.evictions", evicted)
+
+    @staticmethod
+    def _decode(value: str) -> CreateResult:
+        result = CreateResult.model_validate_json(value)
+        result.cached = True
+        return result
+
+    def close(self) -> None:
+        """关闭磁盘缓存"""
+        if self.disk is not None:
+            self.disk.close()
+
+
+class CachedModelClient(ModelClientWrapper):
+    """在模型客户端前加一层补全缓存"""
+
+    def __init__(self, inner: ChatCompletionClient, cache: CompletionCache):
+        super().__init__(inner)
+        self.cache = cache
+
+    def _key(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema],
+        json_output: Any,
+        extra_create_args: Mapping[str, Any] | None,
+    ) -> str:
+        return request_fingerprint(
+            self.request_identity(),
+            messages,
+            tools,
+            json_output,
+            extra_create_args,
+        )
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+        json_output: Any = None,
+        extra_create_args: Mapping[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> CreateResult:
+        key = self._key(messages, tools, json_output, extra_create_args)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = await super().create(
+            messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            **kwargs,
+        )
+        await self.cache.put(key, result)
+        return result
+
+    async def create_stream(  # type: ignore[override]
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+        json_output: Any = None,
+        extra_create_args: Mapping[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[str | CreateResult, None]:
+        key = self._key(messages, tools, json_output, extra_create_args)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            if isinstance(cached.content, str):
+                yield cached.content
+            yield cached
+            return
+
+        async for chunk in super().create_stream(
+            messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            **kwargs,
+        ):
+            if isinstance(chunk, CreateResult):
+                await self.cache.put(key, chunk)
+            yield chunk
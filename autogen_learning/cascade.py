@@ -0,0 +1,393 @@
+"""
+模型级联
+
+先用最便宜的端点回答，再用可插拔的启发式规则（工具调用是否合法、JSON
+能否解析、回答是否被截断、模型自报的置信度）给答案打分，分数低于阈值或
+请求失败时才升级到下一层更强的模型。记录每一层承接的流量比例，以及相对
+直接调用最强模型节省的延迟。
+
+示例中通过环境变量启用，按从便宜到昂贵的顺序列出模型:
+    AUTOGEN_CASCADE_MODELS=deepseek-chat,deepseek-reasoner
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from collections.abc import AsyncGenerator, Callable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from autogen_core import FunctionCall
+from autogen_core.models import (
+    ChatCompletionClient,
+    CreateResult,
+    LLMMessage,
+    RequestUsage,
+)
+from autogen_core.tools import Tool, ToolSchema
+
+from autogen_learning.clients import (
+    ModelClientWrapper,
+    client_identity,
+    create_model_client,
+)
+from autogen_learning.metrics import MetricsCollector
+
+logger = logging.getLogger(__name__)
+
+CASCADE_ENV = "AUTOGEN_CASCADE_MODELS"
+DEFAULT_THRESHOLD = 0.6
+
+# 模型自报的置信度，例如“置信度 0.8”或英文回答中的百分比
+_CONFIDENCE = re.compile(
+    r"(?:置信度|信心|confidence)\s*[:：=]?\s*(\d+(?:\.\d+)?)\s*(%)?",
+    re.IGNORECASE,
+)
+_HEDGES = ("我不确定", "无法确定", "不太清楚", "i'm not sure", "i am not sure")
+
+
+@dataclass
+class CascadeRequest:
+    """打分时可用的请求信息"""
+
+    messages: Sequence[LLMMessage]
+    tools: Sequence[Tool | ToolSchema]
+    json_output: Any
+
+
+# 打分函数返回 0~1 的分数，不适用于该请求时返回 None
+Scorer = Callable[[CreateResult, CascadeRequest], float | None]
+
+
+def _tool_name(tool: Tool | ToolSchema) -> str:
+    return tool["name"] if isinstance(tool, Mapping) else tool.name
+
+
+def tool_call_score(result: CreateResult, request: CascadeRequest) -> float | None:
+    """工具调用必须引用已注册的工具，且参数是 JSON 对象"""
+    if not isinstance(result.content, list):
+        return None
+    names = {_tool_name(tool) for tool in request.tools}
+    for call in result.content:
+        if not isinstance(call, FunctionCall) or call.name not in names:
+            return 0.0
+        try:
+            arguments = json.loads(call.arguments or "{}")
+        except json.JSONDecodeError:
+            return 0.0
+        if not isinstance(arguments, dict):
+            return 0.0
+    return 1.0
+
+
+def json_score(result: CreateResult, request: CascadeRequest) -> float | None:
+    """要求 JSON 输出时，回答必须能被解析"""
+    if not request.json_output or not isinstance(result.content, str):
+        return None
+    try:
+        json.loads(result.content)
+    except json.JSONDecodeError:
+        return 0.0
+    return 1.0
+
+
+def length_scorer(min_chars: int = 1) -> Scorer:
+    """文本回答不能为空、过短或因 max_tokens 被截断"""
+
+    def score(result: CreateResult, request: CascadeRequest) -> float | None:  # noqa: ARG001
+        if not isinstance(result.content, str):
+            return None
+        if result.finish_reason == "length":
+            return 0.0
+        return min(len(result.content.strip()) / min_chars, 1.0)
+
+    return score
+
+
+def confidence_score(result: CreateResult, request: CascadeRequest) -> float | None:  # noqa: ARG001
+    """模型自报的置信度（"置信度: 0.7" 或 "confidence: 70%"）和含糊措辞"""
+    if not isinstance(result.content, str):
+        return None
+    match = _CONFIDENCE.search(result.content)
+    if match:
+        value = float(match.group(1))
+        if match.group(2) or value > 1:
+            value /= 100
+        return min(max(value, 0.0), 1.0)
+    text = result.content.lower()
+    if any(hedge in text for hedge in _HEDGES):
+        return 0.3
+    return None
+
+
+def choice_scorer(choices: Sequence[str]) -> Scorer:
+    """回答必须提到给定选项之一（例如选择下一位发言者）"""
+
+    def score(result: CreateResult, request: CascadeRequest) -> float | None:  # noqa: ARG001
+        if not isinstance(result.content, str):
+            return None
+        return 1.0 if any(choice in result.content for choice in choices) else 0.0
+
+    return score
+
+
+DEFAULT_SCORERS: tuple[Scorer, ...] = (
+    tool_call_score,
+    json_score,
+    length_scorer(),
+    confidence_score,
+)
+
+
+@dataclass
+class CascadeTier:
+    """级联中的一层"""
+
+    name: str
+    client: ChatCompletionClient
+    attempts: int = 0
+    served: int = 0
+    escalated: int = 0
+    errors: int = 0
+    latency: float | None = None
+
+    def observe(self, latency: float, alpha: float = 0.2) -> None:
+        """更新延迟的 EWMA"""
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += alpha * (latency - self.latency)
+
+
+class CascadeModelClient(ModelClientWrapper):
+    """由便宜到昂贵逐层尝试、答案不合格时才升级的模型客户端"""
+
+    def __init__(
+        self,
+        tiers: Sequence[tuple[str, ChatCompletionClient]],
+        scorers: Sequence[Scorer] = DEFAULT_SCORERS,
+        threshold: float = DEFAULT_THRESHOLD,
+        metrics: MetricsCollector | None = None,
+    ):
+        if not tiers:
+            raise ValueError("级联至少需要一层模型")
+        self.tiers = [CascadeTier(name, client) for name, client in tiers]
+        self.scorers = list(scorers)
+        self.threshold = threshold
+        self.metrics = metrics
+        self.requests = 0
+        self.latency_saved = 0.0
+        # 模型能力以最强的一层为准
+        super().__init__(self.tiers[-1].client)
+
+    def request_identity(self) -> dict[str, Any]:
+        # 每一层的模型和参数、打分规则和阈值都会影响最终采用的回答
+        return {
+            "cascade": {tier.name: client_identity(tier.client) for tier in self.tiers},
+            "scorers": [getattr(s, "__qualname__", repr(s)) for s in self.scorers],
+            "threshold": self.threshold,
+        }
+
+    def score(self, result: CreateResult, request: CascadeRequest) -> float:
+        """各打分函数中的最低分；没有适用的打分函数时为 1"""
+        scores = [
+            value
+            for value in (scorer(result, request) for scorer in self.scorers)
+            if value is not None
+        ]
+        return min(scores, default=1.0)
+
+    def _served(self, tier: CascadeTier, started_at: float) -> None:
+        tier.served += 1
+        elapsed = time.monotonic() - started_at
+        top = self.tiers[-1]
+        # 与最强一层的平均延迟相比节省的时间（最强层尚无测量时不计）
+        saved = (
+            max(top.latency - elapsed, 0.0)
+            if tier is not top and top.latency is not None
+            else 0.0
+        )
+        self.latency_saved += saved
+        if self.metrics is not None:
+            self.metrics.counter(f"cascade.served.{tier.name}")
+            self.metrics.timer("cascade.latency_saved", saved)
+
+    async def _attempt(
+        self,
+        tier: CascadeTier,
+        request: CascadeRequest,
+        kwargs: dict[str, Any],
+    ) -> CreateResult | None:
+        """调用非最终层并打分，答案不合格或请求失败时返回 None"""
+        tier.attempts += 1
+        attempt_started = time.monotonic()
+        try:
+            result = await tier.client.create(
+                request.messages,
+                tools=request.tools,
+                json_output=request.json_output,
+                **kwargs,
+            )
+        except Exception as e:
+            tier.errors += 1
+            logger.warning(f"级联层 {tier.name} 请求失败，升级: {e}")
+            return None
+        tier.observe(time.monotonic() - attempt_started)
+
+        score = self.score(result, request)
+        if self.metrics is not None:
+            self.metrics.gauge(f"cascade.score.{tier.name}", score)
+        if score < self.threshold:
+            tier.escalated += 1
+            if self.metrics is not None:
+                self.metrics.counter("cascade.escalations")
+            logger.debug(f"级联层 {tier.name} 得分 {score:.2f}，升级")
+            return None
+        return result
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+        json_output: Any = None,
+        **kwargs: Any,
+    ) -> CreateResult:
+        self.requests += 1
+        request = CascadeRequest(messages, tools, json_output)
+        started_at = time.monotonic()
+        for tier in self.tiers[:-1]:
+            result = await self._attempt(tier, request, kwargs)
+            if result is not None:
+                self._served(tier, started_at)
+                return result
+
+        top = self.tiers[-1]
+        top.attempts += 1
+        top_started = time.monotonic()
+        try:
+            result = await top.client.create(
+                messages,
+                tools=tools,
+                json_output=json_output,
+                **kwargs,
+            )
+        except Exception:
+            top.errors += 1
+            raise
+        top.observe(time.monotonic() - top_started)
+        self._served(top, started_at)
+        return result
+
+    async def create_stream(  # type: ignore[override]
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+        json_output: Any = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[str | CreateResult, None]:
+        # 下层答案要先打分，只能整体生成后一次性输出；最终层正常流式输出
+        self.requests += 1
+        request = CascadeRequest(messages, tools, json_output)
+        started_at = time.monotonic()
+        for tier in self.tiers[:-1]:
+            result = await self._attempt(tier, request, kwargs)
+            if result is not None:
+                self._served(tier, started_at)
+                if isinstance(result.content, str):
+                    yield result.content
+                yield result
+                return
+
+        top = self.tiers[-1]
+        top.attempts += 1
+        top_started = time.monotonic()
+        try:
+            async for chunk in top.client.create_stream(
+                messages,
+                tools=tools,
+                json_output=json_output,
+                **kwargs,
+            ):
+                yield chunk
+        except Exception:
+            top.errors += 1
+            raise
+        top.observe(time.monotonic() - top_started)
+        self._served(top, started_at)
+
+    async def close(self) -> None:
+        for tier in self.tiers:
+            await tier.client.close()
+
+    def _usage(self, usages: Sequence[RequestUsage]) -> RequestUsage:
+        return RequestUsage(
+            prompt_tokens=sum(u.prompt_tokens for u in usages),
+            completion_tokens=sum(u.completion_tokens for u in usages),
+        )
+
+    def actual_usage(self) -> RequestUsage:
+        return self._usage([tier.client.actual_usage() for tier in self.tiers])
+
+    def total_usage(self) -> RequestUsage:
+        return self._usage([tier.client.total_usage() for tier in self.tiers])
+
+    def stats(self) -> dict[str, Any]:
+        """各层承接的流量比例、升级次数和节省的延迟"""
+        return {
+            "requests": self.requests,
+            "latency_saved": round(self.latency_saved, 3),
+            "tiers": {
+                tier.name: {
+                    "served": tier.served,
+                    "share": round(tier.served / self.requests, 3)
+                    if self.requests
+                    else 0.0,
+                    "attempts": tier.attempts,
+                    "escalated": tier.escalated,
+                    "errors": tier.errors,
+                    "latency": round(tier.latency, 3)
+                    if tier.latency is not None
+                    else None,
+                }
+                for tier in self.tiers
+            },
+        }
+
+
+def cascade_models() -> list[str]:
+    """AUTOGEN_CASCADE_MODELS 中从便宜到昂贵排列的模型"""
+    return [m.strip() for m in os.getenv(CASCADE_ENV, "").split(",") if m.strip()]
+
+
+def create_cascade_client(
+    temperature: float | None = None,
+    max_tokens: int | None = None,
+    scorers: Sequence[Scorer] = DEFAULT_SCORERS,
+    threshold: float = DEFAULT_THRESHOLD,
+    metrics: MetricsCollector | None = None,
+) -> ChatCompletionClient:
+    """配置了两个及以上级联模型时创建级联客户端，否则返回普通客户端"""
+    models = cascade_models()
+    if len(models) < 2:
+        return create_model_client(temperature=temperature, max_tokens=max_tokens)
+    tiers = [
+        (
+            model,
+            create_model_client(
+                temperature=temperature,
+                max_tokens=max_tokens,
+                model=model,
+            ),
+        )
+        for model in models
+    ]
+    return CascadeModelClient(
+        tiers,
+        scorers=scorers,
+        threshold=threshold,
+        metrics=metrics,
+    )
@@ -0,0 +1,271 @@
+"""
+模型流量录制与回放
+
+record 模式把每次请求和响应（包括流式块和工具调用）写入按内容寻址的
+压缩磁带文件；replay 模式按请求指纹确定性地回放，不访问网络。
+
+通过环境变量启用，对所有注册表客户端生效:
+    AUTOGEN_CASSETTE_MODE=record|replay|off
+    AUTOGEN_CASSETTE=.autogen_cassette.json.gz
+    AUTOGEN_CASSETTE_STRICT=1|0
+
+录制的内容在进程退出（或调用 close()）时一次性写盘。回放默认是严格的：
+只靠宽松指纹匹配到、或者同一请求的录制已经用完时也算失败；关闭严格模式后
+这两种情况照常回放，但仍在 summary() 中单独计数。
+"""
+
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections.abc import AsyncGenerator, Mapping, Sequence
+from pathlib import Path
+from typing import Any
+
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage
+from autogen_core.tools import Tool, ToolSchema
+
+from autogen_learning.cache import request_fingerprint
+from autogen_learning.clients import ModelClientWrapper
+
+CASSETTE_MODE_ENV = "AUTOGEN_CASSETTE_MODE"
+CASSETTE_PATH_ENV = "AUTOGEN_CASSETTE"
+CASSETTE_STRICT_ENV = "AUTOGEN_CASSETTE_STRICT"
+DEFAULT_CASSETTE_PATH = ".autogen_cassette.json.gz"
+CASSETTE_MODES = ("off", "record", "replay")
+
+
+class CassetteMissError(KeyError):
+    """回放模式下磁带中没有匹配的请求"""
+
+
+class Cassette:
+    """按内容寻址的请求/响应磁带
+
+    相同的响应只存储一次；同一请求多次录制时按顺序回放。
+    非严格模式下，录制用完后重复最后一个；请求中含有随机内容（时间戳、随机指标等）
+    时按对话开头和轮数的宽松指纹回退匹配。
+    """
+
+    def __init__(self, path: str | Path, mode: str = "replay", *, strict: bool = True):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"未知的磁带模式: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.strict = strict
+        self.hits = 0
+        self.fallback_hits = 0
+        self.exhausted = 0
+        self.misses = 0
+        self.recorded = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._cursors: dict[str, int] = {}
+        self._data: dict[str, dict[str, Any]] = {
+            "requests": {},
+            "fallback": {},
+            "responses": {},
+        }
+        if self.path.exists():
+            self._load()
+
+    def _load(self) -> None:
+        opener = gzip.open if self.path.suffix == ".gz" else open
+        with opener(self.path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        for section in self._data:
+            self._data[section].update(data.get(section, {}))
+
+    def save(self) -> None:
+        """原子地写回磁带文件"""
+        opener = gzip.open if self.path.suffix == ".gz" else open
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            with opener(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(self._data, f, ensure_ascii=False, separators=(",", ":"))
+            tmp_path.replace(self.path)
+            self._dirty = False
+
+    def close(self) -> None:
+        """把尚未写盘的录制内容写回磁带文件"""
+        if self._dirty:
+            self.save()
+
+    def __enter__(self) -> "Cassette":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def lookup(self, key: str, fallback_key: str) -> dict[str, Any]:
+        """按请求指纹查找下一条录制的响应"""
+        for section, lookup_key in (("requests", key), ("fallback", fallback_key)):
+            response_ids = self._data[section].get(lookup_key)
+            if not response_ids:
+                continue
+            cursor_key = f"{section}:{lookup_key}"
+            index = self._cursors.get(cursor_key, 0)
+            self._cursors[cursor_key] = index + 1
+            if section == "fallback":
+                self.fallback_hits += 1
+                self._check_strict(f"请求 {key[:12]} 只匹配到宽松指纹")
+            if index >= len(response_ids):
+                self.exhausted += 1
+                self._check_strict(
+                    f"请求 {key[:12]} 的 {len(response_ids)} 条录制已用完",
+                )
+                index = len(response_ids) - 1
+            self.hits += 1
+            return self._data["responses"][response_ids[index]]
+
+        self.misses += 1
+        raise CassetteMissError(f"磁带 {self.path} 中没有匹配的请求 {key[:12]}")
+
+    def _check_strict(self, reason: str) -> None:
+        if self.strict:
+            raise CassetteMissError(f"磁带 {self.path}: {reason}（严格回放）")
+
+    def record(self, key: str, fallback_key: str, response: dict[str, Any]) -> None:
+        """录制一次响应，退出时统一写盘"""
+        canonical = json.dumps(response, sort_keys=True, ensure_ascii=False)
+        response_id = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+        self._data["responses"][response_id] = response
+        self._data["requests"].setdefault(key, []).append(response_id)
+        self._data["fallback"].setdefault(fallback_key, []).append(response_id)
+        self.recorded += 1
+        self._dirty = True
+
+    def summary(self) -> str:
+        """单行统计，test_all_examples.py 据此判断回放是否完整"""
+        return (
+            f"📼 cassette {self.mode}: hits={self.hits} "
+            f"fallback={self.fallback_hits} exhausted={self.exhausted} "
+            f"misses={self.misses} recorded={self.recorded}"
+        )
+
+    def __len__(self) -> int:
+        return len(self._data["requests"])
+
+
+_cassettes: dict[tuple[str, str, bool], Cassette] = {}
+
+
+def get_cassette() -> Cassette | None:
+    """按环境变量获取进程级磁带，未启用时返回 None"""
+    mode = os.getenv(CASSETTE_MODE_ENV, "off").strip().lower()
+    if mode == "off":
+        return None
+    path = os.getenv(CASSETTE_PATH_ENV, DEFAULT_CASSETTE_PATH)
+    strict = os.getenv(CASSETTE_STRICT_ENV, "1").strip().lower() not in ("0", "false")
+    key = (mode, path, strict)
+    if key not in _cassettes:
+        cassette = _cassettes[key] = Cassette(path, mode, strict=strict)
+        atexit.register(_finish, cassette)
+    return _cassettes[key]
+
+
+def _finish(cassette: Cassette) -> None:
+    cassette.close()
+    print(cassette.summary(), file=sys.stderr)
+
+
+class CassetteModelClient(ModelClientWrapper):
+    """录制或回放模型请求的客户端"""
+
+    def __init__(
+        self,
+        inner: ChatCompletionClient,
+        cassette: Cassette,
+        identity: Mapping[str, Any],
+    ):
+        super().__init__(inner)
+        self.cassette = cassette
+        self.identity = dict(identity)
+
+    def request_identity(self) -> dict[str, Any]:
+        return dict(self.identity)
+
+    def _keys(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema],
+        json_output: Any,
+        extra_create_args: Mapping[str, Any] | None,
+    ) -> tuple[str, str]:
+        key = request_fingerprint(
+            self.identity,
+            messages,
+            tools,
+            json_output,
+            extra_create_args,
+        )
+        # 宽松指纹：只看对话开头和消息条数
+        fallback_key = request_fingerprint(
+            {**self.identity, "turns": len(messages)},
+            messages[:2],
+            tools,
+            json_output,
+            extra_create_args,
+        )
+        return key, fallback_key
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+        json_output: Any = None,
+        extra_create_args: Mapping[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> CreateResult:
+        keys = self._keys(messages, tools, json_output, extra_create_args)
+        if self.cassette.mode == "replay":
+            response = self.cassette.lookup(*keys)
+            return CreateResult.model_validate(response["result"])
+
+        result = await super().create(
+            messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            **kwargs,
+        )
+        self.cassette.record(*keys, {"result": result.model_dump(mode="json")})
+        return result
+
+    async def create_stream(  # type: ignore[override]
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+        json_output: Any = None,
+        extra_create_args: Mapping[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[str | CreateResult, None]:
+        keys = self._keys(messages, tools, json_output, extra_create_args)
+        if self.cassette.mode == "replay":
+            response = self.cassette.lookup(*keys)
+            for chunk in response.get("chunks", []):
+                yield chunk
+            yield CreateResult.model_validate(response["result"])
+            return
+
+        chunks: list[str] = []
+        async for chunk in super().create_stream(
+            messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            **kwargs,
+        ):
+            if isinstance(chunk, CreateResult):
+                self.cassette.record(
+                    *keys,
+                    {"result": chunk.model_dump(mode="json"), "chunks": chunks},
+                )
+            else:
+                chunks.append(chunk)
+            yield chunk
@@ -0,0 +1,485 @@
+"""
+对话检查点
+
+长对话在第 12 轮失败后只能从头再来，之前的每次模型调用都要重新付费。
+TurnCheckpoint 放进团队的终止条件后，每轮发言结束时把团队和所有成员的
+状态写入本地 SQLite；resume 载入最后一个完好的检查点，从下一轮继续。
+
+每轮只保存与上一个检查点相比的增量：消息列表只追加新的消息，其余字段
+变化时才整体保存，检查点的体积和每轮新增的消息成正比，不随对话长度增长。
+第一个检查点保存团队的完整状态；之后每轮只读取本轮发言者和管理器的状态，
+其他成员只是在消息缓冲区里多了本轮的发言，不需要重新保存。写入 SQLite
+在线程中进行，不阻塞事件循环。
+
+按轮读取依赖 autogen-agentchat 群聊的内部属性和状态格式，只在验证过的
+0.6.x 上启用（flake.nix 固定为 0.6.1）；其他版本或缺少任一内部属性的团队
+每轮都用公开的 team.save_state() 保存完整状态，只是慢一些。
+
+用法:
+    team = SelectorGroupChat(
+        agents,
+        model_client,
+        termination_condition=TerminationEngine(["完成"]) | TurnCheckpoint(),
+    )
+    store = CheckpointStore()
+    result = await run_with_checkpoints(team, task, store, run_id="incident-42")
+    # 进程崩溃或模型调用失败后，用新构建的团队继续
+    result = await resume(build_team(), "incident-42", store)
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import autogen_agentchat
+from autogen_agentchat.base import TaskResult, TerminationCondition
+from autogen_agentchat.messages import BaseAgentEvent, BaseChatMessage, StopMessage
+from autogen_core import AgentId, CancellationToken
+
+from autogen_learning.metrics import MetricsCollector
+from autogen_learning.streaming import run_task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = ".autogen_checkpoints.sqlite"
+
+# 按轮增量读取团队状态验证过的 autogen-agentchat 版本
+INCREMENTAL_VERSIONS = ("0.6.",)
+
+# 按轮读取用到的群聊内部属性，缺少任何一个时保存完整状态
+_GROUP_CHAT_ATTRS = (
+    "_participants",
+    "_participant_names",
+    "_runtime",
+    "_team_id",
+    "_group_chat_manager_topic_type",
+    "_group_chat_manager_name",
+)
+
+
+def _group_chat_internals(team: Any) -> dict[str, Any] | None:
+    """按轮读取需要的群聊内部属性，版本未验证或缺少属性时返回 None"""
+    if not autogen_agentchat.__version__.startswith(INCREMENTAL_VERSIONS):
+        return None
+    internals = {attr: getattr(team, attr, None) for attr in _GROUP_CHAT_ATTRS}
+    if any(value is None for value in internals.values()):
+        return None
+    if not hasattr(internals["_runtime"], "agent_save_state"):
+        return None
+    return internals
+
+
+def _diff(old: Any, new: Any) -> dict[str, Any] | None:
+    """new 相对 old 的增量，相同时返回 None"""
+    if old == new:
+        return None
+    if isinstance(old, dict) and isinstance(new, dict):
+        changed = {}
+        for key, value in new.items():
+            delta = _diff(old[key], value) if key in old else {"set": value}
+            if delta is not None:
+                changed[key] = delta
+        delta = {"dict": changed}
+        removed = [key for key in old if key not in new]
+        if removed:
+            delta["removed"] = removed
+        return delta
+    # 消息列表通常只在末尾追加
+    if isinstance(old, list) and isinstance(new, list) and new[: len(old)] == old:
+        return {"append": new[len(old) :]}
+    return {"set": new}
+
+
+def _patch(old: Any, delta: dict[str, Any]) -> Any:
+    """把增量应用到 old 上"""
+    if "set" in delta:
+        return delta["set"]
+    if "append" in delta:
+        return [*old, *delta["append"]]
+    removed = delta.get("removed", ())
+    state = {key: value for key, value in old.items() if key not in removed}
+    for key, value in delta["dict"].items():
+        state[key] = _patch(old.get(key), value)
+    return state
+
+
+@dataclass
+class Checkpoint:
+    """一次运行最后一个完好的检查点"""
+
+    run_id: str
+    task: str
+    # running / completed / failed
+    status: str
+    # 已保存的检查点数，0 表示还没有保存过（任务本身是第一个检查点）
+    turns: int
+    state: dict[str, Any] | None
+    stop_reason: str | None = None
+    # 所有增量的总字节数
+    stored_bytes: int = 0
+
+    @property
+    def state_bytes(self) -> int:
+        """完整状态的字节数，对比每轮都保存完整状态时的体积"""
+        if self.state is None:
+            return 0
+        return len(json.dumps(self.state, ensure_ascii=False).encode())
+
+
+class CheckpointStore:
+    """基于 SQLite 的检查点存储：每次运行一行，每轮一个增量"""
+
+    def __init__(self, path: str | Path = DEFAULT_CHECKPOINT_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY,"
+            " task TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " stop_reason TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)",
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            " run_id TEXT NOT NULL,"
+            " turn INTEGER NOT NULL,"
+            " delta TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (run_id, turn))",
+        )
+        self._conn.commit()
+
+    def create_run(self, task: str, run_id: str | None = None) -> str:
+        """登记一次新的运行，返回 run_id；已存在的 run_id 会被清空重来"""
+        run_id = run_id or uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM turns WHERE run_id = ?", (run_id,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, 'running', NULL, ?, ?)",
+                (run_id, task, now, now),
+            )
+            self._conn.commit()
+        return run_id
+
+    def save_turn(self, run_id: str, turn: int, delta: dict[str, Any]) -> int:
+        """保存一轮的增量，返回写入的字节数"""
+        data = json.dumps(delta, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO turns VALUES (?, ?, ?, ?)",
+                (run_id, turn, data, now),
+            )
+            self._conn.execute(
+                "UPDATE runs SET updated_at = ? WHERE run_id = ?",
+                (now, run_id),
+            )
+            self._conn.commit()
+        return len(data.encode())
+
+    def finish(self, run_id: str, status: str, stop_reason: str | None = None) -> None:
+        """记录运行结束（completed）或失败（failed）"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, stop_reason = ?, updated_at = ?"
+                " WHERE run_id = ?",
+                (status, stop_reason, time.time(), run_id),
+            )
+            self._conn.commit()
+
+    def load(self, run_id: str) -> Checkpoint:
+        """依次应用所有增量，还原最后一个检查点的完整状态"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT task, status, stop_reason FROM runs WHERE run_id = ?",
+                (run_id,),
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"未知运行: {run_id}")
+            deltas = self._conn.execute(
+                "SELECT delta FROM turns WHERE run_id = ? ORDER BY turn",
+                (run_id,),
+            ).fetchall()
+        task, status, stop_reason = row
+        state: dict[str, Any] | None = None
+        stored_bytes = 0
+        for (data,) in deltas:
+            stored_bytes += len(data.encode())
+            state = _patch(state or {}, json.loads(data))
+        return Checkpoint(
+            run_id=run_id,
+            task=task,
+            status=status,
+            turns=len(deltas),
+            state=state,
+            stop_reason=stop_reason,
+            stored_bytes=stored_bytes,
+        )
+
+    def unfinished(self) -> list[str]:
+        """未完成（运行中断或失败）的运行，最近更新的在前"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id FROM runs WHERE status != 'completed'"
+                " ORDER BY updated_at DESC",
+            ).fetchall()
+        return [run_id for (run_id,) in rows]
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class _ActiveRun:
+    team: Any
+    store: CheckpointStore
+    run_id: str
+    turns: int = 0
+    state: dict[str, Any] | None = None
+    metrics: MetricsCollector | None = None
+
+    async def _turn_state(
+        self,
+        messages: Sequence[BaseAgentEvent | BaseChatMessage],
+    ) -> dict[str, Any] | None:
+        """在上一个检查点上应用本轮发言，得到团队的当前状态
+
+        只读取发言者和管理器的状态；无法确定发言者、版本未验证或团队缺少
+        需要的内部属性时返回 None，改为保存完整状态。
+        """
+        if self.state is None or not messages:
+            return None
+        internals = _group_chat_internals(self.team)
+        if internals is None:
+            return None
+        speaker = messages[-1].source
+        participants = dict(
+            zip(
+                internals["_participant_names"],
+                internals["_participants"],
+                strict=True,
+            ),
+        )
+        manager_name = internals["_group_chat_manager_name"]
+        agent_states = dict(self.state.get("agent_states", {}))
+        containers = [agent_states.get(name) for name in participants]
+        if (
+            speaker not in participants
+            or manager_name not in agent_states
+            or not all(
+                isinstance(c, dict) and {"agent_state", "message_buffer"} <= c.keys()
+                for c in containers
+            )
+        ):
+            return None
+        manager_id = AgentId(
+            type=internals["_group_chat_manager_topic_type"],
+            key=internals["_team_id"],
+        )
+        # 成员只缓冲发言者最后的回复，内部消息（工具调用等）不转发
+        changed = _json_roundtrip(
+            {
+                "speaker": await participants[speaker].save_state(),
+                "manager": await internals["_runtime"].agent_save_state(manager_id),
+                "reply": messages[-1].dump(),
+            },
+        )
+        for name, container in agent_states.items():
+            if name == speaker:
+                agent_states[name] = {
+                    **container,
+                    "agent_state": changed["speaker"],
+                    "message_buffer": [],
+                }
+            elif name in participants:
+                buffer = [*container["message_buffer"], changed["reply"]]
+                agent_states[name] = {**container, "message_buffer": buffer}
+        agent_states[manager_name] = changed["manager"]
+        return {**self.state, "agent_states": agent_states}
+
+    async def _full_state(
+        self,
+        messages: Sequence[BaseAgentEvent | BaseChatMessage],
+    ) -> dict[str, Any]:
+        """团队的完整状态
+
+        管理器广播任务后立即检查终止条件，这时成员可能还没处理广播，缓冲区
+        里没有任务；这里补上，与成员处理完广播后的状态一致。
+        """
+        state = _json_roundtrip(await self.team.save_state())
+        internals = _group_chat_internals(self.team)
+        if internals is None:
+            # 不认识的团队只保存公开接口给出的状态
+            return state
+        broadcast = _json_roundtrip(
+            [m.dump() for m in messages if isinstance(m, BaseChatMessage)],
+        )
+        agent_states = state.get("agent_states", {})
+        for name in internals["_participant_names"]:
+            container = agent_states.get(name)
+            if not isinstance(container, dict):
+                continue
+            buffer = container.get("message_buffer")
+            if isinstance(buffer, list) and buffer[-len(broadcast) :] != broadcast:
+                container["message_buffer"] = [*buffer, *broadcast]
+        return state
+
+    async def save(self, messages: Sequence[BaseAgentEvent | BaseChatMessage]) -> None:
+        started_at = time.monotonic()
+        state = await self._turn_state(messages)
+        if state is None:
+            state = await self._full_state(messages)
+        delta = _diff(self.state or {}, state)
+        if delta is None:
+            return
+        size = await asyncio.to_thread(
+            self.store.save_turn,
+            self.run_id,
+            self.turns,
+            delta,
+        )
+        self.turns += 1
+        self.state = state
+        if self.metrics is not None:
+            self.metrics.timer("checkpoint.save_time", time.monotonic() - started_at)
+            self.metrics.counter("checkpoint.bytes", size)
+
+
+def _json_roundtrip(state: Any) -> Any:
+    """经过一次 JSON 往返，与从数据库读回的状态一致（例如 datetime 变成
+    字符串），增量只包含真正的变化"""
+    return json.loads(json.dumps(state, ensure_ascii=False, default=str))
+
+
+_active_run: ContextVar[_ActiveRun | None] = ContextVar(
+    "autogen_learning_checkpoint",
+    default=None,
+)
+
+
+class TurnCheckpoint(TerminationCondition):
+    """每轮发言结束后保存检查点的终止条件，本身从不结束对话
+
+    只在 run_with_checkpoints/resume 中生效，直接运行团队时什么也不做。
+    保存失败只记录警告，不影响对话继续。
+    """
+
+    @property
+    def terminated(self) -> bool:
+        return False
+
+    async def __call__(
+        self,
+        messages: Sequence[BaseAgentEvent | BaseChatMessage],
+    ) -> StopMessage | None:
+        # 管理器已把本轮消息追加到对话中、尚未选出下一位发言者
+        run = _active_run.get()
+        if run is not None:
+            try:
+                await run.save(messages)
+            except Exception as e:
+                logger.warning(f"保存检查点失败 ({run.run_id}): {e}")
+        return None
+
+    async def reset(self) -> None:
+        pass
+
+
+async def _run(
+    run: _ActiveRun,
+    task: str | None,
+    render: bool,
+    cancellation_token: CancellationToken | None,
+) -> TaskResult:
+    token = _active_run.set(run)
+    try:
+        result = await run_task(
+            run.team,
+            task,
+            metrics=run.metrics,
+            render=render,
+            cancellation_token=cancellation_token,
+        )
+    except BaseException as e:
+        run.store.finish(run.run_id, "failed", f"{type(e).__name__}: {e}")
+        logger.warning(
+            f"运行 {run.run_id} 在第 {run.turns} 个检查点之后失败，可以 resume 继续",
+        )
+        raise
+    finally:
+        _active_run.reset(token)
+    run.store.finish(run.run_id, "completed", result.stop_reason)
+    return result
+
+
+async def run_with_checkpoints(
+    team: Any,
+    task: str,
+    store: CheckpointStore,
+    *,
+    run_id: str | None = None,
+    metrics: MetricsCollector | None = None,
+    render: bool = True,
+    cancellation_token: CancellationToken | None = None,
+) -> TaskResult:
+    """运行团队并在每轮之后保存检查点
+
+    团队的终止条件需要包含 TurnCheckpoint()。失败时运行记为 failed，
+    异常照常抛出，之后用 resume(新团队, run_id, store) 继续。
+    """
+    run_id = store.create_run(task, run_id)
+    run = _ActiveRun(team=team, store=store, run_id=run_id, metrics=metrics)
+    return await _run(run, task, render, cancellation_token)
+
+
+async def resume(
+    team: Any,
+    run_id: str,
+    store: CheckpointStore,
+    *,
+    metrics: MetricsCollector | None = None,
+    render: bool = True,
+    cancellation_token: CancellationToken | None = None,
+) -> TaskResult:
+    """从最后一个完好的检查点继续运行
+
+    team 应是新构建的、与原团队成员相同的团队：失败的团队内部状态可能
+    不完整，不能直接复用。终止条件的计数（消息数、运行时长等）不属于团队
+    状态，继续运行时从零开始。
+    """
+    checkpoint = store.load(run_id)
+    if checkpoint.status == "completed":
+        raise ValueError(f"运行 {run_id} 已完成: {checkpoint.stop_reason}")
+    run = _ActiveRun(
+        team=team,
+        store=store,
+        run_id=run_id,
+        turns=checkpoint.turns,
+        state=checkpoint.state,
+        metrics=metrics,
+    )
+    if checkpoint.state is None:
+        # 还没保存过检查点，从任务本身开始
+        logger.info(f"运行 {run_id} 没有检查点，重新开始")
+        return await _run(run, checkpoint.task, render, cancellation_token)
+
+    await team.load_state(checkpoint.state)
+    logger.info(f"运行 {run_id} 从第 {checkpoint.turns} 个检查点继续")
+    if metrics is not None:
+        metrics.counter("checkpoint.resumed")
+    return await _run(run, None, render, cancellation_token)
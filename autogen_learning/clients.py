@@ -0,0 +1,535 @@
+"""
+共享模型客户端注册表
+
+所有示例通过进程级注册表获取模型客户端。相同 (base_url, model, api_key)
+的客户端只创建一次，并共享同一个 keep-alive HTTP 连接池；temperature、
+max_tokens 等参数作为每次调用的覆盖项传入，不再为每个智能体单独建连。
+连接池绑定在创建它的事件循环上，每个事件循环各有一份。
+"""
+
+import asyncio
+import os
+from collections.abc import AsyncGenerator, Callable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
+
+import httpx
+from autogen_core import CancellationToken
+from autogen_core.models import (
+    ChatCompletionClient,
+    CreateResult,
+    LLMMessage,
+    ModelCapabilities,
+    ModelInfo,
+    RequestUsage,
+)
+from autogen_core.tools import Tool, ToolSchema
+
+from autogen_learning.bootstrap import lazy_import
+
+if TYPE_CHECKING:
+    from autogen_learning.budget import ContextBudgeter
+
+# OpenAI SDK 导入较慢，到第一次真正发请求时才加载
+openai_models = lazy_import("autogen_ext.models.openai")
+# 磁带和上下文预算依赖本模块，用到时才加载
+cassette_module = lazy_import("autogen_learning.cassette")
+budget_module = lazy_import("autogen_learning.budget")
+
+T = TypeVar("T")
+
+# 不影响请求结果、也不应进入缓存键的客户端配置
+_SECRET_CONFIG = frozenset({"api_key"})
+
+DEFAULT_MODEL_INFO = ModelInfo(
+    family="openai",
+    vision=False,
+    function_calling=True,
+    json_output=True,
+    structured_output=False,
+)
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class LoopLocal(Generic[T]):
+    """每个事件循环各一份的对象
+
+    httpx 连接池、asyncio 锁和信号量绑定在创建时的事件循环上，每次
+    asyncio.run 都是新的事件循环，沿用旧对象会报 "attached to a different
+    loop"。已关闭的事件循环的对象在下次创建时丢弃。
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._values: dict[asyncio.AbstractEventLoop | None, T] = {}
+
+    def get(self) -> T:
+        """当前事件循环的对象，没有时创建"""
+        loop = _running_loop()
+        if loop not in self._values:
+            self._values = {
+                key: value
+                for key, value in self._values.items()
+                if key is None or not key.is_closed()
+            }
+            self._values[loop] = self._factory()
+        return self._values[loop]
+
+    def peek(self) -> T | None:
+        """当前事件循环的对象，不创建"""
+        return self._values.get(_running_loop())
+
+    def values(self) -> list[T]:
+        """所有事件循环的对象"""
+        return list(self._values.values())
+
+    def clear(self) -> None:
+        """丢弃所有对象"""
+        self._values.clear()
+
+
+def client_identity(client: ChatCompletionClient) -> dict[str, Any]:
+    """客户端中决定请求结果的参数（模型、端点、生成参数）
+
+    包装器取自 request_identity；其他客户端取类型、模型族，以及组件配置
+    中的模型和生成参数。
+    """
+    if isinstance(client, ModelClientWrapper):
+        return client.request_identity()
+    identity: dict[str, Any] = {
+        "client": type(client).__name__,
+        "family": client.model_info.get("family", "unknown"),
+    }
+    # OpenAI 等内置客户端是可序列化组件，配置里有 model、temperature 等
+    try:
+        config = client.dump_component().config
+    except Exception:
+        return identity
+    identity.update(
+        {key: value for key, value in config.items() if key not in _SECRET_CONFIG},
+    )
+    return identity
+
+
+class ModelClientWrapper(ChatCompletionClient):
+    """模型客户端包装器基类，默认将所有调用委托给内部客户端"""
+
+    def __init__(self, inner: ChatCompletionClient):
+        self._inner = inner
+
+    @property
+    def inner(self) -> ChatCompletionClient:
+        """被包装的内部客户端"""
+        return self._inner
+
+    def request_identity(self) -> dict[str, Any]:
+        """返回决定请求结果的客户端参数（模型、端点、生成参数）"""
+        return client_identity(self._inner)
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+        json_output: Any = None,
+        extra_create_args: Mapping[str, Any] | None = None,
+        cancellation_token: CancellationToken | None = None,
+        **kwargs: Any,
+    ) -> CreateResult:
+        """创建补全"""
+        return await self._inner.create(
+            messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args or {},
+            cancellation_token=cancellation_token,
+            **kwargs,
+        )
+
+    def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+        json_output: Any = None,
+        extra_create_args: Mapping[str, Any] | None = None,
+        cancellation_token: CancellationToken | None = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[str | CreateResult, None]:
+        """流式创建补全"""
+        return self._inner.create_stream(
+            messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args or {},
+            cancellation_token=cancellation_token,
+            **kwargs,
+        )
+
+    async def close(self) -> None:
+        """关闭内部客户端"""
+        await self._inner.close()
+
+    def actual_usage(self) -> RequestUsage:
+        return self._inner.actual_usage()
+
+    def total_usage(self) -> RequestUsage:
+        return self._inner.total_usage()
+
+    def count_tokens(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+    ) -> int:
+        return self._inner.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+    ) -> int:
+        return self._inner.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore[override]
+        return self._inner.capabilities
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return self._inner.model_info
+
+
+class DeferredModelClient(ModelClientWrapper):
+    """第一次调用时才创建的客户端
+
+    模型信息直接取自配置，构建智能体、回放磁带等不发真实请求的场景不会
+    导入 OpenAI SDK。底层客户端持有事件循环绑定的连接池，每个事件循环
+    各创建一个。
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], ChatCompletionClient],
+        model_info: ModelInfo,
+        identity: Mapping[str, Any] | None = None,
+    ):
+        # 不调用父类构造函数：_inner 由下面的属性按需创建
+        self._model_info = model_info
+        self._identity = dict(identity or {})
+        self._clients = LoopLocal(factory)
+
+    @property
+    def _inner(self) -> ChatCompletionClient:  # type: ignore[override]
+        return self._clients.get()
+
+    def request_identity(self) -> dict[str, Any]:
+        # 不能调用 client_identity：那会创建底层客户端
+        return {"family": self._model_info.get("family", "unknown"), **self._identity}
+
+    @property
+    def created(self) -> bool:
+        """底层客户端是否已创建"""
+        return bool(self._clients.values())
+
+    async def close(self) -> None:
+        # 其他事件循环的客户端无法在这里关闭，随事件循环一起丢弃
+        client = self._clients.peek()
+        self._clients.clear()
+        if client is not None:
+            await client.close()
+
+    def _usage(
+        self,
+        usage: Callable[[ChatCompletionClient], RequestUsage],
+    ) -> RequestUsage:
+        total = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        for client in self._clients.values():
+            used = usage(client)
+            total.prompt_tokens += used.prompt_tokens
+            total.completion_tokens += used.completion_tokens
+        return total
+
+    def actual_usage(self) -> RequestUsage:
+        return self._usage(lambda client: client.actual_usage())
+
+    def total_usage(self) -> RequestUsage:
+        return self._usage(lambda client: client.total_usage())
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore[override]
+        return ModelCapabilities(
+            vision=self._model_info["vision"],
+            function_calling=self._model_info["function_calling"],
+            json_output=self._model_info["json_output"],
+        )
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return self._model_info
+
+
+@dataclass
+class PoolStats:
+    """连接池统计"""
+
+    requests: int = 0
+    connections_opened: int = 0
+    tls_handshakes: int = 0
+    open_connections: int = 0
+    clients_created: int = 0
+    clients_requested: int = 0
+
+    @property
+    def reuse_ratio(self) -> float:
+        """复用已有连接的请求占比"""
+        if not self.requests:
+            return 0.0
+        return max(0.0, 1 - self.connections_opened / self.requests)
+
+    def to_dict(self) -> dict[str, Any]:
+        """转换为字典"""
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "tls_handshakes": self.tls_handshakes,
+            "open_connections": self.open_connections,
+            "reuse_ratio": round(self.reuse_ratio, 3),
+            "clients_created": self.clients_created,
+            "clients_requested": self.clients_requested,
+        }
+
+
+class _InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """通过 httpcore trace 事件统计建连和 TLS 握手次数的传输层"""
+
+    def __init__(self, stats: PoolStats, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._stats = stats
+
+    async def _trace(self, event_name: str, _info: dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self._stats.connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            self._stats.tls_handshakes += 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._stats.requests += 1
+        request.extensions = {**request.extensions, "trace": self._trace}
+        return await super().handle_async_request(request)
+
+    def open_connections(self) -> int:
+        """当前池中的连接数"""
+        return len(self._pool.connections)
+
+
+class PooledModelClient(ModelClientWrapper):
+    """注册表分发的客户端视图，共享底层客户端并附加每次调用的参数覆盖"""
+
+    def __init__(
+        self,
+        inner: ChatCompletionClient,
+        *,
+        model: str,
+        base_url: str | None,
+        create_overrides: Mapping[str, Any] | None = None,
+    ):
+        super().__init__(inner)
+        self.model = model
+        self.base_url = base_url
+        self.create_overrides = dict(create_overrides or {})
+
+    def request_identity(self) -> dict[str, Any]:
+        return {
+            "model": self.model,
+            "base_url": self.base_url,
+            **self.create_overrides,
+        }
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        extra_create_args: Mapping[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> CreateResult:
+        return await super().create(
+            messages,
+            extra_create_args={**self.create_overrides, **(extra_create_args or {})},
+            **kwargs,
+        )
+
+    def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        extra_create_args: Mapping[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[str | CreateResult, None]:
+        return super().create_stream(
+            messages,
+            extra_create_args={**self.create_overrides, **(extra_create_args or {})},
+            **kwargs,
+        )
+
+    async def close(self) -> None:
+        """底层客户端由注册表统一关闭"""
+
+
+class ModelClientRegistry:
+    """进程级模型客户端注册表"""
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        model_info: ModelInfo | None = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.model_info = model_info or DEFAULT_MODEL_INFO
+        self.stats = PoolStats()
+        self._clients: dict[
+            tuple[str | None, str, str, int | None],
+            DeferredModelClient,
+        ] = {}
+        self._http = LoopLocal(self._create_http_client)
+
+    def _create_http_client(self) -> tuple[_InstrumentedTransport, httpx.AsyncClient]:
+        transport = _InstrumentedTransport(self.stats, limits=self.limits)
+        client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(600.0, connect=10.0),
+            follow_redirects=True,
+        )
+        return transport, client
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """当前事件循环中所有客户端共享的 HTTP 连接池（首次使用时创建）"""
+        return self._http.get()[1]
+
+    def get(
+        self,
+        model: str,
+        api_key: str,
+        base_url: str | None = None,
+        *,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        max_retries: int | None = None,
+        budgeter: "ContextBudgeter | None" = None,
+        **create_overrides: Any,
+    ) -> PooledModelClient:
+        """获取共享客户端，temperature/max_tokens 等作为调用覆盖项
+
+        max_retries 是 SDK 内置重试次数，由外层自行重试时应设为 0。
+        budgeter 未指定时使用进程级上下文预算器。
+        """
+        key = (base_url, model, api_key, max_retries)
+        self.stats.clients_requested += 1
+        if key not in self._clients:
+            client_args: dict[str, Any] = {
+                "model": model,
+                "api_key": api_key,
+                "base_url": base_url,
+            }
+            if max_retries is not None:
+                client_args["max_retries"] = max_retries
+            self._clients[key] = DeferredModelClient(
+                lambda args=client_args: self._create_client(args),
+                self.model_info,
+                {"model": model, "base_url": base_url},
+            )
+
+        overrides = dict(create_overrides)
+        if temperature is not None:
+            overrides["temperature"] = temperature
+        if max_tokens is not None:
+            overrides["max_tokens"] = max_tokens
+
+        inner: ChatCompletionClient = self._clients[key]
+        # 磁带和上下文预算只在启用时包装，关闭时调用直达底层客户端
+        cassette = cassette_module.get_cassette()
+        if cassette is not None:
+            inner = cassette_module.CassetteModelClient(
+                inner,
+                cassette,
+                {"model": model},
+            )
+        budgeter = budgeter or budget_module.get_budgeter()
+        if budgeter is not None:
+            inner = budget_module.TokenBudgetModelClient(inner, budgeter)
+
+        return PooledModelClient(
+            inner,
+            model=model,
+            base_url=base_url,
+            create_overrides=overrides,
+        )
+
+    def _create_client(self, client_args: dict[str, Any]) -> ChatCompletionClient:
+        """创建底层 OpenAI 兼容客户端（共享连接池）"""
+        self.stats.clients_created += 1
+        return openai_models.OpenAIChatCompletionClient(
+            http_client=self.http_client,
+            model_info=self.model_info,
+            **client_args,
+        )
+
+    def pool_stats(self) -> PoolStats:
+        """获取连接池统计"""
+        self.stats.open_connections = sum(
+            transport.open_connections() for transport, _ in self._http.values()
+        )
+        return self.stats
+
+    async def aclose(self) -> None:
+        """关闭所有客户端和共享连接池"""
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+        current = self._http.peek()
+        self._http.clear()
+        if current is not None:
+            await current[1].aclose()
+
+
+_registry = ModelClientRegistry()
+
+
+def get_registry() -> ModelClientRegistry:
+    """获取进程级注册表"""
+    return _registry
+
+
+def create_model_client(
+    temperature: float | None = None,
+    max_tokens: int | None = None,
+    model: str | None = None,
+    **create_overrides: Any,
+) -> PooledModelClient:
+    """根据环境变量创建 DeepSeek 兼容的模型客户端，model 未指定时取 OPENAI_MODEL"""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not found in environment variables")
+
+    return get_registry().get(
+        model=model or os.getenv("OPENAI_MODEL", "deepseek-chat"),
+        api_key=api_key,
+        base_url=os.getenv("OPENAI_API_BASE", "https://api.deepseek.com/v1"),
+        temperature=temperature,
+        max_tokens=max_tokens,
+        **create_overrides,
+    )
@@ -0,0 +1,209 @@
+"""
+滚动摘要压缩对话历史
+
+长时间运行的群聊中，每一轮都会重新发送完整的对话记录。启用压缩后，
+历史超过 token 阈值时，较早的消息由一个便宜的模型折叠进滚动摘要，
+最近的 N 条消息保持原样，每轮的提示大小因此保持平稳。
+
+作为 AssistantAgent 的 model_context 使用，默认关闭:
+    AUTOGEN_COMPACTION=1
+    AUTOGEN_COMPACTION_TOKENS=2000
+"""
+
+import logging
+import os
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from autogen_core.model_context import ChatCompletionContext
+from autogen_core.models import (
+    ChatCompletionClient,
+    FunctionExecutionResultMessage,
+    LLMMessage,
+    SystemMessage,
+    UserMessage,
+)
+
+from autogen_learning.budget import TokenCounter, message_text
+from autogen_learning.clients import create_model_client
+from autogen_learning.metrics import MetricsCollector
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_ENV = "AUTOGEN_COMPACTION"
+COMPACTION_TOKENS_ENV = "AUTOGEN_COMPACTION_TOKENS"
+DEFAULT_COMPACTION_TOKENS = 2000
+SUMMARY_SOURCE = "conversation_summary"
+
+SUMMARY_PROMPT = """你负责压缩一段多智能体对话的历史。
+把已有摘要和新增的对话合并成一份新的摘要：保留每位发言者的主要观点、
+已达成的结论、数字和待解决的问题，删除寒暄和重复内容。
+只输出摘要正文，不超过 300 字。"""
+
+
+def compaction_enabled() -> bool:
+    """是否启用对话压缩（默认关闭）"""
+    value = os.getenv(COMPACTION_ENV, "0").strip().lower()
+    return value in ("1", "true", "yes", "on")
+
+
+@dataclass
+class TurnTokens:
+    """一次模型调用的历史 token 数"""
+
+    full: int
+    sent: int
+
+    @property
+    def saved(self) -> int:
+        """压缩节省的 token 数"""
+        return self.full - self.sent
+
+
+class SummarizingChatCompletionContext(ChatCompletionContext):
+    """超过阈值时把较早的消息折叠进滚动摘要的模型上下文"""
+
+    def __init__(
+        self,
+        summarizer: ChatCompletionClient,
+        *,
+        max_tokens: int = DEFAULT_COMPACTION_TOKENS,
+        keep_recent: int = 6,
+        name: str = "context",
+        counter: TokenCounter | None = None,
+        metrics: MetricsCollector | None = None,
+        initial_messages: list[LLMMessage] | None = None,
+    ):
+        if keep_recent < 1:
+            raise ValueError(f"keep_recent 必须大于 0: {keep_recent}")
+        super().__init__(initial_messages)
+        self.summarizer = summarizer
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.name = name
+        self.counter = counter or TokenCounter()
+        self.metrics = metrics
+        self.turns: list[TurnTokens] = []
+        self._summary = ""
+        # 已折叠进摘要的消息数（_messages 的前缀）
+        self._summarized = 0
+
+    def _tokens(self, messages: list[LLMMessage]) -> int:
+        return sum(self.counter.count_message(m) for m in messages)
+
+    def _view(self) -> list[LLMMessage]:
+        """摘要消息加上尚未折叠的消息"""
+        recent = self._messages[self._summarized :]
+        if not self._summary:
+            return list(recent)
+        summary = UserMessage(
+            content=f"[之前对话的摘要]\n{self._summary}",
+            source=SUMMARY_SOURCE,
+        )
+        return [summary, *recent]
+
+    def _boundary(self) -> int:
+        """折叠边界：保留最近 keep_recent 条，且不拆开工具调用和它的结果"""
+        boundary = max(self._summarized, len(self._messages) - self.keep_recent)
+        while boundary > self._summarized and isinstance(
+            self._messages[boundary],
+            FunctionExecutionResultMessage,
+        ):
+            boundary -= 1
+        return boundary
+
+    async def _summarize(self, messages: list[LLMMessage]) -> str | None:
+        """把已有摘要和新消息合并成新的摘要，失败时返回 None"""
+        transcript = "\n".join(
+            f"{getattr(m, 'source', 'tool')}: {message_text(m)}"
+            for m in messages
+            if not isinstance(m, SystemMessage)
+        )
+        prompt = f"已有摘要:\n{self._summary or '（无）'}\n\n新增对话:\n{transcript}"
+        try:
+            result = await self.summarizer.create(
+                [
+                    SystemMessage(content=SUMMARY_PROMPT),
+                    UserMessage(content=prompt, source="user"),
+                ],
+            )
+        except Exception as e:
+            logger.warning(f"对话摘要失败，本轮发送完整历史: {e}")
+            return None
+        if not isinstance(result.content, str) or not result.content.strip():
+            return None
+        return result.content.strip()
+
+    async def get_messages(self) -> list[LLMMessage]:
+        """返回发送给模型的消息；超过阈值时先折叠较早的消息"""
+        view = self._view()
+        if self._tokens(view) > self.max_tokens:
+            boundary = self._boundary()
+            if boundary > self._summarized:
+                folded = self._messages[self._summarized : boundary]
+                summary = await self._summarize(folded)
+                if summary is not None:
+                    self._summary = summary
+                    self._summarized = boundary
+                    if self.metrics is not None:
+                        self.metrics.counter("compaction.folded_messages", len(folded))
+                    view = self._view()
+
+        turn = TurnTokens(full=self._tokens(self._messages), sent=self._tokens(view))
+        self.turns.append(turn)
+        if self.metrics is not None:
+            self.metrics.gauge(f"compaction.prompt_tokens.{self.name}", turn.sent)
+            self.metrics.counter("compaction.tokens_saved", turn.saved)
+        return view
+
+    async def clear(self) -> None:
+        await super().clear()
+        self._summary = ""
+        self._summarized = 0
+
+    async def save_state(self) -> Mapping[str, Any]:
+        state = dict(await super().save_state())
+        state["summary"] = self._summary
+        state["summarized"] = self._summarized
+        return state
+
+    async def load_state(self, state: Mapping[str, Any]) -> None:
+        await super().load_state(state)
+        self._summary = state.get("summary", "")
+        self._summarized = state.get("summarized", 0)
+
+    def report(self) -> str:
+        """每轮压缩前后的历史 token 数"""
+        lines = [f"   {self.name}: 轮次  完整历史 -> 实际发送"]
+        for i, turn in enumerate(self.turns, 1):
+            lines.append(f"      {i:>2}  {turn.full:>6} -> {turn.sent:>6}")
+        return "\n".join(lines)
+
+
+def create_model_context(
+    name: str,
+    summarizer: ChatCompletionClient | None = None,
+    metrics: MetricsCollector | None = None,
+    keep_recent: int = 6,
+) -> SummarizingChatCompletionContext | None:
+    """启用压缩时创建摘要上下文，否则返回 None（使用默认的完整上下文）"""
+    if keep_recent < 1:
+        raise ValueError(f"keep_recent 必须大于 0: {keep_recent}")
+    if not compaction_enabled():
+        return None
+    if summarizer is None:
+        summarizer = create_model_client(
+            model=os.getenv("AUTOGEN_SUMMARY_MODEL"),
+            temperature=0.0,
+            max_tokens=400,
+        )
+    return SummarizingChatCompletionContext(
+        summarizer,
+        max_tokens=int(
+            os.getenv(COMPACTION_TOKENS_ENV, str(DEFAULT_COMPACTION_TOKENS)),
+        ),
+        keep_recent=keep_recent,
+        name=name,
+        metrics=metrics,
+    )
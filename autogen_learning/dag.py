@@ -0,0 +1,358 @@
+"""
+DAG 工作流
+
+固定阶段的流程交给群聊时，每一步都要由模型选择下一位发言者，既多一次
+模型调用，也可能打乱步骤顺序。Workflow 把流程声明成有向无环图：节点是
+一次智能体调用或工具调用，边是依赖关系，条件边用 Python 谓词决定是否
+走这条边。节点在所有上游结束后立即开始，互不依赖的分支并发执行；上游
+失败或被跳过时下游默认也跳过，分支汇合的节点用 partial=True 表示只需要
+部分上游完成。每次运行记录每个节点的起止时间，并给出决定总耗时的关键路径。
+
+用法:
+    def clean(run: WorkflowRun) -> bool:
+        return "异常" not in run.text("validate")
+
+    workflow = Workflow(
+        "data",
+        nodes=[
+            ToolNode("validate", validate_batch, {"batch_id": "b1"}),
+            AgentNode("review", reviewer, "复核验证结果: {validate}"),
+            ToolNode("load", load_batch, {"batch_id": "b1"}),
+        ],
+        edges=[
+            ("validate", "review"),
+            Edge("validate", "load", when=clean),
+        ],
+    )
+    run = await workflow.run(batch_id="b1")
+    print(run.report())
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from autogen_agentchat.base import TaskResult
+
+from autogen_learning.batch import _reset
+from autogen_learning.metrics import MetricsCollector
+from autogen_learning.streaming import run_task
+
+logger = logging.getLogger(__name__)
+
+COMPLETED = "completed"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+@dataclass
+class NodeResult:
+    """单个节点的执行结果"""
+
+    name: str
+    status: str = SKIPPED
+    # 智能体节点为 TaskResult，工具节点为函数返回值
+    output: Any = None
+    error: BaseException | None = None
+    # 相对工作流开始的秒数
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """节点是否执行成功"""
+        return self.status == COMPLETED
+
+    @property
+    def duration(self) -> float:
+        """节点耗时（秒）"""
+        return self.finished_at - self.started_at
+
+    @property
+    def text(self) -> str:
+        """节点输出的文本：智能体的最终回复或工具返回值"""
+        if isinstance(self.output, TaskResult):
+            messages = self.output.messages
+            return messages[-1].to_text() if messages else ""
+        return "" if self.output is None else str(self.output)
+
+
+@dataclass
+class AgentNode:
+    """调用智能体或团队的节点
+
+    prompt 为字符串时用工作流输入和上游节点的输出文本填充，例如
+    "复核验证结果: {validate}"；也可以是接收 WorkflowRun 返回任务的函数。
+    partial 为 True 时只要有上游完成就执行，见 Workflow。
+    """
+
+    name: str
+    runnable: Any
+    prompt: str | Callable[["WorkflowRun"], str]
+    partial: bool = False
+
+
+@dataclass
+class ToolNode:
+    """调用函数的节点，同步函数在线程中执行
+
+    kwargs 为固定参数，或接收 WorkflowRun 返回参数的函数。partial 同 AgentNode。
+    """
+
+    name: str
+    func: Callable[..., Any]
+    kwargs: Mapping[str, Any] | Callable[["WorkflowRun"], Mapping[str, Any]] = field(
+        default_factory=dict,
+    )
+    partial: bool = False
+
+
+@dataclass
+class Edge:
+    """依赖边；when 为条件谓词，上游完成后谓词为假则跳过目标节点"""
+
+    source: str
+    target: str
+    when: Callable[["WorkflowRun"], bool] | None = None
+
+
+Node = AgentNode | ToolNode
+
+
+class WorkflowRun:
+    """一次运行的输入、各节点结果和耗时"""
+
+    def __init__(self, workflow: "Workflow", inputs: Mapping[str, Any]):
+        self.workflow = workflow
+        self.inputs = dict(inputs)
+        self.results = {name: NodeResult(name) for name in workflow.order}
+        self.wall_time = 0.0
+
+    def __getitem__(self, name: str) -> NodeResult:
+        return self.results[name]
+
+    def text(self, name: str) -> str:
+        """节点的输出文本"""
+        return self.results[name].text
+
+    @property
+    def ok(self) -> bool:
+        """没有节点失败"""
+        return all(r.status != FAILED for r in self.results.values())
+
+    def format(self, template: str) -> str:
+        """用输入和上游输出填充模板，跳过或失败的节点填为（未执行）"""
+        values = {
+            name: result.text if result.ok else "（未执行）"
+            for name, result in self.results.items()
+        }
+        return template.format_map({**values, **self.inputs})
+
+    def critical_path(self) -> list[str]:
+        """决定总耗时的节点链：从最后结束的节点起，逐个回溯最后结束的上游"""
+        executed = {n: r for n, r in self.results.items() if r.status != SKIPPED}
+        if not executed:
+            return []
+        node = max(executed, key=lambda n: executed[n].finished_at)
+        path = [node]
+        while True:
+            upstream = [
+                edge.source
+                for edge in self.workflow.incoming[node]
+                if edge.source in executed
+            ]
+            if not upstream:
+                break
+            node = max(upstream, key=lambda n: executed[n].finished_at)
+            path.append(node)
+        return path[::-1]
+
+    def stats(self) -> dict[str, Any]:
+        """各节点耗时、关键路径和串行执行的耗时"""
+        path = self.critical_path()
+        serial_time = sum(r.duration for r in self.results.values())
+        return {
+            "ok": self.ok,
+            "wall_time": round(self.wall_time, 3),
+            "serial_time": round(serial_time, 3),
+            "critical_path": path,
+            "critical_time": round(sum(self.results[n].duration for n in path), 3),
+            "nodes": {
+                name: {
+                    "status": r.status,
+                    "start": round(r.started_at, 3),
+                    "duration": round(r.duration, 3),
+                }
+                for name, r in self.results.items()
+            },
+        }
+
+    def report(self) -> str:
+        """节点时间线和关键路径的摘要"""
+        stats = self.stats()
+        lines = [
+            (
+                f"🧭 工作流 {self.workflow.name}: 总耗时 {stats['wall_time']:.2f}秒 "
+                f"(逐个执行约 {stats['serial_time']:.2f}秒)"
+            ),
+        ]
+        icons = {COMPLETED: "✅", SKIPPED: "⏭️", FAILED: "❌"}
+        for name, node in stats["nodes"].items():
+            if node["status"] == SKIPPED:
+                lines.append(f"   {icons[SKIPPED]} {name}: 跳过")
+                continue
+            lines.append(
+                f"   {icons[node['status']]} {name}: "
+                f"{node['start']:.2f}秒开始, 耗时 {node['duration']:.2f}秒",
+            )
+        if stats["critical_path"]:
+            share = stats["critical_time"] / stats["wall_time"] if self.wall_time else 0
+            lines.append(
+                f"   关键路径: {' → '.join(stats['critical_path'])} "
+                f"({stats['critical_time']:.2f}秒, 占总耗时 {share:.0%})",
+            )
+        return "\n".join(lines)
+
+
+class Workflow:
+    """声明式 DAG 工作流
+
+    节点在所有上游结束（完成、跳过或失败）后决定是否执行：所有上游都完成、
+    且所有条件边都成立时执行，否则跳过，所以失败会沿着依赖一直传到下游。
+    partial=True 的节点只要求至少一个上游完成、且来自已完成上游的条件边
+    全部成立，跳过或失败的上游既不阻止也不触发执行，适合只走了一个分支的
+    汇合节点。没有入边的节点在开始时执行。同一个智能体可以出现在多个节点
+    中，这些节点依次执行，每次执行前重置对话状态。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        nodes: Sequence[Node],
+        edges: Sequence[Edge | tuple[str, str]] = (),
+        metrics: MetricsCollector | None = None,
+    ):
+        self.name = name
+        self.metrics = metrics
+        self.nodes = {node.name: node for node in nodes}
+        if len(self.nodes) != len(nodes):
+            raise ValueError("节点名称重复")
+        self.edges = [e if isinstance(e, Edge) else Edge(*e) for e in edges]
+        self.incoming: dict[str, list[Edge]] = {name: [] for name in self.nodes}
+        for edge in self.edges:
+            unknown = {edge.source, edge.target} - set(self.nodes)
+            if unknown:
+                raise ValueError(f"边引用了不存在的节点: {sorted(unknown)}")
+            self.incoming[edge.target].append(edge)
+        self.order = self._topological_order()
+        self._locks: dict[int, asyncio.Lock] = {}
+
+    def _topological_order(self) -> list[str]:
+        """按依赖排序的节点名；有环时抛出 ValueError"""
+        remaining = {name: len(edges) for name, edges in self.incoming.items()}
+        ready = [name for name, count in remaining.items() if count == 0]
+        order = []
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for edge in self.edges:
+                if edge.source == name:
+                    remaining[edge.target] -= 1
+                    if remaining[edge.target] == 0:
+                        ready.append(edge.target)
+        if len(order) != len(self.nodes):
+            cycle = sorted(set(self.nodes) - set(order))
+            raise ValueError(f"工作流存在环: {cycle}")
+        return order
+
+    def _holds(self, edge: Edge, run: WorkflowRun) -> bool:
+        if edge.when is None:
+            return True
+        try:
+            return bool(edge.when(run))
+        except Exception as e:
+            logger.warning(f"条件 {edge.source} → {edge.target} 出错，视为不成立: {e}")
+            return False
+
+    def _should_run(self, name: str, run: WorkflowRun) -> bool:
+        edges = self.incoming[name]
+        if not edges:
+            return True
+        live = [edge for edge in edges if run[edge.source].ok]
+        if self.nodes[name].partial:
+            # 跳过或失败的上游不阻止执行，但至少要有一个上游完成
+            return bool(live) and all(self._holds(edge, run) for edge in live)
+        return len(live) == len(edges) and all(self._holds(e, run) for e in edges)
+
+    async def _invoke(self, node: Node, run: WorkflowRun) -> Any:
+        if isinstance(node, ToolNode):
+            kwargs = node.kwargs(run) if callable(node.kwargs) else node.kwargs
+            if inspect.iscoroutinefunction(node.func):
+                return await node.func(**kwargs)
+            return await asyncio.to_thread(node.func, **kwargs)
+
+        task = node.prompt(run) if callable(node.prompt) else run.format(node.prompt)
+        lock = self._locks.setdefault(id(node.runnable), asyncio.Lock())
+        async with lock:
+            await _reset(node.runnable)
+            return await run_task(
+                node.runnable,
+                task,
+                metrics=self.metrics,
+                render=False,
+            )
+
+    async def _execute(
+        self,
+        name: str,
+        run: WorkflowRun,
+        done: Mapping[str, asyncio.Event],
+        started_at: float,
+    ) -> None:
+        edges = self.incoming[name]
+        result = run[name]
+        try:
+            for edge in edges:
+                await done[edge.source].wait()
+            if not self._should_run(name, run):
+                logger.debug(f"{self.name}.{name}: 条件不成立或上游未完成，跳过")
+                return
+
+            result.started_at = time.monotonic() - started_at
+            try:
+                result.output = await self._invoke(self.nodes[name], run)
+                result.status = COMPLETED
+            except Exception as e:
+                result.status = FAILED
+                result.error = e
+                logger.warning(f"{self.name}.{name} 失败: {type(e).__name__} {e}")
+            result.finished_at = time.monotonic() - started_at
+
+            if self.metrics is not None:
+                self.metrics.timer(
+                    f"workflow.node.{self.name}.{name}",
+                    result.duration,
+                )
+                if result.status == FAILED:
+                    self.metrics.counter(f"workflow.failed.{self.name}")
+        finally:
+            done[name].set()
+
+    async def run(self, **inputs: Any) -> WorkflowRun:
+        """执行一次工作流；节点失败不会中断其他分支，下游节点被跳过"""
+        run = WorkflowRun(self, inputs)
+        done = {name: asyncio.Event() for name in self.order}
+        started_at = time.monotonic()
+        # 每个节点一个协程，等到上游都结束后才执行，互不依赖的分支自然并发
+        await asyncio.gather(
+            *(self._execute(name, run, done, started_at) for name in self.order),
+        )
+        run.wall_time = time.monotonic() - started_at
+
+        if self.metrics is not None:
+            self.metrics.timer(f"workflow.wall_time.{self.name}", run.wall_time)
+        return run
@@ -0,0 +1,171 @@
+"""
+截止时间
+
+把任务的截止时间变成两道防线：DeadlineTermination 在截止时间之后的第一次
+终止检查时结束对话，团队状态保持一致，可以直接复用；如果某个模型或工具
+调用一直不返回，截止时间再过 grace 秒后 run_with_deadline 取消在途调用，
+并抛出携带已产生消息的 DeadlineExceededError。被强制取消的团队状态可能不完整，
+AgentPool/TeamPool 在借出期间遇到异常时会丢弃该副本。
+
+DeadlineTermination 不指定截止时间时读取 run_with_deadline 设置的当前截止
+时间，所以预先构建、反复复用的团队也能按每个请求的截止时间结束；FanOutTeam
+同样读取当前截止时间，限制各分支的超时并在截止后跳过汇总:
+    termination = TerminationEngine(["完成"]) | DeadlineTermination()
+    result = await run_with_deadline(team, task, deadline)
+"""
+
+import asyncio
+import logging
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any
+
+from autogen_agentchat.base import (
+    TaskResult,
+    TerminatedException,
+    TerminationCondition,
+)
+from autogen_agentchat.messages import (
+    BaseAgentEvent,
+    BaseChatMessage,
+    StopMessage,
+    TextMessage,
+)
+from autogen_core import CancellationToken
+
+from autogen_learning.metrics import MetricsCollector
+from autogen_learning.streaming import StreamRenderer
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_STOP_REASON = "Deadline reached"
+
+_current_deadline: ContextVar[datetime | None] = ContextVar(
+    "autogen_learning_deadline",
+    default=None,
+)
+
+
+def current_deadline() -> datetime | None:
+    """当前请求的截止时间，不在 run_with_deadline 中时为 None"""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: datetime | None) -> Iterator[None]:
+    """在作用域内设置当前截止时间"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def deadline_reached(result: TaskResult) -> bool:
+    """对话是否因截止时间结束"""
+    return DEADLINE_STOP_REASON in (result.stop_reason or "")
+
+
+class DeadlineExceededError(Exception):
+    """截止时间过后仍未结束，在途调用已被取消"""
+
+    def __init__(self, deadline: datetime, result: TaskResult):
+        super().__init__(f"截止时间 {deadline.isoformat()} 已过，运行被取消")
+        self.deadline = deadline
+        # 取消前已产生的消息
+        self.result = result
+
+
+class DeadlineTermination(TerminationCondition):
+    """到达截止时间后结束对话
+
+    deadline 为 None 时使用 run_with_deadline 设置的当前截止时间，两者都
+    没有时不会结束对话。
+    """
+
+    def __init__(self, deadline: datetime | None = None):
+        self.deadline = deadline
+        self._terminated = False
+
+    @property
+    def terminated(self) -> bool:
+        return self._terminated
+
+    async def __call__(
+        self,
+        messages: Sequence[BaseAgentEvent | BaseChatMessage],  # noqa: ARG002
+    ) -> StopMessage | None:
+        if self._terminated:
+            raise TerminatedException("Termination condition has already been reached")
+        deadline = self.deadline or current_deadline()
+        if deadline is not None and datetime.now(deadline.tzinfo) >= deadline:
+            self._terminated = True
+            return StopMessage(
+                content=f"{DEADLINE_STOP_REASON}: {deadline.isoformat()}",
+                source="DeadlineTermination",
+            )
+        return None
+
+    async def reset(self) -> None:
+        self._terminated = False
+
+
+async def run_with_deadline(
+    runnable: Any,
+    task: str,
+    deadline: datetime,
+    *,
+    grace: float = 5.0,
+    metrics: MetricsCollector | None = None,
+    render: bool = True,
+) -> TaskResult:
+    """在截止时间内运行智能体或团队
+
+    团队里的 DeadlineTermination 按截止时间正常结束对话；截止时间过后
+    grace 秒仍未结束则取消在途的模型和工具调用，抛出 DeadlineExceededError。
+    """
+    remaining = (deadline - datetime.now(deadline.tzinfo)).total_seconds()
+    token = CancellationToken()
+    renderer = StreamRenderer(metrics=metrics, render=render)
+    messages: list[BaseAgentEvent | BaseChatMessage] = []
+    result: TaskResult | None = None
+    # 截止时间 + grace 时取消所有关联到 token 的模型和工具调用
+    cutoff = asyncio.get_running_loop().call_later(
+        max(remaining, 0.0) + grace,
+        token.cancel,
+    )
+    try:
+        with deadline_scope(deadline):
+            async for event in runnable.run_stream(
+                task=task,
+                cancellation_token=token,
+            ):
+                if isinstance(event, TaskResult):
+                    result = event
+                    continue
+                renderer.on_event(event)
+                if isinstance(event, BaseChatMessage):
+                    messages.append(event)
+    except asyncio.CancelledError:
+        if not token.is_cancelled():
+            raise
+    finally:
+        cutoff.cancel()
+
+    if result is not None:
+        return result
+    if not token.is_cancelled():
+        raise RuntimeError("run_stream 未返回 TaskResult")
+    if metrics is not None:
+        metrics.counter("deadline.cancelled")
+    logger.warning(f"截止时间 {deadline.isoformat()} 已过 {grace} 秒，取消运行")
+    if not messages:
+        # 群聊在选出第一位发言者后才回显任务，取消得早时记录里至少保留任务本身
+        messages.append(TextMessage(content=task, source="user"))
+    partial = TaskResult(
+        messages=messages,
+        stop_reason=f"{DEADLINE_STOP_REASON}: {deadline.isoformat()} (cancelled)",
+    )
+    raise DeadlineExceededError(deadline, partial)
@@ -0,0 +1,254 @@
+"""
+负载均衡调度
+
+每个请求到达时分派给对应角色下在途请求最少的副本，在该副本的队列中
+按到达顺序等待；同时执行的请求数由全局信号量限制。每个副本是工厂创建
+的独立智能体（或团队），同一时间只处理一个请求、请求之间重置状态，所以
+并发请求不会共享对话历史；运行超时或被取消的智能体可能停在半途，
+直接丢弃，下一个请求重新构建。统计每个副本的利用率和端到端吞吐量，用来
+确定每个角色需要几个副本。
+
+并发上限默认取自 AUTOGEN_DISPATCH_CONCURRENCY。
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from autogen_learning.batch import BatchResult, _reset
+from autogen_learning.metrics import MetricsCollector
+from autogen_learning.streaming import run_task
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_CONCURRENCY_ENV = "AUTOGEN_DISPATCH_CONCURRENCY"
+DEFAULT_DISPATCH_CONCURRENCY = 8
+
+
+def dispatch_concurrency() -> int:
+    """调度器的默认并发上限"""
+    return int(
+        os.getenv(DISPATCH_CONCURRENCY_ENV, str(DEFAULT_DISPATCH_CONCURRENCY)),
+    )
+
+
+@dataclass
+class DispatchResult(BatchResult):
+    """单个请求的执行结果及处理它的副本"""
+
+    role: str = ""
+    replica: str = ""
+
+
+class Replica:
+    """某个角色的一个智能体副本，串行处理分派给它的请求"""
+
+    def __init__(self, role: str, index: int, factory: Callable[[], Any]):
+        self.role = role
+        self.index = index
+        self.factory = factory
+        self.runnable: Any = None
+        # 已分派（排队或执行中）但未完成的请求数
+        self.outstanding = 0
+        self.completed = 0
+        self.failed = 0
+        self.discarded = 0
+        self.busy_time = 0.0
+        # asyncio.Lock 按等待顺序唤醒，相当于副本的请求队列
+        self.lock = asyncio.Lock()
+
+    @property
+    def name(self) -> str:
+        """副本标识，例如 tech_architect#1"""
+        return f"{self.role}#{self.index}"
+
+    async def acquire(self) -> Any:
+        """取得可用的智能体：首次使用时构建，之后在请求之间重置"""
+        if self.runnable is None:
+            self.runnable = self.factory()
+        else:
+            await _reset(self.runnable)
+        return self.runnable
+
+    async def discard(self) -> None:
+        """丢弃当前智能体（运行被打断、状态可能不完整时），下次使用时重新构建"""
+        runnable, self.runnable = self.runnable, None
+        if runnable is None:
+            return
+        self.discarded += 1
+        if hasattr(runnable, "close"):
+            await runnable.close()
+
+
+class Dispatcher:
+    """按最少在途请求把请求分派给各角色副本的调度器
+
+    factories 为每个角色提供创建智能体的工厂；replicas 为每个角色的副本数
+    （整数表示所有角色相同）。
+    """
+
+    def __init__(
+        self,
+        factories: Mapping[str, Callable[[], Any]],
+        replicas: Mapping[str, int] | int = 1,
+        concurrency: int | None = None,
+        timeout: float | None = None,
+        metrics: MetricsCollector | None = None,
+    ):
+        self.concurrency = concurrency or dispatch_concurrency()
+        if self.concurrency < 1:
+            raise ValueError("concurrency 必须大于 0")
+        counts = (
+            dict.fromkeys(factories, replicas)
+            if isinstance(replicas, int)
+            else {role: replicas.get(role, 1) for role in factories}
+        )
+        if any(count < 1 for count in counts.values()):
+            raise ValueError("每个角色至少需要一个副本")
+        self.replicas = {
+            role: [Replica(role, i + 1, factory) for i in range(counts[role])]
+            for role, factory in factories.items()
+        }
+        self.timeout = timeout
+        self.metrics = metrics
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self.wall_time = 0.0
+        self._results: list[DispatchResult] = []
+
+    def _pick(self, role: str) -> Replica:
+        """在途请求最少的副本，相同时取编号小的"""
+        if role not in self.replicas:
+            raise KeyError(f"未知角色: {role}")
+        replica = min(self.replicas[role], key=lambda r: r.outstanding)
+        replica.outstanding += 1
+        return replica
+
+    async def submit(self, role: str, task: str, index: int = 0) -> DispatchResult:
+        """分派并执行一个请求"""
+        item = DispatchResult(index=index, task=task, role=role)
+        replica = self._pick(role)
+        item.replica = replica.name
+        queued_at = time.monotonic()
+        try:
+            async with replica.lock, self._slots:
+                item.wait_time = time.monotonic() - queued_at
+                started_at = time.monotonic()
+                try:
+                    runnable = await replica.acquire()
+                    async with asyncio.timeout(self.timeout):
+                        item.result = await run_task(
+                            runnable,
+                            task,
+                            metrics=self.metrics,
+                            render=False,
+                        )
+                except (TimeoutError, asyncio.CancelledError) as e:
+                    await replica.discard()
+                    if self.metrics is not None:
+                        self.metrics.counter("dispatch.discarded")
+                    current = asyncio.current_task()
+                    if current is not None and current.cancelling():
+                        # 整个调度被取消，不吞掉取消
+                        raise
+                    item.error = e
+                    logger.warning(f"{replica.name} 运行被打断，已丢弃副本: {e!r}")
+                except Exception as e:
+                    item.error = e
+                    logger.warning(f"{replica.name} 处理请求失败: {e}")
+                item.duration = time.monotonic() - started_at
+        finally:
+            replica.outstanding -= 1
+        replica.busy_time += item.duration
+        if item.ok:
+            replica.completed += 1
+        else:
+            replica.failed += 1
+
+        if self.metrics is not None:
+            self.metrics.timer(f"dispatch.duration.{role}", item.duration)
+            self.metrics.timer(f"dispatch.wait_time.{role}", item.wait_time)
+            self.metrics.counter("dispatch.completed" if item.ok else "dispatch.failed")
+        return item
+
+    async def run(self, requests: Sequence[tuple[str, str]]) -> list[DispatchResult]:
+        """并发处理 (角色, 任务) 请求，按输入顺序返回结果（单个失败不影响其他请求）"""
+        unknown = {role for role, _ in requests} - set(self.replicas)
+        if unknown:
+            raise KeyError(f"未知角色: {sorted(unknown)}")
+        for replica in self.all_replicas():
+            replica.busy_time = 0.0
+            replica.completed = replica.failed = 0
+
+        started_at = time.monotonic()
+        # gather 按顺序启动各请求，_pick 在第一次 await 之前执行，分派顺序即到达顺序
+        results = await asyncio.gather(
+            *(
+                self.submit(role, task, index=i)
+                for i, (role, task) in enumerate(requests)
+            ),
+        )
+        self.wall_time = time.monotonic() - started_at
+        self._results = list(results)
+
+        if self.metrics is not None:
+            for replica in self.all_replicas():
+                self.metrics.gauge(
+                    f"dispatch.utilization.{replica.name}",
+                    self.utilization(replica),
+                )
+        return self._results
+
+    def all_replicas(self) -> list[Replica]:
+        """所有角色的副本"""
+        return [r for replicas in self.replicas.values() for r in replicas]
+
+    def utilization(self, replica: Replica) -> float:
+        """副本在最近一次运行中处理请求的时间占比"""
+        return replica.busy_time / self.wall_time if self.wall_time else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        """吞吐量、等待时间和每个副本的利用率"""
+        completed = sum(1 for r in self._results if r.ok)
+        waits = [r.wait_time for r in self._results]
+        return {
+            "requests": len(self._results),
+            "completed": completed,
+            "failed": len(self._results) - completed,
+            "wall_time": round(self.wall_time, 3),
+            "throughput": round(completed / self.wall_time, 3)
+            if self.wall_time
+            else 0.0,
+            "max_wait": round(max(waits, default=0.0), 3),
+            "replicas": {
+                r.name: {
+                    "completed": r.completed,
+                    "failed": r.failed,
+                    "discarded": r.discarded,
+                    "busy_time": round(r.busy_time, 3),
+                    "utilization": round(self.utilization(r), 3),
+                }
+                for r in self.all_replicas()
+            },
+        }
+
+    def report(self) -> str:
+        """吞吐量和副本利用率的摘要"""
+        stats = self.stats()
+        lines = [
+            (
+                f"⚖️ 调度: {stats['completed']}/{stats['requests']} 个请求, "
+                f"总耗时 {stats['wall_time']:.2f}秒, "
+                f"吞吐量 {stats['throughput']:.2f} 请求/秒, "
+                f"最长排队 {stats['max_wait']:.2f}秒 (并发上限 {self.concurrency})"
+            ),
+        ]
+        for name, replica in stats["replicas"].items():
+            lines.append(
+                f"   {name}: {replica['completed']} 个请求, "
+                f"利用率 {replica['utilization']:.0%}",
+            )
+        return "\n".join(lines)
@@ -0,0 +1,147 @@
+"""
+按专长匹配发言者
+
+把每位智能体的专长描述（通常就是系统消息）用哈希词袋 + TF-IDF 编码成
+NumPy 矩阵的一行。新消息编码成同样的向量后，一次矩阵-向量乘法得到与
+每位智能体的余弦相似度，耗时是微秒级，不需要一次模型往返。中文按字的
+二元组切分，英文按单词切分；所有描述都出现的套话 IDF 为 0，不影响匹配。
+
+参与者变化时用 add/remove/sync 增量更新索引，不需要重新编码其他描述。
+和模型选择的对比基准: python -m autogen_learning.selector_bench
+"""
+
+import logging
+import re
+import zlib
+from collections.abc import Iterator, Mapping, Sequence
+
+import numpy as np
+from autogen_agentchat.messages import BaseAgentEvent, BaseChatMessage
+
+from autogen_learning.metrics import MetricsCollector
+from autogen_learning.selection import SpeakerSelector, last_chat_message
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9_]+|[\u4e00-\u9fff]+")
+
+
+def _tokens(text: str) -> Iterator[str]:
+    """英文单词和中文字二元组"""
+    for token in _TOKEN.findall(text.lower()):
+        if token[0].isascii() or len(token) == 1:
+            yield token
+        else:
+            for i in range(len(token) - 1):
+                yield token[i : i + 2]
+
+
+class ExpertiseRouter(SpeakerSelector):
+    """用 TF-IDF 余弦相似度把消息分派给专长最匹配的智能体"""
+
+    label = "专长匹配"
+
+    def __init__(
+        self,
+        descriptions: Mapping[str, str] | None = None,
+        *,
+        n_features: int = 1 << 12,
+        min_score: float = 0.05,
+        min_margin: float = 0.02,
+        fallback: SpeakerSelector | None = None,
+        metrics: MetricsCollector | None = None,
+    ):
+        super().__init__(fallback=fallback, metrics=metrics)
+        self.n_features = n_features
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.names: list[str] = []
+        self._tf = np.zeros((0, n_features), dtype=np.float32)
+        self._df = np.zeros(n_features, dtype=np.float32)
+        self._idf: np.ndarray | None = None
+        self._matrix: np.ndarray | None = None
+        self.sync(descriptions or {})
+
+    def _term_frequencies(self, text: str) -> np.ndarray:
+        buckets = [zlib.crc32(t.encode()) % self.n_features for t in _tokens(text)]
+        counts = np.bincount(buckets, minlength=self.n_features)
+        return np.log1p(counts, dtype=np.float32)
+
+    def add(self, name: str, description: str) -> None:
+        """加入或更新一位智能体的专长描述"""
+        if name in self.names:
+            self.remove(name)
+        row = self._term_frequencies(description)
+        self.names.append(name)
+        self._tf = np.vstack([self._tf, row])
+        self._df += row > 0
+        self._matrix = None
+
+    def remove(self, name: str) -> None:
+        """移除一位智能体"""
+        index = self.names.index(name)
+        self._df -= self._tf[index] > 0
+        self._tf = np.delete(self._tf, index, axis=0)
+        del self.names[index]
+        self._matrix = None
+
+    def sync(self, descriptions: Mapping[str, str]) -> None:
+        """与当前参与者对齐：加入新的、移除离开的，已有的保持不变"""
+        for name in [n for n in self.names if n not in descriptions]:
+            self.remove(name)
+        for name, description in descriptions.items():
+            if name not in self.names:
+                self.add(name, description)
+
+    def _weights(self) -> tuple[np.ndarray, np.ndarray]:
+        """按需重建 IDF 和行归一化的 TF-IDF 矩阵"""
+        if self._matrix is None or self._idf is None:
+            n = len(self.names)
+            # 所有描述都包含的词 IDF 为 0
+            self._idf = np.log((1 + n) / (1 + self._df)).astype(np.float32)
+            matrix = self._tf * self._idf
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._matrix = matrix / np.maximum(norms, 1e-12)
+        return self._matrix, self._idf
+
+    def scores(self, text: str) -> dict[str, float]:
+        """消息与每位智能体专长的余弦相似度"""
+        if not self.names:
+            return {}
+        matrix, idf = self._weights()
+        query = self._term_frequencies(text) * idf
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return dict.fromkeys(self.names, 0.0)
+        similarity = matrix @ (query / norm)
+        return dict(zip(self.names, similarity.tolist(), strict=True))
+
+    def match(self, text: str, exclude: Sequence[str] = ()) -> str | None:
+        """专长最匹配的智能体；得分过低或前两名过于接近时返回 None"""
+        ranked = sorted(
+            (
+                (score, name)
+                for name, score in self.scores(text).items()
+                if name not in exclude
+            ),
+            reverse=True,
+        )
+        if not ranked or ranked[0][0] < self.min_score:
+            return None
+        if len(ranked) > 1 and ranked[0][0] - ranked[1][0] < self.min_margin:
+            return None
+        return ranked[0][1]
+
+    def select(
+        self,
+        messages: Sequence[BaseAgentEvent | BaseChatMessage],
+    ) -> str | None:
+        last = last_chat_message(messages)
+        if last is None:
+            return None
+        speaker = self.match(last.to_text(), exclude=[last.source])
+        if speaker is not None:
+            if self.metrics is not None:
+                self.metrics.counter("selector.expertise")
+            logger.debug(f"按专长选择发言者 {speaker}")
+        return speaker
@@ -0,0 +1,340 @@
+"""
+并行咨询团队
+
+专家各自回答互不依赖的问题时，轮流发言的群聊让总耗时等于所有专家耗时
+之和。FanOutTeam 把任务同时发给每位专家，收齐回复后交给协调者汇总；
+每个分支有独立的超时，慢的专家会被放弃而不拖住整个团队，总耗时接近
+最慢的那个分支加上汇总的时间。
+
+各分支通过 run_stream 运行，token 增量照常向外转发。为了不让并发分支的
+token 交错在一起，同一时刻只有一个分支实时输出，其余分支的事件先缓冲，
+轮到时整体输出；因此按分支统计的首 token 时间由团队自己记录
+(fanout.first_token.<专家>)，不依赖渲染时的观测。
+
+在 run_with_deadline 中运行或指定了 deadline 时，分支超时不超过距截止
+时间的剩余秒数；专家回复收齐时截止时间已到则跳过汇总，按 DeadlineTermination
+的方式正常结束，结果的 stop_reason 可以用 deadline_reached 判断。
+
+实现了 run/run_stream/reset，可以直接交给 run_task 和 BatchRunner。
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncGenerator, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from autogen_agentchat.base import ChatAgent, TaskResult
+from autogen_agentchat.messages import (
+    BaseAgentEvent,
+    BaseChatMessage,
+    ModelClientStreamingChunkEvent,
+    TextMessage,
+)
+from autogen_core import CancellationToken
+
+from autogen_learning.deadline import DeadlineTermination, current_deadline
+from autogen_learning.metrics import MetricsCollector
+
+logger = logging.getLogger(__name__)
+
+MERGE_PROMPT = """{task}
+
+以下是各位专家对上述任务的独立意见：
+
+{replies}
+
+请综合各位专家的意见，指出分歧并给出统一的结论和下一步行动。"""
+
+Event = BaseAgentEvent | BaseChatMessage
+
+
+@dataclass
+class BranchResult:
+    """单个专家分支的结果"""
+
+    name: str
+    messages: list[BaseAgentEvent | BaseChatMessage] = field(default_factory=list)
+    error: BaseException | None = None
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """分支是否按时完成"""
+        return self.error is None and bool(self.messages)
+
+    @property
+    def content(self) -> str:
+        """专家的最终回复"""
+        return self.messages[-1].to_text() if self.messages else ""
+
+
+class _Relay:
+    """按分支转发事件：一个分支实时输出，其余分支缓冲到轮到自己时再输出"""
+
+    def __init__(self, names: Sequence[str]):
+        self.live: str | None = None
+        self.buffers: dict[str, list[Event]] = {name: [] for name in names}
+        self.finished: list[str] = []
+
+    def push(self, name: str, event: Event) -> list[Event]:
+        """收到分支的一个事件，返回现在可以输出的事件"""
+        if self.live is None:
+            self.live = name
+        if name == self.live:
+            return [event]
+        self.buffers[name].append(event)
+        return []
+
+    def finish(self, name: str) -> list[Event]:
+        """分支结束，返回现在可以输出的事件"""
+        self.finished.append(name)
+        if name != self.live:
+            return []
+        # 实时分支结束：先按完成顺序输出已结束的分支，再选一个仍在运行的分支接上
+        ready: list[Event] = []
+        for done in self.finished:
+            ready.extend(self.buffers.pop(done))
+        self.finished = []
+        self.live = next((n for n, events in self.buffers.items() if events), None)
+        if self.live is not None:
+            ready.extend(self.buffers[self.live])
+            self.buffers[self.live] = []
+        return ready
+
+
+class FanOutTeam:
+    """把任务并发广播给多位专家，再由协调者汇总的团队"""
+
+    def __init__(
+        self,
+        specialists: Sequence[ChatAgent],
+        coordinator: ChatAgent,
+        *,
+        branch_timeout: float | None = None,
+        merge_prompt: str = MERGE_PROMPT,
+        metrics: MetricsCollector | None = None,
+        deadline: datetime | None = None,
+    ):
+        if not specialists:
+            raise ValueError("至少需要一位专家")
+        self.specialists = list(specialists)
+        self.coordinator = coordinator
+        self.branch_timeout = branch_timeout
+        self.merge_prompt = merge_prompt
+        self.metrics = metrics
+        self.deadline = deadline
+        # 汇总前检查截止时间，deadline 为 None 时使用当前请求的截止时间
+        self.termination = DeadlineTermination(deadline)
+        self.branches: list[BranchResult] = []
+        self.merge_skipped = False
+        self.wall_time = 0.0
+        self.merge_time = 0.0
+
+    def _branch_timeout(self) -> float | None:
+        """分支超时：branch_timeout 和距截止时间的剩余秒数中较小的一个"""
+        deadline = self.deadline or current_deadline()
+        if deadline is None:
+            return self.branch_timeout
+        remaining = (deadline - datetime.now(deadline.tzinfo)).total_seconds()
+        remaining = max(remaining, 0.0)
+        if self.branch_timeout is None:
+            return remaining
+        return min(self.branch_timeout, remaining)
+
+    def _first_token(self, name: str, started_at: float) -> None:
+        if self.metrics is not None:
+            elapsed = time.monotonic() - started_at
+            self.metrics.timer(f"fanout.first_token.{name}", elapsed)
+
+    async def _branch(
+        self,
+        agent: ChatAgent,
+        task: str,
+        cancellation_token: CancellationToken | None,
+        events: asyncio.Queue[tuple[str, Event | BranchResult]],
+        timeout: float | None,
+    ) -> None:
+        """流式运行一位专家，把事件和最终结果放入 events"""
+        branch = BranchResult(name=agent.name)
+        started_at = time.monotonic()
+        streamed = False
+        try:
+            async with asyncio.timeout(timeout):
+                async for event in agent.run_stream(
+                    task=task,
+                    cancellation_token=cancellation_token,
+                ):
+                    # 去掉回显的任务消息和专家自己的 TaskResult
+                    if isinstance(event, TaskResult) or event.source != agent.name:
+                        continue
+                    if isinstance(event, ModelClientStreamingChunkEvent):
+                        if not streamed:
+                            self._first_token(agent.name, started_at)
+                        streamed = True
+                    else:
+                        branch.messages.append(event)
+                    events.put_nowait((agent.name, event))
+        except Exception as e:
+            branch.error = e
+            logger.warning(f"专家 {agent.name} 未完成，已放弃: {type(e).__name__} {e}")
+        branch.duration = time.monotonic() - started_at
+
+        if self.metrics is not None:
+            self.metrics.timer(f"fanout.branch.{agent.name}", branch.duration)
+            if not branch.ok:
+                self.metrics.counter("fanout.dropped")
+        events.put_nowait((agent.name, branch))
+
+    def _merge_task(self, task: str) -> str:
+        replies = []
+        for branch in self.branches:
+            if branch.ok:
+                replies.append(f"[{branch.name}]\n{branch.content}")
+            else:
+                replies.append(f"[{branch.name}]\n（未在时限内回复）")
+        return self.merge_prompt.format(task=task, replies="\n\n".join(replies))
+
+    async def _fan_out(
+        self,
+        task: str,
+        cancellation_token: CancellationToken | None,
+    ) -> AsyncGenerator[Event, None]:
+        """并发运行所有分支，逐个分支地输出事件，结果记入 self.branches"""
+        events: asyncio.Queue[tuple[str, Event | BranchResult]] = asyncio.Queue()
+        relay = _Relay([agent.name for agent in self.specialists])
+        timeout = self._branch_timeout()
+        pending = [
+            asyncio.create_task(
+                self._branch(agent, task, cancellation_token, events, timeout),
+            )
+            for agent in self.specialists
+        ]
+        try:
+            while len(self.branches) < len(pending):
+                name, item = await events.get()
+                if isinstance(item, BranchResult):
+                    self.branches.append(item)
+                    ready = relay.finish(name)
+                else:
+                    ready = relay.push(name, item)
+                for event in ready:
+                    yield event
+        finally:
+            for branch_task in pending:
+                branch_task.cancel()
+
+    async def run_stream(
+        self,
+        *,
+        task: str,
+        cancellation_token: CancellationToken | None = None,
+    ) -> AsyncGenerator[Event | TaskResult, None]:
+        """并发咨询专家、流式输出各分支回复和协调者的汇总，最后产出 TaskResult"""
+        started_at = time.monotonic()
+        task_message = TextMessage(content=task, source="user")
+        messages: list[Event] = [task_message]
+        yield task_message
+
+        self.branches = []
+        async for event in self._fan_out(task, cancellation_token):
+            if not isinstance(event, ModelClientStreamingChunkEvent):
+                messages.append(event)
+            yield event
+        order = {agent.name: i for i, agent in enumerate(self.specialists)}
+        self.branches.sort(key=lambda b: order[b.name])
+
+        merge_started_at = time.monotonic()
+        stop_reason: str | None = None
+        # 截止时间已到时不再汇总，协调者的状态保持不变
+        stop = await self.termination(messages)
+        self.merge_skipped = stop is not None
+        if stop is not None:
+            await self.termination.reset()
+            stop_reason = stop.content
+        else:
+            async for event in self.coordinator.run_stream(
+                task=self._merge_task(task),
+                cancellation_token=cancellation_token,
+            ):
+                if isinstance(event, TaskResult):
+                    stop_reason = event.stop_reason
+                elif event.source != "user":
+                    if not isinstance(event, ModelClientStreamingChunkEvent):
+                        messages.append(event)
+                    yield event
+        self.merge_time = time.monotonic() - merge_started_at
+        self.wall_time = time.monotonic() - started_at
+
+        if self.metrics is not None:
+            self.metrics.timer("fanout.wall_time", self.wall_time)
+            self.metrics.timer("fanout.merge_time", self.merge_time)
+
+        dropped = [b.name for b in self.branches if not b.ok]
+        if dropped:
+            stop_reason = f"{stop_reason or '汇总完成'}; 已放弃: {', '.join(dropped)}"
+        yield TaskResult(messages=messages, stop_reason=stop_reason)
+
+    async def run(
+        self,
+        *,
+        task: str,
+        cancellation_token: CancellationToken | None = None,
+    ) -> TaskResult:
+        """运行并返回最终结果"""
+        async for event in self.run_stream(
+            task=task,
+            cancellation_token=cancellation_token,
+        ):
+            if isinstance(event, TaskResult):
+                return event
+        raise RuntimeError("run_stream 未返回 TaskResult")
+
+    async def reset(self) -> None:
+        """清空所有专家和协调者的对话状态"""
+        for agent in [*self.specialists, self.coordinator]:
+            await agent.on_reset(CancellationToken())
+        self.branches = []
+        self.merge_skipped = False
+        await self.termination.reset()
+
+    def stats(self) -> dict[str, Any]:
+        """最近一次运行的分支耗时、并行加速比和被放弃的专家"""
+        branch_time = max((b.duration for b in self.branches), default=0.0)
+        serial_time = sum(b.duration for b in self.branches) + self.merge_time
+        return {
+            "branches": {
+                b.name: {"ok": b.ok, "duration": round(b.duration, 3)}
+                for b in self.branches
+            },
+            "dropped": [b.name for b in self.branches if not b.ok],
+            "slowest_branch": round(branch_time, 3),
+            "merge_time": round(self.merge_time, 3),
+            "merge_skipped": self.merge_skipped,
+            "wall_time": round(self.wall_time, 3),
+            "serial_time": round(serial_time, 3),
+            "speedup": round(serial_time / self.wall_time, 2)
+            if self.wall_time
+            else 0.0,
+        }
+
+    def report(self) -> str:
+        """各分支耗时与总耗时的摘要"""
+        stats = self.stats()
+        lines = [
+            (
+                f"⚡ 并行咨询: 总耗时 {stats['wall_time']:.2f}秒 "
+                f"(逐个发言约 {stats['serial_time']:.2f}秒, "
+                f"加速 {stats['speedup']:.1f}x)"
+            ),
+        ]
+        for name, branch in stats["branches"].items():
+            status = "✅" if branch["ok"] else "⏱️ 已放弃"
+            lines.append(f"   {status} {name}: {branch['duration']:.2f}秒")
+        if stats["merge_skipped"]:
+            lines.append("   汇总: ⏱️ 截止时间已到，已跳过")
+        else:
+            lines.append(f"   汇总: {stats['merge_time']:.2f}秒")
+        return "\n".join(lines)
@@ -0,0 +1,192 @@
+"""
+示例启动耗时报告
+
+在独立子进程中用 ``python -X importtime`` 加载每个示例（只执行模块顶层代码，
+不运行 main），按顶层包汇总导入耗时，并与保存的基线比较，超出阈值的示例
+标记为回归并以非零状态退出。
+
+用法:
+    python -m autogen_learning.importtime --save-baseline
+    python -m autogen_learning.importtime
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = ".importtime_baseline.json"
+
+# import time: self [us] | cumulative | imported package
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+# 只加载示例模块，不触发 if __name__ == "__main__" 中的演示
+_LOADER = "import runpy, sys; runpy.run_path(sys.argv[1], run_name='__importtime__')"
+
+
+@dataclass
+class ImportProfile:
+    """单个示例的启动耗时"""
+
+    example: str
+    total_ms: float
+    wall_ms: float
+    packages: dict[str, float] = field(default_factory=dict)
+
+    def top(self, n: int) -> list[tuple[str, float]]:
+        """耗时最多的 n 个顶层包"""
+        return sorted(self.packages.items(), key=lambda item: -item[1])[:n]
+
+    def to_dict(self) -> dict[str, Any]:
+        """转换为字典"""
+        return {
+            "total_ms": round(self.total_ms, 1),
+            "wall_ms": round(self.wall_ms, 1),
+            "packages": {name: round(ms, 1) for name, ms in self.top(10)},
+        }
+
+
+def parse_importtime(stderr: str) -> dict[str, float]:
+    """把 -X importtime 输出汇总为 {顶层包: 累计毫秒}"""
+    packages: dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        # 缩进为 0 的是直接导入的模块，其累计耗时已包含全部子导入
+        if match and not match.group(3):
+            name = match.group(4).split(".")[0]
+            packages[name] += int(match.group(2)) / 1000
+    return dict(packages)
+
+
+def profile_example(path: Path, runs: int = 3) -> ImportProfile:
+    """多次冷启动示例，取总导入耗时最小的一次"""
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(PROJECT_ROOT), env.get("PYTHONPATH")]),
+    )
+    # 示例顶层代码不发请求，占位密钥即可
+    env.setdefault("OPENAI_API_KEY", "importtime")
+
+    profiles = []
+    for _ in range(max(runs, 1)):
+        started_at = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _LOADER, str(path)],
+            check=False,
+            capture_output=True,
+            text=True,
+            cwd=PROJECT_ROOT,
+            env=env,
+        )
+        wall_ms = (time.perf_counter() - started_at) * 1000
+        if result.returncode != 0:
+            raise RuntimeError(f"加载 {path} 失败:\n{result.stderr[-2000:]}")
+
+        packages = parse_importtime(result.stderr)
+        profiles.append(
+            ImportProfile(
+                example=str(path.relative_to(PROJECT_ROOT)),
+                total_ms=sum(packages.values()),
+                wall_ms=wall_ms,
+                packages=packages,
+            ),
+        )
+    return min(profiles, key=lambda profile: profile.total_ms)
+
+
+def find_regressions(
+    profiles: list[ImportProfile],
+    baseline: dict[str, Any],
+    threshold: float = 0.2,
+    min_delta_ms: float = 20.0,
+) -> dict[str, float]:
+    """找出导入耗时比基线增加超过阈值的示例，返回 {示例: 增加的毫秒}"""
+    regressions = {}
+    for profile in profiles:
+        previous = baseline.get(profile.example)
+        if previous is None:
+            continue
+        delta = profile.total_ms - previous["total_ms"]
+        if delta > min_delta_ms and delta > previous["total_ms"] * threshold:
+            regressions[profile.example] = delta
+    return regressions
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="统计每个示例的启动导入耗时")
+    parser.add_argument("examples", nargs="*", help="示例文件（默认 examples/ 下全部）")
+    parser.add_argument("--runs", type=int, default=3, help="每个示例的冷启动次数")
+    parser.add_argument("--top", type=int, default=3, help="显示耗时最多的包数量")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="写入新的基线")
+    parser.add_argument("--threshold", type=float, default=0.2, help="回归的相对阈值")
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=20.0,
+        help="回归的最小绝对增量（毫秒）",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """命令行入口"""
+    args = _parse_args()
+    paths = [Path(p).resolve() for p in args.examples] or sorted(
+        (PROJECT_ROOT / "examples").glob("*/[0-9]*.py"),
+    )
+    baseline_path = PROJECT_ROOT / args.baseline
+    baseline = (
+        json.loads(baseline_path.read_text(encoding="utf-8"))
+        if baseline_path.exists()
+        else {}
+    )
+
+    print(f"⏱️  启动导入耗时 (每个示例取 {args.runs} 次冷启动的最小值)")
+    profiles = []
+    for path in paths:
+        profile = profile_example(path, runs=args.runs)
+        profiles.append(profile)
+        previous = baseline.get(profile.example)
+        delta = (
+            f" ({profile.total_ms - previous['total_ms']:+.1f}ms)" if previous else ""
+        )
+        top = ", ".join(f"{name} {ms:.0f}ms" for name, ms in profile.top(args.top))
+        print(
+            f"   {profile.example}: 导入 {profile.total_ms:.1f}ms{delta}, "
+            f"进程 {profile.wall_ms:.0f}ms | {top}",
+        )
+
+    regressions = find_regressions(
+        profiles,
+        baseline,
+        threshold=args.threshold,
+        min_delta_ms=args.min_delta_ms,
+    )
+
+    if args.save_baseline:
+        data = {profile.example: profile.to_dict() for profile in profiles}
+        baseline_path.write_text(
+            json.dumps(data, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        print(f"💾 基线已保存: {baseline_path}")
+    elif not baseline:
+        print("💡 未找到基线，使用 --save-baseline 保存当前结果")
+
+    if regressions and not args.save_baseline:
+        print("❌ 启动耗时回归:")
+        for example, delta in regressions.items():
+            print(f"   {example}: +{delta:.1f}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+指标收集
+
+示例和共享组件共用的指标收集器（计数器、仪表盘、计时器）。
+"""
+
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from enum import Enum
+from typing import Any
+
+
+class MetricType(Enum):
+    """指标类型"""
+
+    COUNTER = "counter"
+    GAUGE = "gauge"
+    HISTOGRAM = "histogram"
+    TIMER = "timer"
+
+
+@dataclass
+class Metric:
+    """指标数据"""
+
+    name: str
+    type: MetricType
+    value: float
+    timestamp: datetime
+    tags: dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        """转换为字典"""
+        return {
+            "name": self.name,
+            "type": self.type.value,
+            "value": self.value,
+            "timestamp": self.timestamp.isoformat(),
+            "tags": self.tags,
+        }
+
+
+class MetricsCollector:
+    """指标收集器
+
+    长时间运行的进程每次请求都会记录指标，明细和每个计时器的样本只保留
+    最近 max_history 条；计数器和仪表盘是累计值，不受影响。
+    """
+
+    def __init__(self, max_history: int = 10000):
+        self.max_history = max_history
+        self.metrics: deque[Metric] = deque(maxlen=max_history)
+        # 记录过的指标总数，包括已被丢弃的明细
+        self.recorded = 0
+        self.counters: dict[str, float] = {}
+        self.gauges: dict[str, float] = {}
+        self.timers: dict[str, deque[float]] = {}
+
+    def _record(self, metric: Metric) -> None:
+        self.metrics.append(metric)
+        self.recorded += 1
+
+    def counter(self, name: str, value: float = 1.0, **tags) -> None:
+        """计数器指标"""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+        metric = Metric(
+            name=name,
+            type=MetricType.COUNTER,
+            value=self.counters[name],
+            timestamp=datetime.now(UTC),
+            tags=tags,
+        )
+        self._record(metric)
+
+    def gauge(self, name: str, value: float, **tags) -> None:
+        """仪表盘指标"""
+        self.gauges[name] = value
+
+        metric = Metric(
+            name=name,
+            type=MetricType.GAUGE,
+            value=value,
+            timestamp=datetime.now(UTC),
+            tags=tags,
+        )
+        self._record(metric)
+
+    def timer(self, name: str, value: float, **tags) -> None:
+        """计时器指标"""
+        if name not in self.timers:
+            self.timers[name] = deque(maxlen=self.max_history)
+        self.timers[name].append(value)
+
+        metric = Metric(
+            name=name,
+            type=MetricType.TIMER,
+            value=value,
+            timestamp=datetime.now(UTC),
+            tags=tags,
+        )
+        self._record(metric)
+
+    @asynccontextmanager
+    async def time_operation(self, name: str, **tags):
+        """计时上下文管理器"""
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - start_time
+            self.timer(name, duration, **tags)
+
+    def get_metrics(
+        self,
+        metric_type: MetricType | None = None,
+        since: datetime | None = None,
+    ) -> list[Metric]:
+        """获取保留的指标明细，since 需带时区"""
+        metrics = list(self.metrics)
+
+        if metric_type:
+            metrics = [m for m in metrics if m.type == metric_type]
+
+        if since:
+            metrics = [m for m in metrics if m.timestamp >= since]
+
+        return metrics
+
+    def get_summary(self) -> dict[str, Any]:
+        """获取指标摘要"""
+        return {
+            "total_metrics": self.recorded,
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+            "timer_stats": {
+                name: {
+                    "count": len(values),
+                    "avg": sum(values) / len(values),
+                    "min": min(values),
+                    "max": max(values),
+                }
+                for name, values in self.timers.items()
+            },
+        }
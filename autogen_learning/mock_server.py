@@ -0,0 +1,450 @@
+"""
+本地 OpenAI 兼容模拟服务器
+
+实现 /v1/chat/completions（流式、非流式和工具调用），按脚本规则或内置规则
+生成回复，并可配置延迟分布、token 速率和错误注入，用于离线测量编排开销。
+
+内置规则让示例离线也能正常结束：系统提示词要求说出的短语（例如
+当研究完成时说"研究项目完成"）追加在回复末尾，终止条件因此能匹配；
+SelectorGroupChat 的发言者选择请求轮流返回候选角色之一。
+
+用法:
+    python -m autogen_learning.mock_server --port 8000 --latency-ms 200
+    export OPENAI_API_BASE=http://127.0.0.1:8000/v1
+"""
+
+import argparse
+import ast
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from aiohttp import web
+
+DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+# 系统提示词中要求说出的短语：说"完成" / 说“完成”
+_PHRASE = re.compile(r"说\s*[\"“]([^\"”\n]+)[\"”]")
+# SelectorGroupChat 默认提示词中的候选角色列表
+_SELECTOR = re.compile(r"select the next role from (\[[^\]]*\])")
+
+
+@dataclass
+class LatencyProfile:
+    """首 token 延迟分布（毫秒）"""
+
+    distribution: str = "fixed"
+    mean_ms: float = 200.0
+    spread_ms: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        """采样一次延迟，返回秒"""
+        if self.distribution == "uniform":
+            low = self.mean_ms - self.spread_ms
+            value = rng.uniform(low, self.mean_ms + self.spread_ms)
+        elif self.distribution == "normal":
+            value = rng.gauss(self.mean_ms, self.spread_ms)
+        elif self.distribution == "lognormal":
+            # 以 mean_ms 为中位数、spread_ms 为尺度的长尾分布
+            sigma = math.log1p(self.spread_ms / self.mean_ms) if self.mean_ms else 0.0
+            value = self.mean_ms * rng.lognormvariate(0.0, sigma)
+        else:
+            value = self.mean_ms
+        return max(0.0, value) / 1000
+
+
+@dataclass
+class MockRule:
+    """脚本规则：最后一条消息匹配 pattern 时返回固定内容或调用工具"""
+
+    pattern: str
+    content: str | None = None
+    tool: str | None = None
+    arguments: dict[str, Any] | None = None
+
+    def matches(self, text: str) -> bool:
+        return re.search(self.pattern, text) is not None
+
+
+@dataclass
+class MockServerConfig:
+    """模拟服务器配置"""
+
+    host: str = "127.0.0.1"
+    port: int = 8000
+    latency: LatencyProfile = field(default_factory=LatencyProfile)
+    tokens_per_second: float = 50.0
+    completion_tokens: int = 40
+    error_rate: float = 0.0
+    error_statuses: tuple[int, ...] = (429, 500, 503)
+    retry_after: float = 1.0
+    reply_suffix: str = ""
+    auto_tool_calls: bool = True
+    # 回复末尾追加系统提示词要求说出的短语
+    echo_phrases: bool = True
+    # 发言者选择请求轮流返回候选角色
+    select_roles: bool = True
+    rules: list[MockRule] = field(default_factory=list)
+    seed: int | None = None
+
+    @staticmethod
+    def load_rules(path: str | Path) -> list[MockRule]:
+        """从 JSON 文件加载脚本规则列表"""
+        with Path(path).open(encoding="utf-8") as f:
+            return [MockRule(**rule) for rule in json.load(f)]
+
+
+def _message_text(message: dict[str, Any]) -> str:
+    """提取消息中的文本内容"""
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        parts = [part.get("text", "") for part in content if isinstance(part, dict)]
+        return " ".join(parts)
+    return str(content)
+
+
+def _system_text(messages: list[dict[str, Any]]) -> str:
+    return "\n".join(
+        _message_text(m) for m in messages if m.get("role") in ("system", "developer")
+    )
+
+
+def _requested_phrase(messages: list[dict[str, Any]]) -> str | None:
+    """系统提示词要求说出的最后一个短语"""
+    phrases = _PHRASE.findall(_system_text(messages))
+    return phrases[-1] if phrases else None
+
+
+def _candidate_roles(messages: list[dict[str, Any]]) -> list[str]:
+    """发言者选择请求中的候选角色，不是选择请求时为空"""
+    for message in messages:
+        match = _SELECTOR.search(_message_text(message))
+        if match is None:
+            continue
+        try:
+            roles = ast.literal_eval(match.group(1))
+        except (SyntaxError, ValueError):
+            return []
+        return [str(role) for role in roles]
+    return []
+
+
+def _example_value(schema: dict[str, Any]) -> Any:
+    """按 JSON schema 类型生成示例参数"""
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type", "string")
+    if kind in ("integer", "number"):
+        return 1
+    if kind == "boolean":
+        return True
+    if kind == "array":
+        return []
+    if kind == "object":
+        return {}
+    return "test"
+
+
+def _example_arguments(tool: dict[str, Any]) -> dict[str, Any]:
+    parameters = tool.get("function", {}).get("parameters") or {}
+    properties = parameters.get("properties", {})
+    return {
+        name: _example_value(properties.get(name, {}))
+        for name in parameters.get("required", list(properties))
+    }
+
+
+class MockModelServer:
+    """OpenAI 兼容的模拟模型服务器"""
+
+    def __init__(self, config: MockServerConfig | None = None):
+        self.config = config or MockServerConfig()
+        self.stats = {
+            "requests": 0,
+            "streamed": 0,
+            "errors": 0,
+            "tool_calls": 0,
+            "selections": 0,
+        }
+        self._rng = random.Random(self.config.seed)  # noqa: S311
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        """OPENAI_API_BASE 应设置的地址"""
+        return f"http://{self.config.host}:{self.config.port}/v1"
+
+    def build_app(self) -> web.Application:
+        """创建 aiohttp 应用"""
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        app.router.add_get("/v1/models", self._models)
+        app.router.add_get("/stats", self._stats)
+        return app
+
+    async def start(self) -> str:
+        """启动服务器并返回 API 地址"""
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.config.host, self.config.port)
+        await site.start()
+        if self.config.port == 0:
+            # 端口为 0 时使用系统分配的端口
+            self.config.port = self._runner.addresses[0][1]
+        return self.url
+
+    async def stop(self) -> None:
+        """停止服务器"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "MockModelServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.stop()
+
+    async def _models(self, _request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": []})
+
+    async def _stats(self, _request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    def _error(self) -> web.Response | None:
+        """按 error_rate 注入错误"""
+        if self._rng.random() >= self.config.error_rate:
+            return None
+        self.stats["errors"] += 1
+        status = self._rng.choice(self.config.error_statuses)
+        headers = {}
+        if status == 429:
+            headers["retry-after"] = str(self.config.retry_after)
+        return web.json_response(
+            {"error": {"message": "injected error", "type": "mock_error"}},
+            status=status,
+            headers=headers,
+        )
+
+    def _plan(self, body: dict[str, Any]) -> tuple[str | None, list[dict[str, Any]]]:
+        """决定回复：返回 (文本, 工具调用列表)"""
+        messages = body.get("messages") or [{}]
+        last = messages[-1]
+        text = _message_text(last)
+        tools = {t["function"]["name"]: t for t in body.get("tools") or []}
+
+        for rule in self.config.rules:
+            if not rule.matches(text):
+                continue
+            if rule.tool and rule.tool in tools:
+                arguments = rule.arguments
+                if arguments is None:
+                    arguments = _example_arguments(tools[rule.tool])
+                return None, [self._tool_call(rule.tool, arguments)]
+            if rule.content is not None:
+                return rule.content + self.config.reply_suffix, []
+
+        # 内置规则：发言者选择请求轮流选择候选角色，每个角色都有机会发言
+        roles = _candidate_roles(messages) if self.config.select_roles else []
+        if roles:
+            self.stats["selections"] += 1
+            return roles[(self.stats["selections"] - 1) % len(roles)], []
+
+        # 内置规则：提供了工具且上一条不是工具结果时调用工具
+        if self.config.auto_tool_calls and tools and last.get("role") != "tool":
+            name = next((n for n in tools if n in text), next(iter(tools)))
+            return None, [self._tool_call(name, _example_arguments(tools[name]))]
+
+        words = [f"token{i}" for i in range(self.config.completion_tokens)]
+        phrase = _requested_phrase(messages) if self.config.echo_phrases else None
+        if phrase:
+            words.append(phrase)
+        return " ".join(words) + self.config.reply_suffix, []
+
+    def _tool_call(self, name: str, arguments: dict[str, Any]) -> dict[str, Any]:
+        self.stats["tool_calls"] += 1
+        return {
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {
+                "name": name,
+                "arguments": json.dumps(arguments, ensure_ascii=False),
+            },
+        }
+
+    def _usage(self, body: dict[str, Any], completion_tokens: int) -> dict[str, int]:
+        prompt = sum(len(_message_text(m)) for m in body.get("messages") or [])
+        prompt_tokens = max(1, prompt // 4)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _token_delay(self) -> float:
+        rate = self.config.tokens_per_second
+        return 1 / rate if rate > 0 else 0.0
+
+    async def _chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.stats["requests"] += 1
+
+        error = self._error()
+        if error is not None:
+            return error
+
+        content, tool_calls = self._plan(body)
+        tokens = content.split(" ") if content else []
+        await asyncio.sleep(self.config.latency.sample(self._rng))
+
+        if body.get("stream"):
+            self.stats["streamed"] += 1
+            return await self._stream(request, body, tokens, tool_calls)
+
+        # 非流式：一次性等待整段生成时间
+        await asyncio.sleep(len(tokens) * self._token_delay())
+        message: dict[str, Any] = {"role": "assistant", "content": content}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        return web.json_response(
+            {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if tool_calls else "stop",
+                    },
+                ],
+                "usage": self._usage(body, len(tokens) + len(tool_calls)),
+            },
+        )
+
+    async def _stream(
+        self,
+        request: web.Request,
+        body: dict[str, Any],
+        tokens: list[str],
+        tool_calls: list[dict[str, Any]],
+    ) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        async def send(delta: dict[str, Any], finish_reason: str | None = None) -> None:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason},
+                ],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        await send({"role": "assistant", "content": ""})
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(self._token_delay())
+            await send({"content": token if i == 0 else " " + token})
+        for index, call in enumerate(tool_calls):
+            await send({"tool_calls": [{"index": index, **call}]})
+        await send({}, "tool_calls" if tool_calls else "stop")
+
+        if (body.get("stream_options") or {}).get("include_usage"):
+            usage_chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [],
+                "usage": self._usage(body, len(tokens) + len(tool_calls)),
+            }
+            await response.write(f"data: {json.dumps(usage_chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="首 token 延迟")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="延迟分布尺度")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--completion-tokens", type=int, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--error-status",
+        type=int,
+        action="append",
+        help="注入的错误状态码，可重复指定（默认 429/500/503）",
+    )
+    parser.add_argument("--reply-suffix", default="", help="追加到每条文本回复末尾")
+    parser.add_argument("--no-tool-calls", action="store_true", help="关闭自动工具调用")
+    parser.add_argument(
+        "--no-phrases",
+        action="store_true",
+        help="不在回复末尾追加系统提示词要求说出的短语",
+    )
+    parser.add_argument(
+        "--no-role-selection",
+        action="store_true",
+        help="发言者选择请求也返回普通文本",
+    )
+    parser.add_argument("--rules", help="JSON 规则文件: [{pattern, content|tool}]")
+    parser.add_argument("--seed", type=int)
+    return parser.parse_args()
+
+
+async def _serve(config: MockServerConfig) -> None:
+    server = MockModelServer(config)
+    url = await server.start()
+    print(f"🧪 模拟模型服务器已启动: {url}")
+    print(f"   export OPENAI_API_BASE={url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    """命令行入口"""
+    args = _parse_args()
+    config = MockServerConfig(
+        host=args.host,
+        port=args.port,
+        latency=LatencyProfile(args.distribution, args.latency_ms, args.jitter_ms),
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_statuses=tuple(args.error_status or (429, 500, 503)),
+        reply_suffix=args.reply_suffix,
+        auto_tool_calls=not args.no_tool_calls,
+        echo_phrases=not args.no_phrases,
+        select_roles=not args.no_role_selection,
+        rules=MockServerConfig.load_rules(args.rules) if args.rules else [],
+        seed=args.seed,
+    )
+    try:
+        asyncio.run(_serve(config))
+    except KeyboardInterrupt:
+        print("\n👋 模拟服务器已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+智能体副本池
+
+AssistantAgent 持有对话状态，同一个实例同时处理两个请求会互相污染上下文。
+AgentPool 按角色模板（工厂）按需克隆副本，每个角色最多 max_per_role 个；
+请求结束后副本被重置并放回池中供下一个请求复用，空闲超过 idle_ttl 的副本
+被淘汰。副本用尽时请求排队等待，命中率和等待时间写入指标。
+
+TeamPool 对团队做同样的事：团队构建一次后反复借出，借出前已经重置，
+不会继承上一个请求的对话记录；每次运行记录构建耗时和残留的历史消息数。
+
+用法:
+    pool = AgentPool({"analyst": make_analyst}, max_per_role=4)
+    async with pool.lease("analyst") as agent:
+        result = await agent.run(task=task)
+
+    teams = TeamPool(build_team, size=2)
+    async with teams.lease() as team:
+        result = await team.run(task=task)
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Mapping
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from autogen_learning.batch import _reset
+from autogen_learning.metrics import MetricsCollector
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RolePoolStats:
+    """单个角色的池统计"""
+
+    # 当前持有的副本数（借出的加空闲的）
+    replicas: int = 0
+    in_use: int = 0
+    hits: int = 0
+    misses: int = 0
+    waits: int = 0
+    wait_time: float = 0.0
+    evicted: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """复用已有副本的请求占比"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class _RolePool:
+    factory: Callable[[], Any]
+    # (副本, 放回时间)，右侧是最近放回的
+    idle: deque[tuple[Any, float]] = field(default_factory=deque)
+    stats: RolePoolStats = field(default_factory=RolePoolStats)
+    released: asyncio.Condition = field(default_factory=asyncio.Condition)
+
+
+class AgentPool:
+    """按角色克隆、复用和淘汰智能体副本的池
+
+    factories 为每个角色提供创建副本的工厂（也可以创建团队）；max_per_role
+    为每个角色的副本上限（整数表示所有角色相同）。
+    """
+
+    def __init__(
+        self,
+        factories: Mapping[str, Callable[[], Any]],
+        max_per_role: Mapping[str, int] | int = 4,
+        idle_ttl: float | None = 300.0,
+        metrics: MetricsCollector | None = None,
+    ):
+        self.limits = (
+            dict.fromkeys(factories, max_per_role)
+            if isinstance(max_per_role, int)
+            else {role: max_per_role.get(role, 1) for role in factories}
+        )
+        if any(limit < 1 for limit in self.limits.values()):
+            raise ValueError("每个角色至少允许一个副本")
+        self.idle_ttl = idle_ttl
+        self.metrics = metrics
+        self._roles = {role: _RolePool(factory) for role, factory in factories.items()}
+
+    def _role(self, role: str) -> _RolePool:
+        if role not in self._roles:
+            raise KeyError(f"未知角色: {role}")
+        return self._roles[role]
+
+    def _build(self, role: str, pool: _RolePool) -> Any:
+        started_at = time.monotonic()
+        agent = pool.factory()
+        pool.stats.replicas += 1
+        if self.metrics is not None:
+            self.metrics.timer(f"pool.build_time.{role}", time.monotonic() - started_at)
+        logger.debug(f"为 {role} 克隆副本，当前 {pool.stats.replicas} 个")
+        return agent
+
+    async def acquire(self, role: str) -> Any:
+        """取出一个空闲副本；没有空闲且未达上限时克隆，否则等待其他请求归还"""
+        pool = self._role(role)
+        await self.evict_idle(role)
+        queued_at = time.monotonic()
+        waited = False
+        async with pool.released:
+            while True:
+                if pool.idle:
+                    # 最近放回的副本最先复用，让较早的副本自然空闲到被淘汰
+                    agent, _ = pool.idle.pop()
+                    hit = True
+                    break
+                if pool.stats.replicas < self.limits[role]:
+                    agent = self._build(role, pool)
+                    hit = False
+                    break
+                waited = True
+                await pool.released.wait()
+            pool.stats.in_use += 1
+
+        wait_time = time.monotonic() - queued_at
+        if hit:
+            pool.stats.hits += 1
+        else:
+            pool.stats.misses += 1
+        if waited:
+            pool.stats.waits += 1
+            pool.stats.wait_time += wait_time
+        if self.metrics is not None:
+            self.metrics.counter(f"pool.{'hit' if hit else 'miss'}.{role}")
+            self.metrics.timer(f"pool.wait_time.{role}", wait_time)
+        return agent
+
+    async def release(self, role: str, agent: Any) -> None:
+        """重置副本并放回池中"""
+        pool = self._role(role)
+        try:
+            await _reset(agent)
+        except Exception as e:
+            # 无法重置的副本不再复用，下次按需重新克隆
+            logger.warning(f"重置 {role} 副本失败，已丢弃: {e}")
+            pool.stats.replicas -= 1
+            agent = None
+        async with pool.released:
+            pool.stats.in_use -= 1
+            if agent is not None:
+                pool.idle.append((agent, time.monotonic()))
+            pool.released.notify()
+
+    async def discard(self, role: str, agent: Any) -> None:
+        """丢弃借出的副本（例如运行被强制取消、状态可能不完整时）"""
+        pool = self._role(role)
+        async with pool.released:
+            pool.stats.in_use -= 1
+            pool.stats.replicas -= 1
+            pool.released.notify()
+        if hasattr(agent, "close"):
+            await agent.close()
+        logger.debug(f"丢弃 {role} 副本，当前 {pool.stats.replicas} 个")
+
+    @asynccontextmanager
+    async def lease(self, role: str) -> AsyncIterator[Any]:
+        """借出一个副本，退出时重置并归还；运行中抛出异常的副本被丢弃"""
+        agent = await self.acquire(role)
+        try:
+            yield agent
+        except BaseException:
+            await self.discard(role, agent)
+            raise
+        await self.release(role, agent)
+
+    async def evict_idle(self, role: str | None = None) -> int:
+        """淘汰空闲超过 idle_ttl 的副本，返回淘汰数量"""
+        if self.idle_ttl is None:
+            return 0
+        deadline = time.monotonic() - self.idle_ttl
+        evicted = 0
+        for name in [role] if role is not None else list(self._roles):
+            pool = self._role(name)
+            # 左侧是最早放回的副本
+            while pool.idle and pool.idle[0][1] < deadline:
+                agent, _ = pool.idle.popleft()
+                pool.stats.replicas -= 1
+                pool.stats.evicted += 1
+                evicted += 1
+                if hasattr(agent, "close"):
+                    await agent.close()
+                if self.metrics is not None:
+                    self.metrics.counter(f"pool.evicted.{name}")
+        return evicted
+
+    def stats(self) -> dict[str, Any]:
+        """各角色的副本数、命中率和等待时间"""
+        roles = {}
+        for name, pool in self._roles.items():
+            stats = pool.stats
+            roles[name] = {
+                "replicas": stats.replicas,
+                "in_use": stats.in_use,
+                "idle": len(pool.idle),
+                "hits": stats.hits,
+                "misses": stats.misses,
+                "hit_rate": round(stats.hit_rate, 3),
+                "waits": stats.waits,
+                "avg_wait": round(stats.wait_time / stats.waits, 3)
+                if stats.waits
+                else 0.0,
+                "evicted": stats.evicted,
+            }
+        hits = sum(p.stats.hits for p in self._roles.values())
+        total = hits + sum(p.stats.misses for p in self._roles.values())
+        return {
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            "roles": roles,
+        }
+
+    def report(self) -> str:
+        """各角色池状态的摘要"""
+        stats = self.stats()
+        lines = [f"🧰 智能体池: 命中率 {stats['hit_rate']:.0%}"]
+        for name, role in stats["roles"].items():
+            if not role["hits"] and not role["misses"]:
+                continue
+            lines.append(
+                f"   {name}: 副本 {role['replicas']}/{self.limits[name]}, "
+                f"复用 {role['hits']} 次, 克隆 {role['misses']} 次, "
+                f"等待 {role['waits']} 次 (平均 {role['avg_wait']:.2f}秒), "
+                f"淘汰 {role['evicted']}",
+            )
+        return "\n".join(lines)
+
+
+def _count_history(state: Any) -> int:
+    if isinstance(state, dict):
+        return sum(
+            len(value)
+            if key in ("message_thread", "messages") and isinstance(value, list)
+            else _count_history(value)
+            for key, value in state.items()
+        )
+    if isinstance(state, list):
+        return sum(_count_history(item) for item in state)
+    return 0
+
+
+async def history_size(runnable: Any) -> int:
+    """智能体或团队保存的对话消息数（团队包括管理器和所有成员的上下文）"""
+    return _count_history(await runnable.save_state())
+
+
+@dataclass
+class TeamRun:
+    """一次借出团队的记录"""
+
+    reused: bool
+    build_time: float
+    wait_time: float
+    # 借出时团队里残留的消息数，重置正确时为 0
+    leftover_messages: int
+
+
+class TeamPool:
+    """复用团队的池：借出前已重置，不必为每个请求重新构建
+
+    factory 每次调用返回一个新团队（连同它自己的成员智能体，成员不能在
+    团队之间共享）；最多同时存在 size 个团队。每次借出记录构建耗时和残留
+    的历史消息数。
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        size: int = 1,
+        name: str = "team",
+        metrics: MetricsCollector | None = None,
+    ):
+        self.factory = factory
+        self.size = size
+        self.name = name
+        self.metrics = metrics
+        self.runs: list[TeamRun] = []
+        self.prebuild_time = 0.0
+        self._build_times: dict[int, float] = {}
+        self._pool = AgentPool(
+            {name: self._build},
+            max_per_role=size,
+            idle_ttl=None,
+            metrics=metrics,
+        )
+
+    def _build(self) -> Any:
+        started_at = time.monotonic()
+        team = self.factory()
+        self._build_times[id(team)] = time.monotonic() - started_at
+        return team
+
+    async def prebuild(self) -> None:
+        """预先构建全部团队，请求不再承担构建耗时"""
+        teams = [await self._pool.acquire(self.name) for _ in range(self.size)]
+        for team in teams:
+            self.prebuild_time += self._build_times.pop(id(team), 0.0)
+            await self._pool.release(self.name, team)
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[Any]:
+        """借出一个干净的团队，退出时重置并归还；运行中抛出异常的团队被丢弃"""
+        started_at = time.monotonic()
+        team = await self._pool.acquire(self.name)
+        build_time = self._build_times.pop(id(team), None)
+        # 统计残留历史时 save_state 也可能出错，同样丢弃这个团队
+        try:
+            run = TeamRun(
+                reused=build_time is None,
+                build_time=build_time or 0.0,
+                wait_time=time.monotonic() - started_at - (build_time or 0.0),
+                leftover_messages=await history_size(team),
+            )
+            self.runs.append(run)
+            if self.metrics is not None:
+                self.metrics.timer(
+                    f"team_pool.build_time.{self.name}",
+                    run.build_time,
+                )
+                self.metrics.gauge(
+                    f"team_pool.leftover_messages.{self.name}",
+                    run.leftover_messages,
+                )
+            yield team
+        except BaseException:
+            await self._pool.discard(self.name, team)
+            raise
+        await self._pool.release(self.name, team)
+
+    def report(self) -> str:
+        """每次运行的构建耗时和残留历史"""
+        reused = sum(1 for run in self.runs if run.reused)
+        lines = [
+            (
+                f"🧰 团队池 {self.name}: {len(self.runs)} 次运行, 复用 {reused} 次, "
+                f"构建 {len(self.runs) - reused} 次"
+            ),
+        ]
+        if self.prebuild_time:
+            lines.append(f"   预构建: {self.prebuild_time * 1000:.1f}ms")
+        for i, run in enumerate(self.runs, 1):
+            source = "复用" if run.reused else f"构建 {run.build_time * 1000:.1f}ms"
+            lines.append(
+                f"   运行 {i}: {source}, 残留历史 {run.leftover_messages} 条",
+            )
+        return "\n".join(lines)
@@ -0,0 +1,237 @@
+"""
+全局异步限流
+
+令牌桶控制每分钟请求数，信号量控制并发数。同一端点的所有客户端共享
+一个限流器；收到 429 时按 Retry-After 暂停发放令牌并临时降低速率，
+之后随成功请求逐步恢复。令牌桶的状态跨事件循环共享，信号量和锁绑定
+事件循环，每个事件循环各一份。
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncGenerator, AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from typing import Any
+
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage
+
+from autogen_learning.clients import LoopLocal, ModelClientWrapper
+from autogen_learning.metrics import MetricsCollector
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRY_AFTER = 5.0
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """判断是否为服务端限流错误 (HTTP 429)"""
+    return getattr(error, "status_code", None) == 429
+
+
+def retry_after_seconds(error: BaseException) -> float | None:
+    """从错误响应的 Retry-After 头中解析等待秒数"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is not None:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+class AsyncRateLimiter:
+    """令牌桶 + 信号量的异步限流器"""
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        max_concurrent: int,
+        *,
+        name: str = "default",
+        metrics: MetricsCollector | None = None,
+        min_rate_fraction: float = 0.1,
+        recovery_step: float = 0.05,
+    ):
+        if requests_per_minute <= 0:
+            raise ValueError(f"requests_per_minute 必须大于 0: {requests_per_minute}")
+        if max_concurrent <= 0:
+            raise ValueError(f"max_concurrent 必须大于 0: {max_concurrent}")
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.base_rate = requests_per_minute / 60.0
+        self.rate = self.base_rate
+        self.capacity = float(max(1, min(requests_per_minute, max_concurrent)))
+        self.max_concurrent = max_concurrent
+        self.metrics = metrics
+        self.min_rate = self.base_rate * min_rate_fraction
+        self.recovery_step = self.base_rate * recovery_step
+
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.acquired = 0
+
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._semaphores = LoopLocal(lambda: asyncio.Semaphore(max_concurrent))
+        self._bucket_locks = LoopLocal(asyncio.Lock)
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    async def _take_token(self) -> None:
+        # 持锁等待保证先到先得
+        async with self._bucket_locks.get():
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                await asyncio.sleep(wait)
+
+    def _gauge(self, name: str, value: float) -> None:
+        if self.metrics is not None:
+            self.metrics.gauge(name, value, limiter=self.name)
+
+    async def acquire(self) -> None:
+        """等待并发槽位和令牌"""
+        start = time.monotonic()
+        self.queue_depth += 1
+        self._gauge("ratelimit.queue_depth", self.queue_depth)
+        try:
+            await self._semaphores.get().acquire()
+            try:
+                await self._take_token()
+            except BaseException:
+                self._semaphores.get().release()
+                raise
+        finally:
+            self.queue_depth -= 1
+            self._gauge("ratelimit.queue_depth", self.queue_depth)
+
+        waited = time.monotonic() - start
+        self.acquired += 1
+        self.total_wait += waited
+        self.in_flight += 1
+        if self.metrics is not None:
+            self.metrics.timer("ratelimit.wait_time", waited, limiter=self.name)
+
+    def release(self, error: BaseException | None = None) -> None:
+        """归还并发槽位，并根据结果调整速率"""
+        self.in_flight -= 1
+        self._semaphores.get().release()
+        if error is not None and is_rate_limit_error(error):
+            self.on_rate_limited(retry_after_seconds(error))
+        elif error is None and self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.recovery_step)
+            self._gauge("ratelimit.rate_per_minute", self.rate * 60)
+
+    def on_rate_limited(self, retry_after: float | None = None) -> None:
+        """收到 429：暂停发放令牌并把速率减半"""
+        self.throttled += 1
+        pause = retry_after if retry_after is not None else DEFAULT_RETRY_AFTER
+        self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._tokens = min(self._tokens, 0.0)
+        if self.metrics is not None:
+            self.metrics.counter("ratelimit.throttled", limiter=self.name)
+        self._gauge("ratelimit.rate_per_minute", self.rate * 60)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """在限流槽位内执行一次请求"""
+        await self.acquire()
+        try:
+            yield
+        except BaseException as e:
+            self.release(e)
+            raise
+        else:
+            self.release()
+
+    def stats(self) -> dict[str, Any]:
+        """获取限流统计"""
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "avg_wait": self.total_wait / self.acquired if self.acquired else 0.0,
+            "rate_per_minute": round(self.rate * 60, 2),
+        }
+
+
+_limiters: dict[str, AsyncRateLimiter] = {}
+
+
+def get_rate_limiter(
+    name: str,
+    requests_per_minute: int,
+    max_concurrent: int,
+    metrics: MetricsCollector | None = None,
+) -> AsyncRateLimiter:
+    """获取进程级共享限流器（同名限流器只在首次调用时按参数创建）
+
+    同名限流器已按不同的参数创建时记录警告并沿用已有的限流器。
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        limiter = _limiters[name] = AsyncRateLimiter(
+            requests_per_minute,
+            max_concurrent,
+            name=name,
+            metrics=metrics,
+        )
+    elif (limiter.requests_per_minute, limiter.max_concurrent) != (
+        requests_per_minute,
+        max_concurrent,
+    ):
+        logger.warning(
+            f"限流器 {name} 已按 {limiter.requests_per_minute} 次/分钟、"
+            f"并发 {limiter.max_concurrent} 创建，忽略新参数 "
+            f"{requests_per_minute} 次/分钟、并发 {max_concurrent}",
+        )
+    return limiter
+
+
+class RateLimitedModelClient(ModelClientWrapper):
+    """所有请求都经过限流器的模型客户端"""
+
+    def __init__(self, inner: ChatCompletionClient, limiter: AsyncRateLimiter):
+        super().__init__(inner)
+        self.limiter = limiter
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        **kwargs: Any,
+    ) -> CreateResult:
+        async with self.limiter.slot():
+            return await super().create(messages, **kwargs)
+
+    async def create_stream(  # type: ignore[override]
+        self,
+        messages: Sequence[LLMMessage],
+        **kwargs: Any,
+    ) -> AsyncGenerator[str | CreateResult, None]:
+        # 流式请求在整个流期间占用并发槽位
+        async with self.limiter.slot():
+            async for chunk in super().create_stream(messages, **kwargs):
+                yield chunk
@@ -0,0 +1,243 @@
+"""
+超时、重试与对冲请求
+
+每次尝试都有独立的截止时间，可重试的错误按带抖动的指数退避重试。
+配置备用客户端后启用对冲：主请求超过其观测到的 p95 延迟仍未返回时，
+向备用端点发出相同请求，取先完成的结果并取消另一个。
+"""
+
+import asyncio
+import random
+import sys
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, Sequence
+from typing import Any
+
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage
+
+from autogen_learning.clients import ModelClientWrapper
+from autogen_learning.metrics import MetricsCollector
+from autogen_learning.ratelimit import retry_after_seconds
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+# 退避抖动只用于错开各客户端的重试时间
+_jitter = random.SystemRandom()
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """判断错误是否值得重试（超时、连接错误、限流和服务端错误）"""
+    if isinstance(error, TimeoutError):
+        return True
+    # 未导入 openai 时不可能出现它的异常，不必为此加载 SDK
+    openai = sys.modules.get("openai")
+    if openai is not None and isinstance(error, openai.APIConnectionError):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+class LatencyTracker:
+    """滑动窗口内的请求延迟分位数"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def observe(self, latency: float) -> None:
+        """记录一次成功请求的延迟"""
+        self._samples.append(latency)
+
+    def percentile(self, q: float) -> float | None:
+        """返回第 q 分位延迟（0 < q < 1），样本不足时返回 None"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class ResilientModelClient(ModelClientWrapper):
+    """带超时、重试和对冲的模型客户端"""
+
+    def __init__(
+        self,
+        inner: ChatCompletionClient,
+        *,
+        timeout: float,
+        retry_count: int,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        hedge: ChatCompletionClient | None = None,
+        hedge_percentile: float = 0.95,
+        tracker: LatencyTracker | None = None,
+        metrics: MetricsCollector | None = None,
+    ):
+        super().__init__(inner)
+        self.timeout = timeout
+        self.retry_count = retry_count
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.tracker = tracker or LatencyTracker()
+        self.metrics = metrics
+
+    def _count(self, name: str) -> None:
+        if self.metrics is not None:
+            self.metrics.counter(name)
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        """全抖动指数退避；服务端给出 Retry-After 时以其为下限"""
+        ceiling = min(self.backoff_max, self.backoff_base * 2**attempt)
+        delay = _jitter.uniform(0, ceiling)
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def _call(
+        self,
+        client: ChatCompletionClient,
+        messages: Sequence[LLMMessage],
+        kwargs: dict[str, Any],
+    ) -> CreateResult:
+        return await client.create(messages, **kwargs)
+
+    def _hedge_delay(self) -> float | None:
+        """发出对冲请求前等待的秒数；未配置备用端点或样本不足时为 None"""
+        if self.hedge is None:
+            return None
+        hedge_after = self.tracker.percentile(self.hedge_percentile)
+        if hedge_after is None or hedge_after >= self.timeout:
+            return None
+        return hedge_after
+
+    async def _maybe_hedge(
+        self,
+        pending: set[asyncio.Future[CreateResult]],
+        messages: Sequence[LLMMessage],
+        kwargs: dict[str, Any],
+    ) -> None:
+        """主请求超过 p95 仍未完成时，把对冲请求加入 pending"""
+        hedge_after = self._hedge_delay()
+        if hedge_after is None or self.hedge is None:
+            return
+        done, _ = await asyncio.wait(pending, timeout=hedge_after)
+        if not done:
+            self._count("resilience.hedges")
+            pending.add(asyncio.ensure_future(self._call(self.hedge, messages, kwargs)))
+
+    def _finish(
+        self,
+        task: asyncio.Future[CreateResult],
+        primary: asyncio.Future[CreateResult],
+        start: float,
+    ) -> CreateResult:
+        """记录胜出请求的延迟并返回它的结果"""
+        latency = time.monotonic() - start
+        if task is primary:
+            self.tracker.observe(latency)
+        else:
+            self._count("resilience.hedge_wins")
+        if self.metrics is not None:
+            self.metrics.timer("resilience.latency", latency)
+        return task.result()
+
+    async def _first_result(
+        self,
+        pending: set[asyncio.Future[CreateResult]],
+        primary: asyncio.Future[CreateResult],
+        start: float,
+    ) -> CreateResult:
+        """等待第一个成功的请求；全部失败时抛出最后一个错误，到截止时间抛出超时"""
+        error: BaseException | None = None
+        while pending:
+            remaining = self.timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=remaining,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            # 原地更新，调用方据此取消仍在进行的请求
+            pending.difference_update(done)
+            for task in done:
+                if task.exception() is None:
+                    return self._finish(task, primary, start)
+                error = task.exception()
+
+        if error is not None and not pending:
+            raise error
+        raise TimeoutError(f"模型请求超过 {self.timeout} 秒未完成")
+
+    async def _attempt(
+        self,
+        messages: Sequence[LLMMessage],
+        kwargs: dict[str, Any],
+    ) -> CreateResult:
+        """单次尝试：主请求超过 p95 仍未完成时向备用端点发出对冲请求"""
+        start = time.monotonic()
+        primary = asyncio.ensure_future(self._call(self.inner, messages, kwargs))
+        pending = {primary}
+        try:
+            await self._maybe_hedge(pending, messages, kwargs)
+            return await self._first_result(pending, primary, start)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        cancellation_token: CancellationToken | None = None,
+        **kwargs: Any,
+    ) -> CreateResult:
+        attempt = 0
+        while True:
+            call = asyncio.ensure_future(self._attempt(messages, kwargs))
+            if cancellation_token is not None:
+                cancellation_token.link_future(call)
+            try:
+                return await call
+            except Exception as e:
+                if isinstance(e, TimeoutError):
+                    self._count("resilience.timeouts")
+                if attempt >= self.retry_count or not is_retryable_error(e):
+                    raise
+                self._count("resilience.retries")
+                await asyncio.sleep(self._backoff(attempt, e))
+                attempt += 1
+
+    async def create_stream(  # type: ignore[override]
+        self,
+        messages: Sequence[LLMMessage],
+        **kwargs: Any,
+    ) -> AsyncGenerator[str | CreateResult, None]:
+        # 流式请求只在收到首个块之前重试，截止时间作用于首块延迟
+        attempt = 0
+        while True:
+            stream = super().create_stream(messages, **kwargs)
+            try:
+                first = await asyncio.wait_for(anext(stream), self.timeout)
+            except Exception as e:
+                await stream.aclose()
+                if isinstance(e, TimeoutError):
+                    self._count("resilience.timeouts")
+                if attempt >= self.retry_count or not is_retryable_error(e):
+                    raise
+                self._count("resilience.retries")
+                await asyncio.sleep(self._backoff(attempt, e))
+                attempt += 1
+                continue
+            break
+
+        yield first
+        async for chunk in stream:
+            yield chunk
@@ -0,0 +1,233 @@
+"""
+按延迟路由
+
+为每个端点维护延迟和错误率的指数加权移动平均 (EWMA)，每次请求选择
+允许范围内预计最快的健康端点。错误率超过阈值的端点在冷却期内不再接收
+流量，冷却结束后放行探测请求；少量请求随机分给其他健康端点，使变快的
+端点能被重新发现。可重试的错误会切换到下一个候选端点，流式请求在收到
+首个块之前同样切换。
+"""
+
+import random
+import time
+from collections.abc import AsyncGenerator, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage
+
+from autogen_learning.clients import ModelClientWrapper, client_identity
+from autogen_learning.metrics import MetricsCollector
+from autogen_learning.resilience import is_retryable_error
+
+
+@dataclass
+class EndpointHealth:
+    """端点健康状态"""
+
+    name: str
+    client: ChatCompletionClient
+    latency: float | None = None
+    error_rate: float = 0.0
+    in_flight: int = 0
+    requests: int = 0
+    failures: int = 0
+    unhealthy_since: float | None = None
+
+    def expected_latency(self) -> float:
+        """预计延迟：EWMA 延迟乘以排队中的请求数，未测量过的端点优先探测"""
+        if self.latency is None:
+            return 0.0
+        return self.latency * (1 + self.in_flight)
+
+    def to_dict(self) -> dict[str, Any]:
+        """转换为字典"""
+        return {
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "healthy": self.unhealthy_since is None,
+        }
+
+
+class LatencyRouter:
+    """EWMA 延迟路由器"""
+
+    def __init__(
+        self,
+        alpha: float = 0.2,
+        error_threshold: float = 0.5,
+        cooldown: float = 30.0,
+        explore_ratio: float = 0.05,
+        metrics: MetricsCollector | None = None,
+    ):
+        self.alpha = alpha
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.explore_ratio = explore_ratio
+        self.metrics = metrics
+        self.endpoints: dict[str, EndpointHealth] = {}
+
+    def register(self, name: str, client: ChatCompletionClient) -> None:
+        """注册端点（重复注册时保留已有统计）"""
+        if name not in self.endpoints:
+            self.endpoints[name] = EndpointHealth(name=name, client=client)
+
+    def _available(self, endpoint: EndpointHealth, now: float) -> bool:
+        if endpoint.unhealthy_since is None:
+            return True
+        # 冷却期结束后每次只放行一个探测请求
+        cooled_down = now - endpoint.unhealthy_since >= self.cooldown
+        return cooled_down and not endpoint.in_flight
+
+    def candidates(self, allowed: Sequence[str] | None = None) -> list[EndpointHealth]:
+        """按预计延迟排序的候选端点，健康端点在前"""
+        names = allowed if allowed is not None else list(self.endpoints)
+        endpoints = [self.endpoints[name] for name in names if name in self.endpoints]
+        if not endpoints:
+            raise ValueError(f"没有可用的路由端点: {list(names)}")
+
+        now = time.monotonic()
+        ranked = sorted(
+            endpoints,
+            key=lambda e: (
+                not self._available(e, now),
+                e.expected_latency(),
+                e.error_rate,
+            ),
+        )
+        healthy = [e for e in ranked[1:] if self._available(e, now)]
+        if healthy and random.random() < self.explore_ratio:  # noqa: S311
+            probe = random.choice(healthy)  # noqa: S311
+            ranked.remove(probe)
+            ranked.insert(0, probe)
+        return ranked
+
+    def start(self, endpoint: EndpointHealth) -> float:
+        """记录请求开始"""
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        if self.metrics is not None:
+            self.metrics.counter(f"router.routed.{endpoint.name}")
+        return time.monotonic()
+
+    def finish(
+        self,
+        endpoint: EndpointHealth,
+        started_at: float,
+        error: BaseException | None = None,
+    ) -> None:
+        """记录请求结果并更新 EWMA"""
+        endpoint.in_flight -= 1
+        failed = 1.0 if error is not None else 0.0
+        endpoint.error_rate += self.alpha * (failed - endpoint.error_rate)
+
+        if error is None:
+            latency = time.monotonic() - started_at
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += self.alpha * (latency - endpoint.latency)
+            if endpoint.error_rate < self.error_threshold:
+                endpoint.unhealthy_since = None
+        else:
+            endpoint.failures += 1
+            if endpoint.error_rate >= self.error_threshold:
+                endpoint.unhealthy_since = time.monotonic()
+
+        if self.metrics is not None:
+            if endpoint.latency is not None:
+                self.metrics.gauge(
+                    f"router.latency_ewma.{endpoint.name}",
+                    endpoint.latency,
+                )
+            self.metrics.gauge(
+                f"router.error_rate.{endpoint.name}",
+                endpoint.error_rate,
+            )
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """获取各端点统计"""
+        return {name: e.to_dict() for name, e in self.endpoints.items()}
+
+
+class RoutedModelClient(ModelClientWrapper):
+    """每次请求由路由器选择端点的模型客户端"""
+
+    def __init__(self, router: LatencyRouter, allowed: Sequence[str] | None = None):
+        self.router = router
+        self.allowed = list(allowed) if allowed is not None else None
+        # 模型信息和用量统计取自首选端点
+        super().__init__(router.candidates(self.allowed)[0].client)
+
+    def request_identity(self) -> dict[str, Any]:
+        # 请求可能由任一候选端点回答，键中包含每个端点的模型和生成参数
+        endpoints = self.router.candidates(self.allowed)
+        return {
+            "routes": {
+                e.name: client_identity(e.client)
+                for e in sorted(endpoints, key=lambda e: e.name)
+            },
+        }
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        **kwargs: Any,
+    ) -> CreateResult:
+        last_error: Exception | None = None
+        for endpoint in self.router.candidates(self.allowed):
+            started_at = self.router.start(endpoint)
+            try:
+                result = await endpoint.client.create(messages, **kwargs)
+            except Exception as e:
+                self.router.finish(endpoint, started_at, e)
+                # 可重试的错误切换到下一个候选端点
+                if not is_retryable_error(e):
+                    raise
+                last_error = e
+                continue
+            except BaseException:
+                # 被取消的请求不计入健康统计，但要释放在途计数
+                endpoint.in_flight -= 1
+                raise
+            self.router.finish(endpoint, started_at)
+            return result
+        # 所有候选端点都失败，抛出最后一个错误
+        raise last_error  # type: ignore[misc]
+
+    async def create_stream(  # type: ignore[override]
+        self,
+        messages: Sequence[LLMMessage],
+        **kwargs: Any,
+    ) -> AsyncGenerator[str | CreateResult, None]:
+        # 收到首个块之前的可重试错误切换到下一个候选端点，之后的错误直接
+        # 抛出（已输出的块无法撤回）；EWMA 按首块延迟更新
+        last_error: Exception | None = None
+        for endpoint in self.router.candidates(self.allowed):
+            started_at = self.router.start(endpoint)
+            stream = endpoint.client.create_stream(messages, **kwargs)
+            try:
+                first = await anext(stream)
+            except StopAsyncIteration:
+                self.router.finish(endpoint, started_at)
+                return
+            except Exception as e:
+                self.router.finish(endpoint, started_at, e)
+                await stream.aclose()
+                if not is_retryable_error(e):
+                    raise
+                last_error = e
+                continue
+            except BaseException:
+                endpoint.in_flight -= 1
+                raise
+            self.router.finish(endpoint, started_at)
+            yield first
+            async for chunk in stream:
+                yield chunk
+            return
+        # 所有候选端点都失败，抛出最后一个错误
+        raise last_error  # type: ignore[misc]
@@ -0,0 +1,209 @@
+"""
+基于规则的发言者选择
+
+SelectorGroupChat 每一轮都会额外调用一次模型来选择下一位发言者。很多流程
+其实是固定的（验证 -> 转换 -> 加载，初审 -> 专业审批 -> 最终批准），
+或者由组长点名专家发言。RuleBasedSelector 依次用声明的阶段转移、消息中
+点到的名字和关键词缩小候选范围，只剩一位候选者时直接返回；规则有歧义时
+交给 fallback 选择器（例如 ExpertiseRouter），仍无法确定则返回 None，由
+SelectorGroupChat 回退到模型选择。
+
+作为 SelectorGroupChat 的 selector_func 使用:
+    selector = RuleBasedSelector(
+        names,
+        transitions={"DataValidator": ["DataTransformer"]},
+    )
+    team = SelectorGroupChat(agents, model_client, selector_func=selector)
+"""
+
+import abc
+import logging
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from autogen_agentchat.messages import BaseAgentEvent, BaseChatMessage
+
+from autogen_learning.metrics import MetricsCollector
+
+logger = logging.getLogger(__name__)
+
+
+def last_chat_message(
+    messages: Sequence[BaseAgentEvent | BaseChatMessage],
+) -> BaseChatMessage | None:
+    """最近一条对话消息（跳过工具调用等事件）"""
+    for message in reversed(messages):
+        if isinstance(message, BaseChatMessage):
+            return message
+    return None
+
+
+class SpeakerSelector(abc.ABC):
+    """发言者选择器基类
+
+    select 无法唯一确定发言者时依次交给 fallback 链，整条链都无法确定时
+    返回 None，由 SelectorGroupChat 调用模型选择。
+    """
+
+    label = "选择器"
+
+    def __init__(
+        self,
+        *,
+        fallback: "SpeakerSelector | None" = None,
+        metrics: MetricsCollector | None = None,
+    ):
+        self.fallback = fallback
+        self.metrics = metrics
+        self.selections = 0
+        self.misses = 0
+
+    @abc.abstractmethod
+    def select(
+        self,
+        messages: Sequence[BaseAgentEvent | BaseChatMessage],
+    ) -> str | None:
+        """返回下一位发言者；无法唯一确定时返回 None"""
+
+    def __call__(
+        self,
+        messages: Sequence[BaseAgentEvent | BaseChatMessage],
+    ) -> str | None:
+        speaker = self.select(messages)
+        if speaker is not None:
+            self.selections += 1
+            return speaker
+        self.misses += 1
+        if self.fallback is not None:
+            return self.fallback(messages)
+        if self.metrics is not None:
+            self.metrics.counter("selector.llm_fallbacks")
+        return None
+
+    def chain(self) -> list["SpeakerSelector"]:
+        """自身及 fallback 链上的所有选择器"""
+        selectors: list[SpeakerSelector] = [self]
+        while selectors[-1].fallback is not None:
+            selectors.append(selectors[-1].fallback)
+        return selectors
+
+    def stats(self) -> dict[str, Any]:
+        """各选择器的命中次数和回退到模型选择的次数"""
+        chain = self.chain()
+        calls = self.selections + self.misses
+        llm_fallbacks = chain[-1].misses
+        return {
+            "calls": calls,
+            "selections": {s.label: s.selections for s in chain},
+            "llm_fallbacks": llm_fallbacks,
+            "avoided_llm_calls": calls - llm_fallbacks,
+            "avoided_ratio": round((calls - llm_fallbacks) / calls, 3)
+            if calls
+            else 0.0,
+        }
+
+    def report(self) -> str:
+        """各选择器与模型选择次数的一行摘要"""
+        stats = self.stats()
+        hits = ", ".join(
+            f"{label} {count} 次" for label, count in stats["selections"].items()
+        )
+        return (
+            f"🧭 发言者选择: {hits}, 模型 {stats['llm_fallbacks']} 次 "
+            f"(省去 {stats['avoided_ratio']:.0%} 的选择调用)"
+        )
+
+
+class RuleBasedSelector(SpeakerSelector):
+    """用阶段转移、点名和关键词选择下一位发言者"""
+
+    label = "规则"
+
+    def __init__(
+        self,
+        participants: Sequence[str],
+        *,
+        transitions: Mapping[str, Sequence[str]] | None = None,
+        keywords: Mapping[str, Sequence[str]] | None = None,
+        start: str | None = None,
+        allow_repeated_speaker: bool = False,
+        fallback: SpeakerSelector | None = None,
+        metrics: MetricsCollector | None = None,
+    ):
+        super().__init__(fallback=fallback, metrics=metrics)
+        self.participants = list(participants)
+        self.transitions = {k: list(v) for k, v in (transitions or {}).items()}
+        self.keywords = {k: list(v) for k, v in (keywords or {}).items()}
+        self.start = start
+        self.allow_repeated_speaker = allow_repeated_speaker
+
+        declared = {*self.transitions, *self.keywords}
+        declared.update(n for names in self.transitions.values() for n in names)
+        if start is not None:
+            declared.add(start)
+        unknown = declared - set(self.participants)
+        if unknown:
+            raise ValueError(f"规则中的发言者不在团队中: {sorted(unknown)}")
+
+    @classmethod
+    def hub(
+        cls,
+        lead: str,
+        keywords: Mapping[str, Sequence[str]],
+        *,
+        fallback: SpeakerSelector | None = None,
+        metrics: MetricsCollector | None = None,
+    ) -> "RuleBasedSelector":
+        """组长加专家的团队：组长先发言，专家发言后交回组长，组长按点名和关键词分派"""
+        specialists = list(keywords)
+        return cls(
+            participants=[lead, *specialists],
+            transitions={
+                lead: specialists,
+                **{name: [lead] for name in specialists},
+            },
+            keywords=keywords,
+            start=lead,
+            fallback=fallback,
+            metrics=metrics,
+        )
+
+    def _matched(self, speaker: str | None, rule: str) -> str | None:
+        if speaker is not None:
+            if self.metrics is not None:
+                self.metrics.counter(f"selector.rule.{rule}")
+            logger.debug(f"规则选择发言者 {speaker} ({rule})")
+        return speaker
+
+    def select(
+        self,
+        messages: Sequence[BaseAgentEvent | BaseChatMessage],
+    ) -> str | None:
+        last = last_chat_message(messages)
+        speaker = last.source if last is not None else None
+        if last is None or speaker not in self.participants:
+            # 只有任务消息：由声明的起始发言者开场
+            return self._matched(self.start, "start")
+
+        candidates = [
+            name
+            for name in self.transitions.get(speaker, self.participants)
+            if self.allow_repeated_speaker or name != speaker
+        ]
+        text = last.to_text()
+        rule = "transition"
+        # 点名比关键词更明确，先按点名缩小范围
+        checks = (
+            ("mention", lambda name: name in text),
+            (
+                "keyword",
+                lambda name: any(w in text for w in self.keywords.get(name, ())),
+            ),
+        )
+        for signal, matches in checks:
+            if len(candidates) <= 1:
+                break
+            narrowed = [name for name in candidates if matches(name)]
+            if narrowed:
+                candidates, rule = narrowed, signal
+        return self._matched(candidates[0] if len(candidates) == 1 else None, rule)
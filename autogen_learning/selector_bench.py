@@ -0,0 +1,194 @@
+"""
+发言者选择基准
+
+在脚本化的对话记录上比较 ExpertiseRouter 与模型选择（与 SelectorGroupChat
+默认提示词相同的一次补全调用）的准确率和每次选择的耗时。模型端点取自
+OPENAI_API_BASE，离线时可以指向 mock_server。
+
+用法:
+    python -m autogen_learning.selector_bench --no-llm
+    python -m autogen_learning.selector_bench --rounds 2000
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+
+from autogen_core.models import ChatCompletionClient, UserMessage
+
+from autogen_learning.clients import create_model_client
+from autogen_learning.expertise import ExpertiseRouter
+
+# 与 02_selector_group_chat.py 复杂项目团队的专家一致
+ROLES = {
+    "Architect": """你是系统架构师。
+        专长：
+        - 系统架构设计
+        - 技术选型建议
+        - 可扩展性规划
+        - 性能优化策略
+
+        只在被询问架构相关问题时发言。""",
+    "ProductManager": """你是产品经理。
+        专长：
+        - 产品需求分析
+        - 用户体验设计
+        - 功能优先级排序
+        - 市场需求洞察
+
+        只在被询问产品相关问题时发言。""",
+    "SecurityExpert": """你是安全专家。
+        专长：
+        - 安全风险评估
+        - 安全架构设计
+        - 合规性检查
+        - 安全最佳实践
+
+        只在被询问安全相关问题时发言。""",
+}
+
+# 组长的每句发言及应当接话的专家
+TRANSCRIPT = [
+    ("平台需要支撑千万级客户数据，请先给出整体系统架构和技术选型。", "Architect"),
+    ("核心用户是销售和客服，他们最关心哪些功能？请排一下优先级。", "ProductManager"),
+    ("客户数据涉及个人隐私，需要评估合规风险和数据加密方案。", "SecurityExpert"),
+    ("高峰期查询延迟偏高，有什么性能优化策略？", "Architect"),
+    ("用户反馈导入流程太繁琐，用户体验上怎么改进？", "ProductManager"),
+    ("第三方系统接入时如何做权限控制，防止越权访问？", "SecurityExpert"),
+    ("后续要扩展到多个区域部署，可扩展性怎么规划？", "Architect"),
+    ("竞品已经上线了客户画像功能，市场需求有多大？", "ProductManager"),
+    ("上线前需要做一次安全风险评估和渗透测试。", "SecurityExpert"),
+    ("数据同步用消息队列还是批处理？请比较两种技术方案。", "Architect"),
+]
+
+SELECTOR_PROMPT = """You are in a role play game. The following roles are available:
+{roles}.
+Read the following conversation. Then select the next role from {participants} to \
+play. Only return the role.
+
+{history}
+
+Read the above conversation. Then select the next role from {participants} to play. \
+Only return the role.
+"""
+
+
+@dataclass
+class BenchResult:
+    """一种选择方式的基准结果"""
+
+    method: str
+    correct: int
+    total: int
+    avg_ms: float
+    abstained: int | None = None
+
+    @property
+    def accuracy(self) -> float:
+        """选中预期发言者的比例"""
+        return self.correct / self.total if self.total else 0.0
+
+
+def bench_router(router: ExpertiseRouter, rounds: int) -> BenchResult:
+    """对话记录重复 rounds 遍，统计每次选择的平均耗时"""
+    picks = [router.match(text) for text, _ in TRANSCRIPT]
+    correct = sum(
+        pick == expected for pick, (_, expected) in zip(picks, TRANSCRIPT, strict=True)
+    )
+
+    started_at = time.perf_counter()
+    for _ in range(rounds):
+        for text, _ in TRANSCRIPT:
+            router.match(text)
+    elapsed = time.perf_counter() - started_at
+    return BenchResult(
+        method="ExpertiseRouter",
+        correct=correct,
+        total=len(TRANSCRIPT),
+        avg_ms=elapsed / (rounds * len(TRANSCRIPT)) * 1000,
+        # 无法确定时交给模型选择
+        abstained=picks.count(None),
+    )
+
+
+async def bench_llm(client: ChatCompletionClient) -> BenchResult:
+    """每条发言用一次模型调用选择下一位发言者"""
+    roles = "\n".join(f"{name}: {desc.splitlines()[0]}" for name, desc in ROLES.items())
+    participants = str(list(ROLES))
+    correct = 0
+    elapsed = 0.0
+    for text, expected in TRANSCRIPT:
+        prompt = SELECTOR_PROMPT.format(
+            roles=roles,
+            participants=participants,
+            history=f"ProjectLead: {text}",
+        )
+        started_at = time.perf_counter()
+        result = await client.create([UserMessage(content=prompt, source="user")])
+        elapsed += time.perf_counter() - started_at
+        content = result.content if isinstance(result.content, str) else ""
+        picked = next((name for name in ROLES if name in content), None)
+        correct += picked == expected
+    return BenchResult(
+        method="LLM selector",
+        correct=correct,
+        total=len(TRANSCRIPT),
+        avg_ms=elapsed / len(TRANSCRIPT) * 1000,
+    )
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="比较专长匹配与模型选择发言者")
+    parser.add_argument("--rounds", type=int, default=1000, help="路由器重复次数")
+    parser.add_argument("--no-llm", action="store_true", help="跳过模型选择")
+    return parser.parse_args()
+
+
+async def _main() -> None:
+    args = _parse_args()
+    started_at = time.perf_counter()
+    router = ExpertiseRouter(ROLES)
+    build_ms = (time.perf_counter() - started_at) * 1000
+
+    results = [bench_router(router, args.rounds)]
+
+    # 参与者变化只编码新成员的描述
+    started_at = time.perf_counter()
+    router.add("DataEngineer", "你是数据工程师。专长：数据管道、ETL、数据仓库建模。")
+    router.match(TRANSCRIPT[0][0])
+    router.remove("DataEngineer")
+    update_ms = (time.perf_counter() - started_at) * 1000
+
+    if args.no_llm or not os.getenv("OPENAI_API_KEY"):
+        print("💡 跳过模型选择（--no-llm 或未设置 OPENAI_API_KEY）")
+    else:
+        client = create_model_client(temperature=0.0)
+        try:
+            results.append(await bench_llm(client))
+        finally:
+            await client.close()
+
+    print(f"🧭 发言者选择基准 ({len(TRANSCRIPT)} 条发言, 索引构建 {build_ms:.2f}ms)")
+    for result in results:
+        abstained = (
+            f", 交给模型 {result.abstained}" if result.abstained is not None else ""
+        )
+        print(
+            f"   {result.method}: 准确率 {result.accuracy:.0%} "
+            f"({result.correct}/{result.total}{abstained}), "
+            f"每次 {result.avg_ms:.4f}ms",
+        )
+    print(f"   增量更新参与者: {update_ms:.3f}ms")
+    if len(results) == 2:
+        print(f"   加速: {results[1].avg_ms / results[0].avg_ms:,.0f}x")
+
+
+def main() -> None:
+    """命令行入口"""
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+在途请求合并（single-flight）
+
+并发发出的完全相同的补全请求只向上游发送一次：非流式调用共享同一个结果，
+流式调用把同一份 token 流分发给所有等待者。
+"""
+
+import asyncio
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Mapping,
+    Sequence,
+)
+from dataclasses import dataclass, field
+from typing import Any
+
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage
+from autogen_core.tools import Tool, ToolSchema
+
+from autogen_learning.cache import request_fingerprint
+from autogen_learning.clients import ModelClientWrapper
+from autogen_learning.metrics import MetricsCollector
+
+
+def _new_future() -> asyncio.Future[None]:
+    return asyncio.get_running_loop().create_future()
+
+
+@dataclass
+class _Flight:
+    """一次在途的非流式请求"""
+
+    task: asyncio.Task[CreateResult]
+    # 传给上游调用的令牌，所有等待者都取消时取消
+    token: CancellationToken
+    waiters: int = 0
+
+
+@dataclass
+class _StreamFlight:
+    """一次在途的流式请求，缓存已收到的块供后加入的等待者回放"""
+
+    chunks: list[str | CreateResult] = field(default_factory=list)
+    done: bool = False
+    error: BaseException | None = None
+    # 每次收到新块或结束时完成并换成新的 future，等待者据此醒来
+    changed: asyncio.Future[None] = field(default_factory=_new_future)
+    token: CancellationToken = field(default_factory=CancellationToken)
+    task: asyncio.Task[None] | None = None
+    waiters: int = 0
+
+    def notify(self) -> None:
+        """唤醒所有等待者"""
+        self.changed.set_result(None)
+        self.changed = _new_future()
+
+
+def _cancel_future(
+    cancellation_token: CancellationToken | None,
+) -> asyncio.Future[None]:
+    """等待者自己的取消信号：令牌取消时这个 future 被取消"""
+    future = _new_future()
+    if cancellation_token is not None:
+        cancellation_token.link_future(future)
+    return future
+
+
+class SingleFlightGroup:
+    """进程内共享的在途请求表
+
+    上游调用使用请求自己的取消令牌，而不是第一个调用方的令牌：某个等待者
+    取消只让它自己退出，所有等待者都取消后才取消上游请求。
+    """
+
+    def __init__(self, metrics: MetricsCollector | None = None):
+        self.metrics = metrics
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self._flights: dict[str, _Flight] = {}
+        self._streams: dict[str, _StreamFlight] = {}
+
+    def _record(self, coalesced: bool) -> None:
+        if coalesced:
+            self.coalesced += 1
+        else:
+            self.upstream_calls += 1
+        if self.metrics is not None:
+            name = "singleflight.coalesced" if coalesced else "singleflight.upstream"
+            self.metrics.counter(name)
+
+    @staticmethod
+    def _forget(flights: dict[str, Any], key: str, flight: Any) -> None:
+        # 同一个 key 可能已经换成了新发起的请求
+        if flights.get(key) is flight:
+            del flights[key]
+
+    async def do(
+        self,
+        key: str,
+        call: Callable[[CancellationToken], Awaitable[CreateResult]],
+        cancellation_token: CancellationToken | None = None,
+    ) -> CreateResult:
+        """执行 call(token)；若相同 key 的请求已在途则等待它的结果"""
+        flight = self._flights.get(key)
+        if flight is None:
+            token = CancellationToken()
+            flight = _Flight(task=asyncio.ensure_future(call(token)), token=token)
+            self._flights[key] = flight
+            flight.task.add_done_callback(
+                lambda _: self._forget(self._flights, key, flight),
+            )
+            self._record(coalesced=False)
+        else:
+            self._record(coalesced=True)
+
+        flight.waiters += 1
+        waiter = asyncio.ensure_future(asyncio.shield(flight.task))
+        if cancellation_token is not None:
+            cancellation_token.link_future(waiter)
+        try:
+            return await waiter
+        finally:
+            flight.waiters -= 1
+            # 所有等待者都已取消时，取消上游请求
+            if flight.waiters == 0 and not flight.task.done():
+                self._forget(self._flights, key, flight)
+                flight.token.cancel()
+                flight.task.cancel()
+
+    async def do_stream(
+        self,
+        key: str,
+        stream: Callable[[CancellationToken], AsyncIterator[str | CreateResult]],
+        cancellation_token: CancellationToken | None = None,
+    ) -> AsyncGenerator[str | CreateResult, None]:
+        """执行 stream(token)；若相同 key 的流已在途则从头回放并跟随它
+
+        cancellation_token 取消时本等待者抛出 CancelledError。
+        """
+        cancelled = _cancel_future(cancellation_token)
+        if cancelled.cancelled():
+            raise asyncio.CancelledError
+
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _StreamFlight()
+            self._streams[key] = flight
+            flight.task = asyncio.ensure_future(self._pump(key, flight, stream))
+            self._record(coalesced=False)
+        else:
+            self._record(coalesced=True)
+
+        flight.waiters += 1
+        position = 0
+        try:
+            while True:
+                if cancelled.cancelled():
+                    raise asyncio.CancelledError
+                if position < len(flight.chunks):
+                    position += 1
+                    yield flight.chunks[position - 1]
+                    continue
+                if flight.done:
+                    break
+                # asyncio.wait 不会取消传入的 future，共享的 changed 不受影响
+                await asyncio.wait(
+                    (flight.changed, cancelled),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and flight.task and not flight.task.done():
+                # 之后的相同请求重新发起，不加入正在取消的流
+                self._forget(self._streams, key, flight)
+                flight.token.cancel()
+                flight.task.cancel()
+
+    async def _pump(
+        self,
+        key: str,
+        flight: _StreamFlight,
+        stream: Callable[[CancellationToken], AsyncIterator[str | CreateResult]],
+    ) -> None:
+        """消费上游流并通知所有等待者"""
+        try:
+            async for chunk in stream(flight.token):
+                flight.chunks.append(chunk)
+                flight.notify()
+        except asyncio.CancelledError as e:
+            # 仍在等待的调用方收到取消，而不是一个没有最终结果的流
+            flight.error = e
+            raise
+        except Exception as e:
+            # 上游错误转交给所有等待者
+            flight.error = e
+        finally:
+            self._forget(self._streams, key, flight)
+            flight.done = True
+            flight.notify()
+
+
+class SingleFlightModelClient(ModelClientWrapper):
+    """合并并发相同请求的模型客户端"""
+
+    def __init__(self, inner: ChatCompletionClient, group: SingleFlightGroup):
+        super().__init__(inner)
+        self.group = group
+
+    def _key(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema],
+        json_output: Any,
+        extra_create_args: Mapping[str, Any] | None,
+    ) -> str:
+        return request_fingerprint(
+            self.request_identity(),
+            messages,
+            tools,
+            json_output,
+            extra_create_args,
+        )
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+        json_output: Any = None,
+        extra_create_args: Mapping[str, Any] | None = None,
+        cancellation_token: CancellationToken | None = None,
+        **kwargs: Any,
+    ) -> CreateResult:
+        key = self._key(messages, tools, json_output, extra_create_args)
+        return await self.group.do(
+            key,
+            lambda token: super(SingleFlightModelClient, self).create(
+                messages,
+                tools=tools,
+                json_output=json_output,
+                extra_create_args=extra_create_args,
+                cancellation_token=token,
+                **kwargs,
+            ),
+            cancellation_token,
+        )
+
+    def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+        json_output: Any = None,
+        extra_create_args: Mapping[str, Any] | None = None,
+        cancellation_token: CancellationToken | None = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[str | CreateResult, None]:
+        key = self._key(messages, tools, json_output, extra_create_args)
+        return self.group.do_stream(
+            key,
+            lambda token: super(SingleFlightModelClient, self).create_stream(
+                messages,
+                tools=tools,
+                json_output=json_output,
+                extra_create_args=extra_create_args,
+                cancellation_token=token,
+                **kwargs,
+            ),
+            cancellation_token,
+        )
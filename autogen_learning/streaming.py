@@ -0,0 +1,146 @@
+"""
+流式执行
+
+基于 run_stream 边运行边渲染智能体消息和 token 增量，并按智能体记录
+首 token 等待时间和 token 间隔。设置环境变量 AUTOGEN_STREAMING=0
+可退回到一次性 run()。
+
+run_stream 不会报告模型请求何时发出，首 token 等待时间从上一条完整
+消息或工具结果算起，除了模型的首 token 延迟 (TTFT)，还包括群聊选择
+发言者等前置步骤。
+"""
+
+import os
+import time
+from typing import Any
+
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import (
+    BaseAgentEvent,
+    BaseChatMessage,
+    ModelClientStreamingChunkEvent,
+    ToolCallExecutionEvent,
+    ToolCallRequestEvent,
+)
+from autogen_core import CancellationToken
+
+from autogen_learning.metrics import MetricsCollector
+
+STREAMING_ENV = "AUTOGEN_STREAMING"
+
+
+def streaming_enabled() -> bool:
+    """是否启用流式模式（默认启用）"""
+    value = os.getenv(STREAMING_ENV, "1").strip().lower()
+    return value not in ("0", "false", "no", "off")
+
+
+_stream_metrics = MetricsCollector()
+
+
+def get_stream_metrics() -> MetricsCollector:
+    """获取进程级流式指标收集器（未指定 metrics 时使用）"""
+    return _stream_metrics
+
+
+class StreamRenderer:
+    """渲染流式事件并记录每个智能体的首 token 等待时间和 token 间隔"""
+
+    def __init__(
+        self,
+        metrics: MetricsCollector | None = None,
+        render: bool = True,
+        preview_chars: int = 200,
+    ):
+        self.metrics = metrics if metrics is not None else get_stream_metrics()
+        self.render = render
+        self.preview_chars = preview_chars
+        self._turn_started_at = time.monotonic()
+        self._streaming_source: str | None = None
+        self._last_token_at: float | None = None
+
+    def _print(self, *args: Any, **kwargs: Any) -> None:
+        if self.render:
+            print(*args, **kwargs, flush=True)
+
+    def _on_chunk(self, chunk: ModelClientStreamingChunkEvent) -> None:
+        now = time.monotonic()
+        if chunk.source != self._streaming_source:
+            # 新一轮发言：从上一条完整消息或工具结果到首个 token 的时间
+            self.metrics.timer(
+                f"stream.first_token_wait.{chunk.source}",
+                now - self._turn_started_at,
+            )
+            self._streaming_source = chunk.source
+            self._print(f"   💬 {chunk.source}: ", end="")
+        elif self._last_token_at is not None:
+            self.metrics.timer(
+                f"stream.inter_token.{chunk.source}",
+                now - self._last_token_at,
+            )
+        self._last_token_at = now
+        self._print(chunk.content, end="")
+
+    def _end_turn(self) -> None:
+        if self._streaming_source is not None:
+            self._print()
+        self._streaming_source = None
+        self._last_token_at = None
+        self._turn_started_at = time.monotonic()
+
+    def _preview(self, content: Any) -> str:
+        text = content if isinstance(content, str) else str(content)
+        if len(text) > self.preview_chars:
+            return text[: self.preview_chars] + "..."
+        return text
+
+    def on_event(self, event: BaseAgentEvent | BaseChatMessage) -> None:
+        """处理一个流式事件"""
+        if isinstance(event, ModelClientStreamingChunkEvent):
+            self._on_chunk(event)
+            return
+
+        streamed = event.source == self._streaming_source
+        if isinstance(event, ToolCallRequestEvent):
+            self._end_turn()
+            names = ", ".join(call.name for call in event.content)
+            self._print(f"   🔧 {event.source} 调用工具: {names}")
+        elif isinstance(event, ToolCallExecutionEvent):
+            self._end_turn()
+            self._print(f"   🔧 {event.source} 工具返回 {len(event.content)} 个结果")
+        elif isinstance(event, BaseChatMessage):
+            self._end_turn()
+            # 已按 token 渲染过的消息不再重复输出；任务消息本身也不回显
+            if not streamed and event.source != "user":
+                preview = self._preview(event.to_text())
+                self._print(f"   💬 {event.source}: {preview}")
+
+
+async def run_task(
+    runnable: Any,
+    task: str | None,
+    *,
+    metrics: MetricsCollector | None = None,
+    render: bool = True,
+    cancellation_token: CancellationToken | None = None,
+) -> TaskResult:
+    """运行智能体或团队：流式模式下边运行边渲染，否则直接调用 run()
+
+    task 为 None 时团队从上一次停下的地方继续。
+    """
+    if not streaming_enabled():
+        return await runnable.run(task=task, cancellation_token=cancellation_token)
+
+    renderer = StreamRenderer(metrics=metrics, render=render)
+    result: TaskResult | None = None
+    async for event in runnable.run_stream(
+        task=task,
+        cancellation_token=cancellation_token,
+    ):
+        if isinstance(event, TaskResult):
+            result = event
+        else:
+            renderer.on_event(event)
+    if result is None:
+        raise RuntimeError("run_stream 未返回 TaskResult")
+    return result
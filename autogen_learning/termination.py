@@ -0,0 +1,212 @@
+"""
+多条件终止引擎
+
+TextMentionTermination 每个实例单独扫描一遍消息文本，多个结束短语用 `|`
+组合时每条消息要扫描多遍。TerminationEngine 把所有短语编译成一个
+Aho-Corasick 自动机，每条新消息只扫描一遍，耗时只和消息长度有关，不随
+短语数量和对话长度增长；同时检查消息数、token 预算和运行时长，任一条件
+满足即结束对话。
+
+用法:
+    termination = TerminationEngine(
+        ["系统协调完成", "任务已全部完成"],
+        max_messages=30,
+        max_tokens=50_000,
+        timeout=300,
+    )
+    team = SelectorGroupChat(agents, model_client, termination_condition=termination)
+"""
+
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator, Sequence
+
+from autogen_agentchat.base import TerminatedException, TerminationCondition
+from autogen_agentchat.messages import (
+    BaseAgentEvent,
+    BaseChatMessage,
+    ModelClientStreamingChunkEvent,
+    StopMessage,
+)
+
+
+class PhraseMatcher:
+    """Aho-Corasick 自动机：一次扫描找出文本中出现的所有短语"""
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases = list(dict.fromkeys(p for p in phrases if p))
+        # 状态 0 是根；每个状态的出边、失配跳转和在此结束的短语
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[list[int]] = [[]]
+        for index, phrase in enumerate(self.phrases):
+            state = 0
+            for char in phrase:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state].append(index)
+        self._link()
+
+    def _link(self) -> None:
+        """按广度优先计算失配跳转，并合并后缀状态的输出"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] += self._output[self._fail[child]]
+
+    def _step(self, state: int, char: str) -> int:
+        goto, fail = self._goto, self._fail
+        while state and char not in goto[state]:
+            state = fail[state]
+        return goto[state].get(char, 0)
+
+    def finditer(self, text: str) -> Iterator[str]:
+        """按结束位置依次产出文本中出现的短语"""
+        state = 0
+        for char in text:
+            state = self._step(state, char)
+            for index in self._output[state]:
+                yield self.phrases[index]
+
+    def search(self, text: str) -> str | None:
+        """文本中最先结束的短语，没有时返回 None"""
+        return next(self.finditer(text), None)
+
+    def scan(self, chunk: str, state: int = 0) -> tuple[str | None, int]:
+        """从 state 继续扫描一段文本，返回 (最先结束的短语, 新状态)
+
+        把上一次返回的状态传给下一段，流式输出中跨块的短语也能找到。
+        """
+        for char in chunk:
+            state = self._step(state, char)
+            if self._output[state]:
+                return self.phrases[self._output[state][0]], state
+        return None, state
+
+
+class TerminationEngine(TerminationCondition):
+    """短语、消息数、token 预算和运行时长合并成一个终止条件
+
+    每个条件为 None 时不检查。sources 只对短语匹配生效，与
+    TextMentionTermination 一致。
+
+    团队只把完整消息交给终止条件；在自己的 run_stream 循环里把 token 增量
+    事件也交给引擎时，每个来源的自动机状态跨块保留，短语在回复结束前、
+    刚被输出时就能匹配到。
+    """
+
+    def __init__(
+        self,
+        phrases: Sequence[str] = (),
+        max_messages: int | None = None,
+        max_tokens: int | None = None,
+        timeout: float | None = None,
+        sources: Sequence[str] | None = None,
+    ):
+        self.matcher = PhraseMatcher(phrases)
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.sources = set(sources) if sources is not None else None
+        # 最近一次结束的条件 (phrase/max_messages/max_tokens/timeout) 和匹配的短语
+        self.reason: str | None = None
+        self.matched: str | None = None
+        self._message_count = 0
+        self._token_count = 0
+        # 各来源正在流式输出的回复扫描到的自动机状态
+        self._chunk_states: dict[str, int] = {}
+        # 从第一次检查（即任务开始）计时，团队在池中空闲的时间不计入
+        self._started_at: float | None = None
+        self._terminated = False
+
+    @property
+    def terminated(self) -> bool:
+        return self._terminated
+
+    def _stop(self, reason: str, content: str) -> StopMessage:
+        self._terminated = True
+        self.reason = reason
+        if reason != "phrase":
+            self.matched = None
+        return StopMessage(content=content, source="TerminationEngine")
+
+    def _scan(
+        self,
+        messages: Sequence[BaseAgentEvent | BaseChatMessage],
+    ) -> StopMessage | None:
+        """累计新消息的条数和 token 用量，并查找结束短语"""
+        for message in messages:
+            if isinstance(message, BaseChatMessage):
+                self._message_count += 1
+            if message.models_usage is not None:
+                usage = message.models_usage
+                self._token_count += usage.prompt_tokens + usage.completion_tokens
+            if not self.matcher.phrases or (
+                self.sources is not None and message.source not in self.sources
+            ):
+                continue
+            phrase = self._match(message)
+            if phrase is not None:
+                self.matched = phrase
+                return self._stop("phrase", f"Text '{phrase}' mentioned")
+        return None
+
+    def _match(self, message: BaseAgentEvent | BaseChatMessage) -> str | None:
+        """在消息中查找结束短语，token 增量接着同一来源上一块的状态扫描"""
+        if isinstance(message, ModelClientStreamingChunkEvent):
+            state = self._chunk_states.get(message.source, 0)
+            phrase, self._chunk_states[message.source] = self.matcher.scan(
+                message.content,
+                state,
+            )
+            return phrase
+        # 完整消息到达，这个来源的流式回复已经结束
+        self._chunk_states.pop(message.source, None)
+        return self.matcher.search(message.to_text())
+
+    def _check_limits(self) -> StopMessage | None:
+        """消息数、token 预算和运行时长是否超限"""
+        if self.max_messages is not None and self._message_count >= self.max_messages:
+            return self._stop(
+                "max_messages",
+                f"Maximum number of messages {self.max_messages} reached, "
+                f"current message count: {self._message_count}",
+            )
+        if self.max_tokens is not None and self._token_count >= self.max_tokens:
+            return self._stop(
+                "max_tokens",
+                f"Token usage limit reached, total token count: {self._token_count}.",
+            )
+        elapsed = time.monotonic() - (self._started_at or 0.0)
+        if self.timeout is not None and elapsed >= self.timeout:
+            return self._stop("timeout", f"Timeout of {self.timeout} seconds reached")
+        return None
+
+    async def __call__(
+        self,
+        messages: Sequence[BaseAgentEvent | BaseChatMessage],
+    ) -> StopMessage | None:
+        if self._terminated:
+            raise TerminatedException("Termination condition has already been reached")
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+        # 团队每轮只传入新增的消息，已扫描过的对话不会再扫描
+        return self._scan(messages) or self._check_limits()
+
+    async def reset(self) -> None:
+        # 团队在结束时立即重置终止条件，reason 和 matched 保留最近一次结束的原因
+        self._terminated = False
+        self._message_count = 0
+        self._token_count = 0
+        self._chunk_states = {}
+        self._started_at = None
@@ -11,12 +11,14 @@ AutoGen 学习项目 - 高级示例1: 生产级配置管理
 - 日志配置
 - 性能监控配置
 - 错误处理配置
+- 便宜模型优先的模型级联
 """
 
 import asyncio
 import json
 import logging
 import os
+from collections.abc import Sequence
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
@@ -25,11 +27,30 @@ from typing import Any
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.conditions import MaxMessageTermination
 from autogen_agentchat.teams import RoundRobinGroupChat
-from autogen_core.models import ModelInfo
+from autogen_core.models import ChatCompletionClient
 from autogen_core.tools import FunctionTool
-from autogen_ext.models.openai import OpenAIChatCompletionClient
 from dotenv import load_dotenv
 
+from autogen_learning import (
+    CachedModelClient,
+    CascadeModelClient,
+    CompletionCache,
+    ContextBudgeter,
+    LatencyRouter,
+    LatencyTracker,
+    MetricsCollector,
+    RateLimitedModelClient,
+    ResilientModelClient,
+    RoutedModelClient,
+    SingleFlightGroup,
+    SingleFlightModelClient,
+    get_cassette,
+    get_rate_limiter,
+    get_registry,
+    run_task,
+    streaming_enabled,
+)
+
 # 加载环境变量
 load_dotenv()
 
@@ -92,6 +113,21 @@ class ProductionConfig:
     request_timeout: int = 30
     cache_enabled: bool = True
     cache_ttl: int = 3600
+    cache_memory_entries: int = 256
+    cache_disk_entries: int = 5000
+    cache_path: str | None = ".autogen_cache.sqlite"
+    enable_request_coalescing: bool = True
+    enable_hedging: bool = True
+    hedge_model: str | None = "openai"
+    hedge_percentile: float = 0.95
+    enable_routing: bool = True
+    # 0 表示不单独设置预算，沿用 AUTOGEN_PROMPT_TOKEN_BUDGET（默认关闭）
+    prompt_token_budget: int = 0
+    # 级联按从便宜到昂贵的顺序尝试端点，未配置或缺少密钥的端点跳过
+    cascade_models: list[str] = field(
+        default_factory=lambda: ["local", "deepseek", "openai"],
+    )
+    cascade_threshold: float = 0.6
 
     # 安全配置
     enable_rate_limiting: bool = True
@@ -102,6 +138,21 @@ class ProductionConfig:
     enable_metrics: bool = True
     metrics_port: int = 8080
     health_check_interval: int = 30
+    metrics: MetricsCollector = field(default_factory=MetricsCollector, repr=False)
+
+    _completion_cache: CompletionCache | None = field(
+        default=None,
+        init=False,
+        repr=False,
+    )
+    _flights: SingleFlightGroup | None = field(default=None, init=False, repr=False)
+    _router: LatencyRouter | None = field(default=None, init=False, repr=False)
+    _budgeter: ContextBudgeter | None = field(default=None, init=False, repr=False)
+    _latency_trackers: dict[str, LatencyTracker] = field(
+        default_factory=dict,
+        init=False,
+        repr=False,
+    )
 
     def __post_init__(self):
         """初始化后的配置验证和设置"""
@@ -177,6 +228,12 @@ class ProductionConfig:
                 f"API密钥环境变量 '{default_config.api_key_env}' 未设置",
             )
 
+        if self.prompt_token_budget < 0:
+            raise ConfigurationError("prompt_token_budget 不能为负数")
+
+        if not 0.0 <= self.cascade_threshold <= 1.0:
+            raise ConfigurationError("cascade_threshold 必须在 0 到 1 之间")
+
         # 生产环境额外验证
         if self.environment == Environment.PRODUCTION:
             if self.debug:
@@ -188,10 +245,83 @@ class ProductionConfig:
     def get_model_client(
         self,
         model_name: str | None = None,
-    ) -> OpenAIChatCompletionClient:
-        """获取模型客户端"""
-        model_name = model_name or self.default_model
+        allowed_models: Sequence[str] | None = None,
+        cascade: bool = False,
+    ) -> ChatCompletionClient:
+        """获取模型客户端（同一端点的客户端共享连接池）
+
+        启用路由且未指定 model_name 时，每次请求在 allowed_models（默认为所有
+        已配置密钥的端点）中选择预计最快的健康端点。cascade 为 True 时按
+        cascade_models 的顺序先用便宜的端点回答，答案不合格才升级。
+        """
+        if cascade:
+            client = self._cascade_client()
+        elif self.enable_routing and model_name is None:
+            client = self._routed_client(allowed_models)
+        else:
+            client = self._resilient_client(model_name or self.default_model)
+
+        if self.enable_request_coalescing:
+            client = SingleFlightModelClient(client, self.flights)
+        # 录制/回放磁带时不走补全缓存，保证每次请求都被录制
+        if self.cache_enabled and get_cassette() is None:
+            client = CachedModelClient(client, self.completion_cache)
+
+        return client
+
+    def _routed_client(
+        self,
+        allowed_models: Sequence[str] | None,
+    ) -> ChatCompletionClient:
+        """获取按延迟路由的客户端"""
+        names = list(allowed_models or self.api_configs)
+        for name in names:
+            if name not in self.api_configs:
+                raise ConfigurationError(f"模型 '{name}' 未配置")
+            if os.getenv(self.api_configs[name].api_key_env):
+                # 路由器自行在端点间切换，不再对冲
+                self.router.register(name, self._resilient_client(name, hedge=False))
+        return RoutedModelClient(self.router, names)
+
+    def _cascade_client(self) -> ChatCompletionClient:
+        """获取由便宜到昂贵逐层升级的级联客户端"""
+        tiers = [
+            # 级联自行升级到更强的端点，不再对冲
+            (name, self._resilient_client(name, hedge=False))
+            for name in self.cascade_models
+            if name in self.api_configs
+            and os.getenv(self.api_configs[name].api_key_env)
+        ]
+        if not tiers:
+            raise ConfigurationError(
+                f"级联模型 {self.cascade_models} 均未配置或缺少API密钥",
+            )
+        return CascadeModelClient(
+            tiers,
+            threshold=self.cascade_threshold,
+            metrics=self.metrics if self.enable_metrics else None,
+        )
+
+    def _resilient_client(
+        self,
+        model_name: str,
+        hedge: bool = True,
+    ) -> ChatCompletionClient:
+        """获取带超时、重试和对冲的单端点客户端"""
+        client = self._endpoint_client(model_name)
+        config = self.api_configs[model_name]
+        return ResilientModelClient(
+            client,
+            timeout=config.timeout,
+            retry_count=config.retry_count,
+            hedge=self._hedge_client(model_name) if hedge else None,
+            hedge_percentile=self.hedge_percentile,
+            tracker=self.latency_tracker(model_name),
+            metrics=self.metrics if self.enable_metrics else None,
+        )
 
+    def _endpoint_client(self, model_name: str) -> ChatCompletionClient:
+        """获取单个端点的限流客户端"""
         if model_name not in self.api_configs:
             raise ConfigurationError(f"模型 '{model_name}' 未配置")
 
@@ -201,21 +331,86 @@ class ProductionConfig:
         if not api_key:
             raise ConfigurationError(f"API密钥环境变量 '{config.api_key_env}' 未设置")
 
-        return OpenAIChatCompletionClient(
+        client: ChatCompletionClient = get_registry().get(
             model=config.name,
             api_key=api_key,
             base_url=config.base_url,
             temperature=config.temperature,
             max_tokens=config.max_tokens,
-            model_info=ModelInfo(
-                family="openai",
-                vision=False,
-                function_calling=True,
-                json_output=True,
-                structured_output=False,
-            ),
+            # 重试由 ResilientModelClient 负责，关闭 SDK 内置重试避免叠加
+            max_retries=0,
+            budgeter=self.budgeter,
         )
 
+        if self.enable_rate_limiting:
+            # 同一环境下同一端点的所有智能体共享限流器
+            limiter = get_rate_limiter(
+                f"{self.environment.value}:{model_name}",
+                requests_per_minute=self.max_requests_per_minute,
+                max_concurrent=self.max_concurrent_requests,
+                metrics=self.metrics if self.enable_metrics else None,
+            )
+            client = RateLimitedModelClient(client, limiter)
+        return client
+
+    def _hedge_client(self, model_name: str) -> ChatCompletionClient | None:
+        """获取对冲用的备用端点客户端，未配置或缺少密钥时返回 None"""
+        if not self.enable_hedging or self.hedge_model in (None, model_name):
+            return None
+        try:
+            return self._endpoint_client(self.hedge_model)
+        except ConfigurationError as e:
+            logging.debug(f"未启用对冲请求: {e}")
+            return None
+
+    @property
+    def router(self) -> LatencyRouter:
+        """获取端点路由器（所有路由客户端共享端点统计）"""
+        if self._router is None:
+            self._router = LatencyRouter(
+                metrics=self.metrics if self.enable_metrics else None,
+            )
+        return self._router
+
+    @property
+    def budgeter(self) -> ContextBudgeter | None:
+        """获取上下文预算器（所有模型客户端共享节省统计），未设置预算时为 None"""
+        if self._budgeter is None and self.prompt_token_budget > 0:
+            self._budgeter = ContextBudgeter(
+                self.prompt_token_budget,
+                metrics=self.metrics if self.enable_metrics else None,
+            )
+        return self._budgeter
+
+    def latency_tracker(self, model_name: str) -> LatencyTracker:
+        """获取端点的延迟统计（同一端点的所有客户端共享）"""
+        if model_name not in self._latency_trackers:
+            self._latency_trackers[model_name] = LatencyTracker()
+        return self._latency_trackers[model_name]
+
+    @property
+    def completion_cache(self) -> CompletionCache:
+        """获取补全缓存（首次使用时按配置创建，所有模型共享，按环境隔离）"""
+        if self._completion_cache is None:
+            self._completion_cache = CompletionCache(
+                ttl=self.cache_ttl,
+                memory_entries=self.cache_memory_entries,
+                disk_entries=self.cache_disk_entries,
+                path=self.cache_path,
+                metrics=self.metrics if self.enable_metrics else None,
+                namespace=self.environment.value,
+            )
+        return self._completion_cache
+
+    @property
+    def flights(self) -> SingleFlightGroup:
+        """获取在途请求表（所有模型客户端共享）"""
+        if self._flights is None:
+            self._flights = SingleFlightGroup(
+                metrics=self.metrics if self.enable_metrics else None,
+            )
+        return self._flights
+
     def to_dict(self) -> dict[str, Any]:
         """转换为字典格式"""
         return {
@@ -225,6 +420,7 @@ class ProductionConfig:
             "log_level": self.log_level.value,
             "max_concurrent_requests": self.max_concurrent_requests,
             "cache_enabled": self.cache_enabled,
+            "cache_ttl": self.cache_ttl,
             "enable_rate_limiting": self.enable_rate_limiting,
             "enable_metrics": self.enable_metrics,
         }
@@ -259,14 +455,22 @@ class ProductionAgentFactory:
         system_message: str,
         model_name: str | None = None,
         tools: list | None = None,
+        *,
+        allowed_models: Sequence[str] | None = None,
+        cascade: bool = False,
     ) -> AssistantAgent:
         """创建智能体"""
         try:
-            model_client = self.config.get_model_client(model_name)
+            model_client = self.config.get_model_client(
+                model_name,
+                allowed_models,
+                cascade=cascade,
+            )
 
             agent = AssistantAgent(
                 name=name,
                 model_client=model_client,
+                model_client_stream=streaming_enabled(),
                 system_message=system_message,
                 tools=tools or [],
             )
@@ -417,7 +621,7 @@ async def demo_agent_factory() -> None:
         termination_condition=termination,
     )
 
-    result = await monitor_team.run(task="获取当前系统指标并检查健康状态")
+    result = await run_task(monitor_team, "获取当前系统指标并检查健康状态")
 
     for message in result.messages:
         if hasattr(message, "source") and message.source == "MonitoringAgent":
@@ -473,6 +677,136 @@ async def demo_config_validation() -> None:
             os.environ["OPENAI_API_KEY"] = original_key
 
 
+async def demo_completion_cache() -> None:
+    """演示补全缓存"""
+    print("\n💾 Completion Cache Demo")
+    print("-" * 50)
+
+    config = ProductionConfig(environment=Environment.DEVELOPMENT, cache_ttl=600)
+    factory = ProductionAgentFactory(config)
+
+    # 相同的提示词重复执行，第二次起由缓存直接返回
+    task = "用一句话介绍AutoGen。"
+    for i in range(3):
+        agent = factory.create_agent(
+            name=f"CachedAgent{i + 1}",
+            system_message="你是简洁的技术助手。",
+        )
+        async with config.metrics.time_operation("cache_demo.run"):
+            result = await run_task(agent, task)
+        print(f"   第{i + 1}次: {result.messages[-1].content[:60]}...")
+
+    summary = config.metrics.get_summary()
+    print("\n📊 缓存指标:")
+    for name, value in summary["counters"].items():
+        if name.startswith("cache."):
+            print(f"   {name}: {value:.0f}")
+    timings = config.metrics.timers["cache_demo.run"]
+    print(f"   耗时: {', '.join(f'{t:.2f}s' for t in timings)}")
+
+
+async def demo_rate_limiting() -> None:
+    """演示全局限流"""
+    print("\n🚦 Rate Limiting Demo")
+    print("-" * 50)
+
+    config = ProductionConfig(
+        environment=Environment.STAGING,
+        debug=False,
+        max_requests_per_minute=30,
+        max_concurrent_requests=2,
+        cache_enabled=False,
+    )
+    factory = ProductionAgentFactory(config)
+
+    # 6个智能体同时发起请求，超过并发上限的请求在限流器中排队
+    agents = [
+        factory.create_agent(
+            name=f"RateLimitedAgent{i + 1}",
+            system_message="你是简洁的技术助手，回答不超过20个字。",
+        )
+        for i in range(6)
+    ]
+    await asyncio.gather(
+        *[
+            run_task(
+                agent,
+                f"第{i + 1}个问题：什么是限流？",
+                metrics=config.metrics,
+                render=False,
+            )
+            for i, agent in enumerate(agents)
+        ],
+    )
+
+    limiter = get_rate_limiter(
+        f"{config.environment.value}:{config.default_model}",
+        requests_per_minute=config.max_requests_per_minute,
+        max_concurrent=config.max_concurrent_requests,
+    )
+    stats = limiter.stats()
+    print("📊 限流统计:")
+    print(f"   已放行请求: {stats['acquired']}")
+    print(f"   平均等待: {stats['avg_wait']:.2f}秒")
+    print(f"   429次数: {stats['throttled']}")
+    print(f"   当前速率: {stats['rate_per_minute']}/分钟")
+    wait_stats = config.metrics.get_summary()["timer_stats"].get("ratelimit.wait_time")
+    if wait_stats:
+        print(f"   最长等待: {wait_stats['max']:.2f}秒")
+
+    print("📡 端点路由:")
+    for name, endpoint in config.router.stats().items():
+        latency = endpoint["latency"]
+        print(
+            f"   {name}: {endpoint['requests']}次请求, "
+            f"EWMA延迟 {latency if latency is not None else '-'}秒, "
+            f"错误率 {endpoint['error_rate']:.0%}",
+        )
+
+
+async def demo_model_cascade() -> None:
+    """演示模型级联"""
+    print("\n🪜 Model Cascade Demo")
+    print("-" * 50)
+
+    config = ProductionConfig(
+        environment=Environment.DEVELOPMENT,
+        cache_enabled=False,
+        cascade_threshold=0.6,
+    )
+    factory = ProductionAgentFactory(config)
+
+    # 大多数请求很简单，便宜的端点就能答好；不合格的答案才交给更强的模型
+    tasks = [
+        "1 + 1 等于几？",
+        "把'hello'翻译成中文。",
+        "以JSON格式列出三种编程语言。",
+        "比较微服务和单体架构在团队规模扩张时的取舍，并给出置信度(0-1)。",
+    ]
+    for i, task in enumerate(tasks):
+        agent = factory.create_agent(
+            name=f"CascadeAgent{i + 1}",
+            system_message="你是简洁的技术助手。",
+            cascade=True,
+        )
+        result = await run_task(agent, task, render=False)
+        print(f"   {task[:20]}... -> {result.messages[-1].to_text()[:50]}")
+
+    summary = config.metrics.get_summary()
+    served = {
+        name.removeprefix("cascade.served."): count
+        for name, count in summary["counters"].items()
+        if name.startswith("cascade.served.")
+    }
+    total = sum(served.values())
+    print("📊 各层承接比例:")
+    for name, count in served.items():
+        print(f"   {name}: {count:.0f}次 ({count / total:.0%})")
+    print(f"   升级次数: {summary['counters'].get('cascade.escalations', 0):.0f}")
+    saved = config.metrics.timers.get("cascade.latency_saved", [])
+    print(f"   节省延迟: {sum(saved):.2f}秒")
+
+
 async def demo_environment_switching() -> None:
     """演示环境切换"""
     print("\n🔄 Environment Switching Demo")
@@ -514,6 +848,9 @@ async def main() -> None:
         await demo_production_config()
         await demo_agent_factory()
         await demo_config_validation()
+        await demo_completion_cache()
+        await demo_rate_limiting()
+        await demo_model_cascade()
         await demo_environment_switching()
 
         print("\n✨ 所有生产级配置演示完成!")
@@ -524,6 +861,12 @@ async def main() -> None:
         print("   • 日志和监控配置支持生产运维")
         print("   • 安全配置保护API密钥和系统")
         print("   • 性能配置优化系统响应")
+        print("   • 补全缓存避免重复的模型调用")
+        print("   • 全局限流避免并发团队触发服务端429")
+        print("   • 单次超时、抖动重试和对冲请求压低尾延迟")
+        print("   • 按 EWMA 延迟和错误率在端点间路由")
+        print("   • 按 token 预算裁剪上下文，避免超出模型上限")
+        print("   • 模型级联先用便宜端点回答，答案不合格才升级")
 
         # 清理临时配置文件
         import glob
@@ -11,26 +11,53 @@ AutoGen 学习项目 - 高级示例2: 企业级多智能体系统
 - 负载均衡
 - 状态管理
 - 企业集成
+- 专家并行分析、协调员汇总 (FanOutTeam)
+- 按角色复用、重置和淘汰智能体副本 (AgentPool)
+- 复用已重置的团队，不为每个请求重新构建 (TeamPool)
+- 按任务截止时间结束对话、取消在途调用 (run_with_deadline)
 """
 
 import asyncio
+import functools
 import json
 import logging
-import os
+import time
 import uuid
+from collections.abc import AsyncIterator, Callable, Mapping
+from contextlib import AsyncExitStack, asynccontextmanager
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 from typing import Any
 
 from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.conditions import MaxMessageTermination, TextMentionTermination
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.conditions import MaxMessageTermination
+from autogen_agentchat.messages import TextMessage
 from autogen_agentchat.teams import RoundRobinGroupChat, SelectorGroupChat
-from autogen_core.models import ModelInfo
 from autogen_core.tools import FunctionTool
-from autogen_ext.models.openai import OpenAIChatCompletionClient
 from dotenv import load_dotenv
 
+from autogen_learning import (
+    AgentPool,
+    DeadlineExceededError,
+    DeadlineTermination,
+    Dispatcher,
+    FanOutTeam,
+    MetricsCollector,
+    SingleFlightGroup,
+    SingleFlightModelClient,
+    TeamPool,
+    TerminationEngine,
+    create_model_client,
+    create_model_context,
+    deadline_reached,
+    get_registry,
+    run_task,
+    run_with_deadline,
+    streaming_enabled,
+)
+
 load_dotenv()
 
 
@@ -51,6 +78,7 @@ class TaskStatus(Enum):
     COMPLETED = "completed"
     FAILED = "failed"
     CANCELLED = "cancelled"
+    TIMED_OUT = "timed_out"
 
 
 class AgentRole(Enum):
@@ -147,6 +175,24 @@ class TaskManager:
         )
         return True
 
+    def record_result(
+        self,
+        task_id: str,
+        status: TaskStatus,
+        result: TaskResult,
+    ) -> bool:
+        """记录任务的执行结果：状态、结束原因和（可能不完整的）对话记录"""
+        if task_id not in self.tasks:
+            return False
+
+        task = self.tasks[task_id]
+        task.metadata["stop_reason"] = result.stop_reason
+        task.metadata["transcript"] = [
+            {"source": message.source, "content": message.to_text()}
+            for message in result.messages
+        ]
+        return self.update_task_status(task_id, status)
+
     def get_task(self, task_id: str) -> Task | None:
         """获取任务"""
         return self.tasks.get(task_id)
@@ -162,148 +208,197 @@ class TaskManager:
         ]
 
 
-def create_model_client(temperature: float = 0.3) -> OpenAIChatCompletionClient:
-    """创建模型客户端"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-
-    return OpenAIChatCompletionClient(
-        model=os.getenv("OPENAI_MODEL", "deepseek-chat"),
-        api_key=api_key,
-        base_url=os.getenv("OPENAI_API_BASE", "https://api.deepseek.com/v1"),
-        temperature=temperature,
-        model_info=ModelInfo(
-            family="openai",
-            vision=False,
-            function_calling=True,
-            json_output=True,
-            structured_output=False,
+@dataclass(frozen=True)
+class AgentSpec:
+    """智能体的声明式定义，首次使用时才构建"""
+
+    name: str
+    role: AgentRole
+    temperature: float
+    system_message: str
+    # (方法名, 工具描述)，构建时绑定到系统实例的方法
+    tools: tuple[tuple[str, str], ...] = ()
+
+
+AGENT_SPECS: dict[str, AgentSpec] = {
+    # 系统协调员
+    "system_coordinator": AgentSpec(
+        name="SystemCoordinator",
+        role=AgentRole.COORDINATOR,
+        temperature=0.2,
+        tools=(
+            ("_create_task", "创建新任务"),
+            ("_assign_task", "分配任务"),
+            ("_get_task_status", "获取任务状态"),
+            ("_update_task_status", "更新任务状态"),
         ),
-    )
+        system_message="""你是企业系统协调员。
+        职责：
+        - 接收和分析业务需求
+        - 创建和分配任务
+        - 协调各个专业团队
+        - 监控项目进度
+        - 确保交付质量
+
+        当所有任务完成时说"系统协调完成"。""",
+    ),
+    # 业务分析师
+    "business_analyst": AgentSpec(
+        name="BusinessAnalyst",
+        role=AgentRole.SPECIALIST,
+        temperature=0.4,
+        system_message="""你是业务分析师。
+        专长：
+        - 业务需求分析
+        - 流程设计和优化
+        - 用户故事编写
+        - 业务规则定义
+        - ROI分析
+
+        只在被分配业务分析任务时发言。""",
+    ),
+    # 技术架构师
+    "tech_architect": AgentSpec(
+        name="TechArchitect",
+        role=AgentRole.SPECIALIST,
+        temperature=0.3,
+        system_message="""你是技术架构师。
+        专长：
+        - 系统架构设计
+        - 技术选型
+        - 性能优化
+        - 安全架构
+        - 可扩展性设计
+
+        只在被分配技术架构任务时发言。""",
+    ),
+    # 项目经理
+    "project_manager": AgentSpec(
+        name="ProjectManager",
+        role=AgentRole.EXECUTOR,
+        temperature=0.3,
+        system_message="""你是项目经理。
+        专长：
+        - 项目计划制定
+        - 资源协调
+        - 风险管理
+        - 进度跟踪
+        - 团队协作
+
+        只在被分配项目管理任务时发言。""",
+    ),
+    # 质量保证
+    "qa_specialist": AgentSpec(
+        name="QASpecialist",
+        role=AgentRole.REVIEWER,
+        temperature=0.2,
+        system_message="""你是质量保证专家。
+        专长：
+        - 质量标准制定
+        - 测试策略设计
+        - 代码审查
+        - 质量控制
+        - 持续改进
+
+        只在被分配质量保证任务时发言。""",
+    ),
+    # 系统监控员
+    "system_monitor": AgentSpec(
+        name="SystemMonitor",
+        role=AgentRole.MONITOR,
+        temperature=0.1,
+        tools=(
+            ("_get_system_metrics", "获取系统指标"),
+            ("_check_agent_health", "检查智能体健康状态"),
+        ),
+        system_message="""你是系统监控员。
+        职责：
+        - 监控系统性能
+        - 跟踪智能体状态
+        - 检测异常情况
+        - 生成监控报告
+        - 触发告警机制
+
+        持续监控系统状态并及时报告。""",
+    ),
+}
 
 
 class EnterpriseAgentSystem:
     """企业级智能体系统"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        specs: Mapping[str, AgentSpec] = AGENT_SPECS,
+        max_replicas: int = 4,
+        idle_ttl: float | None = 300.0,
+    ):
         self.task_manager = TaskManager()
-        self.agents: dict[str, AssistantAgent] = {}
-        self.agent_roles: dict[str, AgentRole] = {}
+        self.specs = specs
+        self.agent_roles: dict[str, AgentRole] = {
+            key: spec.role for key, spec in specs.items()
+        }
         self.logger = logging.getLogger(self.__class__.__name__)
-        self._setup_agents()
-
-    def _setup_agents(self) -> None:
-        """设置智能体"""
-
-        # 系统协调员
-        self.agents["system_coordinator"] = AssistantAgent(
-            name="SystemCoordinator",
-            model_client=create_model_client(temperature=0.2),
-            tools=[
-                FunctionTool(self._create_task, description="创建新任务"),
-                FunctionTool(self._assign_task, description="分配任务"),
-                FunctionTool(self._get_task_status, description="获取任务状态"),
-                FunctionTool(self._update_task_status, description="更新任务状态"),
-            ],
-            system_message="""你是企业系统协调员。
-            职责：
-            - 接收和分析业务需求
-            - 创建和分配任务
-            - 协调各个专业团队
-            - 监控项目进度
-            - 确保交付质量
-
-            当所有任务完成时说"系统协调完成"。""",
+        # 所有智能体共享的在途请求表，并发的相同请求只调用一次模型
+        self.flights = SingleFlightGroup()
+        # 流式执行的首 token 等待时间等指标
+        self.metrics = MetricsCollector()
+        # 智能体只从池中借出：首次借出时才构建客户端和工具，
+        # 并发请求各自借出独立副本，结束后重置归还
+        self.pool = AgentPool(
+            {key: self.agent_factory(key) for key in specs},
+            max_per_role=max_replicas,
+            idle_ttl=idle_ttl,
+            metrics=self.metrics,
         )
-        self.agent_roles["system_coordinator"] = AgentRole.COORDINATOR
-
-        # 业务分析师
-        self.agents["business_analyst"] = AssistantAgent(
-            name="BusinessAnalyst",
-            model_client=create_model_client(temperature=0.4),
-            system_message="""你是业务分析师。
-            专长：
-            - 业务需求分析
-            - 流程设计和优化
-            - 用户故事编写
-            - 业务规则定义
-            - ROI分析
-
-            只在被分配业务分析任务时发言。""",
+        # 轮流发言的企业团队：构建一次，每个请求借出前重置
+        self.teams = TeamPool(
+            self._build_selector_team,
+            size=2,
+            name="enterprise",
+            metrics=self.metrics,
         )
-        self.agent_roles["business_analyst"] = AgentRole.SPECIALIST
-
-        # 技术架构师
-        self.agents["tech_architect"] = AssistantAgent(
-            name="TechArchitect",
-            model_client=create_model_client(temperature=0.3),
-            system_message="""你是技术架构师。
-            专长：
-            - 系统架构设计
-            - 技术选型
-            - 性能优化
-            - 安全架构
-            - 可扩展性设计
-
-            只在被分配技术架构任务时发言。""",
-        )
-        self.agent_roles["tech_architect"] = AgentRole.SPECIALIST
-
-        # 项目经理
-        self.agents["project_manager"] = AssistantAgent(
-            name="ProjectManager",
-            model_client=create_model_client(temperature=0.3),
-            system_message="""你是项目经理。
-            专长：
-            - 项目计划制定
-            - 资源协调
-            - 风险管理
-            - 进度跟踪
-            - 团队协作
-
-            只在被分配项目管理任务时发言。""",
+
+    def _model_client(self, temperature: float) -> SingleFlightModelClient:
+        """创建合并在途请求的模型客户端"""
+        return SingleFlightModelClient(
+            create_model_client(temperature=temperature),
+            self.flights,
         )
-        self.agent_roles["project_manager"] = AgentRole.EXECUTOR
-
-        # 质量保证
-        self.agents["qa_specialist"] = AssistantAgent(
-            name="QASpecialist",
-            model_client=create_model_client(temperature=0.2),
-            system_message="""你是质量保证专家。
-            专长：
-            - 质量标准制定
-            - 测试策略设计
-            - 代码审查
-            - 质量控制
-            - 持续改进
-
-            只在被分配质量保证任务时发言。""",
+
+    def agent_factory(self, key: str) -> Callable[[], AssistantAgent]:
+        """按定义构建某个角色智能体的工厂"""
+        return functools.partial(self._build_agent, self.specs[key])
+
+    def _build_agent(self, spec: AgentSpec) -> AssistantAgent:
+        """按定义构建智能体"""
+        self.logger.debug(f"构建智能体: {spec.name}")
+        tools = [
+            FunctionTool(getattr(self, method), description=description)
+            for method, description in spec.tools
+        ]
+        return AssistantAgent(
+            name=spec.name,
+            model_client=self._model_client(spec.temperature),
+            model_client_stream=streaming_enabled(),
+            tools=tools or None,
+            system_message=spec.system_message,
+            model_context=create_model_context(spec.name, metrics=self.metrics),
         )
-        self.agent_roles["qa_specialist"] = AgentRole.REVIEWER
-
-        # 系统监控员
-        self.agents["system_monitor"] = AssistantAgent(
-            name="SystemMonitor",
-            model_client=create_model_client(temperature=0.1),
-            tools=[
-                FunctionTool(self._get_system_metrics, description="获取系统指标"),
-                FunctionTool(
-                    self._check_agent_health,
-                    description="检查智能体健康状态",
-                ),
-            ],
-            system_message="""你是系统监控员。
-            职责：
-            - 监控系统性能
-            - 跟踪智能体状态
-            - 检测异常情况
-            - 生成监控报告
-            - 触发告警机制
-
-            持续监控系统状态并及时报告。""",
+
+    def _build_selector_team(self) -> SelectorGroupChat:
+        """由模型选择发言者的企业团队；成员独立构建，不与其他团队共享"""
+        return SelectorGroupChat(
+            participants=[self._build_agent(spec) for spec in self.specs.values()],
+            model_client=self._model_client(0.2),
+            # 协调员宣布完成，消息数、运行时长超限，或到达当前请求的截止时间时结束
+            termination_condition=TerminationEngine(
+                ["系统协调完成"],
+                max_messages=40,
+                timeout=600,
+            )
+            | DeadlineTermination(),
         )
-        self.agent_roles["system_monitor"] = AgentRole.MONITOR
 
     def _create_task(
         self,
@@ -347,7 +442,9 @@ class EnterpriseAgentSystem:
         import random
 
         metrics = {
-            "active_agents": len(self.agents),
+            "active_agents": sum(
+                role["replicas"] for role in self.pool.stats()["roles"].values()
+            ),
             "pending_tasks": len(self.task_manager.get_pending_tasks()),
             "total_tasks": len(self.task_manager.tasks),
             "system_load": round(random.uniform(0.1, 0.8), 2),
@@ -362,29 +459,80 @@ class EnterpriseAgentSystem:
         import random
 
         health_status = {}
-        for agent_name in self.agents:
+        for agent_name, pool_stats in self.pool.stats()["roles"].items():
             health_status[agent_name] = {
                 "status": "healthy" if random.random() > 0.1 else "warning",
                 "last_active": datetime.now().isoformat(),
                 "role": self.agent_roles[agent_name].value,
+                "replicas": pool_stats["replicas"],
             }
 
         return json.dumps(health_status, ensure_ascii=False, indent=2)
 
-    async def process_enterprise_request(self, request: str) -> None:
-        """处理企业级请求"""
+    @asynccontextmanager
+    async def _fanout_team(
+        self,
+        branch_timeout: float | None = 90,
+    ) -> AsyncIterator[FanOutTeam]:
+        """从池中借出专家和协调员组成并行咨询团队，结束后归还
+
+        专家同时分析请求，协调员汇总；监控员不参与请求处理。
+        """
+        keys = [
+            key
+            for key, role in self.agent_roles.items()
+            if role not in (AgentRole.COORDINATOR, AgentRole.MONITOR)
+        ]
+        async with AsyncExitStack() as stack:
+            # 所有请求按相同顺序借出，不会互相等待对方手里的副本
+            specialists = [
+                await stack.enter_async_context(self.pool.lease(key)) for key in keys
+            ]
+            coordinator = await stack.enter_async_context(
+                self.pool.lease("system_coordinator"),
+            )
+            yield FanOutTeam(
+                specialists,
+                coordinator=coordinator,
+                branch_timeout=branch_timeout,
+                metrics=self.metrics,
+            )
+
+    async def process_enterprise_request(
+        self,
+        request: str,
+        parallel: bool = True,
+        deadline: datetime | None = None,
+    ) -> TaskResult:
+        """处理企业级请求
+
+        parallel 为 True 时各专家并行分析后由协调员汇总，否则由
+        从团队池借出的 SelectorGroupChat 轮流选择发言者。给出 deadline 时
+        到达截止时间即结束对话，超过宽限期仍未结束则取消在途调用并抛出
+        DeadlineExceededError，被取消的团队不会放回池中。
+        """
         print(f"\n🏢 处理企业请求: {request}")
         print("-" * 60)
 
-        # 创建企业团队
-        enterprise_team = SelectorGroupChat(
-            participants=list(self.agents.values()),
-            model_client=create_model_client(temperature=0.2),
-            termination_condition=TextMentionTermination("系统协调完成"),
-        )
+        async def run(team: Any) -> TaskResult:
+            if deadline is None:
+                return await run_task(team, request, metrics=self.metrics)
+            return await run_with_deadline(
+                team,
+                request,
+                deadline,
+                metrics=self.metrics,
+            )
 
-        # 执行请求处理
-        result = await enterprise_team.run(task=request)
+        # 创建企业团队并执行请求处理
+        if parallel:
+            async with self._fanout_team() as fanout_team:
+                result = await run(fanout_team)
+            print(fanout_team.report())
+        else:
+            async with self.teams.lease() as enterprise_team:
+                result = await run(enterprise_team)
+            print(self.teams.report())
 
         print("🏢 企业请求处理过程:")
         for i, message in enumerate(result.messages, 1):
@@ -396,8 +544,63 @@ class EnterpriseAgentSystem:
             )
             print(f"   {i}. {sender}: {content}")
 
+        timer_stats = self.metrics.get_summary()["timer_stats"]
+        first_token_wait = {
+            name.removeprefix("stream.first_token_wait."): stats["avg"]
+            for name, stats in timer_stats.items()
+            if name.startswith("stream.first_token_wait.")
+        }
+        if first_token_wait:
+            print("⏱️ 首token等待 (平均，含发言者选择):")
+            for agent_name, latency in first_token_wait.items():
+                print(f"   {agent_name}: {latency:.2f}秒")
+
+        saved = self.metrics.get_summary()["counters"].get("compaction.tokens_saved")
+        if saved:
+            print(f"🗜️ 对话压缩节省历史 token: {saved:.0f}")
+
         return result
 
+    async def process_task(self, task_id: str, parallel: bool = True) -> Task:
+        """按任务的截止时间执行任务，并把状态和对话记录写回任务管理器
+
+        到达截止时间时任务记为 TIMED_OUT，保留截止前产生的对话记录；其他
+        错误记为 FAILED 后照常抛出，任务不会一直停在 IN_PROGRESS。
+        """
+        task = self.task_manager.get_task(task_id)
+        if task is None:
+            raise KeyError(f"任务不存在: {task_id}")
+        self.task_manager.update_task_status(task_id, TaskStatus.IN_PROGRESS)
+        request = f"{task.title}: {task.description}"
+        try:
+            result = await self.process_enterprise_request(
+                request,
+                parallel=parallel,
+                deadline=task.deadline,
+            )
+        except DeadlineExceededError as e:
+            self.logger.warning(f"任务 {task_id} 超过截止时间，已取消: {e}")
+            self.task_manager.record_result(task_id, TaskStatus.TIMED_OUT, e.result)
+            return task
+        except Exception as e:
+            self.logger.exception(f"任务 {task_id} 执行失败")
+            # 异常带有部分结果时保留，否则至少记录任务本身
+            partial = getattr(e, "result", None)
+            if not isinstance(partial, TaskResult):
+                partial = TaskResult(
+                    messages=[TextMessage(content=request, source="user")],
+                    stop_reason=None,
+                )
+            partial.stop_reason = f"{type(e).__name__}: {e}"
+            self.task_manager.record_result(task_id, TaskStatus.FAILED, partial)
+            raise
+
+        status = (
+            TaskStatus.TIMED_OUT if deadline_reached(result) else TaskStatus.COMPLETED
+        )
+        self.task_manager.record_result(task_id, status, result)
+        return task
+
 
 async def demo_enterprise_system_setup() -> None:
     """演示企业系统设置"""
@@ -407,11 +610,10 @@ async def demo_enterprise_system_setup() -> None:
     system = EnterpriseAgentSystem()
 
     print("✅ 企业智能体系统初始化完成")
-    print(f"   智能体数量: {len(system.agents)}")
+    print(f"   智能体角色: {len(system.specs)}")
 
-    for name, agent in system.agents.items():
-        role = system.agent_roles[name].value
-        print(f"   - {agent.name} ({role})")
+    for spec in system.specs.values():
+        print(f"   - {spec.name} ({spec.role.value})")
 
     # 显示系统指标
     metrics = system._get_system_metrics()
@@ -419,6 +621,45 @@ async def demo_enterprise_system_setup() -> None:
     print(f"   {metrics}")
 
 
+async def demo_lazy_construction(rounds: int = 5) -> None:
+    """演示按需构建智能体的冷启动开销"""
+    print("\n🚀 Lazy Construction Demo")
+    print("-" * 50)
+
+    async def lease(system: EnterpriseAgentSystem, *keys: str) -> None:
+        for key in keys:
+            async with system.pool.lease(key):
+                pass
+
+    async def measure(*keys: str) -> float:
+        started_at = time.perf_counter()
+        for _ in range(rounds):
+            await lease(EnterpriseAgentSystem(), *keys)
+        return (time.perf_counter() - started_at) / rounds * 1000
+
+    # 进程内第一次构建还包含客户端注册、工具模式生成等一次性开销
+    started_at = time.perf_counter()
+    await lease(EnterpriseAgentSystem(), *AGENT_SPECS)
+    first_build = (time.perf_counter() - started_at) * 1000
+
+    eager = await measure(*AGENT_SPECS)
+    lazy_init = await measure()
+    one_agent = await measure("system_coordinator")
+
+    print(f"📊 进程内首次构建全部智能体: {first_build:.2f}ms")
+    print(f"📊 每个系统实例的构建耗时 (平均 {rounds} 次):")
+    print(f"   全部构建 (原先的行为): {eager:.3f}ms")
+    print(f"   仅初始化系统: {lazy_init:.3f}ms")
+    print(f"   只使用协调员: {one_agent:.3f}ms")
+
+    system = EnterpriseAgentSystem()
+    system.task_manager.create_task("示例任务", "只用到任务管理器")
+    built = [
+        key for key, role in system.pool.stats()["roles"].items() if role["replicas"]
+    ]
+    print(f"   任务管理场景构建的智能体: {built or '无'}")
+
+
 async def demo_task_management() -> None:
     """演示任务管理"""
     print("\n📋 Task Management Demo")
@@ -484,6 +725,78 @@ async def demo_enterprise_workflow() -> None:
         print(f"\n🎯 企业请求 {i}:")
         await system.process_enterprise_request(request)
 
+    # 后续请求复用已重置的副本，不再重新构建，也不继承上一个请求的对话
+    print()
+    print(system.pool.report())
+
+
+async def demo_agent_pool() -> None:
+    """演示智能体副本池"""
+    print("\n🧰 Agent Pool Demo")
+    print("-" * 50)
+
+    # 每个角色最多两个副本，空闲 1 秒后淘汰
+    system = EnterpriseAgentSystem(max_replicas=2, idle_ttl=1.0)
+    questions = [
+        "评估单体应用拆分为微服务的技术风险",
+        "设计支持千万级用户的缓存架构",
+        "比较消息队列选型: Kafka 与 RabbitMQ",
+        "规划数据库读写分离方案",
+    ]
+
+    async def ask(question: str) -> str:
+        # 同一角色的并发请求各自借出独立副本，副本用尽时排队等待
+        async with system.pool.lease("tech_architect") as architect:
+            result = await run_task(architect, question, render=False)
+            return result.messages[-1].to_text()
+
+    for round_name in ("第一轮", "第二轮"):
+        answers = await asyncio.gather(*(ask(q) for q in questions))
+        print(f"🔄 {round_name}: {len(answers)} 个并发请求完成")
+        print(f"   {system.pool.report()}")
+
+    await asyncio.sleep(1.1)
+    evicted = await system.pool.evict_idle()
+    print(f"🧹 淘汰空闲副本: {evicted} 个")
+
+
+async def demo_task_deadlines() -> None:
+    """演示按截止时间执行任务"""
+    print("\n⏰ Task Deadline Demo")
+    print("-" * 50)
+
+    system = EnterpriseAgentSystem()
+    now = datetime.now()
+    tasks = [
+        system.task_manager.create_task(
+            "紧急故障复盘",
+            "分析昨晚支付服务中断的原因并给出改进措施",
+            Priority.CRITICAL,
+            deadline=now + timedelta(seconds=5),
+        ),
+        system.task_manager.create_task(
+            "季度架构评审",
+            "评审现有系统架构并提出下季度的改进建议",
+            Priority.MEDIUM,
+            deadline=now + timedelta(minutes=10),
+        ),
+    ]
+
+    for task in tasks:
+        # 轮流发言的团队在截止时间到达后的下一次终止检查时结束
+        await system.process_task(task.id, parallel=False)
+
+    print("\n📋 任务结果:")
+    for task in tasks:
+        transcript = task.metadata.get("transcript", [])
+        print(
+            f"   {task.title}: {task.status.value}, "
+            f"对话记录 {len(transcript)} 条, "
+            f"结束原因: {task.metadata.get('stop_reason')}",
+        )
+    cancelled = system.metrics.get_summary()["counters"].get("deadline.cancelled", 0)
+    print(f"   强制取消的运行: {cancelled:.0f}")
+
 
 async def demo_system_monitoring() -> None:
     """演示系统监控"""
@@ -492,16 +805,16 @@ async def demo_system_monitoring() -> None:
 
     system = EnterpriseAgentSystem()
 
-    # 创建监控团队
-    monitor_team = RoundRobinGroupChat(
-        [system.agents["system_monitor"]],
-        termination_condition=MaxMessageTermination(3),
-    )
-
-    # 执行系统监控
-    result = await monitor_team.run(
-        task="执行系统健康检查，获取性能指标，并生成监控报告。",
-    )
+    # 借出监控员组成监控团队，执行系统监控
+    async with system.pool.lease("system_monitor") as monitor:
+        monitor_team = RoundRobinGroupChat(
+            [monitor],
+            termination_condition=MaxMessageTermination(3),
+        )
+        result = await run_task(
+            monitor_team,
+            "执行系统健康检查，获取性能指标，并生成监控报告。",
+        )
 
     print("📊 系统监控报告:")
     for message in result.messages:
@@ -527,40 +840,42 @@ async def demo_load_balancing() -> None:
 
     print("🔄 处理并发请求:")
 
-    # 创建多个专业团队
-    teams = {
-        "business_team": [system.agents["business_analyst"]],
-        "tech_team": [system.agents["tech_architect"]],
-        "project_team": [system.agents["project_manager"]],
-        "qa_team": [system.agents["qa_specialist"]],
-    }
-
-    # 分配请求到不同团队
-    team_assignments = [
-        ("business_team", concurrent_requests[0]),
-        ("tech_team", concurrent_requests[1]),
-        ("project_team", concurrent_requests[2]),
-        ("tech_team", concurrent_requests[3]),
-        ("qa_team", concurrent_requests[4]),
+    # 每个副本是独立构建的智能体，并发请求之间不共享对话历史
+    dispatcher = Dispatcher(
+        {
+            key: system.agent_factory(key)
+            for key in (
+                "business_analyst",
+                "tech_architect",
+                "project_manager",
+                "qa_specialist",
+            )
+        },
+        replicas={"tech_architect": 2},
+        metrics=system.metrics,
+    )
+
+    # 分配请求到不同角色
+    assignments = [
+        ("business_analyst", concurrent_requests[0]),
+        ("tech_architect", concurrent_requests[1]),
+        ("project_manager", concurrent_requests[2]),
+        ("tech_architect", concurrent_requests[3]),
+        ("qa_specialist", concurrent_requests[4]),
     ]
 
-    # 并发处理请求
-    tasks = []
-    for team_name, request in team_assignments:
-        team = RoundRobinGroupChat(
-            teams[team_name],
-            termination_condition=MaxMessageTermination(2),
-        )
-        task = team.run(task=request)
-        tasks.append((team_name, request, task))
+    # 并发处理请求，结果按输入顺序返回
+    for item in await dispatcher.run(assignments):
+        status = "✅" if item.ok else "❌"
+        print(f"   {status} {item.replica}: {item.task}")
+        print(f"      结果: {item.content[:100]}...")
+
+    print()
+    print(dispatcher.report())
 
-    # 等待所有任务完成
-    for team_name, request, task in tasks:
-        result = await task
-        print(f"   ✅ {team_name}: {request}")
-        if result.messages:
-            content = result.messages[-1].content[:100] + "..."
-            print(f"      结果: {content}")
+    print("\n📊 请求合并统计:")
+    print(f"   上游调用: {system.flights.upstream_calls}")
+    print(f"   合并请求: {system.flights.coalesced}")
 
 
 async def main() -> None:
@@ -570,8 +885,11 @@ async def main() -> None:
 
     try:
         await demo_enterprise_system_setup()
+        await demo_lazy_construction()
         await demo_task_management()
         await demo_enterprise_workflow()
+        await demo_agent_pool()
+        await demo_task_deadlines()
         await demo_system_monitoring()
         await demo_load_balancing()
 
@@ -582,7 +900,21 @@ async def main() -> None:
         print("   • 角色专业化提高处理效率")
         print("   • 系统监控保障服务质量")
         print("   • 负载均衡支持高并发处理")
+        print("   • 请求分派给在途请求最少的副本，按利用率确定副本数")
+        print("   • 并发请求从池中借出独立副本，结束后重置归还、空闲时淘汰")
         print("   • 企业级工作流满足业务需求")
+        print("   • 智能体按声明式定义在首次使用时构建")
+        print("   • 专家并行分析请求，慢的分支超时后被放弃")
+        print("   • 任务按截止时间结束，超时任务保留已产生的对话记录")
+
+        stats = get_registry().pool_stats()
+        print("\n🔌 连接池统计:")
+        print(f"   客户端请求/创建: {stats.clients_requested}/{stats.clients_created}")
+        print(f"   HTTP请求数: {stats.requests}")
+        print(f"   新建连接: {stats.connections_opened}")
+        print(f"   TLS握手: {stats.tls_handshakes}")
+        print(f"   当前连接: {stats.open_connections}")
+        print(f"   连接复用率: {stats.reuse_ratio:.1%}")
 
     except Exception as e:
         print(f"❌ 演示失败: {e}")
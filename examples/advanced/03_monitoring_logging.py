@@ -20,17 +20,20 @@ import os
 import time
 import traceback
 from collections.abc import Callable
-from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
 from typing import Any
 
 from autogen_agentchat.agents import AssistantAgent
-from autogen_core.models import ModelInfo
-from autogen_ext.models.openai import OpenAIChatCompletionClient
 from dotenv import load_dotenv
 
+from autogen_learning import (
+    MetricsCollector,
+    create_model_client,
+    streaming_enabled,
+)
+
 load_dotenv()
 
 
@@ -44,15 +47,6 @@ class LogLevel(Enum):
     CRITICAL = "CRITICAL"
 
 
-class MetricType(Enum):
-    """指标类型"""
-
-    COUNTER = "counter"
-    GAUGE = "gauge"
-    HISTOGRAM = "histogram"
-    TIMER = "timer"
-
-
 @dataclass
 class LogEntry:
     """日志条目"""
@@ -82,27 +76,6 @@ class LogEntry:
         }
 
 
-@dataclass
-class Metric:
-    """指标数据"""
-
-    name: str
-    type: MetricType
-    value: float
-    timestamp: datetime
-    tags: dict[str, str] = field(default_factory=dict)
-
-    def to_dict(self) -> dict[str, Any]:
-        """转换为字典"""
-        return {
-            "name": self.name,
-            "type": self.type.value,
-            "value": self.value,
-            "timestamp": self.timestamp.isoformat(),
-            "tags": self.tags,
-        }
-
-
 class StructuredLogger:
     """结构化日志记录器"""
 
@@ -198,100 +171,6 @@ class StructuredLogger:
         return logs
 
 
-class MetricsCollector:
-    """指标收集器"""
-
-    def __init__(self):
-        self.metrics: list[Metric] = []
-        self.counters: dict[str, float] = {}
-        self.gauges: dict[str, float] = {}
-        self.timers: dict[str, list[float]] = {}
-
-    def counter(self, name: str, value: float = 1.0, **tags) -> None:
-        """计数器指标"""
-        self.counters[name] = self.counters.get(name, 0) + value
-
-        metric = Metric(
-            name=name,
-            type=MetricType.COUNTER,
-            value=self.counters[name],
-            timestamp=datetime.now(),
-            tags=tags,
-        )
-        self.metrics.append(metric)
-
-    def gauge(self, name: str, value: float, **tags) -> None:
-        """仪表盘指标"""
-        self.gauges[name] = value
-
-        metric = Metric(
-            name=name,
-            type=MetricType.GAUGE,
-            value=value,
-            timestamp=datetime.now(),
-            tags=tags,
-        )
-        self.metrics.append(metric)
-
-    def timer(self, name: str, value: float, **tags) -> None:
-        """计时器指标"""
-        if name not in self.timers:
-            self.timers[name] = []
-        self.timers[name].append(value)
-
-        metric = Metric(
-            name=name,
-            type=MetricType.TIMER,
-            value=value,
-            timestamp=datetime.now(),
-            tags=tags,
-        )
-        self.metrics.append(metric)
-
-    @asynccontextmanager
-    async def time_operation(self, name: str, **tags):
-        """计时上下文管理器"""
-        start_time = time.time()
-        try:
-            yield
-        finally:
-            duration = time.time() - start_time
-            self.timer(name, duration, **tags)
-
-    def get_metrics(
-        self,
-        metric_type: MetricType | None = None,
-        since: datetime | None = None,
-    ) -> list[Metric]:
-        """获取指标"""
-        metrics = self.metrics
-
-        if metric_type:
-            metrics = [m for m in metrics if m.type == metric_type]
-
-        if since:
-            metrics = [m for m in metrics if m.timestamp >= since]
-
-        return metrics
-
-    def get_summary(self) -> dict[str, Any]:
-        """获取指标摘要"""
-        return {
-            "total_metrics": len(self.metrics),
-            "counters": dict(self.counters),
-            "gauges": dict(self.gauges),
-            "timer_stats": {
-                name: {
-                    "count": len(values),
-                    "avg": sum(values) / len(values),
-                    "min": min(values),
-                    "max": max(values),
-                }
-                for name, values in self.timers.items()
-            },
-        }
-
-
 class PerformanceMonitor:
     """性能监控器"""
 
@@ -429,27 +308,6 @@ class AlertManager:
         return triggered_alerts
 
 
-def create_model_client(temperature: float = 0.3) -> OpenAIChatCompletionClient:
-    """创建模型客户端"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-
-    return OpenAIChatCompletionClient(
-        model=os.getenv("OPENAI_MODEL", "deepseek-chat"),
-        api_key=api_key,
-        base_url=os.getenv("OPENAI_API_BASE", "https://api.deepseek.com/v1"),
-        temperature=temperature,
-        model_info=ModelInfo(
-            family="openai",
-            vision=False,
-            function_calling=True,
-            json_output=True,
-            structured_output=False,
-        ),
-    )
-
-
 class MonitoredAgent:
     """带监控的智能体包装器"""
 
@@ -613,6 +471,7 @@ async def demo_performance_monitoring() -> None:
     base_agent = AssistantAgent(
         name="TestAgent",
         model_client=create_model_client(),
+        model_client_stream=streaming_enabled(),
         system_message="你是测试智能体。",
     )
 
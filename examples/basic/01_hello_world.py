@@ -19,14 +19,15 @@ import sys
 # 检查必要的包是否安装
 try:
     from autogen_agentchat.agents import AssistantAgent
-    from autogen_core.models import ModelInfo
-    from autogen_ext.models.openai import OpenAIChatCompletionClient
     from dotenv import load_dotenv
+
+    from autogen_learning import get_registry, run_task, streaming_enabled
 except ImportError as e:
     print(f"❌ 缺少必要的包: {e}")
     print(
         "💡 请先安装: pip install autogen-agentchat autogen-ext[openai] python-dotenv",
     )
+    print("💡 并在项目根目录运行 (nix develop 会自动设置 PYTHONPATH)")
     sys.exit(1)
 
 # Load environment variables
@@ -59,32 +60,27 @@ async def main() -> None:
     )
 
     try:
-        # Create model client (compatible with DeepSeek)
-        model_client = OpenAIChatCompletionClient(
+        # Get a pooled model client from the shared registry (DeepSeek compatible)
+        model_client = get_registry().get(
             model=model_name,
             api_key=api_key,
             base_url=api_base,  # DeepSeek API endpoint
-            model_info=ModelInfo(
-                family="openai",
-                vision=False,
-                function_calling=True,
-                json_output=True,
-                structured_output=False,
-            ),
         )
 
         # Create an assistant agent
         assistant = AssistantAgent(
             name="HelloWorldAssistant",
             model_client=model_client,
+            model_client_stream=streaming_enabled(),
             system_message="你是一个友好的AI助手，帮助用户学习AutoGen。"
             "请用中文回答，并且要简洁明了。",
         )
 
         # Simple task execution
         print("\n🚀 运行第一个任务...")
-        result = await assistant.run(
-            task="请说'Hello World!'并用一句话解释什么是AutoGen。",
+        result = await run_task(
+            assistant,
+            "请说'Hello World!'并用一句话解释什么是AutoGen。",
         )
 
         print("✅ 助手回复:")
@@ -92,7 +88,7 @@ async def main() -> None:
 
         # Another task to show conversation capability
         print("\n🔄 运行第二个任务...")
-        result2 = await assistant.run(task="AutoGen在多智能体系统方面有什么特别之处？")
+        result2 = await run_task(assistant, "AutoGen在多智能体系统方面有什么特别之处？")
 
         print("✅ 助手回复:")
         print(f"   {result2.messages[-1].content}")
@@ -16,10 +16,16 @@ import asyncio
 import os
 
 from autogen_agentchat.agents import AssistantAgent
-from autogen_core.models import ModelInfo
-from autogen_ext.models.openai import OpenAIChatCompletionClient
 from dotenv import load_dotenv
 
+from autogen_learning import (
+    ContextBudgeter,
+    PooledModelClient,
+    create_model_client,
+    run_task,
+    streaming_enabled,
+)
+
 load_dotenv()
 
 
@@ -35,23 +41,13 @@ class AgentDemo:
         self,
         temperature: float = 0.7,
         max_tokens: int = 1000,
-    ) -> OpenAIChatCompletionClient:
-        """Create a configured DeepSeek-compatible model client"""
-        return OpenAIChatCompletionClient(
-            model=os.getenv("OPENAI_MODEL", "deepseek-chat"),
-            api_key=self.api_key,
-            base_url=os.getenv("OPENAI_API_BASE", "https://api.deepseek.com/v1"),
-            # Model parameters for controlling behavior
+    ) -> PooledModelClient:
+        """Get a DeepSeek-compatible model client from the shared registry"""
+        # Clients share one connection pool; these parameters are applied per call
+        return create_model_client(
             temperature=temperature,  # Creativity level (0.0-1.0)
             max_tokens=max_tokens,  # Maximum response length
             top_p=0.9,  # Nucleus sampling parameter
-            model_info=ModelInfo(
-                family="openai",
-                vision=False,
-                function_calling=True,
-                json_output=True,
-                structured_output=False,
-            ),
         )
 
     async def demo_basic_assistant(self) -> None:
@@ -65,6 +61,7 @@ class AgentDemo:
         coding_assistant = AssistantAgent(
             name="CodingMentor",
             model_client=model_client,
+            model_client_stream=streaming_enabled(),
             system_message="""你是一位专业的Python编程导师。
             你的职责是:
             1. 清晰地解释编程概念
@@ -77,7 +74,7 @@ class AgentDemo:
 
         # Ask a coding question
         task = "解释Python中列表推导式和生成器表达式的区别，并提供示例。"
-        result = await coding_assistant.run(task=task)
+        result = await run_task(coding_assistant, task)
 
         print(f"🤖 {coding_assistant.name} 说:")
         print(f"   {result.messages[-1].content[:200]}...")
@@ -94,6 +91,7 @@ class AgentDemo:
         creative_writer = AssistantAgent(
             name="CreativeWriter",
             model_client=model_client,
+            model_client_stream=streaming_enabled(),
             system_message="""你是一位富有创意的写作助手。
             你擅长:
             - 创作引人入胜的故事
@@ -105,7 +103,7 @@ class AgentDemo:
         )
 
         task = "写一个关于AI发现自己能够做梦的科幻故事开头。"
-        result = await creative_writer.run(task=task)
+        result = await run_task(creative_writer, task)
 
         print(f"✨ {creative_writer.name} 创作:")
         print(f"   {result.messages[-1].content[:300]}...")
@@ -120,6 +118,7 @@ class AgentDemo:
         memory_assistant = AssistantAgent(
             name="MemoryKeeper",
             model_client=model_client,
+            model_client_stream=streaming_enabled(),
             system_message="""你是一个拥有出色记忆力的助手。
             你能记住所有之前的对话，并可以引用它们。
             总是确认你从之前的互动中记住了什么。""",
@@ -127,12 +126,15 @@ class AgentDemo:
 
         # First interaction
         print("💬 第一次对话:")
-        result1 = await memory_assistant.run(task="我的名字是Alice，我喜欢Python编程。")
+        result1 = await run_task(
+            memory_assistant,
+            "我的名字是Alice，我喜欢Python编程。",
+        )
         print(f"   助手: {result1.messages[-1].content}")
 
         # Second interaction - testing memory
         print("\n💬 第二次对话 (测试记忆):")
-        result2 = await memory_assistant.run(task="我的名字是什么？我喜欢什么？")
+        result2 = await run_task(memory_assistant, "我的名字是什么？我喜欢什么？")
         print(f"   助手: {result2.messages[-1].content}")
 
         # Show conversation history
@@ -143,23 +145,27 @@ class AgentDemo:
         print("\n⚠️  Error Handling Demo")
         print("-" * 40)
 
-        model_client = self.create_model_client()
+        # 小预算便于演示：超长输入在发送前按 token 数截断
+        budgeter = ContextBudgeter(max_prompt_tokens=600)
+        model_client = create_model_client(budgeter=budgeter)
 
         assistant = AssistantAgent(
             name="RobustAssistant",
             model_client=model_client,
+            model_client_stream=streaming_enabled(),
             system_message="你是一个优雅处理错误的助手。",
         )
 
         try:
             # This should work fine
-            result = await assistant.run(task="2 + 2 等于多少？")
+            result = await run_task(assistant, "2 + 2 等于多少？")
             print(f"✅ 正常请求: {result.messages[-1].content}")
 
             # Test with very long input (might hit token limits)
             long_task = "解释这个: " + "非常 " * 1000 + "关于AutoGen的长问题"
-            result = await assistant.run(task=long_task)
+            result = await run_task(assistant, long_task)
             print(f"✅ 长请求处理: 回复长度 {len(result.messages[-1].content)}")
+            print(f"✂️  上下文预算节省了 {budgeter.tokens_saved} 个 token")
 
         except Exception as e:
             print(f"❌ 捕获错误: {e}")
@@ -12,37 +12,15 @@ AutoGen 学习项目 - 示例3: 用户代理智能体
 """
 
 import asyncio
-import os
 
 from autogen_agentchat.agents import AssistantAgent, UserProxyAgent
 from autogen_agentchat.conditions import MaxMessageTermination
 from autogen_agentchat.teams import RoundRobinGroupChat
-from autogen_core.models import ModelInfo
-from autogen_ext.models.openai import OpenAIChatCompletionClient
 from dotenv import load_dotenv
 
-load_dotenv()
-
+from autogen_learning import create_model_client, run_task, streaming_enabled
 
-def create_model_client() -> OpenAIChatCompletionClient:
-    """Create a DeepSeek-compatible model client"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-
-    return OpenAIChatCompletionClient(
-        model=os.getenv("OPENAI_MODEL", "deepseek-chat"),
-        api_key=api_key,
-        base_url=os.getenv("OPENAI_API_BASE", "https://api.deepseek.com/v1"),
-        temperature=0.3,
-        model_info=ModelInfo(
-            family="openai",
-            vision=False,
-            function_calling=True,
-            json_output=True,
-            structured_output=False,
-        ),
-    )
+load_dotenv()
 
 
 async def demo_basic_user_proxy() -> None:
@@ -54,6 +32,7 @@ async def demo_basic_user_proxy() -> None:
     assistant = AssistantAgent(
         name="PythonHelper",
         model_client=create_model_client(),
+        model_client_stream=streaming_enabled(),
         system_message="""你是一个Python编程助手。
         当用户需要代码时，提供完整的、可运行的Python代码。
         用中文解释你的代码逻辑。""",
@@ -71,7 +50,7 @@ async def demo_basic_user_proxy() -> None:
         [assistant, user_proxy],
         termination_condition=termination,
     )
-    result = await team.run(task=task)
+    result = await run_task(team, task)
 
     print("📝 对话结果:")
     for i, message in enumerate(result.messages[-3:], 1):
@@ -109,6 +88,7 @@ async def demo_custom_input_function() -> None:
     assistant = AssistantAgent(
         name="InteractiveHelper",
         model_client=create_model_client(),
+        model_client_stream=streaming_enabled(),
         system_message="""你是一个交互式助手。
         你会提出问题来更好地理解用户需求。
         当你需要更多信息时，明确询问。
@@ -128,7 +108,7 @@ async def demo_custom_input_function() -> None:
         [assistant, user_proxy],
         termination_condition=termination,
     )
-    result = await team.run(task=task)
+    result = await run_task(team, task)
 
     print("\n💬 交互式对话摘要:")
     conversation_count = 0
@@ -148,6 +128,7 @@ async def demo_collaborative_workflow() -> None:
     planner = AssistantAgent(
         name="TaskPlanner",
         model_client=create_model_client(),
+        model_client_stream=streaming_enabled(),
         system_message="""你是一个任务规划专家。
         你的职责是：
         1. 分析用户需求
@@ -169,7 +150,7 @@ async def demo_collaborative_workflow() -> None:
         [planner, project_manager],
         termination_condition=termination,
     )
-    result = await team.run(task=task)
+    result = await run_task(team, task)
 
     print("📊 协作工作流结果:")
     print(f"   总轮次: {len(result.messages)}")
@@ -187,6 +168,7 @@ async def demo_role_based_interaction() -> None:
     teacher = AssistantAgent(
         name="PythonTeacher",
         model_client=create_model_client(),
+        model_client_stream=streaming_enabled(),
         system_message="""你是一位耐心的Python编程老师。
         你的教学方式：
         1. 先解释概念
@@ -223,7 +205,7 @@ async def demo_role_based_interaction() -> None:
 
     termination = MaxMessageTermination(6)
     team = RoundRobinGroupChat([teacher, student], termination_condition=termination)
-    result = await team.run(task=task)
+    result = await run_task(team, task)
 
     print("\n📚 教学互动总结:")
     print(f"   教学轮次: {len(result.messages)}")
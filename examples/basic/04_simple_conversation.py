@@ -10,40 +10,25 @@ AutoGen 学习项目 - 示例4: 简单对话系统
 - 终止条件设置
 - 不同的对话场景
 - 对话控制和管理
+- 长对话的滚动摘要压缩 (AUTOGEN_COMPACTION=1)
 """
 
 import asyncio
-import os
 
 from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.conditions import MaxMessageTermination, TextMentionTermination
+from autogen_agentchat.conditions import MaxMessageTermination
 from autogen_agentchat.teams import RoundRobinGroupChat
-from autogen_core.models import ModelInfo
-from autogen_ext.models.openai import OpenAIChatCompletionClient
 from dotenv import load_dotenv
 
-load_dotenv()
-
+from autogen_learning import (
+    TerminationEngine,
+    create_model_client,
+    create_model_context,
+    run_task,
+    streaming_enabled,
+)
 
-def create_model_client(temperature: float = 0.7) -> OpenAIChatCompletionClient:
-    """Create a DeepSeek-compatible model client"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-
-    return OpenAIChatCompletionClient(
-        model=os.getenv("OPENAI_MODEL", "deepseek-chat"),
-        api_key=api_key,
-        base_url=os.getenv("OPENAI_API_BASE", "https://api.deepseek.com/v1"),
-        temperature=temperature,
-        model_info=ModelInfo(
-            family="openai",
-            vision=False,
-            function_calling=True,
-            json_output=True,
-            structured_output=False,
-        ),
-    )
+load_dotenv()
 
 
 async def demo_teacher_student_conversation() -> None:
@@ -55,6 +40,7 @@ async def demo_teacher_student_conversation() -> None:
     teacher = AssistantAgent(
         name="PythonTeacher",
         model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
         system_message="""你是一位耐心的Python编程老师。
         你的特点：
         - 用简单易懂的语言解释概念
@@ -69,6 +55,7 @@ async def demo_teacher_student_conversation() -> None:
     student = AssistantAgent(
         name="Student",
         model_client=create_model_client(temperature=0.8),
+        model_client_stream=streaming_enabled(),
         system_message="""你是一个好学的Python初学者。
         你的特点：
         - 对编程概念好奇
@@ -80,12 +67,12 @@ async def demo_teacher_student_conversation() -> None:
     )
 
     # Set up conversation with termination condition
-    termination = TextMentionTermination("我明白了")
+    termination = TerminationEngine(["我明白了"])
     team = RoundRobinGroupChat([teacher, student], termination_condition=termination)
 
     # Start the lesson
     task = "老师，请教我Python中的列表是什么，怎么使用？"
-    result = await team.run(task=task)
+    result = await run_task(team, task)
 
     print("📚 教学对话记录:")
     for i, message in enumerate(result.messages, 1):
@@ -107,10 +94,16 @@ async def demo_debate_conversation() -> None:
     print("\n🗣️ Debate Conversation Demo")
     print("-" * 50)
 
+    # AUTOGEN_COMPACTION=1 时较早的辩论轮次折叠成滚动摘要，每轮提示大小保持平稳
+    python_context = create_model_context("PythonAdvocate")
+    js_context = create_model_context("JSAdvocate")
+
     # Create pro-Python agent
     python_advocate = AssistantAgent(
         name="PythonAdvocate",
         model_client=create_model_client(temperature=0.6),
+        model_client_stream=streaming_enabled(),
+        model_context=python_context,
         system_message="""你是Python编程语言的支持者。
         你的观点：
         - Python简单易学
@@ -125,6 +118,8 @@ async def demo_debate_conversation() -> None:
     js_advocate = AssistantAgent(
         name="JSAdvocate",
         model_client=create_model_client(temperature=0.6),
+        model_client_stream=streaming_enabled(),
+        model_context=js_context,
         system_message="""你是JavaScript编程语言的支持者。
         你的观点：
         - JavaScript无处不在
@@ -136,7 +131,7 @@ async def demo_debate_conversation() -> None:
     )
 
     # Set up debate with termination condition
-    termination = TextMentionTermination("好吧，你说得有道理")
+    termination = TerminationEngine(["好吧，你说得有道理"])
     team = RoundRobinGroupChat(
         [python_advocate, js_advocate],
         termination_condition=termination,
@@ -144,7 +139,7 @@ async def demo_debate_conversation() -> None:
 
     # Start the debate
     task = "让我们讨论一下：Python和JavaScript哪个更适合初学者学习编程？"
-    result = await team.run(task=task)
+    result = await run_task(team, task)
 
     print("🎭 辩论记录:")
     for i, message in enumerate(result.messages, 1):
@@ -163,6 +158,11 @@ async def demo_debate_conversation() -> None:
         f"{result.messages[-2].source if len(result.messages) > 1 else 'Unknown'}",
     )
 
+    if python_context is not None and js_context is not None:
+        print("\n🗜️ 每轮历史 token (压缩前 -> 压缩后):")
+        print(python_context.report())
+        print(js_context.report())
+
 
 async def demo_creative_collaboration() -> None:
     """Demonstrate creative collaboration between agents"""
@@ -173,6 +173,7 @@ async def demo_creative_collaboration() -> None:
     writer = AssistantAgent(
         name="StoryWriter",
         model_client=create_model_client(temperature=0.9),
+        model_client_stream=streaming_enabled(),
         system_message="""你是一位创意作家。
         你的任务：
         - 开始一个有趣的故事
@@ -187,6 +188,7 @@ async def demo_creative_collaboration() -> None:
     editor = AssistantAgent(
         name="Editor",
         model_client=create_model_client(temperature=0.8),
+        model_client_stream=streaming_enabled(),
         system_message="""你是一位故事编辑。
         你的任务：
         - 继续作家开始的故事
@@ -198,12 +200,12 @@ async def demo_creative_collaboration() -> None:
     )
 
     # Set up collaboration
-    termination = TextMentionTermination("故事完成")
+    termination = TerminationEngine(["故事完成"])
     team = RoundRobinGroupChat([writer, editor], termination_condition=termination)
 
     # Start creative writing
     task = "让我们一起创作一个关于时间旅行者的短篇科幻故事。"
-    result = await team.run(task=task)
+    result = await run_task(team, task)
 
     print("📖 创作过程:")
     for i, message in enumerate(result.messages, 1):
@@ -229,6 +231,7 @@ async def demo_problem_solving_team() -> None:
     analyst = AssistantAgent(
         name="DataAnalyst",
         model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
         system_message="""你是一位数据分析师。
         你的职责：
         - 分析问题和数据
@@ -243,6 +246,7 @@ async def demo_problem_solving_team() -> None:
     solution_expert = AssistantAgent(
         name="SolutionExpert",
         model_client=create_model_client(temperature=0.5),
+        model_client_stream=streaming_enabled(),
         system_message="""你是解决方案专家。
         你的职责：
         - 基于分析结果提出解决方案
@@ -254,7 +258,7 @@ async def demo_problem_solving_team() -> None:
     )
 
     # Set up problem-solving session
-    termination = TextMentionTermination("解决方案已制定完成")
+    termination = TerminationEngine(["解决方案已制定完成"])
     team = RoundRobinGroupChat(
         [analyst, solution_expert],
         termination_condition=termination,
@@ -262,7 +266,7 @@ async def demo_problem_solving_team() -> None:
 
     # Present the problem
     task = "我们的电商网站转化率下降了15%，需要分析原因并提出解决方案。"
-    result = await team.run(task=task)
+    result = await run_task(team, task)
 
     print("🔍 问题解决过程:")
     for i, message in enumerate(result.messages, 1):
@@ -289,12 +293,14 @@ async def demo_max_message_termination() -> None:
     agent1 = AssistantAgent(
         name="ChatterBox1",
         model_client=create_model_client(temperature=0.7),
+        model_client_stream=streaming_enabled(),
         system_message="你是一个健谈的聊天机器人，喜欢讨论技术话题。每次回复要简短。",
     )
 
     agent2 = AssistantAgent(
         name="ChatterBox2",
         model_client=create_model_client(temperature=0.7),
+        model_client_stream=streaming_enabled(),
         system_message="你是另一个健谈的聊天机器人，也喜欢技术讨论。每次回复要简短。",
     )
 
@@ -304,7 +310,7 @@ async def demo_max_message_termination() -> None:
 
     # Start unlimited chat
     task = "聊聊人工智能的发展趋势吧！"
-    result = await team.run(task=task)
+    result = await run_task(team, task)
 
     print("💬 限制消息数的对话:")
     for i, message in enumerate(result.messages, 1):
@@ -337,6 +343,7 @@ async def main() -> None:
         print("   • Temperature 影响回复的创造性")
         print("   • 对话可以有各种应用场景")
         print("   • 适当的终止条件确保对话有意义地结束")
+        print("   • 滚动摘要让长对话每轮发送的历史大小保持平稳")
 
     except Exception as e:
         print(f"❌ 演示失败: {e}")
@@ -10,6 +10,8 @@ AutoGen 学习项目 - 中级示例1: 工具集成
 - 工具链的协作
 - 错误处理和工具安全
 - 多工具智能体的设计
+- 独立任务的批量并发执行
+- 简单请求先交给便宜的模型 (AUTOGEN_CASCADE_MODELS)
 """
 
 import asyncio
@@ -20,32 +22,36 @@ import random
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.conditions import MaxMessageTermination
 from autogen_agentchat.teams import RoundRobinGroupChat
-from autogen_core.models import ModelInfo
 from autogen_core.tools import FunctionTool
-from autogen_ext.models.openai import OpenAIChatCompletionClient
 from dotenv import load_dotenv
 
+from autogen_learning import (
+    BatchResult,
+    BatchRunner,
+    CascadeModelClient,
+    create_cascade_client,
+    create_model_client,
+    run_task,
+    streaming_enabled,
+)
+
 load_dotenv()
 
 
-def create_model_client(temperature: float = 0.3) -> OpenAIChatCompletionClient:
-    """Create a DeepSeek-compatible model client"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-
-    return OpenAIChatCompletionClient(
-        model=os.getenv("OPENAI_MODEL", "deepseek-chat"),
-        api_key=api_key,
-        base_url=os.getenv("OPENAI_API_BASE", "https://api.deepseek.com/v1"),
-        temperature=temperature,
-        model_info=ModelInfo(
-            family="openai",
-            vision=False,
-            function_calling=True,
-            json_output=True,
-            structured_output=False,
-        ),
+def print_batch_results(
+    runner: BatchRunner,
+    results: list[BatchResult],
+    label: str = "任务",
+) -> None:
+    """按输入顺序打印批量执行结果和耗时"""
+    for item in results:
+        status = "🤖 回复" if item.ok else "❌ 异常"
+        print(f"\n📊 {label} {item.index + 1}: {item.task} ({item.duration:.2f}s)")
+        print(f"{status}: {item.content}")
+    stats = runner.stats()
+    print(
+        f"\n⏱️  {stats['tasks']} 个任务并发耗时 {stats['wall_time']}s，"
+        f"串行约需 {stats['serial_time']}s (加速 {stats['speedup']}x)",
     )
 
 
@@ -211,24 +217,25 @@ async def demo_single_tool_agent() -> None:
     # 创建计算器工具
     calc_tool = FunctionTool(calculator, description="执行数学计算")
 
-    # 创建带计算器工具的智能体
-    calculator_agent = AssistantAgent(
-        name="CalculatorAgent",
-        model_client=create_model_client(),
-        tools=[calc_tool],
-        system_message="""你是一个数学计算助手。
-        你可以使用计算器工具来执行数学运算。
-        当用户要求计算时，使用calculator工具来完成。
-        用中文解释计算过程和结果。""",
-    )
+    # 创建带计算器工具的智能体（批量执行时每个并发槽位一个实例）
+    def calculator_agent() -> AssistantAgent:
+        return AssistantAgent(
+            name="CalculatorAgent",
+            model_client=create_model_client(),
+            model_client_stream=streaming_enabled(),
+            tools=[calc_tool],
+            system_message="""你是一个数学计算助手。
+            你可以使用计算器工具来执行数学运算。
+            当用户要求计算时，使用calculator工具来完成。
+            用中文解释计算过程和结果。""",
+        )
 
-    # 测试计算功能
+    # 测试计算功能：互相独立的任务并发执行
     tasks = ["计算 25 * 4 + 15", "计算 (100 - 25) / 3", "计算 2 ** 10"]
 
-    for task in tasks:
-        print(f"\n📊 任务: {task}")
-        result = await calculator_agent.run(task=task)
-        print(f"🤖 回复: {result.messages[-1].content}")
+    runner = BatchRunner(calculator_agent, concurrency=4)
+    results = await runner.run(tasks)
+    print_batch_results(runner, results)
 
 
 async def demo_multi_tool_agent() -> None:
@@ -244,33 +251,51 @@ async def demo_multi_tool_agent() -> None:
         FunctionTool(data_storage, description="存储和检索数据"),
     ]
 
+    # 大多数请求很简单：配置级联时先由便宜的模型回答，工具调用不合法等情况才升级
+    model_client = create_cascade_client()
+
     # 创建多工具智能体
-    multi_tool_agent = AssistantAgent(
-        name="MultiToolAgent",
-        model_client=create_model_client(),
-        tools=tools,
-        system_message="""你是一个多功能助手，拥有以下工具：
-        1. calculator - 数学计算
-        2. weather_simulator - 天气查询
-        3. text_analyzer - 文本分析
-        4. data_storage - 数据存储
-
-        根据用户请求选择合适的工具来完成任务。
-        用中文回复并解释你的操作。""",
-    )
+    def multi_tool_agent() -> AssistantAgent:
+        return AssistantAgent(
+            name="MultiToolAgent",
+            model_client=model_client,
+            model_client_stream=streaming_enabled(),
+            tools=tools,
+            system_message="""你是一个多功能助手，拥有以下工具：
+            1. calculator - 数学计算
+            2. weather_simulator - 天气查询
+            3. text_analyzer - 文本分析
+            4. data_storage - 数据存储
+
+            根据用户请求选择合适的工具来完成任务。
+            用中文回复并解释你的操作。""",
+        )
 
-    # 测试多种工具功能
+    # 测试多种工具功能：前三个任务互相独立，可以并发
     tasks = [
         "帮我计算一下北京今天的气温是多少度，如果加上15度会是多少？",
         "分析这段文本的情感：'今天天气很好，我很高兴能完成这个项目'",
         "存储一个记录：项目进度=90%",
-        "检索刚才存储的项目进度",
     ]
 
-    for task in tasks:
-        print(f"\n📋 任务: {task}")
-        result = await multi_tool_agent.run(task=task)
-        print(f"🤖 回复: {result.messages[-1].content}")
+    runner = BatchRunner(multi_tool_agent, concurrency=4)
+    results = await runner.run(tasks)
+    print_batch_results(runner, results)
+
+    # 检索依赖上面的存储结果，必须在批量任务完成后执行
+    task = "检索刚才存储的项目进度"
+    print(f"\n📋 任务: {task}")
+    result = await run_task(multi_tool_agent(), task)
+    print(f"🤖 回复: {result.messages[-1].content}")
+
+    if isinstance(model_client, CascadeModelClient):
+        stats = model_client.stats()
+        print(f"\n🪜 模型级联 (节省延迟 {stats['latency_saved']:.2f}秒):")
+        for name, tier in stats["tiers"].items():
+            print(
+                f"   {name}: 承接 {tier['share']:.0%} 的请求, "
+                f"升级 {tier['escalated']} 次, 失败 {tier['errors']} 次",
+            )
 
 
 async def demo_tool_chain_collaboration() -> None:
@@ -282,6 +307,7 @@ async def demo_tool_chain_collaboration() -> None:
     analyst = AssistantAgent(
         name="DataAnalyst",
         model_client=create_model_client(),
+        model_client_stream=streaming_enabled(),
         tools=[
             FunctionTool(calculator, description="执行数学计算"),
             FunctionTool(text_analyzer, description="分析文本内容"),
@@ -295,6 +321,7 @@ async def demo_tool_chain_collaboration() -> None:
     storage_expert = AssistantAgent(
         name="StorageExpert",
         model_client=create_model_client(),
+        model_client_stream=streaming_enabled(),
         tools=[FunctionTool(data_storage, description="存储和检索数据")],
         system_message="""你是存储专家，负责数据的存储和管理。
         接收分析结果并妥善存储，确保数据的完整性。
@@ -315,7 +342,7 @@ async def demo_tool_chain_collaboration() -> None:
 
     请计算总销售额、平均季度销售额，分析客户反馈情感，并存储这些结果。"""
 
-    result = await team.run(task=task)
+    result = await run_task(team, task)
 
     print("🔗 工具链协作过程:")
     for i, message in enumerate(result.messages, 1):
@@ -334,21 +361,23 @@ async def demo_error_handling() -> None:
     print("-" * 50)
 
     # 创建带错误处理的智能体
-    robust_agent = AssistantAgent(
-        name="RobustAgent",
-        model_client=create_model_client(),
-        tools=[
-            FunctionTool(calculator, description="执行数学计算"),
-            FunctionTool(weather_simulator, description="查询城市天气"),
-        ],
-        system_message="""你是一个具有错误处理能力的助手。
-        当工具执行失败时，要：
-        1. 识别错误原因
-        2. 提供替代方案
-        3. 给出有用的建议
-
-        始终保持友好和有帮助的态度。""",
-    )
+    def robust_agent() -> AssistantAgent:
+        return AssistantAgent(
+            name="RobustAgent",
+            model_client=create_model_client(),
+            model_client_stream=streaming_enabled(),
+            tools=[
+                FunctionTool(calculator, description="执行数学计算"),
+                FunctionTool(weather_simulator, description="查询城市天气"),
+            ],
+            system_message="""你是一个具有错误处理能力的助手。
+            当工具执行失败时，要：
+            1. 识别错误原因
+            2. 提供替代方案
+            3. 给出有用的建议
+
+            始终保持友好和有帮助的态度。""",
+        )
 
     # 测试错误场景
     error_tasks = [
@@ -357,13 +386,10 @@ async def demo_error_handling() -> None:
         "查询火星的天气",  # 这个应该能正常工作，因为是模拟器
     ]
 
-    for task in error_tasks:
-        print(f"\n🧪 错误测试: {task}")
-        try:
-            result = await robust_agent.run(task=task)
-            print(f"🤖 处理结果: {result.messages[-1].content}")
-        except Exception as e:
-            print(f"❌ 异常: {e}")
+    # 单个任务的异常记录在对应结果中，不影响其他任务
+    runner = BatchRunner(robust_agent, concurrency=4, timeout=60)
+    results = await runner.run(error_tasks)
+    print_batch_results(runner, results, label="错误测试")
 
 
 async def main() -> None:
@@ -383,6 +409,8 @@ async def main() -> None:
         print("   • 工具函数需要适当的错误处理")
         print("   • 多工具智能体可以处理复杂任务")
         print("   • 工具链协作提高任务处理效率")
+        print("   • 独立任务用 BatchRunner 有界并发执行")
+        print("   • 模型级联让简单请求由便宜的模型承接")
         print("   • 安全性是工具设计的重要考虑")
 
         # 清理临时文件
@@ -10,39 +10,49 @@ AutoGen 学习项目 - 中级示例2: 智能选择器群组聊天
 - 专业化智能体团队
 - 复杂对话管理
 - 动态角色分配
+- 选择发言者的调用先交给便宜的模型 (AUTOGEN_CASCADE_MODELS)
+- 规则能确定下一位发言者时跳过模型选择
+- 按系统消息的专长匹配发言者 (NumPy TF-IDF)
+- 互不依赖的专家问题并行咨询，再由组长汇总 (FanOutTeam)
 """
 
 import asyncio
-import os
+import time
 
 from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.conditions import MaxMessageTermination, TextMentionTermination
+from autogen_agentchat.conditions import MaxMessageTermination
 from autogen_agentchat.teams import SelectorGroupChat
-from autogen_core.models import ModelInfo
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_core.models import ChatCompletionClient
 from dotenv import load_dotenv
 
+from autogen_learning import (
+    DEFAULT_SCORERS,
+    ExpertiseRouter,
+    FanOutTeam,
+    RuleBasedSelector,
+    TerminationEngine,
+    choice_scorer,
+    create_cascade_client,
+    create_model_client,
+    run_task,
+    streaming_enabled,
+)
+
 load_dotenv()
 
 
-def create_model_client(temperature: float = 0.7) -> OpenAIChatCompletionClient:
-    """Create a DeepSeek-compatible model client"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
+def selector_client(
+    participants: list[AssistantAgent],
+    temperature: float = 0.2,
+) -> ChatCompletionClient:
+    """选择发言者用的模型客户端
 
-    return OpenAIChatCompletionClient(
-        model=os.getenv("OPENAI_MODEL", "deepseek-chat"),
-        api_key=api_key,
-        base_url=os.getenv("OPENAI_API_BASE", "https://api.deepseek.com/v1"),
+    选择发言者是简单的分类任务，配置级联时先由便宜的模型回答，
+    回答中没有出现任何参与者名字时才升级。
+    """
+    return create_cascade_client(
         temperature=temperature,
-        model_info=ModelInfo(
-            family="openai",
-            vision=False,
-            function_calling=True,
-            json_output=True,
-            structured_output=False,
-        ),
+        scorers=[*DEFAULT_SCORERS, choice_scorer([p.name for p in participants])],
     )
 
 
@@ -55,6 +65,7 @@ async def demo_research_team() -> None:
     research_lead = AssistantAgent(
         name="ResearchLead",
         model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
         system_message="""你是研究团队负责人。
         职责：
         - 制定研究计划和方向
@@ -70,6 +81,7 @@ async def demo_research_team() -> None:
     tech_expert = AssistantAgent(
         name="TechExpert",
         model_client=create_model_client(temperature=0.4),
+        model_client_stream=streaming_enabled(),
         system_message="""你是技术专家。
         专长：
         - 深度学习和机器学习算法
@@ -83,6 +95,7 @@ async def demo_research_team() -> None:
     data_scientist = AssistantAgent(
         name="DataScientist",
         model_client=create_model_client(temperature=0.4),
+        model_client_stream=streaming_enabled(),
         system_message="""你是数据科学家。
         专长：
         - 数据分析和统计建模
@@ -94,11 +107,21 @@ async def demo_research_team() -> None:
     )
 
     # 创建选择器群组
-    termination = TextMentionTermination("研究项目完成")
+    termination = TerminationEngine(["研究项目完成"])
+    participants = [research_lead, tech_expert, data_scientist]
+    # 专家发言后交回组长，组长按点名和关键词分派，有歧义时才调用模型选择
+    selector = RuleBasedSelector.hub(
+        "ResearchLead",
+        {
+            "TechExpert": ["技术", "架构", "算法", "实现"],
+            "DataScientist": ["数据", "统计", "指标", "实验"],
+        },
+    )
     research_team = SelectorGroupChat(
-        participants=[research_lead, tech_expert, data_scientist],
-        model_client=create_model_client(temperature=0.2),
+        participants=participants,
+        model_client=selector_client(participants),
         termination_condition=termination,
+        selector_func=selector,
     )
 
     # 开始研究项目
@@ -106,7 +129,8 @@ async def demo_research_team() -> None:
         "我们需要研究如何提高推荐系统的准确性和用户满意度。"
         "请制定研究计划并分析关键技术挑战。"
     )
-    result = await research_team.run(task=task)
+    result = await run_task(research_team, task)
+    print(selector.report())
 
     print("🔬 研究团队协作过程:")
     for i, message in enumerate(result.messages, 1):
@@ -132,6 +156,7 @@ async def demo_creative_team() -> None:
     creative_director = AssistantAgent(
         name="CreativeDirector",
         model_client=create_model_client(temperature=0.8),
+        model_client_stream=streaming_enabled(),
         system_message="""你是创意总监。
         职责：
         - 把控整体创意方向
@@ -146,6 +171,7 @@ async def demo_creative_team() -> None:
     copywriter = AssistantAgent(
         name="Copywriter",
         model_client=create_model_client(temperature=0.9),
+        model_client_stream=streaming_enabled(),
         system_message="""你是文案专家。
         专长：
         - 创作吸引人的广告文案
@@ -159,6 +185,7 @@ async def demo_creative_team() -> None:
     designer = AssistantAgent(
         name="Designer",
         model_client=create_model_client(temperature=0.8),
+        model_client_stream=streaming_enabled(),
         system_message="""你是视觉设计师。
         专长：
         - 视觉概念设计
@@ -170,16 +197,26 @@ async def demo_creative_team() -> None:
     )
 
     # 创建创意团队
-    termination = TextMentionTermination("创意项目完成")
+    termination = TerminationEngine(["创意项目完成"])
+    participants = [creative_director, copywriter, designer]
+    selector = RuleBasedSelector.hub(
+        "CreativeDirector",
+        {
+            "Copywriter": ["文案", "标语", "口号", "文字"],
+            "Designer": ["设计", "视觉", "配色", "Logo"],
+        },
+    )
     creative_team = SelectorGroupChat(
-        participants=[creative_director, copywriter, designer],
-        model_client=create_model_client(temperature=0.3),
+        participants=participants,
+        model_client=selector_client(participants, temperature=0.3),
         termination_condition=termination,
+        selector_func=selector,
     )
 
     # 开始创意项目
     task = "为一个新的环保科技产品设计营销活动，包括核心信息、文案和视觉风格建议。"
-    result = await creative_team.run(task=task)
+    result = await run_task(creative_team, task)
+    print(selector.report())
 
     print("🎨 创意团队协作过程:")
     for i, message in enumerate(result.messages, 1):
@@ -201,6 +238,7 @@ async def demo_business_analysis_team() -> None:
     business_analyst = AssistantAgent(
         name="BusinessAnalyst",
         model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
         system_message="""你是首席商业分析师。
         职责：
         - 分析商业问题和机会
@@ -215,6 +253,7 @@ async def demo_business_analysis_team() -> None:
     market_analyst = AssistantAgent(
         name="MarketAnalyst",
         model_client=create_model_client(temperature=0.4),
+        model_client_stream=streaming_enabled(),
         system_message="""你是市场分析专家。
         专长：
         - 市场趋势分析
@@ -228,6 +267,7 @@ async def demo_business_analysis_team() -> None:
     financial_analyst = AssistantAgent(
         name="FinancialAnalyst",
         model_client=create_model_client(temperature=0.2),
+        model_client_stream=streaming_enabled(),
         system_message="""你是财务分析专家。
         专长：
         - 财务模型构建
@@ -239,16 +279,26 @@ async def demo_business_analysis_team() -> None:
     )
 
     # 创建商业分析团队
-    termination = TextMentionTermination("商业分析完成")
+    termination = TerminationEngine(["商业分析完成"])
+    participants = [business_analyst, market_analyst, financial_analyst]
+    selector = RuleBasedSelector.hub(
+        "BusinessAnalyst",
+        {
+            "MarketAnalyst": ["市场", "竞争", "用户群", "趋势"],
+            "FinancialAnalyst": ["财务", "成本", "收入", "利润", "投资"],
+        },
+    )
     business_team = SelectorGroupChat(
-        participants=[business_analyst, market_analyst, financial_analyst],
-        model_client=create_model_client(temperature=0.2),
+        participants=participants,
+        model_client=selector_client(participants),
         termination_condition=termination,
+        selector_func=selector,
     )
 
     # 开始商业分析
     task = "分析进入在线教育市场的商业机会，包括市场潜力、竞争状况和财务可行性。"
-    result = await business_team.run(task=task)
+    result = await run_task(business_team, task)
+    print(selector.report())
 
     print("💼 商业分析团队协作过程:")
     for i, message in enumerate(result.messages, 1):
@@ -270,6 +320,7 @@ async def demo_selector_vs_roundrobin() -> None:
     manager = AssistantAgent(
         name="ProjectManager",
         model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
         system_message="""你是项目经理，负责协调团队工作。
         根据任务需要选择合适的团队成员发言。""",
     )
@@ -277,6 +328,7 @@ async def demo_selector_vs_roundrobin() -> None:
     developer = AssistantAgent(
         name="Developer",
         model_client=create_model_client(temperature=0.4),
+        model_client_stream=streaming_enabled(),
         system_message="""你是开发工程师，专注于技术实现。
         只在被询问技术问题时发言。""",
     )
@@ -284,6 +336,7 @@ async def demo_selector_vs_roundrobin() -> None:
     tester = AssistantAgent(
         name="Tester",
         model_client=create_model_client(temperature=0.4),
+        model_client_stream=streaming_enabled(),
         system_message="""你是测试工程师，专注于质量保证。
         只在被询问测试相关问题时发言。""",
     )
@@ -291,14 +344,24 @@ async def demo_selector_vs_roundrobin() -> None:
     # 使用SelectorGroupChat
     print("🎯 使用SelectorGroupChat:")
     termination = MaxMessageTermination(6)
+    participants = [manager, developer, tester]
+    selector = RuleBasedSelector.hub(
+        "ProjectManager",
+        {
+            "Developer": ["开发", "技术", "代码", "实现"],
+            "Tester": ["测试", "质量", "缺陷", "用例"],
+        },
+    )
     selector_team = SelectorGroupChat(
-        participants=[manager, developer, tester],
-        model_client=create_model_client(temperature=0.2),
+        participants=participants,
+        model_client=selector_client(participants),
         termination_condition=termination,
+        selector_func=selector,
     )
 
     task = "我们需要开发一个新功能，请制定开发和测试计划。"
-    result = await selector_team.run(task=task)
+    result = await run_task(selector_team, task)
+    print(selector.report())
 
     for i, message in enumerate(result.messages, 1):
         sender = message.source if hasattr(message, "source") else "Unknown"
@@ -320,10 +383,39 @@ async def demo_complex_project_team() -> None:
     print("\n🏗️ Complex Project Team Demo")
     print("-" * 50)
 
+    # 专家的系统消息同时作为专长索引
+    specialist_messages = {
+        "Architect": """你是系统架构师。
+            专长：
+            - 系统架构设计
+            - 技术选型建议
+            - 可扩展性规划
+            - 性能优化策略
+
+            只在被询问架构相关问题时发言。""",
+        "ProductManager": """你是产品经理。
+            专长：
+            - 产品需求分析
+            - 用户体验设计
+            - 功能优先级排序
+            - 市场需求洞察
+
+            只在被询问产品相关问题时发言。""",
+        "SecurityExpert": """你是安全专家。
+            专长：
+            - 安全风险评估
+            - 安全架构设计
+            - 合规性检查
+            - 安全最佳实践
+
+            只在被询问安全相关问题时发言。""",
+    }
+
     # 创建复杂项目团队
     project_lead = AssistantAgent(
         name="ProjectLead",
         model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
         system_message="""你是项目负责人。
         职责：
         - 整体项目规划和管理
@@ -338,48 +430,42 @@ async def demo_complex_project_team() -> None:
     architect = AssistantAgent(
         name="Architect",
         model_client=create_model_client(temperature=0.4),
-        system_message="""你是系统架构师。
-        专长：
-        - 系统架构设计
-        - 技术选型建议
-        - 可扩展性规划
-        - 性能优化策略
-
-        只在被询问架构相关问题时发言。""",
+        model_client_stream=streaming_enabled(),
+        system_message=specialist_messages["Architect"],
     )
 
     product_manager = AssistantAgent(
         name="ProductManager",
         model_client=create_model_client(temperature=0.5),
-        system_message="""你是产品经理。
-        专长：
-        - 产品需求分析
-        - 用户体验设计
-        - 功能优先级排序
-        - 市场需求洞察
-
-        只在被询问产品相关问题时发言。""",
+        model_client_stream=streaming_enabled(),
+        system_message=specialist_messages["ProductManager"],
     )
 
     security_expert = AssistantAgent(
         name="SecurityExpert",
         model_client=create_model_client(temperature=0.2),
-        system_message="""你是安全专家。
-        专长：
-        - 安全风险评估
-        - 安全架构设计
-        - 合规性检查
-        - 安全最佳实践
-
-        只在被询问安全相关问题时发言。""",
+        model_client_stream=streaming_enabled(),
+        system_message=specialist_messages["SecurityExpert"],
     )
 
     # 创建复杂项目团队
-    termination = TextMentionTermination("项目规划完成")
+    termination = TerminationEngine(["项目规划完成"])
+    participants = [project_lead, architect, product_manager, security_expert]
+    selector = RuleBasedSelector.hub(
+        "ProjectLead",
+        {
+            "Architect": ["架构", "技术选型", "系统设计"],
+            "ProductManager": ["产品", "需求", "用户体验"],
+            "SecurityExpert": ["安全", "权限", "加密", "合规"],
+        },
+        # 关键词有歧义时按专长匹配，仍无法确定才调用模型
+        fallback=ExpertiseRouter(specialist_messages),
+    )
     project_team = SelectorGroupChat(
-        participants=[project_lead, architect, product_manager, security_expert],
-        model_client=create_model_client(temperature=0.2),
+        participants=participants,
+        model_client=selector_client(participants),
         termination_condition=termination,
+        selector_func=selector,
     )
 
     # 开始复杂项目规划
@@ -387,7 +473,10 @@ async def demo_complex_project_team() -> None:
         "规划一个企业级的客户数据管理平台，"
         "需要考虑技术架构、产品功能、安全合规等各个方面。"
     )
-    result = await project_team.run(task=task)
+    started_at = time.monotonic()
+    result = await run_task(project_team, task)
+    sequential_time = time.monotonic() - started_at
+    print(selector.report())
 
     print("🏗️ 复杂项目团队协作过程:")
     for i, message in enumerate(result.messages, 1):
@@ -399,6 +488,21 @@ async def demo_complex_project_team() -> None:
         )
         print(f"   {i}. {sender}: {content}")
 
+    # 三位专家的问题互不依赖：同时咨询，组长只做一次汇总
+    print("\n⚡ 并行咨询同一任务:")
+    fanout_team = FanOutTeam(
+        [architect, product_manager, security_expert],
+        coordinator=project_lead,
+        branch_timeout=60,
+    )
+    await fanout_team.reset()
+    await run_task(fanout_team, task)
+    print(fanout_team.report())
+    print(
+        f"   轮流发言 {sequential_time:.2f}秒 -> "
+        f"并行咨询 {fanout_team.wall_time:.2f}秒",
+    )
+
 
 async def main() -> None:
     """主演示函数"""
@@ -420,6 +524,10 @@ async def main() -> None:
         print("   • 复杂项目可以通过多专家协作完成")
         print("   • 智能选择器减少不必要的轮换发言")
         print("   • 适合需要专业分工的复杂任务")
+        print("   • 发言者选择先交给便宜模型，答案不合格才升级")
+        print("   • 固定的交接用规则选择，省去每轮的模型选择调用")
+        print("   • 专长匹配用一次矩阵-向量乘法代替模型选择")
+        print("   • 互不依赖的专家问题并行咨询，耗时接近最慢的一位")
 
     except Exception as e:
         print(f"❌ 演示失败: {e}")
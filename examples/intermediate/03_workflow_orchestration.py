@@ -10,42 +10,42 @@ AutoGen 学习项目 - 中级示例3: 工作流编排
 - 条件分支和错误恢复
 - 多阶段任务执行
 - 工作流监控和控制
+- 固定流程用规则选择发言者，跳过模型选择调用
+- 团队池复用已重置的团队，请求之间不继承对话记录
+- 每轮保存增量检查点，失败后从最后一个完好的轮次继续
+- 固定阶段的流程声明成 DAG，独立分支并发执行，输出关键路径
 """
 
 import asyncio
 import json
-import os
+from collections.abc import Callable
 
 from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.conditions import TextMentionTermination
 from autogen_agentchat.teams import RoundRobinGroupChat, SelectorGroupChat
-from autogen_core.models import ModelInfo
+from autogen_core import CancellationToken
 from autogen_core.tools import FunctionTool
-from autogen_ext.models.openai import OpenAIChatCompletionClient
 from dotenv import load_dotenv
 
-load_dotenv()
-
+from autogen_learning import (
+    AgentNode,
+    CheckpointStore,
+    Edge,
+    MetricsCollector,
+    RuleBasedSelector,
+    TeamPool,
+    TerminationEngine,
+    ToolNode,
+    TurnCheckpoint,
+    Workflow,
+    WorkflowRun,
+    create_model_client,
+    resume,
+    run_task,
+    run_with_checkpoints,
+    streaming_enabled,
+)
 
-def create_model_client(temperature: float = 0.3) -> OpenAIChatCompletionClient:
-    """Create a DeepSeek-compatible model client"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment variables")
-
-    return OpenAIChatCompletionClient(
-        model=os.getenv("OPENAI_MODEL", "deepseek-chat"),
-        api_key=api_key,
-        base_url=os.getenv("OPENAI_API_BASE", "https://api.deepseek.com/v1"),
-        temperature=temperature,
-        model_info=ModelInfo(
-            family="openai",
-            vision=False,
-            function_calling=True,
-            json_output=True,
-            structured_output=False,
-        ),
-    )
+load_dotenv()
 
 
 # 工作流状态管理工具
@@ -100,6 +100,7 @@ async def demo_data_processing_workflow() -> None:
     workflow_coordinator = AssistantAgent(
         name="WorkflowCoordinator",
         model_client=create_model_client(temperature=0.2),
+        model_client_stream=streaming_enabled(),
         tools=[
             FunctionTool(update_workflow_state, description="更新工作流状态"),
             FunctionTool(get_workflow_state, description="获取工作流状态"),
@@ -118,6 +119,7 @@ async def demo_data_processing_workflow() -> None:
     data_validator = AssistantAgent(
         name="DataValidator",
         model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
         tools=[FunctionTool(process_data_batch, description="处理数据批次")],
         system_message="""你是数据验证专家。
         职责：
@@ -131,6 +133,7 @@ async def demo_data_processing_workflow() -> None:
     data_transformer = AssistantAgent(
         name="DataTransformer",
         model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
         tools=[FunctionTool(process_data_batch, description="处理数据批次")],
         system_message="""你是数据转换专家。
         职责：
@@ -144,6 +147,7 @@ async def demo_data_processing_workflow() -> None:
     data_loader = AssistantAgent(
         name="DataLoader",
         model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
         tools=[FunctionTool(process_data_batch, description="处理数据批次")],
         system_message="""你是数据加载专家。
         职责：
@@ -155,21 +159,40 @@ async def demo_data_processing_workflow() -> None:
     )
 
     # 创建数据处理团队
-    termination = TextMentionTermination("数据处理工作流完成")
+    termination = TerminationEngine(["数据处理工作流完成"])
+    participants = [
+        workflow_coordinator,
+        data_validator,
+        data_transformer,
+        data_loader,
+    ]
+    # 固定流程：验证 -> 转换 -> 加载 -> 协调员收尾，只有协调员分派时可能需要模型选择
+    selector = RuleBasedSelector(
+        [agent.name for agent in participants],
+        transitions={
+            "WorkflowCoordinator": ["DataValidator", "DataTransformer", "DataLoader"],
+            "DataValidator": ["DataTransformer"],
+            "DataTransformer": ["DataLoader"],
+            "DataLoader": ["WorkflowCoordinator"],
+        },
+        keywords={
+            "DataValidator": ["验证"],
+            "DataTransformer": ["转换"],
+            "DataLoader": ["加载"],
+        },
+        start="WorkflowCoordinator",
+    )
     data_team = SelectorGroupChat(
-        participants=[
-            workflow_coordinator,
-            data_validator,
-            data_transformer,
-            data_loader,
-        ],
+        participants=participants,
         model_client=create_model_client(temperature=0.2),
         termination_condition=termination,
+        selector_func=selector,
     )
 
     # 开始数据处理工作流
     task = "处理批次ID为'batch_001'的客户数据，需要完成验证、转换和加载的完整流程。"
-    result = await data_team.run(task=task)
+    result = await run_task(data_team, task)
+    print(selector.report())
 
     print("📊 数据处理工作流过程:")
     for i, message in enumerate(result.messages, 1):
@@ -191,6 +214,7 @@ async def demo_approval_workflow() -> None:
     request_manager = AssistantAgent(
         name="RequestManager",
         model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
         tools=[
             FunctionTool(update_workflow_state, description="更新工作流状态"),
             FunctionTool(check_approval_status, description="检查审批状态"),
@@ -209,6 +233,7 @@ async def demo_approval_workflow() -> None:
     initial_reviewer = AssistantAgent(
         name="InitialReviewer",
         model_client=create_model_client(temperature=0.4),
+        model_client_stream=streaming_enabled(),
         system_message="""你是初审员。
         职责：
         - 进行初步审查
@@ -222,6 +247,7 @@ async def demo_approval_workflow() -> None:
     specialist_approver = AssistantAgent(
         name="SpecialistApprover",
         model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
         tools=[FunctionTool(check_approval_status, description="检查审批状态")],
         system_message="""你是专业审批员。
         职责：
@@ -236,6 +262,7 @@ async def demo_approval_workflow() -> None:
     final_approver = AssistantAgent(
         name="FinalApprover",
         model_client=create_model_client(temperature=0.2),
+        model_client_stream=streaming_enabled(),
         system_message="""你是最终审批人。
         职责：
         - 最终审批决定
@@ -247,16 +274,37 @@ async def demo_approval_workflow() -> None:
     )
 
     # 创建审批团队
-    termination = TextMentionTermination("审批工作流完成")
+    termination = TerminationEngine(["审批工作流完成"])
+    participants = [
+        request_manager,
+        initial_reviewer,
+        specialist_approver,
+        final_approver,
+    ]
+    selector = RuleBasedSelector(
+        [agent.name for agent in participants],
+        transitions={
+            "RequestManager": [
+                "InitialReviewer",
+                "SpecialistApprover",
+                "FinalApprover",
+            ],
+            "InitialReviewer": ["SpecialistApprover"],
+            "SpecialistApprover": ["FinalApprover"],
+            "FinalApprover": ["RequestManager"],
+        },
+        keywords={
+            "InitialReviewer": ["初审"],
+            "SpecialistApprover": ["专业审批"],
+            "FinalApprover": ["最终审批", "最终批准"],
+        },
+        start="RequestManager",
+    )
     approval_team = SelectorGroupChat(
-        participants=[
-            request_manager,
-            initial_reviewer,
-            specialist_approver,
-            final_approver,
-        ],
+        participants=participants,
         model_client=create_model_client(temperature=0.2),
         termination_condition=termination,
+        selector_func=selector,
     )
 
     # 开始审批工作流
@@ -264,7 +312,8 @@ async def demo_approval_workflow() -> None:
         "处理一个紧急的IT系统升级请求，"
         "请求ID为'urgent_upgrade_001'，需要完整的审批流程。"
     )
-    result = await approval_team.run(task=task)
+    result = await run_task(approval_team, task)
+    print(selector.report())
 
     print("✅ 审批工作流过程:")
     for i, message in enumerate(result.messages, 1):
@@ -277,15 +326,12 @@ async def demo_approval_workflow() -> None:
         print(f"   {i}. {sender}: {content}")
 
 
-async def demo_error_recovery_workflow() -> None:
-    """演示错误恢复工作流"""
-    print("\n🔧 Error Recovery Workflow Demo")
-    print("-" * 50)
-
-    # 创建错误恢复团队
+def build_recovery_team() -> tuple[SelectorGroupChat, RuleBasedSelector]:
+    """构建错误恢复团队，返回团队和它的发言者选择器"""
     incident_manager = AssistantAgent(
         name="IncidentManager",
         model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
         tools=[FunctionTool(update_workflow_state, description="更新工作流状态")],
         system_message="""你是事故管理员。
         职责：
@@ -301,6 +347,7 @@ async def demo_error_recovery_workflow() -> None:
     system_analyst = AssistantAgent(
         name="SystemAnalyst",
         model_client=create_model_client(temperature=0.4),
+        model_client_stream=streaming_enabled(),
         system_message="""你是系统分析师。
         职责：
         - 分析系统错误
@@ -314,6 +361,7 @@ async def demo_error_recovery_workflow() -> None:
     recovery_engineer = AssistantAgent(
         name="RecoveryEngineer",
         model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
         system_message="""你是恢复工程师。
         职责：
         - 执行系统修复
@@ -327,6 +375,7 @@ async def demo_error_recovery_workflow() -> None:
     qa_tester = AssistantAgent(
         name="QATester",
         model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
         system_message="""你是质量保证测试员。
         职责：
         - 验证系统修复效果
@@ -338,16 +387,44 @@ async def demo_error_recovery_workflow() -> None:
     )
 
     # 创建错误恢复团队
-    termination = TextMentionTermination("错误恢复工作流完成")
+    # TurnCheckpoint 只在 run_with_checkpoints/resume 中保存检查点
+    termination = TerminationEngine(["错误恢复工作流完成"]) | TurnCheckpoint()
+    participants = [incident_manager, system_analyst, recovery_engineer, qa_tester]
+    selector = RuleBasedSelector(
+        [agent.name for agent in participants],
+        transitions={
+            "IncidentManager": ["SystemAnalyst", "RecoveryEngineer", "QATester"],
+            "SystemAnalyst": ["RecoveryEngineer"],
+            "RecoveryEngineer": ["QATester"],
+            "QATester": ["IncidentManager"],
+        },
+        keywords={
+            "SystemAnalyst": ["诊断", "根本原因"],
+            "RecoveryEngineer": ["修复"],
+            "QATester": ["回归测试", "验证测试"],
+        },
+        start="IncidentManager",
+    )
     recovery_team = SelectorGroupChat(
-        participants=[incident_manager, system_analyst, recovery_engineer, qa_tester],
+        participants=participants,
         model_client=create_model_client(temperature=0.2),
         termination_condition=termination,
+        selector_func=selector,
     )
+    return recovery_team, selector
+
+
+async def demo_error_recovery_workflow() -> None:
+    """演示错误恢复工作流"""
+    print("\n🔧 Error Recovery Workflow Demo")
+    print("-" * 50)
+
+    recovery_team, selector = build_recovery_team()
 
     # 开始错误恢复工作流
     task = "处理一个关键系统故障：用户登录服务出现间歇性错误，影响50%的用户访问。"
-    result = await recovery_team.run(task=task)
+    result = await run_task(recovery_team, task)
+    print(selector.report())
 
     print("🔧 错误恢复工作流过程:")
     for i, message in enumerate(result.messages, 1):
@@ -360,82 +437,354 @@ async def demo_error_recovery_workflow() -> None:
         print(f"   {i}. {sender}: {content}")
 
 
-async def demo_conditional_workflow() -> None:
-    """演示条件分支工作流"""
-    print("\n🔀 Conditional Workflow Demo")
+async def demo_checkpoint_resume() -> None:
+    """演示检查点与断点续跑"""
+    print("\n💾 Checkpoint & Resume Demo")
     print("-" * 50)
 
-    # 创建条件工作流团队
-    workflow_controller = AssistantAgent(
-        name="WorkflowController",
-        model_client=create_model_client(temperature=0.2),
-        tools=[FunctionTool(get_workflow_state, description="获取工作流状态")],
-        system_message="""你是工作流控制器。
-        职责：
-        - 根据条件选择执行路径
-        - 管理分支逻辑
-        - 协调不同处理路径
-        - 合并处理结果
+    store = CheckpointStore()
+    metrics = MetricsCollector()
+    run_id = "payment-incident"
+    task = "处理一个关键系统故障：支付服务响应时间从200毫秒升至5秒，大量订单超时。"
+
+    # 模拟运行到一半失败：30 秒后取消在途调用，相当于进程崩溃或模型服务不可用
+    recovery_team, _ = build_recovery_team()
+    token = CancellationToken()
+    asyncio.get_running_loop().call_later(30, token.cancel)
+    try:
+        await run_with_checkpoints(
+            recovery_team,
+            task,
+            store,
+            run_id=run_id,
+            metrics=metrics,
+            cancellation_token=token,
+        )
+    except asyncio.CancelledError:
+        checkpoint = store.load(run_id)
+        print(f"\n⚠️ 工作流中断，已保存 {checkpoint.turns} 个检查点")
+
+    if run_id in store.unfinished():
+        # 用新构建的团队从最后一个完好的轮次继续，之前的发言不再调用模型
+        recovery_team, _ = build_recovery_team()
+        result = await resume(recovery_team, run_id, store, metrics=metrics)
+        print(f"\n✅ 继续运行完成: {result.stop_reason}")
+
+    checkpoint = store.load(run_id)
+    counters = metrics.get_summary()["counters"]
+    print("\n💾 检查点统计:")
+    print(f"   检查点: {checkpoint.turns} 个, 状态: {checkpoint.status}")
+    print(f"   增量写入: {counters.get('checkpoint.bytes', 0) / 1024:.1f} KB")
+    print(f"   最后的完整状态: {checkpoint.state_bytes / 1024:.1f} KB")
+    store.close()
+
+
+def stage_agent(name: str, system_message: str) -> AssistantAgent:
+    """DAG 节点用的智能体：顺序和工具调用由工作流决定，只负责本阶段的分析"""
+    return AssistantAgent(
+        name=name,
+        model_client=create_model_client(temperature=0.3),
+        model_client_stream=streaming_enabled(),
+        system_message=system_message,
+    )
 
-        根据请求类型选择处理路径：
-        - 紧急请求 -> 快速通道
-        - 常规请求 -> 标准流程
-        - 复杂请求 -> 专家评估
 
-        当处理完成时说"条件工作流完成"。""",
+def build_data_dag() -> Workflow:
+    """数据处理流程：验证后转换、加载与异常分析并行，最后汇总"""
+
+    def batch_step(operation: str) -> Callable[[WorkflowRun], dict[str, str]]:
+        return lambda run: {"batch_id": run.inputs["batch_id"], "operation": operation}
+
+    analyst = stage_agent(
+        "DataValidator",
+        "你是数据验证专家。根据验证结果分析异常记录的成因并给出处理建议。",
+    )
+    coordinator = stage_agent(
+        "WorkflowCoordinator",
+        "你是工作流协调员。根据各阶段的结果写一份简短的数据处理报告。",
+    )
+    return Workflow(
+        "data_processing",
+        nodes=[
+            ToolNode("validate", process_data_batch, batch_step("validate")),
+            AgentNode(
+                "analyze",
+                analyst,
+                "数据批次 {batch_id} 的验证结果: {validate}\n请分析异常记录。",
+            ),
+            ToolNode("transform", process_data_batch, batch_step("transform")),
+            ToolNode("load", process_data_batch, batch_step("load")),
+            ToolNode(
+                "record",
+                update_workflow_state,
+                lambda run: {
+                    "stage": "data_processing",
+                    "status": "completed",
+                    "data": run.text("load"),
+                },
+            ),
+            AgentNode(
+                "summarize",
+                coordinator,
+                "验证: {validate}\n异常分析: {analyze}\n转换: {transform}\n"
+                "加载: {load}\n请写出批次 {batch_id} 的数据处理报告。",
+            ),
+        ],
+        edges=[
+            ("validate", "analyze"),
+            ("validate", "transform"),
+            ("transform", "load"),
+            ("load", "record"),
+            ("analyze", "summarize"),
+            ("load", "summarize"),
+        ],
     )
 
-    express_processor = AssistantAgent(
-        name="ExpressProcessor",
-        model_client=create_model_client(temperature=0.3),
-        system_message="""你是快速处理专员。
-        职责：
-        - 处理紧急和简单请求
-        - 快速响应和解决
-        - 简化流程步骤
-        - 及时反馈结果
 
-        只处理紧急或简单的请求。""",
+def build_approval_dag() -> Workflow:
+    """审批流程：查询审批状态与初审并行，需要二次审核时才经过专业审批"""
+
+    def needs_second_review(run: WorkflowRun) -> bool:
+        return "二次审核" in run.text("status")
+
+    reviewer = stage_agent(
+        "InitialReviewer",
+        "你是初审员。检查请求的完整性，分类请求类型并给出初审意见。",
+    )
+    specialist = stage_agent(
+        "SpecialistApprover",
+        "你是专业审批员。评估请求的风险和影响，给出专业审批意见。",
+    )
+    approver = stage_agent(
+        "FinalApprover",
+        "你是最终审批人。综合各方意见，给出批准或驳回的最终决定。",
+    )
+    return Workflow(
+        "approval",
+        nodes=[
+            ToolNode(
+                "status",
+                check_approval_status,
+                lambda run: {"request_id": run.inputs["request_id"]},
+            ),
+            AgentNode("initial_review", reviewer, "审批请求 {request_id}: {request}"),
+            AgentNode(
+                "specialist_review",
+                specialist,
+                "审批请求 {request_id}: {request}\n审批状态: {status}\n"
+                "初审意见: {initial_review}",
+            ),
+            # 跳过专业审批时最终审批照常执行
+            AgentNode(
+                "final_approval",
+                approver,
+                "审批请求 {request_id}: {request}\n审批状态: {status}\n"
+                "初审意见: {initial_review}\n专业审批意见: {specialist_review}",
+                partial=True,
+            ),
+        ],
+        edges=[
+            ("status", "specialist_review"),
+            Edge("initial_review", "specialist_review", when=needs_second_review),
+            ("status", "final_approval"),
+            ("initial_review", "final_approval"),
+            ("specialist_review", "final_approval"),
+        ],
     )
 
-    standard_processor = AssistantAgent(
-        name="StandardProcessor",
-        model_client=create_model_client(temperature=0.3),
-        system_message="""你是标准流程处理员。
-        职责：
-        - 按标准流程处理请求
-        - 完整的审查和验证
-        - 规范的文档记录
-        - 质量控制检查
 
-        处理常规的标准请求。""",
+def build_recovery_dag() -> Workflow:
+    """错误恢复流程：评估 -> 诊断 -> 修复 -> 验证，验证未通过时升级"""
+
+    def verified(run: WorkflowRun) -> bool:
+        return run.text("verify").strip().startswith("验证通过")
+
+    manager = stage_agent(
+        "IncidentManager",
+        "你是事故管理员。评估事故的严重程度和影响范围，协调恢复工作。",
+    )
+    analyst = stage_agent(
+        "SystemAnalyst",
+        "你是系统分析师。根据事故评估找出根本原因并给出修复建议。",
+    )
+    engineer = stage_agent(
+        "RecoveryEngineer",
+        "你是恢复工程师。根据诊断结果制定并执行修复方案。",
+    )
+    tester = stage_agent(
+        "QATester",
+        "你是质量保证测试员。验证修复效果，回复以“验证通过”或“验证未通过”开头。",
+    )
+    return Workflow(
+        "error_recovery",
+        nodes=[
+            ToolNode(
+                "open_ticket",
+                update_workflow_state,
+                lambda run: {
+                    "stage": "incident",
+                    "status": "in_progress",
+                    "data": run.inputs["incident"],
+                },
+            ),
+            AgentNode("assess", manager, "评估事故: {incident}"),
+            AgentNode("diagnose", analyst, "事故: {incident}\n评估: {assess}"),
+            AgentNode("fix", engineer, "事故: {incident}\n诊断: {diagnose}"),
+            AgentNode("verify", tester, "事故: {incident}\n修复: {fix}"),
+            ToolNode(
+                "close_ticket",
+                update_workflow_state,
+                lambda run: {
+                    "stage": "incident",
+                    "status": "resolved",
+                    "data": run.text("verify"),
+                },
+            ),
+            AgentNode(
+                "escalate",
+                manager,
+                "事故: {incident}\n修复后验证未通过: {verify}\n请制定升级处理方案。",
+            ),
+        ],
+        edges=[
+            ("assess", "diagnose"),
+            ("diagnose", "fix"),
+            ("fix", "verify"),
+            ("open_ticket", "close_ticket"),
+            Edge("verify", "close_ticket", when=verified),
+            Edge("verify", "escalate", when=lambda run: not verified(run)),
+        ],
     )
 
-    expert_processor = AssistantAgent(
-        name="ExpertProcessor",
-        model_client=create_model_client(temperature=0.4),
-        system_message="""你是专家处理员。
-        职责：
-        - 处理复杂和特殊请求
-        - 深入分析和评估
-        - 定制化解决方案
-        - 风险评估和控制
 
-        只处理复杂或需要专业判断的请求。""",
+async def demo_dag_workflows() -> None:
+    """演示 DAG 工作流"""
+    print("\n🧭 DAG Workflow Demo")
+    print("-" * 50)
+
+    # 阶段顺序由图决定，不需要模型选择发言者；互不依赖的节点并发执行
+    runs = [
+        (build_data_dag(), {"batch_id": "batch_001"}),
+        (
+            build_approval_dag(),
+            {
+                "request_id": "budget_2024_q3",
+                "request": "申请追加50万元预算用于云服务扩容",
+            },
+        ),
+        (
+            build_recovery_dag(),
+            {"incident": "用户登录服务出现间歇性错误，影响50%的用户访问"},
+        ),
+    ]
+    for workflow, inputs in runs:
+        run = await workflow.run(**inputs)
+        print(f"\n{run.report()}")
+        last = next(
+            (name for name in reversed(workflow.order) if run[name].ok),
+            None,
+        )
+        if last is not None:
+            content = run.text(last)
+            print(f"   {last}: {content[:200]}{'...' if len(content) > 200 else ''}")
+
+
+async def demo_conditional_workflow() -> None:
+    """演示条件分支工作流"""
+    print("\n🔀 Conditional Workflow Demo")
+    print("-" * 50)
+
+    # 处理员完成后交回控制器，控制器按请求类型的关键词选择分支
+    selector = RuleBasedSelector.hub(
+        "WorkflowController",
+        {
+            "ExpressProcessor": ["紧急", "快速通道"],
+            "StandardProcessor": ["常规", "标准流程"],
+            "ExpertProcessor": ["复杂", "专家评估"],
+        },
     )
 
-    # 创建条件工作流团队
-    termination = TextMentionTermination("条件工作流完成")
-    conditional_team = SelectorGroupChat(
-        participants=[
+    def build_conditional_team() -> SelectorGroupChat:
+        """构建条件工作流团队（每个团队持有自己的成员智能体）"""
+        workflow_controller = AssistantAgent(
+            name="WorkflowController",
+            model_client=create_model_client(temperature=0.2),
+            model_client_stream=streaming_enabled(),
+            tools=[FunctionTool(get_workflow_state, description="获取工作流状态")],
+            system_message="""你是工作流控制器。
+            职责：
+            - 根据条件选择执行路径
+            - 管理分支逻辑
+            - 协调不同处理路径
+            - 合并处理结果
+
+            根据请求类型选择处理路径：
+            - 紧急请求 -> 快速通道
+            - 常规请求 -> 标准流程
+            - 复杂请求 -> 专家评估
+
+            当处理完成时说"条件工作流完成"。""",
+        )
+
+        express_processor = AssistantAgent(
+            name="ExpressProcessor",
+            model_client=create_model_client(temperature=0.3),
+            model_client_stream=streaming_enabled(),
+            system_message="""你是快速处理专员。
+            职责：
+            - 处理紧急和简单请求
+            - 快速响应和解决
+            - 简化流程步骤
+            - 及时反馈结果
+
+            只处理紧急或简单的请求。""",
+        )
+
+        standard_processor = AssistantAgent(
+            name="StandardProcessor",
+            model_client=create_model_client(temperature=0.3),
+            model_client_stream=streaming_enabled(),
+            system_message="""你是标准流程处理员。
+            职责：
+            - 按标准流程处理请求
+            - 完整的审查和验证
+            - 规范的文档记录
+            - 质量控制检查
+
+            处理常规的标准请求。""",
+        )
+
+        expert_processor = AssistantAgent(
+            name="ExpertProcessor",
+            model_client=create_model_client(temperature=0.4),
+            model_client_stream=streaming_enabled(),
+            system_message="""你是专家处理员。
+            职责：
+            - 处理复杂和特殊请求
+            - 深入分析和评估
+            - 定制化解决方案
+            - 风险评估和控制
+
+            只处理复杂或需要专业判断的请求。""",
+        )
+
+        # 创建条件工作流团队
+        termination = TerminationEngine(["条件工作流完成"])
+        participants = [
             workflow_controller,
             express_processor,
             standard_processor,
             expert_processor,
-        ],
-        model_client=create_model_client(temperature=0.2),
-        termination_condition=termination,
-    )
+        ]
+        return SelectorGroupChat(
+            participants=participants,
+            model_client=create_model_client(temperature=0.2),
+            termination_condition=termination,
+            selector_func=selector,
+        )
+
+    # 团队只构建一次；每个请求借出前重置，不继承上一个请求的对话
+    teams = TeamPool(build_conditional_team, name="conditional")
 
     # 测试不同类型的请求
     requests = [
@@ -446,9 +795,11 @@ async def demo_conditional_workflow() -> None:
 
     for request in requests:
         print(f"\n🔀 处理请求: {request}")
-        result = await conditional_team.run(
-            task=f"根据请求类型选择合适的处理路径：{request}",
-        )
+        async with teams.lease() as conditional_team:
+            result = await run_task(
+                conditional_team,
+                f"根据请求类型选择合适的处理路径：{request}",
+            )
 
         # 显示最后几条消息
         for message in result.messages[-2:]:
@@ -460,6 +811,9 @@ async def demo_conditional_workflow() -> None:
             )
             print(f"   {sender}: {content}")
 
+    print(selector.report())
+    print(teams.report())
+
 
 async def demo_workflow_monitoring() -> None:
     """演示工作流监控"""
@@ -470,6 +824,7 @@ async def demo_workflow_monitoring() -> None:
     monitor = AssistantAgent(
         name="WorkflowMonitor",
         model_client=create_model_client(temperature=0.2),
+        model_client_stream=streaming_enabled(),
         tools=[
             FunctionTool(get_workflow_state, description="获取工作流状态"),
             FunctionTool(update_workflow_state, description="更新工作流状态"),
@@ -491,11 +846,11 @@ async def demo_workflow_monitoring() -> None:
     update_workflow_state("系统恢复", "完成", "服务已恢复正常")
 
     # 运行监控
-    termination = TextMentionTermination("工作流监控完成")
+    termination = TerminationEngine(["工作流监控完成"])
     monitor_team = RoundRobinGroupChat([monitor], termination_condition=termination)
 
     task = "生成当前所有工作流的状态报告，识别需要关注的问题并提供建议。"
-    result = await monitor_team.run(task=task)
+    result = await run_task(monitor_team, task)
 
     print("📈 工作流监控报告:")
     for message in result.messages:
@@ -512,6 +867,8 @@ async def main() -> None:
         await demo_data_processing_workflow()
         await demo_approval_workflow()
         await demo_error_recovery_workflow()
+        await demo_checkpoint_resume()
+        await demo_dag_workflows()
         await demo_conditional_workflow()
         await demo_workflow_monitoring()
 
@@ -523,6 +880,9 @@ async def main() -> None:
         print("   • 错误恢复机制提高系统可靠性")
         print("   • 工作流监控帮助优化性能")
         print("   • SelectorGroupChat适合复杂的协作场景")
+        print("   • 声明阶段转移后，大多数轮次无需模型选择发言者")
+        print("   • 增量检查点让失败的长对话从最后一个完好的轮次继续")
+        print("   • 固定流程用 DAG 编排，独立分支并发，关键路径决定总耗时")
 
         # 清理全局状态
         global workflow_state
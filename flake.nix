@@ -24,6 +24,7 @@
           python-dotenv
           pydantic
           openai
+          numpy
 
           # Development tools
           ipython
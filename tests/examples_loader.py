@@ -0,0 +1,20 @@
+"""按文件路径加载示例脚本（文件名以数字开头，不能直接 import）"""
+
+import importlib.util
+import sys
+from pathlib import Path
+from types import ModuleType
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_example(relative_path: str) -> ModuleType:
+    """导入示例模块，同一示例只加载一次"""
+    name = "example_" + Path(relative_path).stem
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, ROOT / relative_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,147 @@
+"""测试用的模型客户端：按脚本回复，可设置延迟和错误，记录每次调用"""
+
+import asyncio
+from collections.abc import AsyncGenerator, Mapping, Sequence
+from typing import Any
+
+from autogen_core import CancellationToken
+from autogen_core.models import (
+    ChatCompletionClient,
+    CreateResult,
+    LLMMessage,
+    ModelCapabilities,
+    ModelInfo,
+    RequestUsage,
+)
+from autogen_core.tools import Tool, ToolSchema
+
+
+def make_result(content: Any, *, cached: bool = False) -> CreateResult:
+    return CreateResult(
+        finish_reason="function_calls" if isinstance(content, list) else "stop",
+        content=content,
+        usage=RequestUsage(prompt_tokens=10, completion_tokens=5),
+        cached=cached,
+    )
+
+
+class FakeModelClient(ChatCompletionClient):
+    """依次返回 replies（最后一条重复使用）
+
+    errors 中的异常依次在前几次调用时抛出；delay 是返回结果前的等待，
+    chunk_delay 是流式调用每个块之间的等待。
+    """
+
+    def __init__(
+        self,
+        replies: Sequence[Any] = ("ok",),
+        *,
+        delay: float = 0.0,
+        chunk_delay: float = 0.0,
+        errors: Sequence[BaseException] = (),
+        model: str = "fake",
+    ):
+        self.replies = list(replies)
+        self.delay = delay
+        self.chunk_delay = chunk_delay
+        self.errors = list(errors)
+        self.model = model
+        self.calls = 0
+        self.requests: list[dict[str, Any]] = []
+        self.tokens: list[CancellationToken | None] = []
+        self.finished = 0
+
+    def _next_reply(self) -> Any:
+        return self.replies[min(self.calls - 1, len(self.replies) - 1)]
+
+    def _begin(
+        self,
+        messages: Sequence[LLMMessage],
+        extra_create_args: Mapping[str, Any],
+        cancellation_token: CancellationToken | None,
+    ) -> None:
+        self.calls += 1
+        self.requests.append(
+            {"messages": list(messages), "create_args": dict(extra_create_args)},
+        )
+        self.tokens.append(cancellation_token)
+        if self.errors:
+            raise self.errors.pop(0)
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),  # noqa: ARG002
+        json_output: Any = None,  # noqa: ARG002
+        extra_create_args: Mapping[str, Any] | None = None,
+        cancellation_token: CancellationToken | None = None,
+    ) -> CreateResult:
+        self._begin(messages, extra_create_args or {}, cancellation_token)
+        reply = self._next_reply()
+        await asyncio.sleep(self.delay)
+        self.finished += 1
+        return make_result(reply)
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),  # noqa: ARG002
+        json_output: Any = None,  # noqa: ARG002
+        extra_create_args: Mapping[str, Any] | None = None,
+        cancellation_token: CancellationToken | None = None,
+        **kwargs: Any,  # noqa: ARG002
+    ) -> AsyncGenerator[str | CreateResult, None]:
+        self._begin(messages, extra_create_args or {}, cancellation_token)
+        reply = self._next_reply()
+        await asyncio.sleep(self.delay)
+        if isinstance(reply, str):
+            for word in reply.split():
+                await asyncio.sleep(self.chunk_delay)
+                yield word + " "
+        self.finished += 1
+        yield make_result(reply)
+
+    async def close(self) -> None:
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    def total_usage(self) -> RequestUsage:
+        return RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    def count_tokens(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),  # noqa: ARG002
+    ) -> int:
+        return sum(len(str(message.content)) for message in messages)
+
+    def remaining_tokens(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = (),
+    ) -> int:
+        return 100000 - self.count_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore[override]
+        return ModelCapabilities(
+            vision=False,
+            function_calling=True,
+            json_output=True,
+        )
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return ModelInfo(
+            family="unknown",
+            vision=False,
+            function_calling=True,
+            json_output=True,
+            structured_output=False,
+        )
@@ -0,0 +1,59 @@
+"""batch: 有界并发、按序返回以及超时后重建智能体"""
+
+import asyncio
+
+from autogen_agentchat.agents import AssistantAgent
+from fakes import FakeModelClient
+
+from autogen_learning.batch import BatchRunner
+from autogen_learning.metrics import MetricsCollector
+
+
+def factory_from(clients: list[FakeModelClient]):
+    def factory() -> AssistantAgent:
+        return AssistantAgent("worker", model_client=clients.pop(0))
+
+    return factory
+
+
+def test_results_keep_input_order_with_bounded_agents(monkeypatch):
+    monkeypatch.setenv("AUTOGEN_STREAMING", "0")
+    clients = [FakeModelClient([f"答案{i}"] * 3) for i in range(2)]
+    runner = BatchRunner(factory_from(clients), concurrency=2)
+
+    results = asyncio.run(runner.run([f"任务{i}" for i in range(5)]))
+    assert [r.task for r in results] == [f"任务{i}" for i in range(5)]
+    assert all(r.ok for r in results)
+    assert runner.stats()["agents_created"] == 2
+
+
+def test_timed_out_agent_is_replaced(monkeypatch):
+    monkeypatch.setenv("AUTOGEN_STREAMING", "0")
+    slow = FakeModelClient(["慢"], delay=1.0)
+    fast = FakeModelClient(["快"])
+    metrics = MetricsCollector()
+    runner = BatchRunner(
+        factory_from([slow, fast]),
+        concurrency=1,
+        timeout=0.05,
+        metrics=metrics,
+    )
+
+    first, second = asyncio.run(runner.run(["第一个", "第二个"]))
+    assert isinstance(first.error, TimeoutError)
+    assert second.ok
+    assert second.content == "快"
+    assert slow.calls == 1
+    assert runner.agents_created == 2
+    assert metrics.counters["batch.agents_discarded"] == 1
+
+
+def test_failed_task_keeps_agent(monkeypatch):
+    monkeypatch.setenv("AUTOGEN_STREAMING", "0")
+    client = FakeModelClient(["好"], errors=[ValueError("坏请求")])
+    runner = BatchRunner(factory_from([client]), concurrency=1)
+
+    first, second = asyncio.run(runner.run(["第一个", "第二个"]))
+    assert isinstance(first.error, ValueError)
+    assert second.ok
+    assert runner.agents_created == 1
@@ -0,0 +1,39 @@
+"""bootstrap: 包的延迟导出"""
+
+import subprocess
+import sys
+
+import pytest
+
+import autogen_learning
+from autogen_learning import _EXPORTS
+
+
+def test_all_matches_exports():
+    assert autogen_learning.__all__ == list(_EXPORTS)
+    assert set(dir(autogen_learning)) >= set(_EXPORTS)
+
+
+def test_every_export_resolves_from_its_module():
+    for name, module in _EXPORTS.items():
+        value = getattr(autogen_learning, name)
+        assert getattr(sys.modules[f"autogen_learning.{module}"], name) is value
+
+
+def test_unknown_name_raises_attribute_error():
+    with pytest.raises(AttributeError, match="NoSuchThing"):
+        autogen_learning.NoSuchThing  # noqa: B018
+
+
+def test_import_does_not_load_submodules():
+    code = (
+        "import sys, autogen_learning; "
+        "print(sorted(m for m in sys.modules if m.startswith('autogen_learning.')))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert result.stdout.strip() == "['autogen_learning.bootstrap']"
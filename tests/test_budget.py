@@ -0,0 +1,74 @@
+"""budget: 默认关闭、按预算裁剪历史和进程级预算器"""
+
+import pytest
+from autogen_core import FunctionCall
+from autogen_core.models import (
+    AssistantMessage,
+    FunctionExecutionResult,
+    FunctionExecutionResultMessage,
+    SystemMessage,
+    UserMessage,
+)
+
+from autogen_learning import budget
+from autogen_learning.budget import ContextBudgeter, TokenCounter, get_budgeter
+
+
+class CharCounter(TokenCounter):
+    """每个字符一个 token，避免依赖 tiktoken 编码文件"""
+
+    def count_text(self, text: str) -> int:
+        return len(text)
+
+
+def test_budget_is_off_unless_configured(monkeypatch):
+    monkeypatch.delenv("AUTOGEN_PROMPT_TOKEN_BUDGET", raising=False)
+    assert get_budgeter() is None
+    monkeypatch.setenv("AUTOGEN_PROMPT_TOKEN_BUDGET", "0")
+    assert get_budgeter() is None
+
+
+def test_get_budgeter_reuses_one_budgeter_per_budget(monkeypatch):
+    monkeypatch.setattr(budget, "_budgeters", {})
+    monkeypatch.setenv("AUTOGEN_PROMPT_TOKEN_BUDGET", "500")
+    first = get_budgeter()
+    assert first is get_budgeter()
+    assert first.max_prompt_tokens == 500
+
+    monkeypatch.setenv("AUTOGEN_PROMPT_TOKEN_BUDGET", "800")
+    assert get_budgeter().max_prompt_tokens == 800
+    monkeypatch.setenv("AUTOGEN_PROMPT_TOKEN_BUDGET", "500")
+    assert get_budgeter() is first
+
+
+def test_rejects_non_positive_budget():
+    with pytest.raises(ValueError, match="必须大于 0"):
+        ContextBudgeter(0)
+
+
+def test_fit_drops_oldest_turns_and_keeps_tool_pairs():
+    call = FunctionCall(id="1", name="search", arguments="{}")
+    messages = [
+        SystemMessage(content="系统"),
+        UserMessage(content="很早的问题" * 10, source="user"),
+        AssistantMessage(content=[call], source="agent"),
+        FunctionExecutionResultMessage(
+            content=[
+                FunctionExecutionResult(call_id="1", content="结果", name="search"),
+            ],
+        ),
+        UserMessage(content="最新的问题", source="user"),
+    ]
+    budgeter = ContextBudgeter(70, counter=CharCounter())
+
+    fitted = budgeter.fit(messages)
+    assert fitted[0] == messages[0]
+    assert "省略 1 条" in fitted[1].content
+    assert fitted[2:] == messages[2:]
+    assert budgeter.messages_dropped == 1
+    assert budgeter.tokens_saved > 0
+
+
+def test_fit_leaves_short_prompts_alone():
+    messages = [UserMessage(content="你好", source="user")]
+    assert ContextBudgeter(100, counter=CharCounter()).fit(messages) == messages
@@ -0,0 +1,124 @@
+"""cache: LRU 淘汰、SQLite 往返、命名空间和缓存键"""
+
+import asyncio
+
+from autogen_core.models import UserMessage
+from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_ext.models.replay import ReplayChatCompletionClient
+from fakes import make_result
+
+from autogen_learning.cache import (
+    CachedModelClient,
+    CompletionCache,
+    MemoryLRUCache,
+    SQLiteCache,
+    request_fingerprint,
+)
+from autogen_learning.clients import ModelClientWrapper
+from autogen_learning.metrics import MetricsCollector
+
+MESSAGES = [UserMessage(content="你好", source="user")]
+
+
+def test_memory_lru_evicts_least_recently_used():
+    cache = MemoryLRUCache(max_entries=2, ttl=60)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    assert cache.put("c", "3") == 1
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert len(cache) == 2
+
+
+def test_memory_lru_expires_entries():
+    cache = MemoryLRUCache(max_entries=2, ttl=60)
+    cache.put("a", "1", created_at=0.0)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_sqlite_round_trip_and_eviction(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = SQLiteCache(path, max_entries=2, ttl=60)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.close()
+
+    reopened = SQLiteCache(path, max_entries=2, ttl=60)
+    assert reopened.get("a")[1] == "1"
+    # a 刚被读取，淘汰最久未访问的 b
+    assert reopened.put("c", "3") == 1
+    assert reopened.get("b") is None
+    assert reopened.get("c")[1] == "3"
+    reopened.close()
+
+
+def test_completion_cache_refills_memory_from_disk(tmp_path):
+    metrics = MetricsCollector()
+    path = tmp_path / "cache.sqlite"
+
+    async def scenario():
+        first = CompletionCache(path=path, metrics=metrics)
+        await first.put("k", make_result("答案"))
+        first.close()
+        second = CompletionCache(path=path, metrics=metrics)
+        from_disk = await second.get("k")
+        from_memory = await second.get("k")
+        second.close()
+        return from_disk, from_memory
+
+    from_disk, from_memory = asyncio.run(scenario())
+    assert from_disk.content == from_memory.content == "答案"
+    assert from_disk.cached
+    assert metrics.counters["cache.disk.hits"] == 1
+    assert metrics.counters["cache.memory.hits"] == 1
+
+
+def test_namespaces_do_not_share_entries(tmp_path):
+    path = tmp_path / "cache.sqlite"
+
+    async def scenario():
+        dev = CompletionCache(path=path, namespace="development")
+        prod = CompletionCache(path=path, namespace="production")
+        await dev.put("k", make_result("dev"))
+        result = await prod.get("k"), await dev.get("k")
+        dev.close()
+        prod.close()
+        return result
+
+    prod_hit, dev_hit = asyncio.run(scenario())
+    assert prod_hit is None
+    assert dev_hit.content == "dev"
+
+
+def test_identity_includes_model_and_create_args():
+    def identity(**kwargs):
+        client = OpenAIChatCompletionClient(api_key="sk-test", **kwargs)
+        return ModelClientWrapper(client).request_identity()
+
+    base = identity(model="gpt-4o", temperature=0.1)
+    assert base["model"] == "gpt-4o"
+    assert base["temperature"] == 0.1
+    assert "api_key" not in base
+
+    key = request_fingerprint(base, MESSAGES)
+    assert key != request_fingerprint(identity(model="gpt-4o-mini"), MESSAGES)
+    assert key != request_fingerprint(
+        identity(model="gpt-4o", temperature=0.9),
+        MESSAGES,
+    )
+
+
+def test_cached_client_answers_repeated_request():
+    inner = ReplayChatCompletionClient(["第一次", "第二次"])
+    client = CachedModelClient(inner, CompletionCache(path=None))
+
+    async def scenario():
+        first = await client.create(MESSAGES)
+        second = await client.create(MESSAGES)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.content == second.content == "第一次"
+    assert second.cached
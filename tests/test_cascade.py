@@ -0,0 +1,60 @@
+"""cascade: 低分升级和包含各层模型的缓存身份"""
+
+import asyncio
+
+from autogen_core.models import UserMessage
+from autogen_ext.models.openai import OpenAIChatCompletionClient
+from fakes import FakeModelClient
+
+from autogen_learning.cascade import CascadeModelClient, choice_scorer
+
+MESSAGES = [UserMessage(content="下一位发言者是谁？", source="user")]
+
+
+def test_escalates_when_cheap_answer_scores_low():
+    cheap = FakeModelClient(["我不确定"])
+    strong = FakeModelClient(["Planner"])
+    client = CascadeModelClient([("cheap", cheap), ("strong", strong)])
+
+    result = asyncio.run(client.create(MESSAGES))
+    assert result.content == "Planner"
+    assert client.tiers[0].escalated == 1
+    assert client.stats()["tiers"]["strong"]["served"] == 1
+
+
+def test_cheap_answer_is_kept_when_it_passes():
+    cheap = FakeModelClient(["Planner"])
+    strong = FakeModelClient(["Coder"])
+    client = CascadeModelClient(
+        [("cheap", cheap), ("strong", strong)],
+        scorers=[choice_scorer(["Planner", "Coder"])],
+    )
+
+    assert asyncio.run(client.create(MESSAGES)).content == "Planner"
+    assert strong.calls == 0
+
+
+def test_identity_includes_every_tier_model():
+    def cascade(cheap_model: str, **options) -> CascadeModelClient:
+        def tier(model: str) -> OpenAIChatCompletionClient:
+            return OpenAIChatCompletionClient(
+                model=model,
+                api_key="sk-test",
+                base_url="http://local",
+                model_info=FakeModelClient().model_info,
+            )
+
+        return CascadeModelClient(
+            [("cheap", tier(cheap_model)), ("strong", tier("big"))],
+            **options,
+        )
+
+    identity = cascade("small").request_identity()
+    assert identity["cascade"]["cheap"]["model"] == "small"
+    assert identity["cascade"]["strong"]["model"] == "big"
+    assert "api_key" not in identity["cascade"]["cheap"]
+    assert identity != cascade("tiny").request_identity()
+    assert identity != cascade("small", threshold=0.9).request_identity()
+    assert (
+        identity != cascade("small", scorers=[choice_scorer(["a"])]).request_identity()
+    )
@@ -0,0 +1,90 @@
+"""cassette: 退出时写盘、严格回放和宽松匹配计数"""
+
+import asyncio
+
+import pytest
+from autogen_core.models import UserMessage
+from fakes import FakeModelClient
+
+from autogen_learning import cassette as cassette_module
+from autogen_learning.cassette import Cassette, CassetteMissError, CassetteModelClient
+
+IDENTITY = {"model": "fake"}
+
+
+def ask(client: CassetteModelClient, *texts: str) -> str:
+    messages = [UserMessage(content=text, source="user") for text in texts]
+    return asyncio.run(client.create(messages)).content
+
+
+def record(path, replies, *conversations) -> None:
+    with Cassette(path, "record") as tape:
+        client = CassetteModelClient(FakeModelClient(replies), tape, IDENTITY)
+        for texts in conversations:
+            ask(client, *texts)
+
+
+def test_record_writes_once_on_close(tmp_path, monkeypatch):
+    path = tmp_path / "tape.json.gz"
+    saves = []
+    monkeypatch.setattr(Cassette, "save", lambda self: saves.append(self.recorded))
+
+    record(path, ["a", "b", "c"], ["1"], ["2"], ["3"])
+    assert saves == [3]
+
+
+def test_replay_returns_recorded_responses(tmp_path):
+    path = tmp_path / "tape.json.gz"
+    record(path, ["甲", "乙"], ["问题一"], ["问题二"])
+
+    tape = Cassette(path, "replay")
+    client = CassetteModelClient(FakeModelClient(), tape, IDENTITY)
+    assert ask(client, "问题二") == "乙"
+    assert ask(client, "问题一") == "甲"
+    assert "hits=2 fallback=0 exhausted=0 misses=0" in tape.summary()
+
+
+def test_strict_replay_rejects_fallback_and_exhausted(tmp_path):
+    path = tmp_path / "tape.json"
+    record(path, ["甲"], ["系统", "开头", "时间 10:00"])
+
+    tape = Cassette(path, "replay")
+    client = CassetteModelClient(FakeModelClient(), tape, IDENTITY)
+    with pytest.raises(CassetteMissError, match="宽松指纹"):
+        ask(client, "系统", "开头", "时间 10:01")
+    ask(client, "系统", "开头", "时间 10:00")
+    with pytest.raises(CassetteMissError, match="已用完"):
+        ask(client, "系统", "开头", "时间 10:00")
+    assert (tape.fallback_hits, tape.exhausted, tape.misses) == (1, 1, 0)
+
+
+def test_loose_replay_answers_but_counts(tmp_path):
+    path = tmp_path / "tape.json"
+    record(path, ["甲"], ["系统", "开头", "时间 10:00"])
+
+    tape = Cassette(path, "replay", strict=False)
+    client = CassetteModelClient(FakeModelClient(), tape, IDENTITY)
+    assert ask(client, "系统", "开头", "时间 10:01") == "甲"
+    assert ask(client, "系统", "开头", "时间 10:00") == "甲"
+    assert ask(client, "系统", "开头", "时间 10:00") == "甲"
+    with pytest.raises(CassetteMissError):
+        ask(client, "另一个对话")
+    assert "hits=3 fallback=1 exhausted=1 misses=1" in tape.summary()
+
+
+def test_get_cassette_reuses_one_cassette_per_setting(tmp_path, monkeypatch):
+    monkeypatch.setattr(cassette_module, "_cassettes", {})
+    monkeypatch.setattr(cassette_module.atexit, "register", lambda *_: None)
+    monkeypatch.setenv("AUTOGEN_CASSETTE", str(tmp_path / "tape.json"))
+    monkeypatch.setenv("AUTOGEN_CASSETTE_MODE", "off")
+    assert cassette_module.get_cassette() is None
+
+    monkeypatch.setenv("AUTOGEN_CASSETTE_MODE", "replay")
+    strict = cassette_module.get_cassette()
+    assert strict is cassette_module.get_cassette()
+    assert strict.strict
+
+    monkeypatch.setenv("AUTOGEN_CASSETTE_STRICT", "0")
+    loose = cassette_module.get_cassette()
+    assert loose is not strict
+    assert not loose.strict
@@ -0,0 +1,139 @@
+"""checkpoint: 增量检查点与完整状态一致，失败后从最后一个检查点继续"""
+
+import asyncio
+
+import pytest
+from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.conditions import MaxMessageTermination
+from autogen_agentchat.teams import RoundRobinGroupChat, SelectorGroupChat
+from fakes import FakeModelClient
+
+from autogen_learning import checkpoint
+from autogen_learning.checkpoint import (
+    CheckpointStore,
+    TurnCheckpoint,
+    resume,
+    run_with_checkpoints,
+)
+from autogen_learning.metrics import MetricsCollector
+
+
+class ModelDownError(Exception):
+    pass
+
+
+def round_robin(replies: dict[str, FakeModelClient], max_messages: int = 5):
+    agents = [
+        AssistantAgent(name, model_client=client) for name, client in replies.items()
+    ]
+    return RoundRobinGroupChat(
+        agents,
+        termination_condition=MaxMessageTermination(max_messages) | TurnCheckpoint(),
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CheckpointStore(tmp_path / "checkpoints.sqlite")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def snapshots(monkeypatch):
+    """每次保存检查点后，记录增量还原的状态和团队自己保存的完整状态"""
+    recorded = []
+    save = checkpoint._ActiveRun.save
+
+    async def checked_save(self, messages):
+        await save(self, messages)
+        # 等成员处理完管理器的广播，再与团队自己保存的状态比较
+        await asyncio.sleep(0.01)
+        full = checkpoint._json_roundtrip(await self.team.save_state())
+        recorded.append((self.state, full))
+
+    monkeypatch.setattr(checkpoint._ActiveRun, "save", checked_save)
+    return recorded
+
+
+@pytest.mark.parametrize("selector", [False, True])
+def test_incremental_state_matches_full_save(store, snapshots, selector):
+    agents = [
+        AssistantAgent("writer", model_client=FakeModelClient(["草稿"])),
+        AssistantAgent("reviewer", model_client=FakeModelClient(["意见"])),
+    ]
+    termination = MaxMessageTermination(5) | TurnCheckpoint()
+    if selector:
+        order = iter(["writer", "reviewer", "writer", "reviewer"])
+        team = SelectorGroupChat(
+            agents,
+            model_client=FakeModelClient(),
+            termination_condition=termination,
+            selector_func=lambda _thread: next(order),
+        )
+    else:
+        team = RoundRobinGroupChat(agents, termination_condition=termination)
+
+    asyncio.run(
+        run_with_checkpoints(team, "写一段介绍", store, run_id="r1", render=False),
+    )
+    assert len(snapshots) == 5
+    for incremental, full in snapshots:
+        assert incremental == full
+    assert store.load("r1").state == snapshots[-1][0]
+
+
+def test_incremental_path_needs_known_version_and_internals(monkeypatch):
+    team = round_robin({"writer": FakeModelClient()})
+    assert checkpoint._group_chat_internals(team) is not None
+
+    monkeypatch.setattr(team, "_team_id", None)
+    assert checkpoint._group_chat_internals(team) is None
+    monkeypatch.undo()
+
+    monkeypatch.setattr(checkpoint, "INCREMENTAL_VERSIONS", ("9.",))
+    assert checkpoint._group_chat_internals(team) is None
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_resume_continues_from_last_checkpoint(store, monkeypatch, incremental):
+    if not incremental:
+        # 未验证的版本每轮保存完整状态，同样可以继续
+        monkeypatch.setattr(checkpoint, "INCREMENTAL_VERSIONS", ("9.",))
+    metrics = MetricsCollector()
+    failing = FakeModelClient(["意见"], errors=[ModelDownError()])
+    team = round_robin(
+        {"writer": FakeModelClient(["草稿"]), "reviewer": failing},
+    )
+
+    with pytest.raises(RuntimeError, match="ModelDownError"):
+        asyncio.run(
+            run_with_checkpoints(
+                team,
+                "写一段介绍",
+                store,
+                run_id="r2",
+                metrics=metrics,
+                render=False,
+            ),
+        )
+    saved = store.load("r2")
+    assert saved.status == "failed"
+    assert saved.turns == 2
+    assert "r2" in store.unfinished()
+    assert metrics.counters["checkpoint.bytes"] == saved.stored_bytes
+
+    writer = FakeModelClient(["草稿"])
+    reviewer = FakeModelClient(["意见"])
+    # 终止条件的计数不属于团队状态，继续运行时从零开始
+    fresh = round_robin({"writer": writer, "reviewer": reviewer}, max_messages=3)
+    result = asyncio.run(resume(fresh, "r2", store, metrics=metrics, render=False))
+
+    assert [m.source for m in result.messages] == ["reviewer", "writer", "reviewer"]
+    # 任务和 writer 的第一次发言不再调用模型
+    assert writer.calls == 1
+    assert reviewer.calls == 2
+    assert store.load("r2").status == "completed"
+    assert metrics.counters["checkpoint.resumed"] == 1
+    with pytest.raises(ValueError, match="已完成"):
+        asyncio.run(resume(fresh, "r2", store, render=False))
@@ -0,0 +1,71 @@
+"""clients: 事件循环隔离的连接池和按需包装"""
+
+import asyncio
+
+import pytest
+
+from autogen_learning.budget import TokenBudgetModelClient
+from autogen_learning.clients import (
+    DeferredModelClient,
+    LoopLocal,
+    ModelClientRegistry,
+)
+
+
+@pytest.fixture
+def wrappers_off(monkeypatch):
+    monkeypatch.setenv("AUTOGEN_CASSETTE_MODE", "off")
+    monkeypatch.setenv("AUTOGEN_PROMPT_TOKEN_BUDGET", "0")
+
+
+def test_loop_local_one_value_per_loop():
+    created = []
+    local = LoopLocal(lambda: created.append(object()) or created[-1])
+
+    async def get_twice():
+        return local.get(), local.get()
+
+    first, again = asyncio.run(get_twice())
+    second, _ = asyncio.run(get_twice())
+    assert first is again
+    assert first is not second
+    # 第一个事件循环已关闭，创建第二个时丢弃
+    assert local.values() == [second]
+
+
+def test_http_client_not_shared_across_loops():
+    registry = ModelClientRegistry()
+
+    async def http_client():
+        client = registry.http_client
+        assert registry.http_client is client
+        return client
+
+    first = asyncio.run(http_client())
+    second = asyncio.run(http_client())
+    assert first is not second
+    assert registry.pool_stats().open_connections == 0
+
+
+@pytest.mark.usefixtures("wrappers_off")
+def test_get_shares_client_and_skips_disabled_wrappers():
+    registry = ModelClientRegistry()
+    a = registry.get("m", "key", "http://x", temperature=0.1)
+    b = registry.get("m", "key", "http://x", temperature=0.9)
+    assert isinstance(a.inner, DeferredModelClient)
+    assert a.inner is b.inner
+    assert not a.inner.created
+    assert a.request_identity() == {
+        "model": "m",
+        "base_url": "http://x",
+        "temperature": 0.1,
+    }
+    assert registry.stats.clients_requested == 2
+
+
+@pytest.mark.usefixtures("wrappers_off")
+def test_get_wraps_budget_when_enabled(monkeypatch):
+    monkeypatch.setenv("AUTOGEN_PROMPT_TOKEN_BUDGET", "1000")
+    client = ModelClientRegistry().get("m", "key")
+    assert isinstance(client.inner, TokenBudgetModelClient)
+    assert client.inner.budgeter.max_prompt_tokens == 1000
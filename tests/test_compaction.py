@@ -0,0 +1,104 @@
+"""compaction: 滚动摘要折叠较早的消息，工具调用与结果不拆开"""
+
+import asyncio
+
+import pytest
+from autogen_core import FunctionCall
+from autogen_core.models import (
+    AssistantMessage,
+    FunctionExecutionResult,
+    FunctionExecutionResultMessage,
+    UserMessage,
+)
+from fakes import FakeModelClient
+
+from autogen_learning.budget import TokenCounter
+from autogen_learning.compaction import (
+    SUMMARY_SOURCE,
+    SummarizingChatCompletionContext,
+    create_model_context,
+)
+from autogen_learning.metrics import MetricsCollector
+
+
+class CharCounter(TokenCounter):
+    """每个字符一个 token，避免依赖 tiktoken 编码文件"""
+
+    def count_text(self, text: str) -> int:
+        return len(text)
+
+
+def tool_turn(call_id: str) -> list:
+    call = FunctionCall(id=call_id, name="lookup", arguments="{}")
+    return [
+        AssistantMessage(content=[call], source="agent"),
+        FunctionExecutionResultMessage(
+            content=[
+                FunctionExecutionResult(call_id=call_id, content="结果", name="lookup"),
+            ],
+        ),
+    ]
+
+
+def make_context(summarizer, **options) -> SummarizingChatCompletionContext:
+    return SummarizingChatCompletionContext(
+        summarizer,
+        max_tokens=50,
+        counter=CharCounter(),
+        **options,
+    )
+
+
+async def fill(context, messages) -> list:
+    for message in messages:
+        await context.add_message(message)
+    return await context.get_messages()
+
+
+def test_folds_old_messages_and_keeps_tool_pairs_together():
+    summarizer = FakeModelClient(["之前讨论了需求"])
+    metrics = MetricsCollector()
+    context = make_context(summarizer, keep_recent=1, metrics=metrics)
+    messages = [
+        UserMessage(content="很早的问题" * 5, source="user"),
+        UserMessage(content="补充说明" * 5, source="user"),
+        *tool_turn("1"),
+    ]
+
+    view = asyncio.run(fill(context, messages))
+    # 只保留 1 条会把工具结果和它的调用拆开，边界因此前移到调用
+    assert view[0].source == SUMMARY_SOURCE
+    assert "之前讨论了需求" in view[0].content
+    assert view[1:] == messages[2:]
+    assert summarizer.calls == 1
+    assert metrics.counters["compaction.folded_messages"] == 2
+    assert context.turns[-1].saved > 0
+
+
+def test_failed_summary_sends_full_history():
+    context = make_context(FakeModelClient(errors=[RuntimeError("down")]))
+    messages = [UserMessage(content=f"消息{i}" * 5, source="user") for i in range(8)]
+
+    view = asyncio.run(fill(context, messages))
+    assert view == messages
+    assert context.turns[-1].saved == 0
+
+
+def test_state_round_trip_keeps_summary():
+    context = make_context(FakeModelClient(["摘要"]), keep_recent=2)
+    messages = [UserMessage(content=f"消息{i}" * 5, source="user") for i in range(6)]
+    asyncio.run(fill(context, messages))
+
+    restored = make_context(FakeModelClient(), keep_recent=2)
+    asyncio.run(restored.load_state(asyncio.run(context.save_state())))
+    view = asyncio.run(restored.get_messages())
+    assert view[0].source == SUMMARY_SOURCE
+    assert view[1:] == messages[-2:]
+
+
+@pytest.mark.parametrize("keep_recent", [0, -1])
+def test_rejects_non_positive_keep_recent(keep_recent):
+    with pytest.raises(ValueError, match="keep_recent"):
+        SummarizingChatCompletionContext(FakeModelClient(), keep_recent=keep_recent)
+    with pytest.raises(ValueError, match="keep_recent"):
+        create_model_context("writer", FakeModelClient(), keep_recent=keep_recent)
@@ -0,0 +1,100 @@
+"""dag: 依赖顺序、条件边、失败传播和部分汇合"""
+
+import asyncio
+
+import pytest
+
+from autogen_learning.dag import COMPLETED, FAILED, SKIPPED, Edge, ToolNode, Workflow
+
+
+class StepError(Exception):
+    pass
+
+
+def step(value: str):
+    return lambda: value
+
+
+def fail():
+    raise StepError("坏了")
+
+
+def statuses(workflow: Workflow, **inputs) -> dict[str, str]:
+    run = asyncio.run(workflow.run(**inputs))
+    return {name: result.status for name, result in run.results.items()}
+
+
+def test_failure_propagates_to_every_downstream_node():
+    workflow = Workflow(
+        "chain",
+        nodes=[
+            ToolNode("extract", fail),
+            ToolNode("other", step("ok")),
+            ToolNode("transform", step("t")),
+            ToolNode("load", step("l")),
+            ToolNode("report", step("r"), partial=True),
+        ],
+        edges=[
+            ("extract", "transform"),
+            ("other", "transform"),
+            ("transform", "load"),
+            ("load", "report"),
+            ("other", "report"),
+        ],
+    )
+
+    assert statuses(workflow) == {
+        "extract": FAILED,
+        "other": COMPLETED,
+        # 默认需要所有上游完成：一个上游失败就跳过，并继续传到下游
+        "transform": SKIPPED,
+        "load": SKIPPED,
+        # partial 节点只要有上游完成就执行
+        "report": COMPLETED,
+    }
+
+
+def test_condition_on_any_edge_gates_strict_join():
+    def flagged(run) -> bool:
+        return "异常" in run.text("validate")
+
+    workflow = Workflow(
+        "join",
+        nodes=[
+            ToolNode("validate", step("全部通过")),
+            ToolNode("review", step("复核")),
+            ToolNode("load", step("加载")),
+        ],
+        edges=[("review", "load"), Edge("validate", "load", when=flagged)],
+    )
+    assert statuses(workflow)["load"] == SKIPPED
+
+
+def test_partial_join_runs_when_only_one_branch_taken():
+    workflow = Workflow(
+        "approval",
+        nodes=[
+            ToolNode("review", step("初审")),
+            ToolNode("specialist", step("专业审批")),
+            ToolNode("final", step("批准"), partial=True),
+        ],
+        edges=[
+            Edge("review", "specialist", when=lambda _run: False),
+            ("review", "final"),
+            ("specialist", "final"),
+        ],
+    )
+
+    run = asyncio.run(workflow.run())
+    assert run["specialist"].status == SKIPPED
+    assert run["final"].ok
+    assert run.format("{specialist}") == "（未执行）"
+    assert run.critical_path() == ["review", "final"]
+
+
+def test_rejects_cycles_and_unknown_nodes():
+    nodes = [ToolNode("a", step("a")), ToolNode("b", step("b"))]
+    with pytest.raises(ValueError, match="环"):
+        Workflow("cycle", nodes=nodes, edges=[("a", "b"), ("b", "a")])
+    with pytest.raises(ValueError, match="不存在"):
+        Workflow("unknown", nodes=nodes, edges=[("a", "c")])
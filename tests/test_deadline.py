@@ -0,0 +1,63 @@
+"""deadline: 按截止时间结束对话，超过宽限期取消在途调用"""
+
+import asyncio
+import time
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from autogen_agentchat.agents import AssistantAgent
+from fakes import FakeModelClient
+
+from autogen_learning.deadline import (
+    DeadlineExceededError,
+    DeadlineTermination,
+    deadline_scope,
+    run_with_deadline,
+)
+from autogen_learning.metrics import MetricsCollector
+from autogen_learning.singleflight import SingleFlightGroup, SingleFlightModelClient
+
+
+def test_termination_uses_current_deadline():
+    termination = DeadlineTermination()
+
+    async def scenario():
+        assert await termination([]) is None
+        with deadline_scope(datetime.now(UTC) - timedelta(seconds=1)):
+            return await termination([])
+
+    stop = asyncio.run(scenario())
+    assert stop is not None
+    assert termination.terminated
+
+
+def test_streamed_singleflight_call_stops_within_grace():
+    inner = FakeModelClient([" ".join("abcdefghij")], chunk_delay=0.1)
+    agent = AssistantAgent(
+        "writer",
+        model_client=SingleFlightModelClient(inner, SingleFlightGroup()),
+        model_client_stream=True,
+    )
+    metrics = MetricsCollector()
+
+    async def scenario():
+        deadline = datetime.now(UTC) + timedelta(seconds=0.1)
+        started_at = time.monotonic()
+        with pytest.raises(DeadlineExceededError) as exc_info:
+            await run_with_deadline(
+                agent,
+                "写点什么",
+                deadline,
+                grace=0.1,
+                metrics=metrics,
+                render=False,
+            )
+        return exc_info.value, time.monotonic() - started_at
+
+    error, elapsed = asyncio.run(scenario())
+    # 截止时间 0.1 秒 + 宽限 0.1 秒，完整回复需要约 1 秒
+    assert elapsed < 0.4
+    assert inner.finished == 0
+    assert inner.tokens[0].is_cancelled()
+    assert error.result.messages[0].content == "写点什么"
+    assert metrics.counters["deadline.cancelled"] == 1
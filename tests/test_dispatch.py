@@ -0,0 +1,71 @@
+"""dispatch: 最少在途分派、按序返回以及丢弃被打断的副本"""
+
+import asyncio
+
+from autogen_agentchat.agents import AssistantAgent
+from fakes import FakeModelClient
+
+from autogen_learning.dispatch import Dispatcher
+
+
+def factory(*clients: FakeModelClient):
+    remaining = list(clients)
+
+    def build() -> AssistantAgent:
+        return AssistantAgent("worker", model_client=remaining.pop(0))
+
+    return build
+
+
+def test_requests_spread_over_replicas_in_order(monkeypatch):
+    monkeypatch.setenv("AUTOGEN_STREAMING", "0")
+    dispatcher = Dispatcher(
+        {
+            "writer": factory(
+                FakeModelClient(["甲"], delay=0.02),
+                FakeModelClient(["乙"], delay=0.02),
+            ),
+        },
+        replicas=2,
+    )
+
+    results = asyncio.run(dispatcher.run([("writer", f"任务{i}") for i in range(4)]))
+    assert [r.task for r in results] == [f"任务{i}" for i in range(4)]
+    assert [r.replica for r in results] == ["writer#1", "writer#2"] * 2
+    assert all(r.ok for r in results)
+
+
+def test_timed_out_replica_is_rebuilt(monkeypatch):
+    monkeypatch.setenv("AUTOGEN_STREAMING", "0")
+    slow = FakeModelClient(["慢"], delay=1.0)
+    fast = FakeModelClient(["快"])
+    dispatcher = Dispatcher({"writer": factory(slow, fast)}, timeout=0.05)
+
+    first, second = asyncio.run(
+        dispatcher.run([("writer", "第一个"), ("writer", "第二个")]),
+    )
+    assert isinstance(first.error, TimeoutError)
+    assert second.content == "快"
+    assert slow.calls == 1
+    assert dispatcher.stats()["replicas"]["writer#1"]["discarded"] == 1
+
+
+def test_cancelling_dispatch_discards_running_replica(monkeypatch):
+    monkeypatch.setenv("AUTOGEN_STREAMING", "0")
+    dispatcher = Dispatcher({"writer": factory(FakeModelClient(delay=1.0))})
+
+    async def scenario():
+        request = asyncio.ensure_future(dispatcher.submit("writer", "任务"))
+        await asyncio.sleep(0.05)
+        request.cancel()
+        try:
+            await request
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(scenario())
+    replica = dispatcher.replicas["writer"][0]
+    assert replica.runnable is None
+    assert replica.discarded == 1
+    assert replica.outstanding == 0
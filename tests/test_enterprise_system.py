@@ -0,0 +1,74 @@
+"""企业系统示例: 智能体只从池中构建和借出"""
+
+import asyncio
+import json
+
+import pytest
+from examples_loader import load_example
+from fakes import FakeModelClient
+
+enterprise = load_example("examples/advanced/02_enterprise_system.py")
+
+
+@pytest.fixture
+def system(monkeypatch):
+    monkeypatch.setenv("AUTOGEN_STREAMING", "0")
+    monkeypatch.setattr(
+        enterprise,
+        "create_model_client",
+        lambda **_: FakeModelClient(["完成"]),
+    )
+    return enterprise.EnterpriseAgentSystem()
+
+
+def replicas(system) -> dict[str, int]:
+    return {key: role["replicas"] for key, role in system.pool.stats()["roles"].items()}
+
+
+def test_no_agent_is_built_until_leased(system):
+    assert not hasattr(system, "agents")
+    assert not any(replicas(system).values())
+
+    async def lease():
+        async with system.pool.lease("system_monitor") as monitor:
+            return monitor.name
+
+    assert asyncio.run(lease()) == "SystemMonitor"
+    assert replicas(system)["system_monitor"] == 1
+    assert sum(replicas(system).values()) == 1
+
+
+def test_health_check_reports_pool_replicas(system):
+    async def lease_twice():
+        async with (
+            system.pool.lease("tech_architect"),
+            system.pool.lease("tech_architect"),
+        ):
+            pass
+
+    asyncio.run(lease_twice())
+    health = json.loads(system._check_agent_health())
+    assert set(health) == set(enterprise.AGENT_SPECS)
+    assert health["tech_architect"]["replicas"] == 2
+    assert json.loads(system._get_system_metrics())["active_agents"] == 2
+
+
+def test_failed_task_is_recorded_and_reraised(system, monkeypatch):
+    class ModelDownError(Exception):
+        pass
+
+    async def failing_request(*_args, **_kwargs):
+        raise ModelDownError("模型服务不可用")
+
+    monkeypatch.setattr(system, "process_enterprise_request", failing_request)
+    task = system.task_manager.create_task(
+        "扩容评估",
+        "评估云服务扩容方案",
+        enterprise.Priority.HIGH,
+    )
+
+    with pytest.raises(ModelDownError):
+        asyncio.run(system.process_task(task.id))
+    assert task.status == enterprise.TaskStatus.FAILED
+    assert task.metadata["stop_reason"] == "ModelDownError: 模型服务不可用"
+    assert task.metadata["transcript"][0]["source"] == "user"
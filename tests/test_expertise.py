@@ -0,0 +1,33 @@
+"""expertise: 按专长描述分派发言者"""
+
+import pytest
+from autogen_agentchat.messages import TextMessage
+
+from autogen_learning.expertise import ExpertiseRouter
+from autogen_learning.selector_bench import ROLES, bench_router
+
+
+def test_bench_transcript_is_routed_without_wrong_picks():
+    result = bench_router(ExpertiseRouter(ROLES), rounds=1)
+    # 无法确定的发言交给模型选择，但不应选错人
+    assert result.correct + result.abstained == result.total
+    assert result.accuracy >= 0.7
+
+
+def test_select_skips_last_speaker_and_abstains_on_noise():
+    router = ExpertiseRouter(ROLES)
+    message = TextMessage(source="Architect", content="请评估安全风险和合规性")
+    assert router([message]) == "SecurityExpert"
+    assert router([TextMessage(source="user", content="好的")]) is None
+
+
+def test_sync_tracks_participants():
+    router = ExpertiseRouter({"A": "数据库 索引", "B": "前端 样式"})
+    router.sync({"B": "前端 样式", "C": "数据库 索引"})
+    assert router.names == ["B", "C"]
+    assert router.match("数据库索引怎么优化") == "C"
+
+
+def test_options_are_keyword_only():
+    with pytest.raises(TypeError):
+        ExpertiseRouter(ROLES, 1024)
@@ -0,0 +1,99 @@
+"""fanout: 并行分支、逐个分支地转发 token、超时放弃和汇总"""
+
+import asyncio
+import itertools
+import time
+from datetime import UTC, datetime, timedelta
+
+from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import ModelClientStreamingChunkEvent
+from fakes import FakeModelClient
+
+from autogen_learning.deadline import deadline_reached, deadline_scope
+from autogen_learning.fanout import FanOutTeam
+from autogen_learning.metrics import MetricsCollector
+
+
+def agent(name: str, reply: str, **options) -> AssistantAgent:
+    return AssistantAgent(
+        name,
+        model_client=FakeModelClient([reply], **options),
+        model_client_stream=True,
+    )
+
+
+def make_team(**options) -> FanOutTeam:
+    return FanOutTeam(
+        [
+            agent("analyst", "a1 a2 a3", chunk_delay=0.01),
+            agent("architect", "b1 b2 b3", chunk_delay=0.01),
+        ],
+        coordinator=agent("lead", "汇总 完成"),
+        **options,
+    )
+
+
+async def collect(team: FanOutTeam) -> list:
+    return [event async for event in team.run_stream(task="评估方案")]
+
+
+def test_branch_tokens_are_streamed_without_interleaving():
+    metrics = MetricsCollector()
+    team = make_team(metrics=metrics)
+
+    events = asyncio.run(collect(team))
+    chunks = [e for e in events if isinstance(e, ModelClientStreamingChunkEvent)]
+    sources = [source for source, _ in itertools.groupby(c.source for c in chunks)]
+    # 每个分支的 token 连续输出，最后是协调者的汇总
+    assert sorted(sources[:2]) == ["analyst", "architect"]
+    assert sources[2:] == ["lead"]
+    assert "fanout.first_token.analyst" in metrics.timers
+    assert "fanout.first_token.architect" in metrics.timers
+
+    result = events[-1]
+    assert isinstance(result, TaskResult)
+    assert not any(
+        isinstance(m, ModelClientStreamingChunkEvent) for m in result.messages
+    )
+    assert result.messages[-1].content == "汇总 完成"
+    assert [b.content for b in team.branches] == ["a1 a2 a3", "b1 b2 b3"]
+
+
+def test_slow_branch_is_dropped_and_merge_still_runs():
+    team = FanOutTeam(
+        [agent("fast", "快"), agent("slow", "慢", delay=1.0)],
+        coordinator=agent("lead", "汇总"),
+        branch_timeout=0.05,
+    )
+
+    result = asyncio.run(team.run(task="评估方案"))
+    assert "已放弃: slow" in result.stop_reason
+    assert team.stats()["dropped"] == ["slow"]
+    merge_prompt = team._merge_task("评估方案")
+    assert "[fast]\n快" in merge_prompt
+    assert "未在时限内回复" in merge_prompt
+
+
+def test_deadline_drops_slow_branch_and_skips_merge():
+    coordinator = agent("lead", "汇总")
+    team = FanOutTeam(
+        [agent("fast", "快"), agent("slow", "慢", delay=1.0)],
+        coordinator=coordinator,
+    )
+
+    async def scenario():
+        deadline = datetime.now(UTC) + timedelta(seconds=0.05)
+        started_at = time.monotonic()
+        with deadline_scope(deadline):
+            result = await team.run(task="评估方案")
+        return result, time.monotonic() - started_at
+
+    result, elapsed = asyncio.run(scenario())
+    assert elapsed < 0.5
+    assert deadline_reached(result)
+    assert "已放弃: slow" in result.stop_reason
+    assert team.merge_skipped
+    assert coordinator._model_client.calls == 0
+    assert result.messages[-1].content == "快"
+    assert "已跳过" in team.report()
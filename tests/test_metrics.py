@@ -0,0 +1,21 @@
+"""metrics: 明细条数上限和带时区的时间戳"""
+
+from autogen_learning.metrics import MetricsCollector
+
+
+def test_history_is_capped_but_counters_accumulate():
+    metrics = MetricsCollector(max_history=3)
+    for i in range(5):
+        metrics.counter("requests")
+        metrics.timer("latency", float(i))
+
+    assert len(metrics.metrics) == 3
+    assert list(metrics.timers["latency"]) == [2.0, 3.0, 4.0]
+    assert metrics.counters["requests"] == 5
+    assert metrics.get_summary()["total_metrics"] == 10
+
+
+def test_timestamps_are_timezone_aware():
+    metrics = MetricsCollector()
+    metrics.gauge("queue", 1)
+    assert metrics.metrics[-1].timestamp.tzinfo is not None
@@ -0,0 +1,87 @@
+"""mock_server: 内置规则让示例能离线跑到终止条件"""
+
+import asyncio
+
+from autogen_core.models import SystemMessage, UserMessage
+from autogen_ext.models.openai import OpenAIChatCompletionClient
+from fakes import FakeModelClient
+
+from autogen_learning.mock_server import (
+    LatencyProfile,
+    MockModelServer,
+    MockServerConfig,
+)
+
+SELECTOR_PROMPT = (
+    "You are in a role play game. Read the above conversation. "
+    "Then select the next role from ['planner', 'coder', 'reviewer'] to play."
+)
+
+
+def make_server(**options) -> MockModelServer:
+    config = MockServerConfig(
+        port=0,
+        latency=LatencyProfile(mean_ms=0),
+        tokens_per_second=0,
+        completion_tokens=3,
+        **options,
+    )
+    return MockModelServer(config)
+
+
+def user(text: str) -> dict[str, str]:
+    return {"role": "user", "content": text}
+
+
+def test_reply_ends_with_phrase_requested_by_system_prompt():
+    server = make_server()
+    content, tool_calls = server._plan(
+        {
+            "messages": [
+                {"role": "system", "content": "完成审查后说“审查通过”结束对话。"},
+                user("请审查这段代码"),
+            ],
+        },
+    )
+    assert not tool_calls
+    assert content.endswith("审查通过")
+
+
+def test_phrases_can_be_disabled():
+    server = make_server(echo_phrases=False)
+    content, _ = server._plan(
+        {"messages": [{"role": "system", "content": '结束时说"DONE"'}, user("hi")]},
+    )
+    assert content == "token0 token1 token2"
+
+
+def test_selector_requests_rotate_through_candidates():
+    server = make_server()
+    body = {"messages": [{"role": "system", "content": SELECTOR_PROMPT}]}
+    picks = [server._plan(body)[0] for _ in range(4)]
+    assert picks == ["planner", "coder", "reviewer", "planner"]
+    assert server.stats["selections"] == 4
+
+    server = make_server(select_roles=False)
+    assert server._plan(body)[0] == "token0 token1 token2"
+
+
+def test_openai_client_receives_phrase_over_http():
+    async def scenario():
+        async with make_server() as server:
+            client = OpenAIChatCompletionClient(
+                model="mock",
+                api_key="x",
+                base_url=server.url,
+                model_info=FakeModelClient().model_info,
+            )
+            result = await client.create(
+                [
+                    SystemMessage(content='任务完成后说"TERMINATE"'),
+                    UserMessage(content="开始", source="user"),
+                ],
+            )
+            await client.close()
+            return result
+
+    assert asyncio.run(scenario()).content.endswith("TERMINATE")
@@ -0,0 +1,95 @@
+"""pool: 按角色复用、隔离、等待和淘汰智能体副本"""
+
+import asyncio
+import types
+
+import pytest
+from autogen_agentchat.agents import AssistantAgent
+from fakes import FakeModelClient
+
+from autogen_learning import pool as pool_module
+from autogen_learning.pool import AgentPool, history_size
+
+
+def writer() -> AssistantAgent:
+    return AssistantAgent("writer", model_client=FakeModelClient(["草稿"]))
+
+
+def test_released_replica_is_reset_and_reused():
+    pool = AgentPool({"writer": writer}, max_per_role=2)
+
+    async def scenario():
+        async with pool.lease("writer") as first:
+            await first.run(task="写一段")
+            assert await history_size(first) > 0
+        async with pool.lease("writer") as second:
+            return first, second, await history_size(second)
+
+    first, second, leftover = asyncio.run(scenario())
+    assert second is first
+    assert leftover == 0
+    stats = pool.stats()["roles"]["writer"]
+    assert (stats["replicas"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_concurrent_leases_get_separate_replicas_up_to_limit():
+    pool = AgentPool({"writer": writer}, max_per_role=2)
+    held = []
+
+    async def hold():
+        async with pool.lease("writer") as agent:
+            held.append(agent)
+            await asyncio.sleep(0.02)
+
+    async def scenario():
+        await asyncio.gather(hold(), hold(), hold())
+
+    asyncio.run(scenario())
+    assert len({id(agent) for agent in held}) == 2
+    stats = pool.stats()["roles"]["writer"]
+    assert stats["replicas"] == 2
+    assert stats["waits"] == 1
+
+
+def test_replica_that_raised_is_discarded():
+    pool = AgentPool({"writer": writer})
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            async with pool.lease("writer"):
+                raise RuntimeError("运行失败")
+        async with pool.lease("writer"):
+            pass
+
+    asyncio.run(scenario())
+    stats = pool.stats()["roles"]["writer"]
+    assert stats["misses"] == 2
+    assert stats["replicas"] == 1
+
+
+def test_idle_replicas_are_evicted_after_ttl(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(
+        pool_module,
+        "time",
+        types.SimpleNamespace(monotonic=lambda: now[0]),
+    )
+    pool = AgentPool({"writer": writer}, idle_ttl=10.0)
+
+    async def scenario():
+        async with pool.lease("writer"):
+            pass
+        now[0] += 5
+        kept = await pool.evict_idle()
+        now[0] += 10
+        return kept, await pool.evict_idle()
+
+    assert asyncio.run(scenario()) == (0, 1)
+    assert pool.stats()["roles"]["writer"]["replicas"] == 0
+
+
+def test_unknown_role_and_invalid_limits():
+    with pytest.raises(ValueError, match="至少允许一个副本"):
+        AgentPool({"writer": writer}, max_per_role=0)
+    with pytest.raises(KeyError):
+        asyncio.run(AgentPool({"writer": writer}).acquire("reviewer"))
@@ -0,0 +1,95 @@
+"""ratelimit: 令牌桶补充、参数校验和跨事件循环复用"""
+
+import asyncio
+import logging
+import types
+
+import pytest
+
+from autogen_learning import ratelimit
+from autogen_learning.ratelimit import AsyncRateLimiter, get_rate_limiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """假时钟：asyncio.sleep 只推进时间，不真正等待"""
+    now = [0.0]
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay, result=None):
+        now[0] += max(delay, 0)
+        return await real_sleep(0, result)
+
+    monkeypatch.setattr(
+        ratelimit,
+        "time",
+        types.SimpleNamespace(monotonic=lambda: now[0]),
+    )
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    return now
+
+
+def test_bucket_refills_at_configured_rate(clock):
+    # 60 次/分钟 = 每秒一个令牌，桶容量取并发数 2
+    limiter = AsyncRateLimiter(60, 2)
+
+    async def take(count):
+        waits = []
+        for _ in range(count):
+            before = clock[0]
+            async with limiter.slot():
+                pass
+            waits.append(clock[0] - before)
+        return waits
+
+    waits = asyncio.run(take(4))
+    assert waits == [0, 0, pytest.approx(1.0), pytest.approx(1.0)]
+
+    # 空闲 10 秒只补满到容量
+    clock[0] += 10
+    waits = asyncio.run(take(3))
+    assert waits == [0, 0, pytest.approx(1.0)]
+
+
+def test_rate_limited_pauses_and_halves_rate(clock):
+    limiter = AsyncRateLimiter(60, 1)
+    limiter.on_rate_limited(retry_after=3.0)
+    assert limiter.rate == pytest.approx(0.5)
+
+    async def take():
+        async with limiter.slot():
+            pass
+
+    asyncio.run(take())
+    assert clock[0] >= 3.0
+    assert limiter.stats()["throttled"] == 1
+
+
+@pytest.mark.parametrize(("rpm", "concurrent"), [(0, 1), (-5, 1), (60, 0)])
+def test_rejects_non_positive_limits(rpm, concurrent):
+    with pytest.raises(ValueError, match="必须大于 0"):
+        AsyncRateLimiter(rpm, concurrent)
+
+
+def test_limiter_works_across_event_loops():
+    limiter = AsyncRateLimiter(6000, 1)
+
+    async def contend():
+        async def one():
+            async with limiter.slot():
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(one(), one())
+
+    asyncio.run(contend())
+    asyncio.run(contend())
+    assert limiter.acquired == 4
+    assert limiter.in_flight == 0
+
+
+def test_get_rate_limiter_warns_on_mismatch(caplog):
+    first = get_rate_limiter("test-mismatch", 60, 2)
+    with caplog.at_level(logging.WARNING, logger="autogen_learning.ratelimit"):
+        again = get_rate_limiter("test-mismatch", 120, 2)
+    assert again is first
+    assert "忽略新参数" in caplog.text
@@ -0,0 +1,139 @@
+"""resilience: 重试退避、对冲和截止时间"""
+
+import asyncio
+import types
+
+import pytest
+from autogen_core.models import CreateResult, UserMessage
+from fakes import FakeModelClient
+
+from autogen_learning.metrics import MetricsCollector
+from autogen_learning.resilience import LatencyTracker, ResilientModelClient
+
+MESSAGES = [UserMessage(content="你好", source="user")]
+
+
+class ServerError(Exception):
+    def __init__(self, status_code: int, headers: dict[str, str] | None = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = types.SimpleNamespace(headers=headers or {})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """记录退避时长的假时钟：asyncio.sleep 不真正等待"""
+    recorded = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay, result=None):
+        recorded.append(delay)
+        return await real_sleep(0, result)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    return recorded
+
+
+def test_retries_with_capped_exponential_backoff(sleeps):
+    inner = FakeModelClient(errors=[ServerError(503), ServerError(502), TimeoutError()])
+    metrics = MetricsCollector()
+    client = ResilientModelClient(
+        inner,
+        timeout=1.0,
+        retry_count=3,
+        backoff_base=0.5,
+        backoff_max=1.5,
+        metrics=metrics,
+    )
+
+    result = asyncio.run(client.create(MESSAGES))
+    assert result.content == "ok"
+    assert inner.calls == 4
+    backoffs = [delay for delay in sleeps if delay]
+    assert len(backoffs) == 3
+    for delay, ceiling in zip(backoffs, [0.5, 1.0, 1.5], strict=True):
+        assert 0 <= delay <= ceiling
+    assert metrics.counters["resilience.retries"] == 3
+    assert metrics.counters["resilience.timeouts"] == 1
+
+
+def test_retry_after_is_a_lower_bound(sleeps):
+    inner = FakeModelClient(errors=[ServerError(429, {"retry-after": "3"})])
+    client = ResilientModelClient(inner, timeout=1.0, retry_count=1)
+
+    asyncio.run(client.create(MESSAGES))
+    assert max(sleeps) >= 3.0
+
+
+def test_non_retryable_error_is_raised_at_once(sleeps):
+    inner = FakeModelClient(errors=[ServerError(400)])
+    client = ResilientModelClient(inner, timeout=1.0, retry_count=3)
+
+    with pytest.raises(ServerError):
+        asyncio.run(client.create(MESSAGES))
+    assert inner.calls == 1
+    assert not [delay for delay in sleeps if delay]
+
+
+def test_attempt_deadline_raises_timeout():
+    inner = FakeModelClient(delay=1.0)
+    client = ResilientModelClient(inner, timeout=0.05, retry_count=0)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(client.create(MESSAGES))
+
+
+def test_hedge_fires_after_p95_and_wins():
+    tracker = LatencyTracker(min_samples=5)
+    for _ in range(5):
+        tracker.observe(0.02)
+    primary = FakeModelClient(["慢"], delay=1.0)
+    hedge = FakeModelClient(["快"])
+    metrics = MetricsCollector()
+    client = ResilientModelClient(
+        primary,
+        timeout=2.0,
+        retry_count=0,
+        hedge=hedge,
+        tracker=tracker,
+        metrics=metrics,
+    )
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        result = await client.create(MESSAGES)
+        return result, loop.time() - started_at
+
+    result, elapsed = asyncio.run(scenario())
+    assert result.content == "快"
+    assert 0.02 <= elapsed < 0.5
+    # 输掉的主请求被取消
+    assert primary.finished == 0
+    assert metrics.counters["resilience.hedges"] == 1
+    assert metrics.counters["resilience.hedge_wins"] == 1
+
+
+def test_no_hedge_until_enough_samples():
+    primary = FakeModelClient(["主"], delay=0.05)
+    hedge = FakeModelClient(["备"])
+    client = ResilientModelClient(primary, timeout=1.0, retry_count=0, hedge=hedge)
+
+    result = asyncio.run(client.create(MESSAGES))
+    assert result.content == "主"
+    assert hedge.calls == 0
+    assert len(client.tracker) == 1
+
+
+@pytest.mark.usefixtures("sleeps")
+def test_stream_retries_only_before_first_chunk():
+    inner = FakeModelClient(["a b"], errors=[ServerError(503)])
+    client = ResilientModelClient(inner, timeout=1.0, retry_count=1)
+
+    async def collect():
+        return [chunk async for chunk in client.create_stream(MESSAGES)]
+
+    chunks = asyncio.run(collect())
+    assert inner.calls == 2
+    assert chunks[:2] == ["a ", "b "]
+    assert isinstance(chunks[-1], CreateResult)
@@ -0,0 +1,131 @@
+"""routing: EWMA 选路、熔断、故障切换和缓存身份"""
+
+import asyncio
+
+import pytest
+from autogen_core.models import CreateResult, UserMessage
+from autogen_ext.models.openai import OpenAIChatCompletionClient
+from fakes import FakeModelClient
+
+from autogen_learning.routing import LatencyRouter, RoutedModelClient
+
+MESSAGES = [UserMessage(content="你好", source="user")]
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class BadRequestError(Exception):
+    status_code = 400
+
+
+def make_router(**clients) -> LatencyRouter:
+    router = LatencyRouter(explore_ratio=0.0)
+    for name, client in clients.items():
+        router.register(name, client)
+    return router
+
+
+def test_prefers_lower_ewma_latency():
+    router = make_router(slow=FakeModelClient(), fast=FakeModelClient())
+    for name, latency in [("slow", 0.5), ("fast", 0.1)]:
+        endpoint = router.endpoints[name]
+        router.finish(endpoint, router.start(endpoint) - latency)
+
+    assert [e.name for e in router.candidates()] == ["fast", "slow"]
+
+
+def test_failing_endpoint_is_benched_for_cooldown():
+    router = make_router(a=FakeModelClient(), b=FakeModelClient())
+    endpoint = router.endpoints["a"]
+    for _ in range(4):
+        router.finish(endpoint, router.start(endpoint), ServerError())
+
+    assert router.stats()["a"]["healthy"] is False
+    assert router.candidates()[0].name == "b"
+
+
+def test_create_fails_over_on_retryable_error():
+    first = FakeModelClient(["a"], errors=[ServerError()])
+    second = FakeModelClient(["b"])
+    client = RoutedModelClient(make_router(first=first, second=second))
+
+    result = asyncio.run(client.create(MESSAGES))
+    assert result.content == "b"
+    assert client.router.endpoints["first"].failures == 1
+
+
+def test_create_raises_non_retryable_error():
+    first = FakeModelClient(errors=[BadRequestError()])
+    second = FakeModelClient()
+    client = RoutedModelClient(make_router(first=first, second=second))
+
+    with pytest.raises(BadRequestError):
+        asyncio.run(client.create(MESSAGES))
+    assert second.calls == 0
+
+
+def test_cancelled_create_releases_in_flight():
+    slow = FakeModelClient(delay=1.0)
+    client = RoutedModelClient(make_router(slow=slow))
+
+    async def scenario():
+        request = asyncio.ensure_future(client.create(MESSAGES))
+        await asyncio.sleep(0.01)
+        assert client.router.endpoints["slow"].in_flight == 1
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+
+    asyncio.run(scenario())
+    endpoint = client.router.endpoints["slow"]
+    assert endpoint.in_flight == 0
+    assert endpoint.failures == 0
+
+
+def test_stream_fails_over_before_first_chunk():
+    first = FakeModelClient(["a"], errors=[ServerError()])
+    second = FakeModelClient(["b c"])
+    client = RoutedModelClient(make_router(first=first, second=second))
+
+    async def collect():
+        return [chunk async for chunk in client.create_stream(MESSAGES)]
+
+    chunks = asyncio.run(collect())
+    assert chunks[:2] == ["b ", "c "]
+    assert isinstance(chunks[-1], CreateResult)
+    assert all(e.in_flight == 0 for e in client.router.endpoints.values())
+
+
+def test_stream_raises_when_every_endpoint_fails():
+    first = FakeModelClient(errors=[ServerError()])
+    second = FakeModelClient(errors=[ServerError()])
+    client = RoutedModelClient(make_router(first=first, second=second))
+
+    async def collect():
+        return [chunk async for chunk in client.create_stream(MESSAGES)]
+
+    with pytest.raises(ServerError):
+        asyncio.run(collect())
+    assert all(e.in_flight == 0 for e in client.router.endpoints.values())
+
+
+def test_identity_includes_every_endpoint_model():
+    def routed(model: str) -> RoutedModelClient:
+        return RoutedModelClient(
+            make_router(
+                deepseek=OpenAIChatCompletionClient(
+                    model="deepseek-chat",
+                    api_key="sk-test",
+                    base_url="http://deepseek",
+                    model_info=FakeModelClient().model_info,
+                ),
+                openai=OpenAIChatCompletionClient(model=model, api_key="sk-test"),
+            ),
+        )
+
+    identity = routed("gpt-4o").request_identity()
+    assert identity["routes"]["deepseek"]["model"] == "deepseek-chat"
+    assert identity["routes"]["openai"]["model"] == "gpt-4o"
+    assert identity != routed("gpt-4o-mini").request_identity()
@@ -0,0 +1,71 @@
+"""selection: 规则选择、fallback 链和选择器基类"""
+
+import pytest
+from autogen_agentchat.messages import TextMessage
+
+from autogen_learning.selection import RuleBasedSelector, SpeakerSelector
+
+
+def said(source: str, content: str = "") -> TextMessage:
+    return TextMessage(source=source, content=content)
+
+
+class FixedSelector(SpeakerSelector):
+    label = "固定"
+
+    def __init__(self, speaker: str | None, **options):
+        super().__init__(**options)
+        self.speaker = speaker
+
+    def select(self, messages):  # noqa: ARG002
+        return self.speaker
+
+
+def test_base_selector_is_abstract():
+    with pytest.raises(TypeError):
+        SpeakerSelector()
+
+    class Incomplete(SpeakerSelector):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_transitions_start_and_mentions():
+    selector = RuleBasedSelector(
+        ["Lead", "Coder", "Tester"],
+        transitions={"Lead": ["Coder", "Tester"], "Coder": ["Tester"]},
+        start="Lead",
+    )
+    assert selector([said("user", "任务")]) == "Lead"
+    assert selector([said("Coder", "写完了")]) == "Tester"
+    assert selector([said("Lead", "请 Tester 先看看")]) == "Tester"
+    # 组长没有点名任何人：规则有歧义，交给模型选择
+    assert selector([said("Lead", "开始吧")]) is None
+    assert selector.stats()["llm_fallbacks"] == 1
+
+
+def test_hub_uses_keywords_then_falls_back():
+    fallback = FixedSelector("Designer")
+    selector = RuleBasedSelector.hub(
+        "Director",
+        {"Writer": ["文案"], "Designer": ["配色"]},
+        fallback=fallback,
+    )
+    assert selector([said("Director", "先写文案")]) == "Writer"
+    assert selector([said("Writer", "写好了")]) == "Director"
+    assert selector([said("Director", "下一步？")]) == "Designer"
+    stats = selector.stats()
+    assert stats["selections"] == {"规则": 2, "固定": 1}
+    assert stats["avoided_llm_calls"] == 3
+
+
+def test_options_are_keyword_only():
+    with pytest.raises(TypeError):
+        RuleBasedSelector(["A", "B"], {"A": ["B"]})
+
+
+def test_unknown_speakers_in_rules_are_rejected():
+    with pytest.raises(ValueError, match="不在团队中"):
+        RuleBasedSelector(["A"], transitions={"A": ["B"]})
@@ -0,0 +1,117 @@
+"""singleflight: 合并相同请求，以及每个等待者各自的取消"""
+
+import asyncio
+import time
+
+import pytest
+from autogen_core import CancellationToken
+from autogen_core.models import CreateResult, UserMessage
+from fakes import FakeModelClient
+
+from autogen_learning.singleflight import SingleFlightGroup, SingleFlightModelClient
+
+MESSAGES = [UserMessage(content="你好", source="user")]
+
+
+async def collect(stream) -> list:
+    return [chunk async for chunk in stream]
+
+
+def test_concurrent_streams_share_one_upstream_call():
+    inner = FakeModelClient(["a b c"], chunk_delay=0.01)
+    client = SingleFlightModelClient(inner, SingleFlightGroup())
+
+    async def scenario():
+        return await asyncio.gather(
+            collect(client.create_stream(MESSAGES)),
+            collect(client.create_stream(MESSAGES)),
+        )
+
+    first, second = asyncio.run(scenario())
+    assert inner.calls == 1
+    assert first == second
+    assert isinstance(first[-1], CreateResult)
+    assert client.group.coalesced == 1
+
+
+def test_cancelled_waiter_stops_while_others_continue():
+    inner = FakeModelClient(["a b c d e"], chunk_delay=0.1)
+    client = SingleFlightModelClient(inner, SingleFlightGroup())
+
+    async def scenario():
+        token = CancellationToken()
+        asyncio.get_running_loop().call_later(0.05, token.cancel)
+        cancelled = asyncio.ensure_future(
+            collect(client.create_stream(MESSAGES, cancellation_token=token)),
+        )
+        survivor = asyncio.ensure_future(collect(client.create_stream(MESSAGES)))
+        started_at = time.monotonic()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        elapsed = time.monotonic() - started_at
+        return elapsed, await survivor
+
+    elapsed, chunks = asyncio.run(scenario())
+    assert elapsed < 0.2
+    assert isinstance(chunks[-1], CreateResult)
+    assert inner.finished == 1
+
+
+def test_upstream_is_cancelled_when_every_waiter_cancels():
+    inner = FakeModelClient(["a b c d e"], chunk_delay=0.5)
+    client = SingleFlightModelClient(inner, SingleFlightGroup())
+
+    async def scenario():
+        token = CancellationToken()
+        asyncio.get_running_loop().call_later(0.05, token.cancel)
+        with pytest.raises(asyncio.CancelledError):
+            await collect(client.create_stream(MESSAGES, cancellation_token=token))
+        await asyncio.sleep(0.05)
+
+    started_at = time.monotonic()
+    asyncio.run(scenario())
+    assert time.monotonic() - started_at < 0.5
+    assert inner.finished == 0
+    # 上游收到的是这次请求自己的令牌，已随等待者一起取消
+    assert inner.tokens[0].is_cancelled()
+
+
+def test_already_cancelled_token_never_starts_upstream():
+    inner = FakeModelClient()
+    client = SingleFlightModelClient(inner, SingleFlightGroup())
+    token = CancellationToken()
+    token.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(collect(client.create_stream(MESSAGES, cancellation_token=token)))
+    assert inner.calls == 0
+
+
+def test_upstream_cancellation_reaches_waiters():
+    inner = FakeModelClient(errors=[asyncio.CancelledError()])
+    client = SingleFlightModelClient(inner, SingleFlightGroup())
+
+    async def scenario():
+        return await asyncio.gather(
+            collect(client.create_stream(MESSAGES)),
+            collect(client.create_stream(MESSAGES)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+
+
+def test_create_cancels_upstream_token_with_last_waiter():
+    inner = FakeModelClient(delay=0.5)
+    client = SingleFlightModelClient(inner, SingleFlightGroup())
+
+    async def scenario():
+        token = CancellationToken()
+        asyncio.get_running_loop().call_later(0.05, token.cancel)
+        with pytest.raises(asyncio.CancelledError):
+            await client.create(MESSAGES, cancellation_token=token)
+
+    asyncio.run(scenario())
+    assert inner.tokens[0].is_cancelled()
+    assert inner.finished == 0
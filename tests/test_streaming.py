@@ -0,0 +1,60 @@
+"""streaming: 渲染、首 token 等待时间和 run_task"""
+
+import asyncio
+
+from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.messages import ModelClientStreamingChunkEvent, TextMessage
+from fakes import FakeModelClient
+
+from autogen_learning.metrics import MetricsCollector
+from autogen_learning.streaming import StreamRenderer, run_task
+
+
+def chunk(source: str, content: str) -> ModelClientStreamingChunkEvent:
+    return ModelClientStreamingChunkEvent(source=source, content=content)
+
+
+def test_renderer_records_waits_per_turn(capsys):
+    metrics = MetricsCollector()
+    renderer = StreamRenderer(metrics=metrics)
+    for event in [
+        TextMessage(source="user", content="任务"),
+        chunk("writer", "你"),
+        chunk("writer", "好"),
+        TextMessage(source="writer", content="你好"),
+        TextMessage(source="reviewer", content="通过"),
+        chunk("writer", "再"),
+    ]:
+        renderer.on_event(event)
+
+    assert len(metrics.timers["stream.first_token_wait.writer"]) == 2
+    assert len(metrics.timers["stream.inter_token.writer"]) == 1
+    output = capsys.readouterr().out
+    # 按 token 渲染过的消息不重复输出，未流式的消息输出预览，任务不回显
+    assert output.count("你好") == 1
+    assert "reviewer: 通过" in output
+    assert "任务" not in output
+
+
+def test_run_task_streams_agent_reply(monkeypatch):
+    monkeypatch.setenv("AUTOGEN_STREAMING", "1")
+    metrics = MetricsCollector()
+    agent = AssistantAgent(
+        "writer",
+        model_client=FakeModelClient(["流式 回复"]),
+        model_client_stream=True,
+    )
+
+    result = asyncio.run(run_task(agent, "写点什么", metrics=metrics, render=False))
+    assert result.messages[-1].content == "流式 回复"
+    assert "stream.first_token_wait.writer" in metrics.timers
+
+
+def test_run_task_without_streaming(monkeypatch):
+    monkeypatch.setenv("AUTOGEN_STREAMING", "0")
+    metrics = MetricsCollector()
+    agent = AssistantAgent("writer", model_client=FakeModelClient(["一次性"]))
+
+    result = asyncio.run(run_task(agent, "写点什么", metrics=metrics))
+    assert result.messages[-1].content == "一次性"
+    assert not metrics.timers
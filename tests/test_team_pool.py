@@ -0,0 +1,98 @@
+"""TeamPool: 借出已重置的团队，不为每个请求重新构建"""
+
+import asyncio
+
+import pytest
+from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.conditions import MaxMessageTermination
+from autogen_agentchat.teams import RoundRobinGroupChat
+from fakes import FakeModelClient
+
+from autogen_learning.pool import TeamPool
+
+
+def build_team() -> RoundRobinGroupChat:
+    return RoundRobinGroupChat(
+        [
+            AssistantAgent("writer", model_client=FakeModelClient(["草稿"])),
+            AssistantAgent("reviewer", model_client=FakeModelClient(["通过"])),
+        ],
+        termination_condition=MaxMessageTermination(3),
+    )
+
+
+def test_team_is_reused_without_leftover_history():
+    pool = TeamPool(build_team, name="review")
+
+    async def scenario():
+        teams = []
+        for task in ("第一篇", "第二篇"):
+            async with pool.lease() as team:
+                teams.append(team)
+                result = await team.run(task=task)
+                assert result.messages[0].content == task
+        return teams
+
+    first, second = asyncio.run(scenario())
+    assert second is first
+    assert [run.reused for run in pool.runs] == [False, True]
+    assert [run.leftover_messages for run in pool.runs] == [0, 0]
+    assert "复用 1 次" in pool.report()
+
+
+def test_prebuild_moves_build_time_out_of_requests():
+    pool = TeamPool(build_team, size=2)
+
+    async def scenario():
+        await pool.prebuild()
+        async with pool.lease(), pool.lease():
+            pass
+
+    asyncio.run(scenario())
+    assert all(run.reused for run in pool.runs)
+    assert pool.prebuild_time > 0
+    assert "预构建" in pool.report()
+
+
+def test_team_that_raised_is_rebuilt():
+    pool = TeamPool(build_team)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            async with pool.lease():
+                raise RuntimeError("运行失败")
+        async with pool.lease():
+            pass
+
+    asyncio.run(scenario())
+    assert [run.reused for run in pool.runs] == [False, False]
+
+
+def test_team_is_discarded_when_history_check_fails():
+    built = []
+
+    def build_broken_team() -> RoundRobinGroupChat:
+        team = build_team()
+        if not built:
+
+            async def broken_save_state():
+                raise RuntimeError("save_state 失败")
+
+            team.save_state = broken_save_state
+        built.append(team)
+        return team
+
+    pool = TeamPool(build_broken_team)
+
+    async def scenario():
+        with pytest.raises(RuntimeError, match="save_state"):
+            async with pool.lease():
+                pass
+        # 名额没有释放时这里会一直等待
+        async with asyncio.timeout(1), pool.lease() as team:
+            return team
+
+    team = asyncio.run(scenario())
+    # 出错的团队被丢弃而不是一直占着名额，下一次借出时重新构建
+    assert team is built[1]
+    assert pool.runs[0].reused is False
@@ -0,0 +1,126 @@
+"""termination: 短语自动机、跨块匹配和各项上限"""
+
+import asyncio
+import types
+
+import pytest
+from autogen_agentchat.base import TerminatedException
+from autogen_agentchat.messages import ModelClientStreamingChunkEvent, TextMessage
+from autogen_core.models import RequestUsage
+
+from autogen_learning import termination
+from autogen_learning.termination import PhraseMatcher, TerminationEngine
+
+
+def message(source: str, content: str, tokens: int = 0) -> TextMessage:
+    usage = RequestUsage(prompt_tokens=tokens, completion_tokens=0) if tokens else None
+    return TextMessage(source=source, content=content, models_usage=usage)
+
+
+def test_finditer_reports_overlapping_phrases():
+    matcher = PhraseMatcher(["he", "she", "hers", "his"])
+    assert list(matcher.finditer("ushers")) == ["she", "he", "hers"]
+    assert matcher.search("this") == "his"
+    assert matcher.search("无关") is None
+
+
+def test_scan_matches_phrase_split_across_chunks():
+    matcher = PhraseMatcher(["任务已全部完成", "系统协调完成"])
+    state = 0
+    found = []
+    for chunk in ["好的，任务已", "全部", "完", "成。"]:
+        phrase, state = matcher.scan(chunk, state)
+        found.append(phrase)
+    assert found == [None, None, None, "任务已全部完成"]
+    # 不带状态逐块扫描找不到跨块的短语
+    assert all(matcher.scan(c)[0] is None for c in ["任务已", "全部完成"])
+
+
+def test_engine_matches_phrase_across_streamed_chunks():
+    engine = TerminationEngine(["任务已全部完成"])
+
+    def chunk(source: str, content: str) -> ModelClientStreamingChunkEvent:
+        return ModelClientStreamingChunkEvent(source=source, content=content)
+
+    async def scenario():
+        return [
+            await engine([chunk("writer", "好的，任务已")]),
+            # 其他来源的增量不打断 writer 的自动机状态
+            await engine([chunk("reviewer", "任务")]),
+            await engine([chunk("writer", "全部")]),
+            await engine([chunk("writer", "完成。")]),
+        ]
+
+    results = asyncio.run(scenario())
+    assert results[:3] == [None, None, None]
+    assert results[3] is not None
+    assert engine.matched == "任务已全部完成"
+    # token 增量不计入消息数
+    assert engine._message_count == 0
+
+
+def test_complete_message_resets_chunk_state():
+    engine = TerminationEngine(["全部完成"])
+    chunk = ModelClientStreamingChunkEvent(source="writer", content="全部")
+
+    async def scenario():
+        await engine([chunk, message("writer", "全部")])
+        return await engine(
+            [ModelClientStreamingChunkEvent(source="writer", content="完成")],
+        )
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_engine_stops_on_phrase_from_allowed_source():
+    engine = TerminationEngine(["完成"], sources=["reviewer"])
+
+    async def scenario():
+        first = await engine([message("writer", "完成")])
+        second = await engine([message("reviewer", "审核完成")])
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first is None
+    assert second is not None
+    assert engine.reason == "phrase"
+    assert engine.matched == "完成"
+    with pytest.raises(TerminatedException):
+        asyncio.run(engine([message("reviewer", "再来")]))
+
+
+def test_engine_counts_messages_and_tokens():
+    by_count = TerminationEngine(max_messages=3)
+    by_tokens = TerminationEngine(max_tokens=100)
+
+    async def scenario():
+        results = [await by_count([message("a", "x")]) for _ in range(3)]
+        results.append(await by_tokens([message("a", "x", 60)]))
+        results.append(await by_tokens([message("b", "y", 60)]))
+        return results
+
+    results = asyncio.run(scenario())
+    assert results[:2] == [None, None]
+    assert by_count.reason == "max_messages"
+    assert results[3] is None
+    assert by_tokens.reason == "max_tokens"
+
+
+def test_engine_timeout_and_reset(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(
+        termination,
+        "time",
+        types.SimpleNamespace(monotonic=lambda: now[0]),
+    )
+    engine = TerminationEngine(timeout=10)
+
+    async def scenario():
+        assert await engine([message("a", "x")]) is None
+        now[0] = 10.0
+        assert await engine([message("a", "y")]) is not None
+        await engine.reset()
+        return await engine([message("a", "z")])
+
+    assert asyncio.run(scenario()) is None
+    assert engine.reason == "timeout"